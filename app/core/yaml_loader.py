@@ -39,6 +39,7 @@ class ExperimentSpec:
     profiles: Dict[str, ProfileSpec]
     workflow: List[WorkflowStep]
     gvars: Dict[str, Any] = field(default_factory=dict)
+    capture: Dict[str, Any] = field(default_factory=dict)
 
 def _load_yaml_all(path: Path) -> Dict[str, Any]:
     docs = list(yaml.safe_load_all(Path(path).read_text(encoding="utf-8")))
@@ -135,13 +136,15 @@ def load_experiment_from_yaml(path: str | Path) -> ExperimentSpec:
         profiles   = _to_profiles(y.get("profiles") or [])
         workflow   = _to_workflow(y.get("workflow") or [])
         gvars      = (y.get("global") or {}) or {}
+        capture    = (y.get("capture") or {}) or {}
 
         exp_id = str(experiment.get("id") or p.stem)
         logger.info(f"[YAML] exp_id={exp_id} templates={len(templates)} profiles={len(profiles)} steps={len(workflow)}")
 
         return ExperimentSpec(
             experiment=experiment, network=network, targets=targets,
-            templates=templates, profiles=profiles, workflow=workflow, gvars=gvars
+            templates=templates, profiles=profiles, workflow=workflow, gvars=gvars,
+            capture=capture
         )
     except Exception as e:
         logger.error(f"[YAML] Erro lendo YAML: {e}")
@@ -669,8 +669,13 @@ class ExperimentGuideDialog(QDialog):
                     raise RuntimeError("Diretório `captures` não existe no projeto.")
 
                 from lab.data.manifest import get_latest_run_ts, build_manifest
+                from lab.datasets.profiling import EtlProfiler
                 run_ts = get_latest_run_ts(captures_dir=captures)
-                manifest_dict = build_manifest(run_ts, cap_dir=captures)
+                # Perfil do clique inteiro (manifest + ETL de cada run) em processed/<run_ts>/meta/etl_profile.json
+                profiler = EtlProfiler(f"runner:{run_ts}")
+                with profiler.stage("manifest") as st:
+                    manifest_dict = build_manifest(run_ts, cap_dir=captures)
+                    st.rows_out = len((manifest_dict or {}).get("runs") or [])
                 if not manifest_dict:
                     raise RuntimeError("Manifest vazio. Verifique se há capturas no diretório.")
                 manifest_path = captures / "manifest.json"
@@ -681,7 +686,7 @@ class ExperimentGuideDialog(QDialog):
                 out_dir = base / "lab" / "data" / "processed"
                 out_dir.mkdir(parents=True, exist_ok=True)
                 # victim_ip opcional (None). Se precisar, evoluir para receber do UI.
-                run_etl_from_manifest(manifest_path, out_dir, victim_ip=None)
+                run_etl_from_manifest(manifest_path, out_dir, victim_ip=None, profiler=profiler)
 
                 return {
                     "run_ts": run_ts,
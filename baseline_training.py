@@ -10,20 +10,38 @@ from sklearn.impute import SimpleImputer
 from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.metrics import classification_report, confusion_matrix, f1_score, roc_auc_score
 
+from lab.datasets.arrow_ipc import ARROW_FILE, ARROW_SUFFIXES, arrow_is_current, read_arrow
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("[Viability]")
 
-def load_df(p: Path) -> pd.DataFrame:
+def _arrow_of(p: Path):
+    """arrow/full.arrow publicado pelo ETL ao lado do dataset, se não for mais antigo que ele."""
+    cand = p.parent / ARROW_FILE
+    return cand if arrow_is_current(p, cand) else None
+
+def load_df(p: Path, columns=None, filters=None) -> pd.DataFrame:
+    """CSV, .parquet avulso, .arrow/.feather ou pasta do dataset particionado (etl/<exp>/dataset).
+    Pasta do dataset com arrow/full.arrow publicado ao lado (etl_arrow) => lê o .arrow mapeado.
+    columns/filters (formato pyarrow) só valem para Parquet/Arrow: lê apenas colunas/partições pedidas."""
     try:
+        p = Path(p)
+        if p.is_dir() and _arrow_of(p) is not None:
+            p = _arrow_of(p)
         logger.info(f"[Viability] Lendo: {p}")
-        return pd.read_csv(p)
+        if p.suffix in ARROW_SUFFIXES:
+            # Arrow IPC mapeado em memória (lab.datasets.arrow_ipc): numéricas chegam sem cópia
+            return read_arrow(p, columns=columns, filters=filters)
+        if p.is_dir() or p.suffix == ".parquet":
+            return pd.read_parquet(p, columns=columns, filters=filters)
+        return pd.read_csv(p, usecols=columns)
     except Exception as e:
-        logger.error(f"[Viability] Falha ao ler CSV: {e}")
+        logger.error(f"[Viability] Falha ao ler dataset: {e}")
         raise
 
 def choose_split(df: pd.DataFrame):
     # tenta blocar por captura/host/execução para evitar vazamento
-    for g in ["capture_id","run_id","sensor_host","src_h","vm_name"]:
+    for g in ["exp_id","run_ts","capture_id","run_id","sensor_host","src_h","vm_name"]:
         if g in df.columns and df[g].nunique() > 1:
             logger.info(f"[Viability] Usando GroupShuffleSplit por '{g}'")
             grp = df[g].astype(str)
@@ -45,9 +63,19 @@ def choose_split(df: pd.DataFrame):
     cut = int(n*0.8)
     return idx[:cut], idx[cut:]
 
+# Verdade de campo do host (auth.log juntado pelo ETL): auth_outcome == "failure" é praticamente o
+# rótulo HydraBrute, então essas colunas ficam fora das features (são para avaliação, não para treino)
+TRUTH_PREFIXES = ("auth_",)
+
+def _feature_frame(df: pd.DataFrame, label_col: str | None) -> pd.DataFrame:
+    drop = [c for c in df.columns if c in (label_col, "sample_weight") or str(c).startswith(TRUTH_PREFIXES)]
+    return df.drop(columns=drop)
+
 def supervised_baseline(df: pd.DataFrame, label_col: str):
     y = df[label_col].astype(str)
-    X = df.drop(columns=[label_col])
+    # Dataset amostrado pelo ETL: sample_weight (Horvitz-Thompson) entra no fit e nas métricas
+    w = df["sample_weight"].to_numpy() if "sample_weight" in df.columns else None
+    X = _feature_frame(df, label_col)
     num_cols = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c])]
     cat_cols = [c for c in X.columns if c not in num_cols]
     pre = ColumnTransformer([
@@ -56,20 +84,23 @@ def supervised_baseline(df: pd.DataFrame, label_col: str):
         ("cat", Pipeline([("imp", SimpleImputer(strategy="most_frequent")),
                           ("oh", OneHotEncoder(handle_unknown="ignore"))]), cat_cols),
     ])
-    clf = RandomForestClassifier(n_estimators=300, class_weight="balanced",
+    # Com pesos o rebalanceamento já veio da amostragem; class_weight dobraria a correção
+    clf = RandomForestClassifier(n_estimators=300, class_weight=None if w is not None else "balanced",
                                  n_jobs=-1, random_state=42)
     pipe = Pipeline([("pre", pre), ("clf", clf)])
     idx_tr, idx_te = choose_split(df)
     Xtr, Xte, ytr, yte = X.iloc[idx_tr], X.iloc[idx_te], y.iloc[idx_tr], y.iloc[idx_te]
     logger.info("[Viability] Treinando RandomForest...")
-    pipe.fit(Xtr, ytr)
+    wtr, wte = (w[idx_tr], w[idx_te]) if w is not None else (None, None)
+    pipe.fit(Xtr, ytr, clf__sample_weight=wtr)
     yp = pipe.predict(Xte)
-    logger.info("\n" + classification_report(yte, yp))
-    logger.info("\nMatriz de confusão:\n%s", confusion_matrix(yte, yp))
+    logger.info("\n" + classification_report(yte, yp, sample_weight=wte))
+    logger.info("\nMatriz de confusão:\n%s", confusion_matrix(yte, yp, sample_weight=wte))
     return True
 
 def unsupervised_baseline(df: pd.DataFrame, label_col: str | None):
-    Xu = df.drop(columns=[label_col]) if label_col else df.copy()
+    w = df["sample_weight"].to_numpy() if "sample_weight" in df.columns else None
+    Xu = _feature_frame(df, label_col)
     num = [c for c in Xu.columns if pd.api.types.is_numeric_dtype(Xu[c])]
     if len(num) < 2:
         logger.error("[Viability] Poucas features numéricas para não-supervisionado.")
@@ -78,14 +109,14 @@ def unsupervised_baseline(df: pd.DataFrame, label_col: str | None):
     iso = IsolationForest(n_estimators=200, contamination="auto",
                           n_jobs=-1, random_state=42)
     logger.info("[Viability] Treinando IsolationForest...")
-    iso.fit(Xu)
+    iso.fit(Xu, sample_weight=w)
     if label_col:
         y_bin = (df[label_col].astype(str) != "benign").astype(int)
         pred = (iso.predict(Xu) == -1).astype(int)
-        f1 = f1_score(y_bin, pred)
+        f1 = f1_score(y_bin, pred, sample_weight=w)
         try:
             scores = -iso.decision_function(Xu)
-            auc = roc_auc_score(y_bin, scores)
+            auc = roc_auc_score(y_bin, scores, sample_weight=w)
         except Exception:
             auc = None
         logger.info(f"[Viability] F1(anomalia)={f1:.3f} | AUC={auc}")
@@ -109,5 +140,5 @@ def main(csv_path: str):
         logger.error(f"[Viability] Erro geral: {e}")
 
 if __name__ == "__main__":
-    csv = sys.argv[1] if len(sys.argv) > 1 else "C:\\Users\\diego\\Desktop\\faculdade\\TCC\\python-projects\\VagrantLabUI\\etl\\exp_hydra_sweep\\csv\\full.csv"
+    csv = sys.argv[1] if len(sys.argv) > 1 else "C:\\Users\\diego\\Desktop\\faculdade\\TCC\\python-projects\\VagrantLabUI\\etl\\exp_hydra_sweep\\dataset"
     main(csv)
@@ -1,15 +1,18 @@
 # lab/orchestrator/actions/sensor.py
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 import logging
+import shlex
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from app.core.logger_setup import setup_logger
 from lab.utils import format_only_keys
 
 logger = setup_logger(Path('.logs'), name="[Sensor]")
 
-SENSOR_INIT_SCRIPT = r"""
+# Provisionamento: base gravável + Zeek instalado; grava run/sensor_state.env.
+SENSOR_BOOTSTRAP_SCRIPT = r"""
     set -euo pipefail
     umask 022
 
@@ -211,54 +214,153 @@ SENSOR_INIT_SCRIPT = r"""
       return 1
     }
 
+    if ! ensure_zeek; then
+      log "Falha ao garantir Zeek — abortando sensor."
+      exit 4
+    fi
+
+    # Estado provisionado: lido pelo start "quente" para pular toda a detecção/instalação acima
+    ZEEXE=$(command -v zeek || echo /opt/zeek/bin/zeek)
+    TCPDUMP=$(command -v tcpdump || echo /usr/sbin/tcpdump)
+    ZEEK_VERSION=$("$ZEEXE" --version 2>/dev/null | awk '{print $NF}' || true)
+    AF_PACKET=0
+    "$ZEEXE" -N 2>/dev/null | grep -qi "af_packet" && AF_PACKET=1
+    IFACE=$(ip route get "{victim_ip}" 2>/dev/null | awk '/dev/ {for(i=1;i<=NF;i++) if($i=="dev"){print $(i+1); exit}}' || true)
+    SUDO_OK=0; [ -n "$SUDO" ] && SUDO_OK=1
+    {
+      printf 'STATE_VERSION=%q\n' "{state_version}"
+      printf 'BASE=%q\nZEEXE=%q\nZEEK_VERSION=%q\nTCPDUMP=%q\n' "$BASE" "$ZEEXE" "$ZEEK_VERSION" "$TCPDUMP"
+      printf 'AF_PACKET=%q\nIFACE=%q\nSUDO_OK=%q\n' "$AF_PACKET" "$IFACE" "$SUDO_OK"
+      printf 'PROVISIONED_AT=%q\n' "$(date -u +%Y-%m-%dT%H:%M:%SZ)"
+    } > "${RUNDIR}/sensor_state.env"
+    log "estado provisionado gravado (zeek ${ZEEK_VERSION:-?} af_packet=${AF_PACKET})"
+
+"""
+
+SENSOR_WARM_PREAMBLE = r"""
+    set -euo pipefail
+    umask 022
+
+    log() { echo "[sensor] $*"; }
+    stale() { echo "::STALE:: $*"; exit 0; }
+    USR="$(id -un)"
+
+    STATE=""
+    for f in "${HOME}/tcc/run/sensor_state.env" "/tmp/tcc/run/sensor_state.env"; do
+      if [ -r "$f" ]; then STATE="$f"; break; fi
+    done
+    [ -n "$STATE" ] || stale "sem estado provisionado"
+    . "$STATE"
+    [ "${STATE_VERSION:-}" = "{state_version}" ] || stale "versão do estado (${STATE_VERSION:-?})"
+    [ -x "${ZEEXE:-}" ] || stale "zeek ausente em ${ZEEXE:-?}"
+    [ -x "${TCPDUMP:-}" ] || stale "tcpdump ausente"
+    [ -d "${BASE}/pcap" ] && [ -w "${BASE}/pcap" ] || stale "base ${BASE} sem escrita"
+    if sudo -n true 2>/dev/null; then SUDO="sudo -n"; else SUDO=""; fi
+    [ "${SUDO_OK:-0}" = "1" ] && [ -z "$SUDO" ] && stale "sudo não-interativo indisponível"
+
+    LOGPCAP="${BASE}/pcap"
+    LOGZEEK="${BASE}/zeek"
+    RUNDIR="${BASE}/run"
+    log "estado provisionado ok (zeek ${ZEEK_VERSION:-?} em ${ZEEXE})"
+"""
+
+# Start da captura propriamente dito (espera BASE/ZEEXE/TCPDUMP/SUDO/AF_PACKET definidos).
+SENSOR_CAPTURE_SCRIPT = r"""
     log "base escolhida: ${BASE}"
-    log "Encerrando restos de zeek/tcpdump (se houver)…"
-    $SUDO pkill -x zeek 2>/dev/null || true
-    $SUDO pkill -x tcpdump 2>/dev/null || true
-    sleep 0.4
+    if pgrep -x zeek >/dev/null 2>&1 || pgrep -x tcpdump >/dev/null 2>&1; then
+      log "Encerrando restos de zeek/tcpdump…"
+      $SUDO pkill -x zeek 2>/dev/null || true
+      $SUDO pkill -x tcpdump 2>/dev/null || true
+      sleep 0.4
+    fi
 
     log "Limpando logs antigos de Zeek…"
     rm -f "${LOGZEEK}"/*.log 2>/dev/null || true
+    rm -rf "${LOGZEEK}"/w[0-9]* 2>/dev/null || true
     : > "${LOGZEEK}/zeek.out" 2>/dev/null || true
 
     victim="{victim_ip}"; attacker="{attacker_ip}"
-    iface=$(ip route get "$victim" 2>/dev/null | awk '/dev/ {for(i=1;i<=NF;i++) if($i=="dev"){print $(i+1); exit}}')
+    iface="{iface}"
+    [ -z "$iface" ] && iface=$(ip route get "$victim" 2>/dev/null | awk '/dev/ {for(i=1;i<=NF;i++) if($i=="dev"){print $(i+1); exit}}')
+    # Tap no próprio victim: a rota para o IP local sai por 'lo' — usa a interface que tem o IP do lab
+    if [ -z "$iface" ] || [ "$iface" = "lo" ]; then
+      iface=$(ip -o -4 addr show | awk -v p="${victim%.*}." 'index($4,p)==1 {print $2; exit}')
+    fi
+    [ -z "$iface" ] && iface="${IFACE:-}"
     [ -z "$iface" ] && iface=$(ip -br link | awk '/UP/ && !/LOOPBACK/ {print $1; exit}')
     log "Interface selecionada: $iface"
 
+    # Contadores de base para o relatório de saúde da captura (delta calculado no stop)
+    echo "$iface" > "${RUNDIR}/iface"
+    softnet=0
+    while read -r _ d _; do softnet=$((softnet + 16#$d)); done < /proc/net/softnet_stat 2>/dev/null || true
+    {
+      echo "rx_dropped_start=$(cat /sys/class/net/$iface/statistics/rx_dropped 2>/dev/null || echo 0)"
+      echo "rx_packets_start=$(cat /sys/class/net/$iface/statistics/rx_packets 2>/dev/null || echo 0)"
+      echo "softnet_dropped_start=${softnet}"
+    } > "${RUNDIR}/capture_start.txt"
+
     chmod 0777 "${LOGPCAP}" "${LOGZEEK}" "${RUNDIR}" 2>/dev/null || true
 
-    nohup $SUDO /usr/sbin/tcpdump -i "$iface" -s 0 -U -nn \
+    # Perfil de captura (snaplen / BPF / buffer / rotação) — ver CAPTURE_PROFILES
+    SNAPLEN="{snaplen}"; BUFKB="{buffer_kb}"; BPF={bpf}
+    TCPDUMP_OPTS=(-i "$iface" -s "$SNAPLEN" -U -nn)
+    [ "$BUFKB" -gt 0 ] && TCPDUMP_OPTS+=(-B "$BUFKB")
+    log "Perfil de captura: {profile} (snaplen=${SNAPLEN} buffer_kb=${BUFKB} bpf='${BPF}')"
+
+    nohup $SUDO "$TCPDUMP" "${TCPDUMP_OPTS[@]}" \
       -w "${LOGPCAP}/exp_%Y%m%d_%H%M%S.pcap" \
-      -G 300 -C 100 -W 48 -Z "$USR" \
+      -G {rotate_seconds} -C {rotate_size_mb} -W {rotate_files} -Z "$USR" \
+      ${BPF:+"$BPF"} \
       > "${LOGPCAP}/tcpdump.out" 2>&1 \
       & echo $! > "${RUNDIR}/tcc_tcpdump.pid"
 
-    sleep 0.8
+    sleep 0.3
     if ! pgrep -x tcpdump >/dev/null; then
       log "ERRO tcpdump (veja ${LOGPCAP}/tcpdump.out):"
       tail -n 200 "${LOGPCAP}/tcpdump.out" || true
       exit 3
     fi
 
-    if ! ensure_zeek; then
-      log "Falha ao garantir Zeek — abortando sensor."
-      exit 4
+    # O BPF vale só para o tcpdump: os logs do Zeek alimentam o dataset rotulado e precisam do
+    # tráfego benigno de toda a rede, não só do par atacante/vítima
+    ZEEK_REDEF="redef CaptureLoss::watch_interval=30sec; redef Stats::report_interval=30sec;"
+
+    FANOUT_WORKERS="{fanout_workers}"
+    if [ "$FANOUT_WORKERS" -gt 1 ] && [ "${AF_PACKET:-0}" = "1" ]; then
+      # N workers no mesmo grupo AF_PACKET: o kernel distribui os fluxos (hash) entre eles.
+      # Cada worker grava em zeek/w<i>/ para não disputar os mesmos arquivos de log.
+      log "Zeek com AF_PACKET fanout (workers=${FANOUT_WORKERS} id={fanout_id})"
+      : > "${RUNDIR}/tcc_zeek.pid"
+      for w in $(seq 0 $((FANOUT_WORKERS - 1))); do
+        mkdir -p "${LOGZEEK}/w${w}" && chmod 0777 "${LOGZEEK}/w${w}" 2>/dev/null || true
+        nohup $SUDO "$ZEEXE" -i "af_packet::$iface" -C misc/capture-loss misc/stats \
+          -e "redef Log::default_logdir=\"${LOGZEEK}/w${w}\"; redef AF_Packet::fanout_id={fanout_id}; redef AF_Packet::buffer_size={af_buffer_bytes}; ${ZEEK_REDEF}" \
+          >> "${LOGZEEK}/zeek.out" 2>&1 \
+          & echo $! >> "${RUNDIR}/tcc_zeek.pid"
+      done
+    else
+      [ "$FANOUT_WORKERS" -gt 1 ] && log "Aviso: plugin AF_Packet ausente no Zeek — usando worker único."
+      nohup $SUDO "$ZEEXE" -i "$iface" -C misc/capture-loss misc/stats \
+        -e "redef Log::default_logdir=\"${LOGZEEK}\"; ${ZEEK_REDEF}" \
+        >> "${LOGZEEK}/zeek.out" 2>&1 \
+        & echo $! > "${RUNDIR}/tcc_zeek.pid"
     fi
 
-    ZEEXE=$(command -v zeek || echo /opt/zeek/bin/zeek)
-    nohup $SUDO "$ZEEXE" -i "$iface" -C \
-      -e "redef Log::default_logdir=\"${LOGZEEK}\"" \
-      >> "${LOGZEEK}/zeek.out" 2>&1 \
-      & echo $! > "${RUNDIR}/tcc_zeek.pid"
-
-    sleep 1.0
+    sleep 0.3
     pgrep -fa "zeek -i" >/dev/null || { log "ERRO ao subir Zeek"; tail -n 200 "${LOGZEEK}/zeek.out" || true; exit 4; }
 
     log "Captura ativa (tcpdump + Zeek)."
     log "[paths] pcap=${LOGPCAP} zeek=${LOGZEEK} run=${RUNDIR}"
 """
 
+# Caminho frio completo (mantido para compatibilidade e para `force_bootstrap`).
+SENSOR_INIT_SCRIPT = SENSOR_BOOTSTRAP_SCRIPT + SENSOR_CAPTURE_SCRIPT
+
+# Incrementar quando o formato de sensor_state.env ou os requisitos mudarem.
+SENSOR_STATE_VERSION = "1"
+
+
 
 
 
@@ -269,10 +371,37 @@ SENSOR_STOP_SCRIPT = r"""
     else
       SUDO=""
     fi
+    BASE="${HOME}/tcc"
+    [ -f "${BASE}/run/iface" ] || BASE="/tmp/tcc"
+    RUNDIR="${BASE}/run"
+
+    had_tcpdump=0
+    pgrep -x tcpdump >/dev/null 2>&1 && had_tcpdump=1
     $SUDO pkill -x tcpdump 2>/dev/null || true
     $SUDO pkill -x zeek 2>/dev/null || true
     sleep 0.5
+    # tcpdump só escreve as estatísticas finais (captured/received/dropped) ao sair
+    for i in $(seq 1 20); do
+      if ! pgrep -x tcpdump >/dev/null 2>&1 && ! pgrep -x zeek >/dev/null 2>&1; then break; fi
+      sleep 0.25
+    done
     echo "[sensor] stopped."
+
+    if [ "$had_tcpdump" = "1" ] && [ -s "${RUNDIR}/iface" ]; then
+      iface=$(cat "${RUNDIR}/iface")
+      TOUT="${BASE}/pcap/tcpdump.out"
+      hp() { echo "::HEALTH:: $1=$2"; }
+      hp iface "$iface"
+      hp tcpdump_captured "$(awk '/packets captured/{v=$1} END{print v+0}' "$TOUT" 2>/dev/null || echo 0)"
+      hp tcpdump_received "$(awk '/received by filter/{v=$1} END{print v+0}' "$TOUT" 2>/dev/null || echo 0)"
+      hp tcpdump_dropped "$(awk '/dropped by kernel/{v=$1} END{print v+0}' "$TOUT" 2>/dev/null || echo 0)"
+      sed 's/^/::HEALTH:: /' "${RUNDIR}/capture_start.txt" 2>/dev/null || true
+      hp rx_dropped_end "$(cat /sys/class/net/$iface/statistics/rx_dropped 2>/dev/null || echo 0)"
+      hp rx_packets_end "$(cat /sys/class/net/$iface/statistics/rx_packets 2>/dev/null || echo 0)"
+      softnet=0
+      while read -r _ d _; do softnet=$((softnet + 16#$d)); done < /proc/net/softnet_stat 2>/dev/null || true
+      hp softnet_dropped_end "$softnet"
+    fi
 """
 
 SENSOR_COLLECT_SCRIPT = r"""
@@ -295,37 +424,284 @@ SENSOR_COLLECT_SCRIPT = r"""
 """
 
 
+HEALTH_PREFIX = "::HEALTH::"
+
+
+@dataclass
+class CaptureProfile:
+    name: str = "full"
+    snaplen: int = 0            # 0 = pacote inteiro (tcpdump -s 0)
+    bpf: str = ""               # só no tcpdump (o Zeek vê tudo); aceita {attacker_ip}/{victim_ip}/{sensor_ip}
+    buffer_mb: int = 0          # 0 = default do kernel/libpcap (tcpdump -B)
+    fanout_workers: int = 0     # >1 => N workers Zeek em AF_PACKET fanout
+    fanout_id: int = 23
+    rotate_seconds: int = 300
+    rotate_size_mb: int = 100
+    rotate_files: int = 48
+
+
+# Perfis prontos; o YAML escolhe um via `capture.profile` e pode sobrescrever qualquer campo.
+CAPTURE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "full": {},
+    # Só cabeçalhos (Eth+IP+TCP com opções) nos pcaps; sem BPF, como os demais perfis
+    "headers": {"snaplen": 128, "buffer_mb": 64},
+    # Floods (SYN/DoS): cabeçalho mínimo, buffer grande e Zeek distribuído; sem BPF, para o
+    # dataset rotulado manter o tráfego benigno fora do par atacante/vítima
+    "flood": {"snaplen": 96, "buffer_mb": 256,
+              "fanout_workers": 2, "rotate_seconds": 120, "rotate_size_mb": 200},
+}
+
+
+def resolve_capture_profile(cfg: Optional[Dict[str, Any]], ips: Dict[str, str]) -> CaptureProfile:
+    """Monta o perfil efetivo a partir de `capture:` do YAML (profile + overrides) e dos IPs resolvidos."""
+    cfg = dict(cfg or {})
+    name = str(cfg.pop("profile", "full") or "full")
+    if name not in CAPTURE_PROFILES:
+        logger.warning(f"[sensor] perfil de captura desconhecido '{name}' — usando 'full'.")
+        name = "full"
+    merged = {**CAPTURE_PROFILES[name], **{k: v for k, v in cfg.items() if k in CaptureProfile.__dataclass_fields__}}
+    prof = CaptureProfile(name=name, **{k: v for k, v in merged.items() if k != "name"})
+    for f in ("snaplen", "buffer_mb", "fanout_workers", "fanout_id", "rotate_seconds", "rotate_size_mb", "rotate_files"):
+        setattr(prof, f, max(0, int(getattr(prof, f) or 0)))
+    bpf = format_only_keys(str(prof.bpf or ""), {
+        "attacker_ip": ips.get("attacker", ""),
+        "victim_ip": ips.get("victim", ""),
+        "sensor_ip": ips.get("sensor", ""),
+    }, {"attacker_ip", "victim_ip", "sensor_ip"})
+    if "host  " in f"{bpf} " or bpf.strip().endswith("host"):
+        # IP não resolvido => filtro inválido; melhor capturar tudo que perder a captura
+        logger.warning(f"[sensor] BPF com IP vazio ('{bpf}') — desabilitando filtro.")
+        bpf = ""
+    prof.bpf = bpf.strip()
+    return prof
+
+
+def _zeek_log_column(path: Path, column: str) -> list[float]:
+    """Lê uma coluna numérica de um log TSV do Zeek (cabeçalho #fields)."""
+    vals: list[float] = []
+    if not path.exists():
+        return vals
+    idx = None
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            if line.startswith("#fields"):
+                names = line.rstrip("\n").split("\t")[1:]
+                idx = names.index(column) if column in names else None
+                continue
+            if line.startswith("#") or idx is None:
+                continue
+            parts = line.rstrip("\n").split("\t")
+            try:
+                vals.append(float(parts[idx]))
+            except (IndexError, ValueError):
+                continue
+    return vals
+
+
+def build_capture_health(raw: dict, zeek_dir: Path | None = None, max_loss_pct: float = 1.0) -> dict:
+    """
+    Consolida contadores do tcpdump/kernel (coletados no stop) e os logs
+    capture_loss.log/stats.log do Zeek em um relatório de perda de captura.
+    """
+    def _i(k: str) -> int:
+        try:
+            return int(float(raw.get(k) or 0))
+        except (TypeError, ValueError):
+            return 0
+
+    received = _i("tcpdump_received")
+    dropped = _i("tcpdump_dropped")
+    health: dict = {
+        "iface": raw.get("iface"),
+        "tcpdump": {"captured": _i("tcpdump_captured"), "received": received, "dropped": dropped},
+        "kernel": {
+            "rx_packets": max(0, _i("rx_packets_end") - _i("rx_packets_start")),
+            "rx_dropped": max(0, _i("rx_dropped_end") - _i("rx_dropped_start")),
+            "softnet_dropped": max(0, _i("softnet_dropped_end") - _i("softnet_dropped_start")),
+        },
+    }
+    loss: dict = {}
+    if received > 0:
+        loss["tcpdump"] = 100.0 * dropped / received
+    if health["kernel"]["rx_packets"] > 0:
+        loss["kernel"] = 100.0 * health["kernel"]["rx_dropped"] / health["kernel"]["rx_packets"]
+
+    if zeek_dir is not None:
+        zeek_dir = Path(zeek_dir)
+        # Com AF_PACKET fanout cada worker grava em zeek/w<i>/
+        pct, proc, zdrop = [], 0.0, 0.0
+        for f in sorted(zeek_dir.rglob("capture_loss.log")):
+            pct += _zeek_log_column(f, "percent_lost")
+        for f in sorted(zeek_dir.rglob("stats.log")):
+            proc += sum(_zeek_log_column(f, "pkts_proc"))
+            zdrop += sum(_zeek_log_column(f, "pkts_dropped"))
+        health["zeek"] = {
+            "capture_loss_pct_max": max(pct) if pct else None,
+            "pkts_proc": int(proc),
+            "pkts_dropped": int(zdrop),
+        }
+        if pct:
+            loss["zeek_capture_loss"] = max(pct)
+        if proc + zdrop > 0:
+            loss["zeek_dropped"] = 100.0 * zdrop / (proc + zdrop)
+
+    health["loss_pct"] = {k: round(v, 4) for k, v in loss.items()}
+    worst = max(loss.values()) if loss else None
+    health["loss_pct_max"] = round(worst, 4) if worst is not None else None
+    health["threshold_pct"] = float(max_loss_pct)
+    if worst is None:
+        health["status"] = "unknown"
+    else:
+        health["status"] = "ok" if worst <= float(max_loss_pct) else "degraded"
+    return health
+
+
+def _zeek_time_range(path: Path) -> Optional[Dict[str, Any]]:
+    ts = _zeek_log_column(path, "ts")
+    if not ts:
+        return None
+    return {"first_ts": min(ts), "last_ts": max(ts), "records": len(ts)}
+
+
+@dataclass
+class SensorTap:
+    id: str                 # namespace local (out_base/<id>/) e nas métricas
+    host: str               # VM onde tcpdump/Zeek rodam
+    iface: str = ""         # vazio => detectado pelo script (rota para o victim / IP do lab)
+
+
+def resolve_sensor_taps(capture: Optional[Dict[str, Any]]) -> list[SensorTap]:
+    """
+    Lê `capture.sensors` do YAML. Sem a chave, mantém o comportamento clássico
+    (um único sensor na VM 'sensor'). Um tap por VM: os scripts controlam
+    tcpdump/Zeek por nome de processo.
+    """
+    entries = (capture or {}).get("sensors") or [{"host": "sensor"}]
+    taps: list[SensorTap] = []
+    seen_hosts: set[str] = set()
+    for i, ent in enumerate(entries):
+        if isinstance(ent, str):
+            ent = {"host": ent}
+        host = str(ent.get("host") or ent.get("name") or "").strip()
+        if not host:
+            logger.warning(f"[sensor] entrada de sensor sem host ignorada: {ent!r}")
+            continue
+        if host in seen_hosts:
+            logger.warning(f"[sensor] mais de um tap na VM '{host}' não é suportado — ignorando {ent!r}")
+            continue
+        seen_hosts.add(host)
+        default_id = "sensor" if host == "sensor" else f"{host}_tap"
+        taps.append(SensorTap(id=str(ent.get("id") or default_id), host=host, iface=str(ent.get("iface") or "")))
+    return taps
+
+
+def build_sensor_timeline(out_base: Path, taps: list[SensorTap]) -> Dict[str, Any]:
+    """Linha do tempo mesclada: quais arquivos (pcap/zeek) cada tap produziu e em que intervalo."""
+    from lab.datasets.pcap_flows import pcap_time_range
+    segments: list[Dict[str, Any]] = []
+    for tap in taps:
+        base = Path(out_base) / tap.id
+        for f in sorted((base / "pcap").glob("*.pcap*")):
+            rng = pcap_time_range(f)
+            if rng and rng.get("first_ts") is not None:
+                segments.append({"sensor": tap.id, "host": tap.host, "kind": "pcap",
+                                 "file": str(f.relative_to(out_base)), **rng})
+        for f in sorted((base / "zeek").rglob("*.log")):
+            if f.name in ("stats.log", "capture_loss.log", "loaded_scripts.log", "packet_filter.log"):
+                continue
+            rng = _zeek_time_range(f)
+            if rng:
+                segments.append({"sensor": tap.id, "host": tap.host, "kind": f"zeek:{f.stem}",
+                                 "file": str(f.relative_to(out_base)), **rng})
+    segments.sort(key=lambda x: (x["first_ts"], x["sensor"]))
+    return {"sensors": [asdict(t) for t in taps], "segments": segments}
+
+
 @dataclass
 class SensorAgent:
 
-    def __init__(self, ssh_manager, name: str = "sensor"):
+    def __init__(self, ssh_manager, name: str = "sensor", iface: str = ""):
         self.ssh = ssh_manager
         self.name = name
-
-    def sanitize_and_start(self, victim_ip: str, attacker_ip: str, timeout: int = 60):
+        self.iface = iface
+        # Contadores brutos do último stop (vazio até a captura ser encerrada)
+        self.capture_stats: dict = {}
+        # Perfil efetivamente aplicado no último start (registrado no metadata.json)
+        self.capture_profile: dict = {}
+
+    def sanitize_and_start(self, victim_ip: str, attacker_ip: str, timeout: int = 60,
+                           capture: Optional[Dict[str, Any]] = None, sensor_ip: str = "",
+                           force_bootstrap: bool = False):
+        """
+        Inicia tcpdump + Zeek. Em VMs já provisionadas (run/sensor_state.env válido) envia
+        só o script curto de captura; o caminho de instalação/detecção roda apenas quando o
+        estado está ausente ou desatualizado (ou com `force_bootstrap`).
+        """
+        import time
         import traceback
         try:
             logger.info("[sensor] inicializando captura…")
-            # Evita .format() para não quebrar as chaves do awk/bash
-            script = format_only_keys(
-                SENSOR_INIT_SCRIPT,
-                {"victim_ip": victim_ip, "attacker_ip": attacker_ip},
-                {"victim_ip", "attacker_ip"}
-            )
-            out = self.ssh.run_command(self.name, script, timeout=timeout)
+            t0 = time.time()
+            prof = resolve_capture_profile(capture, {"victim": victim_ip, "attacker": attacker_ip, "sensor": sensor_ip})
+            values = {
+                "victim_ip": victim_ip,
+                "attacker_ip": attacker_ip,
+                "iface": self.iface,
+                "state_version": SENSOR_STATE_VERSION,
+                "profile": prof.name,
+                "snaplen": prof.snaplen,
+                "buffer_kb": prof.buffer_mb * 1024,
+                "bpf": shlex.quote(prof.bpf),
+                "fanout_workers": prof.fanout_workers,
+                "fanout_id": prof.fanout_id,
+                "af_buffer_bytes": (prof.buffer_mb or 128) * 1024 * 1024,
+                "rotate_seconds": prof.rotate_seconds or 300,
+                "rotate_size_mb": prof.rotate_size_mb or 100,
+                "rotate_files": prof.rotate_files or 48,
+            }
+            self.capture_profile = asdict(prof)
+
+            out = ""
+            mode = "cold"
+            if not force_bootstrap:
+                # Evita .format() para não quebrar as chaves do awk/bash
+                warm = format_only_keys(SENSOR_WARM_PREAMBLE + SENSOR_CAPTURE_SCRIPT, values, set(values))
+                out = self.ssh.run_command(self.name, warm, timeout=min(timeout, 20)) or ""
+                stale = next((ln for ln in out.splitlines() if ln.startswith("::STALE::")), None)
+                if stale is None:
+                    mode = "warm"
+                else:
+                    logger.info(f"[sensor] estado provisionado inválido ({stale[9:].strip()}) — bootstrap completo.")
+
+            if mode == "cold":
+                script = format_only_keys(SENSOR_INIT_SCRIPT, values, set(values))
+                out = self.ssh.run_command(self.name, script, timeout=timeout)
+
             for line in (out or "").splitlines():
                 logger.info(line)
+            self.capture_profile["bootstrap"] = mode
+            logger.info(f"[sensor:{self.name}] captura iniciada ({mode}) em {time.time() - t0:.2f}s")
         except Exception as e:
             logger.error(f"[sensor] Falha ao iniciar captura: {e}")
             logger.error(traceback.format_exc())
             raise
 
-    def stop(self):
+    def stop(self) -> dict:
         try:
-            self.ssh.run_command(self.name, SENSOR_STOP_SCRIPT, timeout=30)
+            out = self.ssh.run_command(self.name, SENSOR_STOP_SCRIPT, timeout=30)
+            stats = {}
+            for line in (out or "").splitlines():
+                line = line.strip()
+                if line.startswith(HEALTH_PREFIX) and "=" in line:
+                    k, v = line[len(HEALTH_PREFIX):].strip().split("=", 1)
+                    stats[k.strip()] = v.strip()
+            # stop() é chamado mais de uma vez (ação + finally); mantém o primeiro com dados
+            if stats:
+                self.capture_stats = stats
             logger.info("[sensor] captura parada.")
         except Exception as e:
             logger.warning(f"[sensor] stop: {e}")
+        return self.capture_stats
 
     def collect_snapshot(self):
         try:
@@ -333,3 +709,60 @@ class SensorAgent:
             logger.info(out or "")
         except Exception as e:
             logger.warning(f"[sensor] collect: {e}")
+
+
+class SensorGroup:
+    """
+    Conjunto de taps (um SensorAgent por VM) iniciados/parados em paralelo.
+    Expõe a mesma interface do SensorAgent; `capture_stats`/`capture_profile`
+    refletem o tap primário (o primeiro da lista).
+    """
+
+    def __init__(self, ssh_manager, taps: Optional[list[SensorTap]] = None):
+        self.taps = taps or [SensorTap(id="sensor", host="sensor")]
+        self.agents: Dict[str, SensorAgent] = {t.id: SensorAgent(ssh_manager, t.host, iface=t.iface) for t in self.taps}
+
+    @property
+    def primary(self) -> SensorAgent:
+        return self.agents[self.taps[0].id]
+
+    @property
+    def capture_stats(self) -> dict:
+        return self.primary.capture_stats
+
+    @property
+    def capture_profile(self) -> dict:
+        return self.primary.capture_profile
+
+    def _each(self, fn_name: str, *args, **kwargs) -> Dict[str, Any]:
+        from concurrent.futures import ThreadPoolExecutor
+        results: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.agents))) as ex:
+            futs = {tid: ex.submit(getattr(a, fn_name), *args, **kwargs) for tid, a in self.agents.items()}
+            for tid, fut in futs.items():
+                try:
+                    results[tid] = fut.result()
+                except Exception as e:
+                    errors[tid] = e
+        if errors:
+            first = next(iter(errors.values()))
+            logger.error(f"[sensor] {fn_name} falhou em {list(errors)}: {first}")
+            raise first
+        return results
+
+    def sanitize_and_start(self, victim_ip: str, attacker_ip: str, timeout: int = 60,
+                           capture: Optional[Dict[str, Any]] = None, sensor_ip: str = "",
+                           force_bootstrap: bool = False):
+        cap = {k: v for k, v in (capture or {}).items() if k != "sensors"}
+        logger.info(f"[sensor] iniciando {len(self.taps)} tap(s): {[t.id for t in self.taps]}")
+        self._each("sanitize_and_start", victim_ip, attacker_ip, timeout=timeout, capture=cap,
+                   sensor_ip=sensor_ip, force_bootstrap=force_bootstrap)
+
+    def stop(self) -> dict:
+        self._each("stop")
+        return self.capture_stats
+
+    def collect_snapshot(self):
+        self._each("collect_snapshot")
+
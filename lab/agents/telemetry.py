@@ -0,0 +1,234 @@
+# lab/orchestrator/actions/telemetry.py
+from __future__ import annotations
+
+import base64
+import csv
+import json
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from app.core.logger_setup import setup_logger
+from lab.utils import format_only_keys
+
+logger = setup_logger(Path('.logs'), name="[Telemetry]")
+
+try:
+    import pyarrow as pa  # opcional: converte o TSV bruto em parquet no host
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# Colunas gravadas pelo sampler remoto (contadores brutos, acumulados).
+# As taxas/deltas são calculadas no host para manter o loop na VM barato.
+TELEMETRY_COLUMNS = (
+    "ts_ms",
+    "cpu_user", "cpu_nice", "cpu_system", "cpu_idle", "cpu_iowait", "cpu_irq", "cpu_softirq",
+    "load1", "mem_total_kb", "mem_avail_kb",
+    "rx_bytes", "rx_packets", "rx_dropped", "tx_bytes", "tx_packets",
+    "tcpdump_dropped", "zeek_dropped",
+)
+
+# Loop de amostragem executado na VM (enviado em base64 para evitar heredoc/quoting).
+TELEMETRY_SAMPLER = textwrap.dedent(r"""
+    #!/bin/bash
+    OUT="$1"; IFACE="$2"; INTERVAL="$3"; BASE="$4"
+    NET="/sys/class/net/${IFACE}/statistics"
+    rd() { cat "$1" 2>/dev/null || echo 0; }
+    while :; do
+      ts=$(date +%s%3N)
+      cpu=$(awk '/^cpu /{print $2"\t"$3"\t"$4"\t"$5"\t"$6"\t"$7"\t"$8; exit}' /proc/stat)
+      load=$(cut -d' ' -f1 /proc/loadavg)
+      mem=$(awk '/^MemTotal:/{t=$2} /^MemAvailable:/{a=$2} END{print t"\t"a}' /proc/meminfo)
+      net=$(printf '%s\t%s\t%s\t%s\t%s' "$(rd "$NET/rx_bytes")" "$(rd "$NET/rx_packets")" \
+            "$(rd "$NET/rx_dropped")" "$(rd "$NET/tx_bytes")" "$(rd "$NET/tx_packets")")
+      tdrop=0; zdrop=0
+      # Último "N packets dropped by kernel" do tcpdump.out: o sampler não sinaliza o tcpdump (cada
+      # SIGUSR1 acrescenta um bloco ao arquivo); o contador anda a cada fim de etapa (mark_stage_end)
+      if [ -s "${BASE}/pcap/tcpdump.out" ]; then
+        tdrop=$(awk '/dropped by kernel/{v=$1} END{print v+0}' "${BASE}/pcap/tcpdump.out" 2>/dev/null || echo 0)
+      fi
+      if [ -s "${BASE}/zeek/stats.log" ]; then
+        zdrop=$(awk -F'\t' '/^#fields/{for(i=2;i<=NF;i++) if($i=="pkts_dropped") c=i-1; next} /^#/{next} c{s+=$c} END{print s+0}' \
+                "${BASE}/zeek/stats.log" 2>/dev/null || echo 0)
+      fi
+      printf '%s\t%s\t%s\t%s\t%s\t%s\t%s\n' "$ts" "$cpu" "$load" "$mem" "$net" "$tdrop" "$zdrop" >> "$OUT"
+      sleep "$INTERVAL"
+    done
+""").lstrip()
+
+TELEMETRY_START_SCRIPT = r"""
+    set -euo pipefail
+    BASE="${HOME}/tcc"
+    mkdir -p "${BASE}/run" 2>/dev/null || { BASE="/tmp/tcc"; mkdir -p "${BASE}/run"; }
+    RUNDIR="${BASE}/run"
+    OUT="${RUNDIR}/telemetry.tsv"
+    PIDF="${RUNDIR}/tcc_telemetry.pid"
+
+    if [ -s "$PIDF" ] && kill -0 "$(cat "$PIDF")" 2>/dev/null; then
+      kill "$(cat "$PIDF")" 2>/dev/null || true
+      sleep 0.2
+    fi
+
+    # Interface que carrega o IP do lab (no próprio victim, 'ip route get' devolveria 'lo')
+    victim="{victim_ip}"; pfx="${victim%.*}."
+    iface=$(ip -o -4 addr show | awk -v p="$pfx" 'index($4,p)==1 {print $2; exit}')
+    [ -z "$iface" ] && iface=$(ip route get "$victim" 2>/dev/null | awk '/dev/ {for(i=1;i<=NF;i++) if($i=="dev"){print $(i+1); exit}}')
+    [ -z "$iface" ] && iface=$(ip -br link | awk '/UP/ && !/LOOPBACK/ {print $1; exit}')
+
+    printf '{header}\n' > "$OUT"
+    echo "{sampler_b64}" | base64 -d > "${RUNDIR}/tcc_telemetry.sh"
+    chmod +x "${RUNDIR}/tcc_telemetry.sh"
+
+    nohup setsid "${RUNDIR}/tcc_telemetry.sh" "$OUT" "$iface" "{interval_s}" "$BASE" \
+      >/dev/null 2>&1 </dev/null & echo $! > "$PIDF"
+    echo "[telemetry] sampler ativo (iface=${iface} interval={interval_s}s out=${OUT})"
+"""
+
+# Um SIGUSR1 por fim de etapa: o tcpdump imprime "N packets dropped by kernel" no tcpdump.out
+TELEMETRY_STAGE_SCRIPT = r"""
+    set -uo pipefail
+    if sudo -n true 2>/dev/null; then SUDO="sudo -n"; else SUDO=""; fi
+    if pgrep -x tcpdump >/dev/null 2>&1; then
+      $SUDO pkill -USR1 -x tcpdump 2>/dev/null || true
+    fi
+    exit 0
+"""
+
+TELEMETRY_STOP_SCRIPT = r"""
+    set -uo pipefail
+    for BASE in "${HOME}/tcc" "/tmp/tcc"; do
+      PIDF="${BASE}/run/tcc_telemetry.pid"
+      if [ -s "$PIDF" ]; then
+        kill "$(cat "$PIDF")" 2>/dev/null || true
+        rm -f "$PIDF"
+        echo "[telemetry] sampler parado (${BASE})."
+      fi
+    done
+    exit 0
+"""
+
+
+@dataclass
+class TelemetryAgent:
+
+    def __init__(self, ssh_manager, hosts: Iterable[str] = ("attacker", "victim", "sensor"), interval_s: float = 1.0):
+        self.ssh = ssh_manager
+        self.hosts = list(hosts)
+        self.interval_s = max(0.2, float(interval_s))
+        self._started: set[str] = set()
+
+    def start(self, victim_ip: str, timeout: int = 30):
+        script = format_only_keys(
+            TELEMETRY_START_SCRIPT,
+            {
+                "victim_ip": victim_ip,
+                "interval_s": f"{self.interval_s:g}",
+                "header": "\\t".join(TELEMETRY_COLUMNS),
+                "sampler_b64": base64.b64encode(TELEMETRY_SAMPLER.encode("utf-8")).decode("ascii"),
+            },
+            {"victim_ip", "interval_s", "header", "sampler_b64"}
+        )
+        for host in self.hosts:
+            try:
+                out = self.ssh.run_command(host, script, timeout=timeout)
+                for line in (out or "").splitlines():
+                    logger.info(f"[{host}] {line}")
+                self._started.add(host)
+            except Exception as e:
+                logger.warning(f"[telemetry] start em {host} falhou (seguindo sem telemetria): {e}")
+
+    def mark_stage_end(self):
+        """Atualiza o contador de drops do tcpdump (um SIGUSR1 nos hosts com telemetria ativa)."""
+        for host in self._started:
+            try:
+                self.ssh.run_command(host, TELEMETRY_STAGE_SCRIPT, timeout=20)
+            except Exception as e:
+                logger.warning(f"[telemetry] drops do tcpdump em {host}: {e}")
+
+    def stop(self):
+        for host in list(self._started):
+            try:
+                self.ssh.run_command(host, TELEMETRY_STOP_SCRIPT, timeout=20)
+                self._started.discard(host)
+            except Exception as e:
+                logger.warning(f"[telemetry] stop em {host}: {e}")
+
+
+def _read_tsv(path: Path) -> list[dict]:
+    rows: list[dict] = []
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as fh:
+        for rec in csv.DictReader(fh, delimiter="\t"):
+            try:
+                rows.append({k: float(rec.get(k) or 0) for k in TELEMETRY_COLUMNS})
+            except (TypeError, ValueError):
+                continue  # linha truncada (sampler morto no meio do printf)
+    return rows
+
+
+def summarize_telemetry(tsv_path: Path, write_parquet: bool = True) -> Optional[Dict]:
+    """
+    Resume o TSV bruto do sampler (contadores acumulados) em métricas de saturação.
+    Opcionalmente grava telemetry.parquet ao lado do TSV.
+    """
+    tsv_path = Path(tsv_path)
+    if not tsv_path.exists():
+        return None
+    try:
+        rows = _read_tsv(tsv_path)
+        if len(rows) < 2:
+            return {"samples": len(rows)}
+
+        busy_pct, iowait_pct, rx_pps = [], [], []
+        for a, b in zip(rows, rows[1:]):
+            d = {k: b[k] - a[k] for k in TELEMETRY_COLUMNS}
+            total = sum(d[k] for k in ("cpu_user", "cpu_nice", "cpu_system", "cpu_idle",
+                                       "cpu_iowait", "cpu_irq", "cpu_softirq"))
+            dt = d["ts_ms"] / 1000.0
+            if total > 0:
+                busy_pct.append(100.0 * (total - d["cpu_idle"] - d["cpu_iowait"]) / total)
+                iowait_pct.append(100.0 * d["cpu_iowait"] / total)
+            if dt > 0:
+                rx_pps.append(d["rx_packets"] / dt)
+
+        first, last = rows[0], rows[-1]
+        summary = {
+            "samples": len(rows),
+            "duration_s": round((last["ts_ms"] - first["ts_ms"]) / 1000.0, 3),
+            "cpu_busy_pct_mean": round(sum(busy_pct) / len(busy_pct), 2) if busy_pct else None,
+            "cpu_busy_pct_max": round(max(busy_pct), 2) if busy_pct else None,
+            "cpu_iowait_pct_max": round(max(iowait_pct), 2) if iowait_pct else None,
+            "load1_max": max(r["load1"] for r in rows),
+            "mem_avail_kb_min": int(min(r["mem_avail_kb"] for r in rows)),
+            "rx_pps_max": round(max(rx_pps), 1) if rx_pps else None,
+            "rx_packets": int(last["rx_packets"] - first["rx_packets"]),
+            "rx_dropped": int(last["rx_dropped"] - first["rx_dropped"]),
+            "tcpdump_dropped": int(max(r["tcpdump_dropped"] for r in rows)),
+            "zeek_dropped": int(max(r["zeek_dropped"] for r in rows)),
+        }
+        summary["cpu_saturated"] = bool(busy_pct and max(busy_pct) >= 95.0)
+
+        if write_parquet and _HAS_PYARROW:
+            try:
+                table = pa.table({k: [r[k] for r in rows] for k in TELEMETRY_COLUMNS})
+                table = table.set_column(0, "ts_ms", table.column("ts_ms").cast(pa.int64()))
+                pq.write_table(table, tsv_path.with_suffix(".parquet"), compression="zstd")
+            except Exception as e:
+                logger.warning(f"[telemetry] parquet {tsv_path}: {e}")
+        return summary
+    except Exception as e:
+        logger.warning(f"[telemetry] resumo {tsv_path}: {e}")
+        return None
+
+
+def summarize_run_telemetry(out_base: Path, hosts: Iterable[str] = ("attacker", "victim", "sensor")) -> Dict[str, Dict]:
+    out: Dict[str, Dict] = {}
+    for host in hosts:
+        s = summarize_telemetry(Path(out_base) / host / "run" / "telemetry.tsv")
+        if s is not None:
+            out[host] = s
+    if out:
+        logger.info(f"[telemetry] resumo: {json.dumps(out)}")
+    return out
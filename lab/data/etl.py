@@ -0,0 +1,53 @@
+# lab/data/etl.py
+"""ETL a partir de um manifest (lab.data.manifest.build_manifest): um run_etl incremental por run."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.profiling import EtlProfiler
+
+logger = setup_logger(Path('.logs'), name="[ETL]")
+
+
+def _run_rows(run_out: Path) -> Optional[int]:
+    try:
+        return int(json.loads((run_out / "meta" / "etl_run.json").read_text(encoding="utf-8"))["rows"])
+    except Exception:
+        return None
+
+
+def run_etl_from_manifest(manifest_path: Path, out_dir: Path, victim_ip: Optional[str] = None,
+                          workers: Optional[int] = None, profiler: Optional[EtlProfiler] = None) -> Path:
+    """
+    Processa os runs do manifest em <out_dir>/<run_ts>/<exp_id>/ (run_ts ausente => "all").
+    Cada run guarda seu meta/etl_state.json: clicar de novo só processa o que mudou.
+    Retorna <out_dir>/<run_ts>.
+    profiler: recebe uma etapa por run (o perfil detalhado fica no meta/ de cada run) e é gravado em
+              <out_dir>/<run_ts>/meta/etl_profile.json; a UI passa o seu com a etapa do manifest.
+    """
+    manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+    out = Path(out_dir) / str(manifest.get("run_ts") or "all")
+    out.mkdir(parents=True, exist_ok=True)
+    runs = manifest.get("runs") or []
+    if not runs:
+        raise RuntimeError(f"manifest sem runs: {manifest_path}")
+    prof = profiler or EtlProfiler(f"manifest:{out.name}")
+    failed = []
+    for r in runs:
+        name = str(r.get("exp_id") or r["run_dir"])
+        try:
+            with prof.stage(f"etl:{name}") as st:
+                run_etl(Path(r["path"]), out / name, workers=workers, victim_ip=victim_ip)
+                st.rows_out = _run_rows(out / name)
+        except Exception as e:
+            logger.error(f"[ETL] falha no run {r.get('run_dir')}: {e}")
+            failed.append(r.get("run_dir"))
+    prof.write(out / "meta", extra={"manifest": str(manifest_path), "runs": len(runs), "failed": len(failed)})
+    if failed and len(failed) == len(runs):
+        raise RuntimeError(f"ETL falhou em todos os runs: {failed}")
+    logger.info(f"[ETL] manifest {Path(manifest_path).name}: {len(runs) - len(failed)}/{len(runs)} run(s) em {out}")
+    return out
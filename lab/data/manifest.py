@@ -0,0 +1,254 @@
+# lab/data/manifest.py
+"""
+Catálogo das capturas (SQLite em <captures>/catalog.sqlite) e manifest para o ETL.
+
+Cada run é um diretório <captures>/<exp_id>/ com metadata.json (layout do Runner). O catálogo guarda:
+
+  runs   run_dir, exp_id, run_ts, IPs, sensores, intervalo de tempo, nº de arquivos/bytes
+  files  caminho, tipo (pcap, zeek:<log>, auth, ...), host de origem, tamanho, hash, intervalo de tempo
+
+e é atualizado de forma incremental: o Runner indexa o run ao gravar o metadata.json
+(index_run) e refresh() só reindexa diretórios novos ou cujo metadata.json mudou — um stat por run.
+get_latest_run_ts/build_manifest viram consultas indexadas, sem varrer a árvore de capturas.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_state import file_hash
+from lab.datasets.parquet_dataset import run_ts_of
+
+logger = setup_logger(Path('.logs'), name="[Manifest]")
+
+CATALOG_FILE = "catalog.sqlite"
+DEFAULT_CAPTURES_DIR = Path("lab") / "data" / "captures"
+# Logs do Zeek que não descrevem tráfego (não entram no intervalo de tempo do run)
+_ZEEK_AUX = {"stats", "capture_loss", "loaded_scripts", "packet_filter", "reporter"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_dir       TEXT PRIMARY KEY,
+    exp_id        TEXT NOT NULL,
+    run_ts        TEXT NOT NULL,
+    attacker_ip   TEXT,
+    victim_ip     TEXT,
+    sensors       TEXT,
+    first_ts      REAL,
+    last_ts       REAL,
+    n_files       INTEGER,
+    bytes         INTEGER,
+    meta_mtime_ns INTEGER,
+    indexed_at    TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_run_ts ON runs(run_ts);
+CREATE INDEX IF NOT EXISTS runs_exp_id ON runs(exp_id);
+CREATE TABLE IF NOT EXISTS files (
+    run_dir   TEXT NOT NULL REFERENCES runs(run_dir) ON DELETE CASCADE,
+    rel_path  TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    host      TEXT,
+    size      INTEGER,
+    mtime_ns  INTEGER,
+    hash      TEXT,
+    first_ts  REAL,
+    last_ts   REAL,
+    PRIMARY KEY (run_dir, rel_path)
+);
+CREATE INDEX IF NOT EXISTS files_kind ON files(kind);
+"""
+
+
+def _file_kind(rel: Path) -> str:
+    name = rel.name
+    if ".pcap" in name:
+        return "pcap"
+    if "zeek" in rel.parts and (name.endswith(".log") or name.endswith(".log.gz")):
+        return f"zeek:{name.split('.')[0]}"
+    if name.startswith("auth.log"):
+        return "auth"
+    if name.startswith("hydra_"):
+        return "hydra"
+    if name.endswith(".json"):
+        return "meta"
+    return "other"
+
+
+def _time_range(path: Path, kind: str) -> Optional[Dict[str, Any]]:
+    """Primeiro/último timestamp de pcap/conn.log (só quando o capture_timeline.json não traz)."""
+    try:
+        if kind == "pcap":
+            from lab.datasets.pcap_flows import pcap_time_range
+            return pcap_time_range(path)
+        if kind.startswith("zeek:") and kind[5:] not in _ZEEK_AUX:
+            import numpy as np
+            from lab.datasets.zeek_reader import NAT_NS, iter_zeek_log
+            lo = hi = None
+            for batch in iter_zeek_log([path], columns=["ts"]):
+                ts = np.asarray(batch["ts"], dtype=np.int64)
+                ts = ts[ts != NAT_NS]
+                if len(ts):
+                    lo = ts.min() if lo is None else min(lo, ts.min())
+                    hi = ts.max() if hi is None else max(hi, ts.max())
+            if lo is not None:
+                return {"first_ts": lo / 1e9, "last_ts": hi / 1e9}
+    except Exception as e:
+        logger.warning(f"[Manifest] intervalo de {path.name}: {e}")
+    return None
+
+
+class CaptureCatalog:
+    """Índice SQLite de <captures_dir>. Use como context manager ou chame close()."""
+
+    def __init__(self, captures_dir: Path = DEFAULT_CAPTURES_DIR):
+        self.root = Path(captures_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.root / CATALOG_FILE), timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self) -> "CaptureCatalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    # -------- indexação --------
+    def index_run(self, run_dir: Path, force: bool = False) -> bool:
+        """(Re)indexa um run; arquivos com tamanho/mtime iguais reaproveitam hash e intervalo. True se mudou."""
+        run_dir = Path(run_dir)
+        meta_path = run_dir / "metadata.json"
+        if not meta_path.exists():
+            return False
+        key = run_dir.name
+        meta_mtime = meta_path.stat().st_mtime_ns
+        row = self.db.execute("SELECT meta_mtime_ns FROM runs WHERE run_dir=?", (key,)).fetchone()
+        if row is not None and row["meta_mtime_ns"] == meta_mtime and not force:
+            return False
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"[Manifest] metadata.json ilegível em {run_dir}: {e}")
+            meta = {}
+        targets = meta.get("targets") or {}
+        sensors = meta.get("sensors") or []
+        host_of = {str(s.get("id")): str(s.get("host") or s.get("id")) for s in sensors if s.get("id")}
+        timeline: Dict[str, Dict[str, Any]] = {}
+        try:
+            ct = json.loads((run_dir / "capture_timeline.json").read_text(encoding="utf-8"))
+            timeline = {Path(s["file"]).as_posix(): s for s in ct.get("segments") or []}
+        except Exception:
+            pass
+        known = {r["rel_path"]: r for r in self.db.execute("SELECT * FROM files WHERE run_dir=?", (key,))}
+
+        rows: List[tuple] = []
+        for dirpath, _, names in os.walk(run_dir):
+            for name in names:
+                path = Path(dirpath) / name
+                rel = path.relative_to(run_dir)
+                rel_s = rel.as_posix()
+                st = path.stat()
+                kind = _file_kind(rel)
+                host = host_of.get(rel.parts[0], rel.parts[0]) if len(rel.parts) > 1 else ""
+                prev = known.get(rel_s)
+                if prev is not None and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+                    digest, first, last = prev["hash"], prev["first_ts"], prev["last_ts"]
+                else:
+                    digest = file_hash(path)
+                    rng = timeline.get(rel_s) or _time_range(path, kind) or {}
+                    first, last = rng.get("first_ts"), rng.get("last_ts")
+                rows.append((key, rel_s, kind, host, st.st_size, st.st_mtime_ns, digest, first, last))
+
+        firsts = [r[7] for r in rows if r[7] is not None]
+        lasts = [r[8] for r in rows if r[8] is not None]
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE run_dir=?", (key,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                (key, key, run_ts_of(run_dir), targets.get("attacker_ip"),
+                 targets.get("victim_ip"), json.dumps(sensors), min(firsts) if firsts else None,
+                 max(lasts) if lasts else None, len(rows), sum(r[4] for r in rows), meta_mtime,
+                 datetime.now(timezone.utc).isoformat()))
+            self.db.executemany("INSERT INTO files VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        logger.info(f"[Manifest] indexado {key}: {len(rows)} arquivo(s)")
+        return True
+
+    def refresh(self) -> Dict[str, int]:
+        """Sincroniza com o disco: indexa runs novos/alterados e remove os que sumiram."""
+        t0 = time.perf_counter()
+        seen, changed = set(), 0
+        with os.scandir(self.root) as it:
+            for ent in it:
+                if ent.is_dir() and os.path.exists(os.path.join(ent.path, "metadata.json")):
+                    seen.add(ent.name)
+                    changed += int(self.index_run(Path(ent.path)))
+        gone = [r["run_dir"] for r in self.db.execute("SELECT run_dir FROM runs") if r["run_dir"] not in seen]
+        with self.db:
+            self.db.executemany("DELETE FROM runs WHERE run_dir=?", [(g,) for g in gone])
+        logger.info(f"[Manifest] refresh: {len(seen)} run(s), {changed} reindexado(s), {len(gone)} removido(s) "
+                    f"em {time.perf_counter() - t0:.2f}s")
+        return {"runs": len(seen), "indexed": changed, "removed": len(gone)}
+
+    # -------- consultas --------
+    def latest_run_ts(self) -> Optional[str]:
+        row = self.db.execute("SELECT MAX(run_ts) AS ts FROM runs").fetchone()
+        return row["ts"] if row else None
+
+    def runs(self, run_ts: Optional[str] = None) -> List[Dict[str, Any]]:
+        if run_ts is None:
+            cur = self.db.execute("SELECT * FROM runs ORDER BY run_ts, run_dir")
+        else:
+            cur = self.db.execute("SELECT * FROM runs WHERE run_ts=? ORDER BY run_dir", (run_ts,))
+        return [dict(r) for r in cur]
+
+    def files(self, run_dir: str) -> List[Dict[str, Any]]:
+        cur = self.db.execute("SELECT rel_path, kind, host, size, hash, first_ts, last_ts FROM files "
+                              "WHERE run_dir=? ORDER BY rel_path", (run_dir,))
+        return [dict(r) for r in cur]
+
+
+def index_run(run_dir: Path, captures_dir: Optional[Path] = None) -> None:
+    """Indexa um run recém-coletado no catálogo do diretório pai (chamado pelo Runner)."""
+    run_dir = Path(run_dir)
+    try:
+        with CaptureCatalog(captures_dir or run_dir.parent) as cat:
+            cat.index_run(run_dir, force=True)
+    except Exception as e:
+        logger.warning(f"[Manifest] falha indexando {run_dir}: {e}")
+
+
+def get_latest_run_ts(captures_dir: Path = DEFAULT_CAPTURES_DIR) -> Optional[str]:
+    """run_ts mais recente do catálogo (após um refresh incremental)."""
+    with CaptureCatalog(captures_dir) as cat:
+        cat.refresh()
+        return cat.latest_run_ts()
+
+
+def build_manifest(run_ts: Optional[str], cap_dir: Path = DEFAULT_CAPTURES_DIR) -> Dict[str, Any]:
+    """
+    Manifest dos runs com esse run_ts (None => todos), direto do catálogo:
+    {"run_ts", "generated_at", "captures_dir", "runs": [{exp_id, path, ..., "files": [...]}]}.
+    Vazio quando não há runs.
+    """
+    cap_dir = Path(cap_dir)
+    with CaptureCatalog(cap_dir) as cat:
+        runs = cat.runs(run_ts)
+        if not runs:
+            return {}
+        for r in runs:
+            r["path"] = str((cap_dir / r["run_dir"]).resolve())
+            r["sensors"] = json.loads(r.get("sensors") or "[]")
+            r["files"] = cat.files(r["run_dir"])
+    return {"run_ts": run_ts, "generated_at": datetime.now(timezone.utc).isoformat(),
+            "captures_dir": str(cap_dir.resolve()), "runs": runs}
@@ -0,0 +1,116 @@
+# lab/datasets/arrow_ipc.py
+"""
+Publicação do dataset do ETL em Arrow IPC (Feather v2) para treino e visualização:
+
+  <out>/arrow/full.arrow    todas as partições do dataset numa tabela só, SEM compressão
+
+Parquet é o formato de armazenamento (zstd, estatísticas, partições); o .arrow é a cópia de
+entrega: o layout em disco é o mesmo da memória, então pa.memory_map + ipc.open_file expõem as
+colunas direto do page cache — abrir um arquivo de vários GB é instantâneo e nada é
+decodificado até ser usado. Colunas numéricas sem nulos chegam ao pandas sem cópia
+(to_pandas(split_blocks=True)); strings ainda são convertidas.
+
+    table = open_arrow(out / "arrow" / "full.arrow", columns=["ts", "label"])
+    df = read_arrow(out / "arrow" / "full.arrow", filters=[("label", "!=", "benign")])
+"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.parquet_dataset import open_dataset
+
+logger = setup_logger(Path('.logs'), name="[ArrowIPC]")
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+ARROW_FILE = Path("arrow") / "full.arrow"
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+_REPLACE_TRIES = 5
+
+
+def arrow_is_current(dataset_dir: Path, arrow_path: Path) -> bool:
+    """O .arrow existe e não é mais antigo que o _metadata do dataset (última publicação não ficou para trás)."""
+    arrow_path, meta = Path(arrow_path), Path(dataset_dir) / "_metadata"
+    return arrow_path.exists() and (not meta.exists() or arrow_path.stat().st_mtime >= meta.stat().st_mtime)
+
+
+def _replace(src: Path, dst: Path) -> bool:
+    """os.replace com algumas tentativas; False se `dst` continuar em uso (mapeado no Windows)."""
+    for attempt in range(_REPLACE_TRIES):
+        try:
+            os.replace(src, dst)
+            return True
+        except PermissionError:
+            if attempt + 1 < _REPLACE_TRIES:
+                time.sleep(0.2 * (attempt + 1))
+    return False
+
+
+def publish_arrow(dataset_dir: Path, out_path: Path) -> Optional[Path]:
+    """
+    Regrava `out_path` com o conteúdo do dataset Parquet particionado, lote a lote (memória
+    limitada a um row group), num .tmp trocado com os.replace no fim.
+
+    POSIX: quem está com o arquivo antigo mapeado continua lendo o inode antigo. Windows: um
+    arquivo mapeado não pode ser substituído nem removido; se um leitor o mantiver aberto, a
+    publicação é adiada (aviso no log) e a versão anterior fica, mais antiga que o _metadata do
+    dataset — arrow_is_current() a trata como desatualizada e o próximo ETL tenta de novo.
+    Retorna None se o dataset estiver vazio ou a troca tiver sido adiada.
+    """
+    dataset_dir, out_path = Path(dataset_dir), Path(out_path)
+    if not _HAS_PYARROW:
+        raise RuntimeError("pyarrow é necessário para publicar Arrow IPC")
+    dataset = open_dataset(dataset_dir)
+    if not dataset.files:
+        try:
+            out_path.unlink(missing_ok=True)
+        except PermissionError as e:
+            logger.warning(f"[ArrowIPC] {out_path} em uso — não removido ({e})")
+        return None
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    rows = 0
+    # Sem compressão: compressão no IPC obriga a descomprimir (copiar) na leitura
+    with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, dataset.schema) as writer:
+        for batch in dataset.to_batches():
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    if not _replace(tmp, out_path):
+        tmp.unlink(missing_ok=True)
+        logger.warning(f"[ArrowIPC] {out_path} aberto por um leitor — publicação adiada, versão anterior "
+                       f"mantida (desatualizada); feche o leitor e rode o ETL de novo")
+        return None
+    logger.info(f"[ArrowIPC] {rows} linha(s) -> {out_path} ({out_path.stat().st_size / 1e6:.1f} MB)")
+    return out_path
+
+
+def open_arrow(path: Path, columns: Optional[Sequence[str]] = None, filters=None) -> "pa.Table":
+    """
+    Tabela sobre o arquivo mapeado em memória (zero cópia). `columns` só seleciona; `filters`
+    (formato do pyarrow, como em read_dataset) materializa apenas as linhas que passam.
+    """
+    if not _HAS_PYARROW:
+        raise RuntimeError("pyarrow é necessário para ler Arrow IPC")
+    table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns:
+        table = table.select(list(columns))
+    return table
+
+
+def read_arrow(path: Path, columns: Optional[Sequence[str]] = None, filters=None) -> pd.DataFrame:
+    """open_arrow -> pandas, um bloco por coluna (numéricas sem nulos ficam como views do mmap)."""
+    return open_arrow(path, columns=columns, filters=filters).to_pandas(split_blocks=True)
@@ -0,0 +1,342 @@
+# lab/datasets/auth_events.py
+"""
+Verdade do lado dos hosts: auth.log do victim (sshd) e saída do Hydra (-o) do attacker,
+ligados aos fluxos do Zeek (conn.log/ssh.log).
+
+  victim/auth.log[.1][.gz]          eventos do sshd: Accepted/Failed/Invalid user/máx. tentativas/fim
+  attacker/lists/hydra_<ip>.out     início de cada execução e credenciais encontradas
+
+Os parsers não usam regex: cada arquivo é lido uma vez, linha a linha (bytes), com um filtro
+barato (" sshd") antes de qualquer split; o timestamp vira datetime de uma vez só no fim.
+
+Eventos de uma mesma conexão (src_ip, src_port, pid do sshd) viram uma sessão com o resultado
+(success > failure > noauth) e o nº de senhas erradas. A sessão é ligada ao fluxo por
+(src_ip, src_port) e tempo num merge_asof (merge ordenado): o fluxo que começou por último
+antes do primeiro evento (mais a tolerância de relógio) e ainda estava aberto.
+
+    python -m lab.datasets.auth_events data/<exp_id>
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_state import context_digest
+from lab.datasets.zeek_reader import NAT_NS, find_zeek_logs, ip_to_str, read_zeek_log
+
+logger = setup_logger(Path('.logs'), name="[AuthEvents]")
+
+# Tolerância entre o relógio do victim e o do sensor
+DEFAULT_TOLERANCE_S = 2.0
+OUTCOMES = ("", "noauth", "failure", "success")
+EVENT_COLUMNS = ["ts", "pid", "kind", "user", "src_ip", "src_port"]
+SESSION_COLUMNS = ["src_ip", "src_port", "pid", "first_ts", "last_ts", "failures", "outcome", "user"]
+HYDRA_COLUMNS = ["run_started", "host", "port", "service", "login", "password"]
+
+# Prefixo da mensagem do sshd -> tipo do evento
+_KINDS = (
+    (b"Accepted ", "accepted"),
+    (b"Failed ", "failed"),
+    (b"Invalid user ", "invalid_user"),
+    (b"error: maximum authentication attempts", "max_attempts"),
+    (b"Disconnecting authenticating user ", "max_attempts"),
+    (b"Disconnecting invalid user ", "max_attempts"),
+    (b"Connection closed by ", "closed"),
+    (b"Disconnected from ", "closed"),
+    (b"Received disconnect from ", "closed"),
+    (b"Connection reset by ", "closed"),
+)
+
+
+def _lines(path: Path) -> Iterator[bytes]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as fh:
+        yield from fh
+
+
+def _kind(msg: bytes) -> Optional[str]:
+    for prefix, kind in _KINDS:
+        if msg.startswith(prefix):
+            return kind
+    return None
+
+
+def _endpoint(msg: bytes):
+    """(user, ip, port) de uma mensagem do sshd: o par '<ip> port <n>' e o usuário antes dele."""
+    p = msg.rfind(b" port ")
+    if p < 0:
+        return None
+    port = msg[p + 6:].split(b" ", 1)[0].split(b":", 1)[0]
+    s = msg.rfind(b" ", 0, p)
+    if not port.isdigit() or s < 0:
+        return None
+    head = msg[:s]
+    f = head.find(b" for ")
+    f = f + 5 if f >= 0 else head.find(b"user ") + 5
+    user = b""
+    if f >= 5:
+        rest = head[f:]
+        for prefix in (b"invalid user ", b"authenticating user "):
+            if rest.startswith(prefix):
+                rest = rest[len(prefix):]
+        user = rest.split(b" ", 1)[0]
+    return user, msg[s + 1:p], int(port)
+
+
+def _epoch(t: pd.Series) -> np.ndarray:
+    return np.where(t.isna(), np.nan, t.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9)
+
+
+def _to_epoch(stamps: List[str], ref_ts: Optional[float], tz: timezone) -> np.ndarray:
+    """Timestamps do syslog -> epoch (s). ISO 8601 (rsyslog novo) ou 'Mmm dd HH:MM:SS' sem ano."""
+    # O syslog tem resolução de segundos: converte só os valores distintos
+    codes, uniq = pd.factorize(pd.Series(stamps, dtype=object))
+    s = pd.Series(uniq, dtype=object)
+    out = np.full(len(s), np.nan)
+    iso = s.str[:1].str.isdigit().to_numpy(dtype=bool)
+    if iso.any():
+        out[iso] = _epoch(pd.to_datetime(s[iso], format="ISO8601", utc=True, errors="coerce"))
+    if (~iso).any():
+        ref = datetime.fromtimestamp(ref_ts if ref_ts is not None else datetime.now(tz).timestamp(), tz)
+        classic = s[~iso].str.split().str.join(" ")
+
+        def parse(year: int, values: pd.Series) -> np.ndarray:
+            t = pd.to_datetime(str(year) + " " + values, format="%Y %b %d %H:%M:%S", errors="coerce")
+            return _epoch(t.dt.tz_localize(tz))
+
+        epoch = parse(ref.year, classic)
+        # Sem ano no syslog clássico: evento "no futuro" de ref é do ano anterior (virada de ano)
+        late = epoch > ref.timestamp() + 180 * 86400
+        if late.any():
+            epoch[late] = parse(ref.year - 1, classic[late])
+        out[~iso] = epoch
+    return out[codes]
+
+
+def parse_auth_log(paths: Iterable[Path], ref_ts: Optional[float] = None, tz: timezone = timezone.utc) -> pd.DataFrame:
+    """
+    Eventos do sshd dos auth.log (uma passada por arquivo): ts, pid, kind, user, src_ip, src_port.
+    ref_ts: instante de referência para o ano do syslog clássico (ex.: início do experimento).
+    """
+    stamps: List[str] = []
+    rows: List[tuple] = []
+    for path in paths:
+        try:
+            for line in _lines(Path(path)):
+                i = line.find(b" sshd")
+                if i < 0:
+                    continue
+                j = line.find(b"]: ", i)
+                k = line.find(b"[", i, j)
+                if j < 0 or k < 0:
+                    continue
+                msg = line[j + 3:].rstrip()
+                kind = _kind(msg)
+                if kind is None:
+                    continue
+                ep = _endpoint(msg)
+                if ep is None:
+                    continue
+                user, ip, port = ep
+                # "<timestamp> <host> sshd[pid]": o host é o último token antes do programa
+                stamps.append(line[:i].rsplit(b" ", 1)[0].decode("ascii", "replace"))
+                rows.append((int(line[k + 1:j]) if line[k + 1:j].isdigit() else -1, kind,
+                             user.decode("utf-8", "replace"), ip.decode("ascii", "replace"), port))
+        except Exception as e:
+            logger.warning(f"[AuthEvents] falha lendo {path}: {e}")
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                             zip(EVENT_COLUMNS, ("float64", "int64", object, object, object, "int64"))})
+    df = pd.DataFrame(rows, columns=EVENT_COLUMNS[1:])
+    df.insert(0, "ts", _to_epoch(stamps, ref_ts, tz))
+    return df[df["ts"].notna()].sort_values("ts", kind="stable").reset_index(drop=True)
+
+
+def auth_sessions(events: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por conexão SSH vista pelo sshd (src_ip, src_port, pid), com o resultado."""
+    if events.empty:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                             zip(SESSION_COLUMNS, (object, "int64", "int64", "float64", "float64", "int64", object, object))})
+    ev = events.assign(failed=(events["kind"] == "failed").astype(np.int64),
+                       accepted=(events["kind"] == "accepted").astype(np.int64),
+                       rejected=events["kind"].isin(("failed", "invalid_user", "max_attempts")).astype(np.int64),
+                       auth_user=events["user"].where((events["kind"] != "closed") & (events["user"] != "")))
+    # "last" ignora NaN: fica o último usuário de uma tentativa (eventos de fim não contam)
+    g = ev.groupby(["src_ip", "src_port", "pid"], sort=False)
+    out = g.agg(first_ts=("ts", "min"), last_ts=("ts", "max"), failures=("failed", "sum"),
+                accepted=("accepted", "max"), rejected=("rejected", "max"), user=("auth_user", "last")).reset_index()
+    # Usuário aceito vence o das tentativas
+    ok_user = ev[ev["accepted"] == 1].groupby(["src_ip", "src_port", "pid"], sort=False)["user"].last()
+    if len(ok_user):
+        out = out.merge(ok_user.rename("ok_user").reset_index(), on=["src_ip", "src_port", "pid"], how="left")
+        out["user"] = out["ok_user"].fillna(out["user"])
+    out["outcome"] = np.where(out["accepted"] > 0, "success", np.where(out["rejected"] > 0, "failure", "noauth"))
+    out["user"] = out["user"].fillna("").astype(object)
+    return out[SESSION_COLUMNS].sort_values("first_ts", kind="stable").reset_index(drop=True)
+
+
+def join_auth_to_flows(flows: pd.DataFrame, sessions: pd.DataFrame,
+                       tolerance_s: float = DEFAULT_TOLERANCE_S) -> pd.DataFrame:
+    """
+    Resultado da autenticação de cada fluxo (mesmo índice/ordem de `flows`, que precisa de
+    ts, src_ip, src_port e, se houver, duration): auth_outcome ("" = sem sessão no host),
+    auth_failures e auth_user.
+    """
+    n = len(flows)
+    out = pd.DataFrame({"auth_outcome": np.full(n, "", dtype=object), "auth_failures": np.zeros(n, dtype=np.int32),
+                        "auth_user": np.full(n, "", dtype=object)}, index=flows.index)
+    if not n or sessions is None or sessions.empty:
+        return out
+    ts = np.asarray(flows["ts"], dtype=np.float64)
+    dur = (pd.to_numeric(flows["duration"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+           if "duration" in flows else np.zeros(n))
+    right = pd.DataFrame({"t": ts, "src_ip": np.asarray(flows["src_ip"]).astype(str).astype(object),
+                          "src_port": np.asarray(flows["src_port"], dtype=np.int64), "end": ts + dur,
+                          "row": np.arange(n)}).sort_values("t", kind="stable")
+    left = pd.DataFrame({"t": sessions["first_ts"].to_numpy(dtype=np.float64) + tolerance_s,
+                         "src_ip": sessions["src_ip"].astype(str).astype(object).to_numpy(),
+                         "src_port": sessions["src_port"].to_numpy(dtype=np.int64),
+                         "first_ts": sessions["first_ts"].to_numpy(dtype=np.float64),
+                         "rank": pd.Categorical(sessions["outcome"], categories=OUTCOMES).codes.astype(np.int64),
+                         "failures": sessions["failures"].to_numpy(dtype=np.int64),
+                         "user": sessions["user"].to_numpy()}).sort_values("t", kind="stable")
+    m = pd.merge_asof(left, right, on="t", by=["src_ip", "src_port"], direction="backward")
+    m = m[m["row"].notna() & (m["first_ts"] <= m["end"] + tolerance_s)]
+    if m.empty:
+        return out
+    m = m.assign(row=m["row"].astype(np.int64)).sort_values(["row", "rank"], kind="stable")
+    per = m.groupby("row", sort=False).agg(rank=("rank", "max"), failures=("failures", "sum"), user=("user", "last"))
+    rows = per.index.to_numpy()
+    out.iloc[rows, 0] = np.asarray(OUTCOMES, dtype=object)[per["rank"].to_numpy()]
+    out.iloc[rows, 1] = per["failures"].to_numpy(dtype=np.int32)
+    out.iloc[rows, 2] = per["user"].to_numpy()
+    return out
+
+
+def parse_hydra_out(paths: Iterable[Path]) -> pd.DataFrame:
+    """Credenciais encontradas pelo Hydra (-o), com o início da execução: uma linha por login válido."""
+    rows: List[tuple] = []
+    for path in paths:
+        started = None
+        try:
+            for line in _lines(Path(path)):
+                if line.startswith(b"# Hydra"):
+                    i, j = line.find(b" run at "), line.find(b" on ")
+                    started = None
+                    if i >= 0 and j > i:
+                        try:
+                            started = datetime.strptime(line[i + 8:j].decode(), "%Y-%m-%d %H:%M:%S").replace(
+                                tzinfo=timezone.utc).timestamp()
+                        except ValueError:
+                            pass
+                elif line.startswith(b"[") and b" login: " in line:
+                    tag, _, rest = line.partition(b" ")
+                    port, _, service = tag.strip(b"[]").partition(b"][")
+                    host = rest.partition(b"host: ")[2].split(b" ", 1)[0]
+                    login = rest.partition(b"login: ")[2].split(b" ", 1)[0]
+                    password = rest.partition(b"password: ")[2].rstrip(b"\r\n")
+                    rows.append((started, host.decode(), int(port) if port.isdigit() else -1, service.decode(),
+                                 login.decode("utf-8", "replace"), password.decode("utf-8", "replace")))
+        except Exception as e:
+            logger.warning(f"[AuthEvents] falha lendo {path}: {e}")
+    return pd.DataFrame(rows, columns=HYDRA_COLUMNS)
+
+
+@dataclass
+class HostTruth:
+    """Sessões do sshd e credenciais do Hydra de um experimento."""
+    sessions: pd.DataFrame
+    hydra: pd.DataFrame
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def digest(self) -> str:
+        """Muda quando o conteúdo relevante muda (entra no contexto do ETL incremental)."""
+        return context_digest({"sessions": self.sessions.to_dict("split")["data"],
+                               "hydra": self.hydra.to_dict("split")["data"]})
+
+    def summary(self) -> Dict[str, Any]:
+        counts = self.sessions["outcome"].value_counts().to_dict() if not self.sessions.empty else {}
+        ok_users = set(self.sessions.loc[self.sessions["outcome"] == "success", "user"]) if not self.sessions.empty else set()
+        return {"sources": self.sources, "sessions": len(self.sessions),
+                "outcomes": {str(k): int(v) for k, v in counts.items()},
+                "failures": int(self.sessions["failures"].sum()) if not self.sessions.empty else 0,
+                "hydra_found": [{"login": r.login, "host": r.host, "port": int(r.port),
+                                 "seen_in_auth_log": r.login in ok_users} for r in self.hydra.itertuples()]}
+
+
+def auth_log_files(exp_dir: Path) -> List[Path]:
+    vic = Path(exp_dir) / "victim"
+    return sorted(vic.glob("auth.log*")) if vic.exists() else []
+
+
+def hydra_files(exp_dir: Path) -> List[Path]:
+    att = Path(exp_dir) / "attacker"
+    return sorted(att.rglob("hydra_*.out")) if att.exists() else []
+
+
+def load_host_truth(exp_dir: Path, ref_ts: Optional[float] = None, tz: timezone = timezone.utc) -> HostTruth:
+    """Lê auth.log e saídas do Hydra do experimento (vazio quando não foram coletados)."""
+    exp_dir = Path(exp_dir)
+    auth, hydra = auth_log_files(exp_dir), hydra_files(exp_dir)
+    sessions = auth_sessions(parse_auth_log(auth, ref_ts=ref_ts, tz=tz))
+    return HostTruth(sessions=sessions, hydra=parse_hydra_out(hydra),
+                     sources=[f.relative_to(exp_dir).as_posix() for f in auth + hydra])
+
+
+def zeek_flow_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Bloco de log do Zeek (id.orig_h, id.orig_p, ts tipado) no formato de join_auth_to_flows."""
+    ts_ns = np.asarray(df["ts"], dtype=np.int64)
+    ok = ts_ns != NAT_NS
+    df = df[ok]
+    out = pd.DataFrame({"ts": ts_ns[ok] / 1e9, "src_ip": ip_to_str(df["id.orig_h"]),
+                        "src_port": np.asarray(df["id.orig_p"], dtype=np.int64)}, index=df.index)
+    if "duration" in df:
+        out["duration"] = pd.to_numeric(df["duration"], errors="coerce").fillna(0).to_numpy()
+    return out
+
+
+def label_zeek_log(exp_dir: Path, truth: HostTruth, log: str = "ssh", tap: str = "sensor",
+                   columns: Optional[Sequence[str]] = None,
+                   tolerance_s: float = DEFAULT_TOLERANCE_S) -> pd.DataFrame:
+    """ssh.log/conn.log do tap com as colunas auth_* ao lado."""
+    files = find_zeek_logs(Path(exp_dir) / tap / "zeek", log)
+    df = read_zeek_log(files, columns=columns)
+    if df.empty:
+        return df
+    flows = zeek_flow_frame(df)
+    return df.loc[flows.index].join(join_auth_to_flows(flows, truth.sessions, tolerance_s=tolerance_s))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="auth.log/Hydra do experimento ligados ao ssh.log do Zeek")
+    ap.add_argument("exp_dir", type=Path)
+    ap.add_argument("--tap", default="sensor")
+    args = ap.parse_args(argv)
+    from lab.datasets.labeling import load_attack_windows
+    windows = load_attack_windows(args.exp_dir)
+    truth = load_host_truth(args.exp_dir, ref_ts=min((w.t0 for w in windows), default=None))
+    report = truth.summary()
+    ssh = label_zeek_log(args.exp_dir, truth, log="ssh", tap=args.tap)
+    if not ssh.empty:
+        report["ssh_log"] = {"flows": len(ssh), "matched": int((ssh["auth_outcome"] != "").sum()),
+                             "outcomes": {str(k): int(v) for k, v in ssh["auth_outcome"].value_counts().items()}}
+        if "auth_success" in ssh:
+            seen = ssh[ssh["auth_outcome"].isin(("success", "failure"))]
+            zeek_ok = seen["auth_success"].astype(str).str.upper().isin(("T", "TRUE"))
+            report["ssh_log"]["agreement_with_zeek"] = (round(float((zeek_ok == (seen["auth_outcome"] == "success")).mean()), 4)
+                                                         if len(seen) else None)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+# lab/datasets/bench.py
+"""
+Benchmarks das etapas do ETL sobre dados sintéticos (sem VMs).
+
+    python -m lab.datasets.bench pre_etl --rows 10000000
+    python -m lab.datasets.bench zeek_reader --rows 10000000
+    python -m lab.datasets.bench etl --rows 10000000 --workers 1 2 4 8 --parsers pandas arrow
+    python -m lab.datasets.bench pcap_flows --rows 5000000
+    python -m lab.datasets.bench labeling --rows 50000000
+    python -m lab.datasets.bench corpus --rows 2000000 --experiments 12
+    python -m lab.datasets.bench features --rows 5000000
+    python -m lab.datasets.bench arrow --rows 5000000
+    python -m lab.datasets.bench windows --rows 5000000 --windows 60 300 300/60 3600
+    python -m lab.datasets.bench sketches --rows 20000000 --error 0.01
+    python -m lab.datasets.bench pcap_index --rows 1000000
+    python -m lab.datasets.bench suite --sizes 10000 100000 1000000 10000000 --workers 4
+
+suite roda o pipeline inteiro sobre experimentos do gerador (synth: Zeek conn/ssh/http, pcap,
+auth.log, Hydra e timeline.json); as outras etapas isolam um componente com dados mínimos.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lab.datasets.arrow_ipc import ARROW_FILE, open_arrow, read_arrow
+from lab.datasets.corpus_windows import build_corpus_windows
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.features import REGISTRY, FeatureDef, WindowSpec, compute_multi_window_features, register
+from lab.datasets.labeling import AttackWindow, IntervalLabeler
+from lab.datasets.parquet_dataset import read_dataset
+from lab.datasets.pcap_flows import extract_flows
+from lab.datasets.pre_etl import aggregate_conn_windows, generate_conn_features
+from lab.datasets.profiling import peak_rss_mb
+from lab.datasets.sketches import SketchConfig, estimate, merge_states, sketch_state
+from lab.datasets.synth import SynthSpec, generate_experiment, pcap_header, pcap_records
+from lab.datasets.zeek_reader import iter_zeek_log
+
+CONN_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "proto", "service",
+               "duration", "orig_bytes", "resp_bytes", "conn_state", "missed_bytes", "history",
+               "orig_pkts", "orig_ip_bytes", "resp_pkts", "resp_ip_bytes", "tunnel_parents"]
+CONN_TYPES = ["time", "string", "addr", "port", "addr", "port", "enum", "string",
+              "interval", "count", "count", "string", "count", "string",
+              "count", "count", "count", "count", "set[string]"]
+
+
+def write_synthetic_conn_log(path: Path, rows: int, t0: float = 1_700_000_000.0, span_s: float = 3600.0,
+                             seed: int = 42, block: int = 500_000) -> Path:
+    """conn.log TSV com cabeçalho Zeek; escreve em blocos para não segurar 10M linhas na memória."""
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    states = np.array(["SF", "S0", "REJ", "RSTO", "SH"])
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("#separator \\x09\n#set_separator\t,\n#empty_field\t(empty)\n#unset_field\t-\n#path\tconn\n")
+        fh.write("#fields\t" + "\t".join(CONN_FIELDS) + "\n")
+        fh.write("#types\t" + "\t".join(CONN_TYPES) + "\n")
+        done = 0
+        while done < rows:
+            n = min(block, rows - done)
+            ts = np.sort(t0 + rng.random(n) * span_s)
+            src = rng.integers(2, 60, n)
+            dst = rng.integers(2, 12, n)
+            dport = rng.choice([22, 80, 443, 8080, 8081], n)
+            dur = rng.exponential(0.5, n)
+            ob = rng.integers(0, 5000, n)
+            rb = rng.integers(0, 50000, n)
+            st = states[rng.integers(0, len(states), n)]
+            op = rng.integers(1, 40, n)
+            rp = rng.integers(0, 60, n)
+            lines = [
+                f"{ts[i]:.6f}\tC{done + i}\t192.168.56.{src[i]}\t{40000 + (i % 20000)}\t192.168.56.{dst[i]}\t{dport[i]}"
+                f"\ttcp\t-\t{dur[i]:.6f}\t{ob[i]}\t{rb[i]}\t{st[i]}\t0\tShADad\t{op[i]}\t{op[i] * 52}\t{rp[i]}\t{rp[i] * 52}\t-"
+                for i in range(n)
+            ]
+            fh.write("\n".join(lines) + "\n")
+            done += n
+        fh.write("#close\t2024-01-01-00-00-00\n")
+    return path
+
+
+def write_synthetic_pcap(path: Path, packets: int, flows: int = 5000, t0: float = 1_700_000_000.0,
+                         span_s: float = 600.0, seed: int = 42, block: int = 1_000_000) -> Path:
+    """
+    pcap Ethernet/IPv4/TCP só com cabeçalhos (snaplen 54, como o perfil "headers"), montado
+    vetorialmente: cada pacote pertence a um de `flows` fluxos e alterna de sentido ao acaso.
+    """
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fl_src = (0xC0A83800 | rng.integers(2, 60, flows)).astype(np.uint32)    # 192.168.56.x
+    fl_dst = (0xC0A83800 | rng.integers(60, 70, flows)).astype(np.uint32)
+    fl_sport = rng.integers(30000, 60000, flows).astype(np.uint16)
+    fl_dport = rng.choice(np.array([22, 80, 443, 8080], dtype=np.uint16), flows)
+    with open(path, "wb") as fh:
+        fh.write(pcap_header())
+        done = 0
+        while done < packets:
+            n = min(block, packets - done)
+            ts = t0 + (done + np.arange(n)) * (span_s / packets)
+            f = rng.integers(0, flows, n)
+            rev = rng.random(n) < 0.4
+            ip_len = 40 + rng.integers(0, 1400, n)
+            flags = rng.choice(np.array([0x02, 0x12, 0x10, 0x18, 0x11], dtype=np.uint8), n)
+            fh.write(pcap_records(ts, np.where(rev, fl_dst[f], fl_src[f]), np.where(rev, fl_src[f], fl_dst[f]),
+                                  np.where(rev, fl_dport[f], fl_sport[f]), np.where(rev, fl_sport[f], fl_dport[f]),
+                                  np.full(n, 6, dtype=np.uint8), flags, ip_len).tobytes())
+            done += n
+    return path
+
+
+def bench_pcap_flows(packets: int, flows: int = 5000, workdir: Path | None = None) -> dict:
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        pcap = write_synthetic_pcap(Path(tmp) / "exp_bench.pcap", packets, flows=flows)
+        stats = extract_flows([pcap], Path(tmp) / "flows.parquet")
+        return {"stage": "pcap_flows", "packets": stats.packets, "input_mb": round(pcap.stat().st_size / 1e6, 1),
+                "flows": stats.flows, "seconds": stats.seconds, "packets_per_s": stats.as_dict()["packets_per_s"]}
+
+
+def bench_pre_etl(rows: int, window_s: int = 60, workdir: Path | None = None) -> dict:
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        conn = write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", rows)
+        t0 = time.perf_counter()
+        out = generate_conn_features(exp, window_s=window_s)
+        dt = time.perf_counter() - t0
+        return {"stage": "pre_etl", "rows": rows, "input_mb": round(conn.stat().st_size / 1e6, 1),
+                "seconds": round(dt, 3), "rows_per_s": round(rows / dt, 1), "output": out.suffix}
+
+
+def bench_zeek_reader(rows: int, batch_rows: int = 500_000, workdir: Path | None = None) -> dict:
+    """Só leitura tipada: vazão e maior bloco (a memória deve ficar presa a batch_rows)."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        conn = write_synthetic_conn_log(Path(tmp) / "conn.log", rows)
+        t0 = time.perf_counter()
+        n = 0
+        peak_mb = 0.0
+        for batch in iter_zeek_log([conn], batch_rows=batch_rows):
+            n += len(batch)
+            peak_mb = max(peak_mb, batch.memory_usage(deep=True).sum() / 1e6)
+        dt = time.perf_counter() - t0
+        return {"stage": "zeek_reader", "rows": n, "input_mb": round(conn.stat().st_size / 1e6, 1),
+                "seconds": round(dt, 3), "rows_per_s": round(n / dt, 1), "batch_rows": batch_rows,
+                "max_batch_mb": round(peak_mb, 1)}
+
+
+def bench_etl(rows: int, workers=(1,), shard_mb: int = 64, parsers=("pandas",), workdir: Path | None = None) -> dict:
+    """ETL final com diferentes nºs de workers (e parsers das fatias) sobre o mesmo conn.log (escalonamento)."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        conn = write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", rows)
+        runs = []
+        for parser in parsers:
+            for w in workers:
+                t0 = time.perf_counter()
+                run_etl(exp, Path(tmp) / f"etl_{parser}_w{w}", workers=w, shard_mb=shard_mb, parser=parser)
+                dt = time.perf_counter() - t0
+                runs.append({"parser": parser, "workers": w, "seconds": round(dt, 3), "rows_per_s": round(rows / dt, 1)})
+        base = runs[0]["seconds"]
+        for r in runs:
+            r["speedup"] = round(base / r["seconds"], 2) if r["seconds"] else None
+        # Disco: dataset Parquet particionado x CSV monolítico (rodada extra com csv=True, fora do tempo)
+        info = json.loads((run_etl(exp, Path(tmp) / "etl_csv", workers=workers[0], shard_mb=shard_mb, csv=True)
+                           / "meta" / "etl_run.json").read_text(encoding="utf-8"))["bytes"]
+        disk = {"dataset_mb": round((info["dataset"] or 0) / 1e6, 1), "csv_mb": round((info["csv"] or 0) / 1e6, 1),
+                "ratio": round(info["csv"] / info["dataset"], 1) if info["dataset"] and info["csv"] else None}
+        return {"stage": "etl", "rows": rows, "input_mb": round(conn.stat().st_size / 1e6, 1),
+                "shard_mb": shard_mb, "runs": runs, "disk": disk}
+
+
+def bench_labeling(rows: int, stages: int = 200, attacker_share: float = 0.05) -> dict:
+    """Join fluxo x timeline: `stages` janelas sobrepostas, fluxos em ordem de tempo, IPs uint32."""
+    rng = np.random.default_rng(7)
+    span = 86_400.0
+    t0 = rng.uniform(0, span, stages)
+    windows = [AttackWindow(("HydraSSH", "HydraBruteAction", "NmapTCP", "NmapScanAction")[i % 4], a, a + d)
+               for i, (a, d) in enumerate(zip(t0, rng.uniform(1, 1800, stages)))]
+    attacker, victim = 0x0A000002, 0x0A000003
+    labeler = IntervalLabeler(windows, "10.0.0.2", "10.0.0.3")
+    ts = np.sort(rng.uniform(0, span, rows))
+    src = rng.integers(0x0A000100, 0x0A00FF00, rows, dtype=np.uint32)
+    dst = np.full(rows, victim, dtype=np.uint32)
+    src[rng.random(rows) < attacker_share] = attacker
+    t = time.perf_counter()
+    codes = labeler.codes_for(ts, src, dst)
+    counts = labeler.counts(codes)
+    dt = time.perf_counter() - t
+    return {"stage": "labeling", "rows": rows, "stages": stages, "seconds": round(dt, 3),
+            "rows_per_s": round(rows / dt, 1), "label_counts": counts}
+
+
+def bench_features(rows: int, window_s: int = 60, workdir: Path | None = None) -> dict:
+    """Cache do registro de features: frio, tudo em cache e com uma feature nova registrada."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", rows)
+        runs = []
+
+        def run(case: str) -> None:
+            t0 = time.perf_counter()
+            out = aggregate_conn_windows(exp, window_s=window_s)
+            runs.append({"case": case, "seconds": round(time.perf_counter() - t0, 3),
+                         "computed": out.attrs["features_computed"], "cached": out.attrs["features_cached"]})
+
+        run("cold")
+        run("warm")
+        name = "bench_https_count"
+        register(FeatureDef(name, ("id.resp_p",), "sum", dtype="int64",
+                            fn=lambda b: (np.asarray(b.df["id.resp_p"]) == 443).astype(np.int64)))
+        try:
+            run("new_feature")
+        finally:
+            REGISTRY.pop(name, None)
+        return {"stage": "features", "rows": rows, "window_s": window_s, "runs": runs}
+
+
+def bench_windows(rows: int, windows=(60, 300, "300/60", 3600), workdir: Path | None = None) -> dict:
+    """Várias resoluções: uma passada por janela (sem cache) x todas numa passada (janela base + combinação)."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", rows)
+        specs = [WindowSpec.parse(w) for w in windows]
+        t0 = time.perf_counter()
+        separate = {sp.name: len(compute_multi_window_features(exp, [sp])[sp.name]) for sp in specs}
+        t1 = time.perf_counter()
+        one_pass = {k: len(v) for k, v in compute_multi_window_features(exp, specs).items()}
+        t2 = time.perf_counter()
+        assert separate == one_pass
+        return {"stage": "windows", "rows": rows, "windows": one_pass,
+                "seconds": {"separate": round(t1 - t0, 3), "one_pass": round(t2 - t1, 3)},
+                "speedup": round((t1 - t0) / (t2 - t1), 2) if t2 > t1 else None}
+
+
+def bench_sketches(rows: int, sources: int = 16, error: float = 0.01, block: int = 1_000_000) -> dict:
+    """
+    Varredura (cada origem varre portas e hosts de um /16): distintos por origem numa janela,
+    exato (hash de cada valor distinto) x HyperLogLog — tempo, tamanho do estado e erro.
+    """
+    rng = np.random.default_rng(42)
+    runs = {}
+    truth = None
+    for cfg in (SketchConfig(exact=True), SketchConfig(error=error)):
+        keys = ["window_start", "src_ip"]
+        states, peak = [], 0
+        t0 = time.perf_counter()
+        for done in range(0, rows, block):
+            n = min(block, rows - done)
+            frame = pd.DataFrame({"window_start": np.zeros(n, dtype=np.int64),
+                                  "src_ip": rng.integers(0, sources, n).astype(np.int32)})
+            target = rng.integers(0, 65536, n) * 65536 + rng.integers(1, 65536, n)   # (host, porta)
+            states.append(sketch_state(frame, target, cfg))
+            if len(states) >= 8:
+                states = [merge_states(states, keys, cfg)]
+            peak = max(peak, sum(int(st.memory_usage(index=False).sum()) for st in states))
+        est = estimate(merge_states(states, keys, cfg), keys, cfg).set_index("src_ip")["estimate"]
+        dt = time.perf_counter() - t0
+        if truth is None:
+            truth = est
+        rel = ((est - truth).abs() / truth).to_numpy()
+        runs[cfg.tag] = {"seconds": round(dt, 3), "state_peak_mb": round(peak / 1e6, 2),
+                         "max_rel_error": round(float(rel.max()), 5), "mean_rel_error": round(float(rel.mean()), 5)}
+    return {"stage": "sketches", "rows": rows, "sources": sources,
+            "distinct_per_source": int(truth.mean()), "runs": runs}
+
+
+def bench_arrow(rows: int, workdir: Path | None = None) -> dict:
+    """Entrega ETL -> treino: dataset Parquet (decodifica) x arrow/full.arrow mapeado (memory_map)."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", rows)
+        out = run_etl(exp, Path(tmp) / "etl", workers=1, arrow=True)
+        arrow = out / ARROW_FILE
+        cases = {"parquet_to_pandas": lambda: read_dataset(out / "dataset"),
+                 "arrow_open": lambda: open_arrow(arrow),
+                 "arrow_to_pandas": lambda: read_arrow(arrow),
+                 "arrow_numeric_column": lambda: read_arrow(arrow, columns=["orig_bytes"])}
+        runs = {}
+        for name, fn in cases.items():
+            t0 = time.perf_counter()
+            fn()
+            runs[name] = round(time.perf_counter() - t0, 3)
+        return {"stage": "arrow", "rows": rows, "seconds": runs,
+                "disk_mb": {"dataset": round(sum(f.stat().st_size for f in (out / "dataset").rglob("*.parquet")) / 1e6, 1),
+                            "arrow": round(arrow.stat().st_size / 1e6, 1)}}
+
+
+def _corpus_run(exps, out, window_s, engine, memory_limit):
+    t0 = time.perf_counter()
+    build_corpus_windows(exps, out, window_s=window_s, engine=engine, memory_limit=memory_limit)
+    return time.perf_counter() - t0, peak_rss_mb()
+
+
+def bench_corpus(rows: int, experiments: int = 12, window_s: int = 60, engines=("pandas", "duckdb"),
+                 memory_limit: str = "1GB", workdir: Path | None = None) -> dict:
+    """features_conn_window de um corpus: pandas (concat em memória) x DuckDB (fora da memória).
+    Cada motor roda num processo novo para medir o pico de RSS isolado."""
+    per_exp = max(1, rows // experiments)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exps = []
+        for i in range(experiments):
+            exp = Path(tmp) / f"EXP_{i:03d}"
+            write_synthetic_conn_log(exp / "sensor" / "zeek" / "conn.log", per_exp)
+            exps.append(exp)
+        runs = []
+        for engine in engines:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                dt, rss = pool.submit(_corpus_run, exps, Path(tmp) / f"corpus_{engine}.parquet", window_s,
+                                      engine, memory_limit).result()
+            runs.append({"engine": engine, "seconds": round(dt, 3), "rows_per_s": round(per_exp * experiments / dt, 1),
+                         "peak_rss_mb": None if rss is None else round(rss, 1)})
+        return {"stage": "corpus", "rows": per_exp * experiments, "experiments": experiments,
+                "memory_limit": memory_limit, "runs": runs}
+
+
+def bench_pcap_index(rows: int, queries: int = 200, window_s: float = 1.0, workdir: Path | None = None) -> dict:
+    """
+    Índice dos pcaps de um experimento sintético: build, consultas por janela de tempo e por fluxo
+    (linhas + cabeçalhos lidos do mmap) x reler todos os segmentos para uma janela só.
+    """
+    from lab.datasets.pcap_flows import _iter_packets, find_pcaps
+    from lab.datasets.pcap_index import PcapIndex, build_exp_index
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exp = Path(tmp) / "EXP_BENCH"
+        gen = generate_experiment(exp, SynthSpec(rows=rows, pcap=True))
+        meta, t_build = _timed(lambda: build_exp_index(exp))
+        _, t_rebuild = _timed(lambda: build_exp_index(exp))
+        rng = np.random.default_rng(3)
+        with PcapIndex.for_experiment(exp) as idx:
+            ts = np.asarray(idx.ts)
+            starts = rng.uniform(ts[0] / 1e9, ts[-1] / 1e9 - window_s, queries)
+            t0 = time.perf_counter()
+            n_range = sum(len(idx.frame(idx.time_range(a, a + window_s))) for a in starts)
+            t_range = time.perf_counter() - t0
+            keys = idx.key[rng.integers(0, len(ts), queries)]
+            t0 = time.perf_counter()
+            n_flow = sum(len(idx.frame(idx.flow(int(k)))) for k in keys)
+            t_flow = time.perf_counter() - t0
+        a = starts[0]
+        t0 = time.perf_counter()
+        scanned = sum(int(((pk["ts"] >= a) & (pk["ts"] <= a + window_s)).sum())
+                      for f in find_pcaps(exp) for pk, _, _ in _iter_packets(f, 1_000_000))
+        t_scan = time.perf_counter() - t0
+        return {"stage": "pcap_index", "packets": gen["packets"], "segments": len(gen["files"]["pcap"]),
+                "pcap_mb": round(sum(f.stat().st_size for f in find_pcaps(exp)) / 1e6, 1),
+                "index_mb": round(meta["bytes"] / 1e6, 1), "build_s": t_build, "rebuild_unchanged_s": t_rebuild,
+                "range_query_ms": round(t_range / queries * 1e3, 3), "range_packets_avg": round(n_range / queries, 1),
+                "flow_query_ms": round(t_flow / queries * 1e3, 3), "flow_packets_avg": round(n_flow / queries, 1),
+                "rescan_one_window_s": round(t_scan, 3), "rescan_packets": scanned}
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, round(time.perf_counter() - t0, 3)
+
+
+def bench_suite(sizes=(10_000, 100_000, 1_000_000), workers: int = 1, pcap: bool = True,
+                zeek_rotate_s: float = 600.0, workdir: Path | None = None) -> dict:
+    """
+    Todas as etapas do ETL sobre experimentos sintéticos (synth) de vários tamanhos: geração,
+    pré-ETL (pandas e DuckDB), ETL final com perfil por etapa (pcap_flows e arrow inclusos),
+    amostragem, join do auth.log no ssh.log e leitura do dataset/arrow.
+    """
+    from lab.datasets.auth_events import label_zeek_log, load_host_truth
+    from lab.datasets.profiling import EtlProfiler
+    from lab.datasets.sampling import SamplingSpec
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            exp = Path(tmp) / f"SYN_{rows}"
+            gen = generate_experiment(exp, SynthSpec(rows=rows, pcap=pcap, zeek_rotate_s=zeek_rotate_s))
+            seconds = {"generate": gen["seconds"]}
+            _, seconds["pre_etl"] = _timed(lambda: generate_conn_features(exp))
+            _, seconds["pre_etl_duckdb"] = _timed(lambda: generate_conn_features(
+                exp, out_path=Path(tmp) / "windows_duckdb.parquet", engine="duckdb"))
+            prof = EtlProfiler(exp.name)
+            out, seconds["etl"] = _timed(lambda: run_etl(exp, Path(tmp) / "etl", workers=workers, pcap_flows=pcap,
+                                                         arrow=True, profiler=prof))
+            _, seconds["etl_sampled"] = _timed(lambda: run_etl(exp, Path(tmp) / "etl_sample", workers=workers,
+                                                               sample=SamplingSpec()))
+            ssh, seconds["auth_join"] = _timed(lambda: label_zeek_log(exp, load_host_truth(exp)))
+            _, seconds["read_parquet"] = _timed(lambda: read_dataset(out / "dataset"))
+            _, seconds["read_arrow"] = _timed(lambda: read_arrow(out / ARROW_FILE))
+            labels = json.loads((out / "meta" / "label_counts.json").read_text(encoding="utf-8"))
+            results.append({"rows": rows, "input_mb": round(gen["bytes"] / 1e6, 1), "packets": gen["packets"],
+                            "seconds": seconds, "etl_stages": {st.name: round(st.wall_s, 3) for st in prof.stages},
+                            "etl_rows_per_s": round(rows / seconds["etl"], 1) if seconds["etl"] else None,
+                            "label_counts": labels,
+                            "ssh_matched": int((ssh["auth_outcome"] != "").sum()) if "auth_outcome" in ssh else 0})
+    return {"stage": "suite", "workers": workers, "pcap": pcap, "runs": results}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks do ETL sobre dados sintéticos")
+    ap.add_argument("stage", choices=["pre_etl", "zeek_reader", "etl", "pcap_flows", "labeling", "corpus", "features", "arrow",
+                                          "windows", "sketches", "suite", "pcap_index"])
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--window-s", type=int, default=60)
+    ap.add_argument("--windows", nargs="+", default=["60", "300", "300/60", "3600"])
+    ap.add_argument("--error", type=float, default=0.01)
+    ap.add_argument("--batch-rows", type=int, default=500_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1])
+    ap.add_argument("--shard-mb", type=int, default=64)
+    ap.add_argument("--parsers", nargs="+", choices=["pandas", "arrow"], default=["pandas"])
+    ap.add_argument("--experiments", type=int, default=12)
+    ap.add_argument("--memory-limit", default="1GB")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--no-pcap", action="store_true", help="suite sem pcaps (só logs do Zeek)")
+    ap.add_argument("--workdir", type=Path, default=None)
+    args = ap.parse_args(argv)
+    if args.stage == "pcap_index":
+        res = bench_pcap_index(args.rows, workdir=args.workdir)
+    elif args.stage == "suite":
+        res = bench_suite(args.sizes, workers=args.workers[0], pcap=not args.no_pcap, workdir=args.workdir)
+    elif args.stage == "sketches":
+        res = bench_sketches(args.rows, error=args.error)
+    elif args.stage == "windows":
+        res = bench_windows(args.rows, windows=args.windows, workdir=args.workdir)
+    elif args.stage == "arrow":
+        res = bench_arrow(args.rows, workdir=args.workdir)
+    elif args.stage == "features":
+        res = bench_features(args.rows, window_s=args.window_s, workdir=args.workdir)
+    elif args.stage == "corpus":
+        res = bench_corpus(args.rows, experiments=args.experiments, window_s=args.window_s,
+                           memory_limit=args.memory_limit, workdir=args.workdir)
+    elif args.stage == "labeling":
+        res = bench_labeling(args.rows)
+    elif args.stage == "pcap_flows":
+        res = bench_pcap_flows(args.rows, workdir=args.workdir)
+    elif args.stage == "etl":
+        res = bench_etl(args.rows, workers=args.workers, shard_mb=args.shard_mb, parsers=args.parsers,
+                        workdir=args.workdir)
+    elif args.stage == "zeek_reader":
+        res = bench_zeek_reader(args.rows, batch_rows=args.batch_rows, workdir=args.workdir)
+    else:
+        res = bench_pre_etl(args.rows, window_s=args.window_s, workdir=args.workdir)
+    print(json.dumps(res))
+
+
+if __name__ == "__main__":
+    main()
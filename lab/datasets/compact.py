@@ -0,0 +1,127 @@
+# lab/datasets/compact.py
+"""
+Compactação dos datasets Parquet do ETL (data/etl/<exp>/dataset, lab/data/processed/<run_ts>/<exp>/dataset).
+
+Por exp_id:
+  - junta os arquivos pequenos (shards, rótulos raros, reprocessamentos) em poucos arquivos com
+    row groups do tamanho alvo;
+  - remove fluxos repetidos pelo hash estável do fluxo (uid, ts, 5-tupla, sensor) — quando o
+    mesmo fluxo aparece em dois run_ts (metadata regravado pelo failsafe), fica o run_ts mais novo;
+  - reordena por ts e 5-tupla (colunas vizinhas parecidas comprimem melhor e o filtro por tempo
+    pula row groups pelas estatísticas).
+
+A troca é feita por partição (parquet_dataset.swap_partitions, restrita às folhas do exp_id) e o
+estado do ETL é marcado como compactado: a próxima mudança de entrada reprocessa o experimento inteiro.
+
+    python -m lab.datasets.compact data/etl lab/data/processed [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_state import EtlState
+from lab.datasets.parquet_dataset import (DEFAULT_ROW_GROUP_ROWS, PARTITION_COLS, leaf_dirs, read_dataset,
+                                          swap_partitions, write_metadata_summary, write_partitioned)
+
+logger = setup_logger(Path('.logs'), name="[Compact]")
+
+# Identidade de um fluxo (independe de rótulo e de run_ts)
+FLOW_KEY = ["uid", "ts", "src_ip", "src_port", "dst_ip", "dst_port", "proto", "sensor_host"]
+SORT_KEY = ["ts", "src_ip", "src_port", "dst_ip", "dst_port", "proto"]
+
+
+def flow_hash(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 estável do fluxo (mesma chave fixa do pandas em qualquer processo/máquina)."""
+    cols = [c for c in FLOW_KEY if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def find_datasets(paths: List[Path]) -> List[Path]:
+    """Raízes de dataset (diretórios `dataset` com partições exp_id=) sob os caminhos dados."""
+    found = []
+    for p in map(Path, paths):
+        cands = [p] if p.name == "dataset" else sorted(p.rglob("dataset"))
+        found += [c for c in cands if c.is_dir() and any(c.glob("exp_id=*"))]
+    return found
+
+
+def _du(files: List[Path]) -> int:
+    return sum(f.stat().st_size for f in files)
+
+
+def compact_dataset(root: Path, row_group_rows: int = DEFAULT_ROW_GROUP_ROWS, dry_run: bool = False) -> Dict[str, Any]:
+    """Compacta/deduplica um dataset; retorna o relatório (arquivos, linhas e bytes antes/depois)."""
+    root = Path(root)
+    t0 = time.perf_counter()
+    report: Dict[str, Any] = {"dataset": str(root), "experiments": []}
+    staging = root.parent / "_staging_compact"
+    shutil.rmtree(staging, ignore_errors=True)
+    for exp_dir in sorted(root.glob("exp_id=*")):
+        exp_id = exp_dir.name.split("=", 1)[1]
+        leaves = [rel for rel in leaf_dirs(root) if rel.parts[0] == exp_dir.name]
+        files = [f for rel in leaves for f in sorted((root / rel).glob("*.parquet"))]
+        runs = {rel.parts[1] for rel in leaves}
+        if len(files) <= len(leaves) and len(runs) <= 1:
+            report["experiments"].append({"exp_id": exp_id, "skipped": "já compacto", "files": len(files)})
+            continue
+        df = read_dataset(root, filters=[("exp_id", "=", exp_id)])
+        rows_before = len(df)
+        # Mais novo primeiro: drop_duplicates mantém o run_ts mais recente de cada fluxo
+        df = df.sort_values("run_ts", ascending=False, kind="stable")
+        df = df[~pd.Series(flow_hash(df)).duplicated().to_numpy()]
+        df = df.sort_values(SORT_KEY, kind="stable").reset_index(drop=True)
+        entry = {"exp_id": exp_id, "files_before": len(files), "rows_before": rows_before,
+                 "duplicates": rows_before - len(df), "bytes_before": _du(files)}
+        if not dry_run:
+            cols = [c for c in df.columns if c not in PARTITION_COLS] + PARTITION_COLS
+            write_partitioned(df[cols], staging, f"compact-{exp_id}", row_group_rows=row_group_rows)
+            # Todas as folhas do experimento saem (mesmo as que ficaram vazias após a deduplicação)
+            swap_partitions(root, staging, stale_prefixes=[f.name for f in files], scope=Path(exp_dir.name))
+            new_files = [f for rel in leaf_dirs(root) if rel.parts[0] == exp_dir.name
+                         for f in (root / rel).glob("*.parquet")]
+            entry.update(files_after=len(new_files), bytes_after=_du(new_files), rows_after=len(df))
+            entry["bytes_reclaimed"] = entry["bytes_before"] - entry["bytes_after"]
+        report["experiments"].append(entry)
+    if not dry_run:
+        write_metadata_summary(root)
+        meta_dir = root.parent / "meta"
+        if (meta_dir / "etl_state.json").exists():
+            state = EtlState.load(meta_dir)
+            state.compacted = True
+            state.save(meta_dir)
+    shutil.rmtree(staging, ignore_errors=True)
+    done = [e for e in report["experiments"] if "bytes_before" in e]
+    report.update(seconds=round(time.perf_counter() - t0, 3), dry_run=dry_run,
+                  duplicates=sum(e["duplicates"] for e in done),
+                  bytes_reclaimed=sum(e.get("bytes_reclaimed", 0) for e in done))
+    if not dry_run:
+        (root.parent / "meta").mkdir(parents=True, exist_ok=True)
+        (root.parent / "meta" / "compaction.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info(f"[Compact] {root}: {report['duplicates']} duplicata(s), "
+                f"{report['bytes_reclaimed'] / 1e6:.1f} MB recuperados em {report['seconds']}s")
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compacta e deduplica os datasets Parquet do ETL")
+    ap.add_argument("paths", type=Path, nargs="+", help="dataset/ ou diretórios acima (data/etl, lab/data/processed)")
+    ap.add_argument("--row-group-rows", type=int, default=DEFAULT_ROW_GROUP_ROWS)
+    ap.add_argument("--dry-run", action="store_true", help="só relata (duplicatas, arquivos, bytes)")
+    args = ap.parse_args(argv)
+    reports = [compact_dataset(d, row_group_rows=args.row_group_rows, dry_run=args.dry_run)
+               for d in find_datasets(args.paths)]
+    print(json.dumps({"datasets": len(reports), "duplicates": sum(r["duplicates"] for r in reports),
+                      "bytes_reclaimed": sum(r["bytes_reclaimed"] for r in reports), "reports": reports}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# lab/datasets/corpus_windows.py
+"""
+features_conn_window de vários experimentos num único arquivo (corpus), com dois motores:
+
+  pandas  agrega cada experimento em memória (pre_etl.aggregate_conn_windows) e concatena;
+  duckdb  empurra leitura do conn.log, rótulo (ASOF join com os segmentos do timeline) e
+          agregação para o DuckDB, que grava o Parquet direto com COPY; com memory_limit e
+          temp_directory o DuckDB despeja em disco — o corpus pode ser maior que a RAM.
+
+As duas saídas têm as mesmas colunas (pre_etl + exp_id) e os mesmos valores para as features
+padrão do registro (features.py); features registradas depois só saem no motor pandas, que
+também reaproveita o cache de features de cada experimento. As contagens de distintos
+(distinct_*) são estimativas nos dois motores (HyperLogLog do sketches.py no pandas,
+approx_count_distinct no DuckDB) e só coincidem com SketchConfig(exact=True) (count DISTINCT).
+
+    python -m lab.datasets.corpus_windows data/EXP_A data/EXP_B --out corpus.parquet --engine duckdb
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.pre_etl import ENGINES, FAILED_STATES, aggregate_conn_windows, find_conn_logs
+from lab.datasets.sketches import SketchConfig
+from lab.datasets.zeek_reader import read_zeek_header
+
+logger = setup_logger(Path('.logs'), name="[CorpusWindows]")
+
+try:
+    import duckdb
+    _HAS_DUCKDB = True
+except Exception:
+    _HAS_DUCKDB = False
+
+DEFAULT_MEMORY_LIMIT = "2GB"
+ORDER = ["exp_id", "window_start", "src_ip", "dst_ip", "dst_port"]
+# Tipos Zeek -> DuckDB na leitura do TSV
+_DUCK_TYPES = {"time": "DOUBLE", "interval": "DOUBLE", "double": "DOUBLE",
+               "port": "BIGINT", "count": "BIGINT", "int": "BIGINT"}
+
+
+def _q(s: str) -> str:
+    return "'" + str(s).replace("'", "''") + "'"
+
+
+def _conn_select(path: Path, exp_id: str) -> str:
+    """SELECT das colunas do pré-ETL de um conn.log (TSV ou JSON, .gz incluso), já com nomes finais."""
+    hdr = read_zeek_header(path)
+    if hdr.fmt == "json":
+        src = f"read_json_auto({_q(path)}, format='newline_delimited')"
+    else:
+        cols = ", ".join(f"{_q(f)}: '{_DUCK_TYPES.get(t.split('[')[0], 'VARCHAR')}'" for f, t in zip(hdr.fields, hdr.types))
+        src = (f"read_csv({_q(path)}, delim='\\t', comment='#', header=false, auto_detect=false, "
+               f"quote='', escape='', nullstr='-', columns={{{cols}}})")
+    present = set(hdr.fields)
+    def col(c: str, cast: str) -> str:
+        return f'CAST("{c}" AS {cast})' if c in present else f"CAST(NULL AS {cast})"
+    return (f"SELECT {_q(exp_id)} AS exp_id, {col('ts', 'DOUBLE')} AS ts, {col('id.orig_h', 'VARCHAR')} AS src_ip, "
+            f"{col('id.resp_h', 'VARCHAR')} AS dst_ip, {col('id.resp_p', 'BIGINT')} AS dst_port, "
+            f"{col('proto', 'VARCHAR')} AS proto, {col('duration', 'DOUBLE')} AS duration, "
+            f"{col('orig_bytes', 'DOUBLE')} AS orig_bytes, {col('resp_bytes', 'DOUBLE')} AS resp_bytes, "
+            f"{col('conn_state', 'VARCHAR')} AS conn_state, {col('orig_pkts', 'DOUBLE')} AS orig_pkts, "
+            f"{col('resp_pkts', 'DOUBLE')} AS resp_pkts FROM {src}")
+
+
+def _label_tables(exp_dirs: Sequence[Path]) -> Dict[str, pd.DataFrame]:
+    """Segmentos rotulados (para o ASOF join) e rank -> rótulo, por experimento."""
+    segs, ranks = [], []
+    for exp in exp_dirs:
+        lab = IntervalLabeler(load_attack_windows(exp), *load_targets(exp))
+        for lo, hi, rank in lab.segments():
+            segs.append((exp.name, lo, hi, rank, lab.attacker_ip, lab.victim_ip))
+        ranks += [(exp.name, i, str(lbl)) for i, lbl in enumerate(lab.ranked)]
+    return {
+        "segs": pd.DataFrame(segs, columns=["exp_id", "lo", "hi", "rank", "attacker", "victim"]).astype(
+            {"exp_id": object, "lo": "float64", "hi": "float64", "rank": "int64", "attacker": object, "victim": object}),
+        "ranks": pd.DataFrame(ranks, columns=["exp_id", "rank", "label"]).astype(
+            {"exp_id": object, "rank": "int64", "label": object}),
+    }
+
+
+def _windows_sql(selects: List[str], window_s: int, with_exp_id: bool, exact: bool = False) -> str:
+    failed = ", ".join(_q(s) for s in FAILED_STATES)
+    exp_col = "a.exp_id, " if with_exp_id else ""
+    order = ", ".join(ORDER if with_exp_id else ORDER[1:])
+    distinct = "count(DISTINCT {})" if exact else "approx_count_distinct({})"
+    return f"""
+    WITH flows AS ({' UNION ALL BY NAME '.join(selects)}),
+    labelled AS (
+        SELECT f.*,
+               CASE WHEN s.hi IS NOT NULL AND f.ts < s.hi
+                         AND (f.src_ip = s.attacker OR f.dst_ip = s.attacker)
+                         AND (s.victim = '' OR f.src_ip = s.victim OR f.dst_ip = s.victim)
+                    THEN s.rank ELSE 0 END AS label_rank,
+               CAST(floor(f.ts / {window_s}) AS BIGINT) * {window_s} AS window_start
+        FROM flows f ASOF LEFT JOIN segs s ON f.exp_id = s.exp_id AND f.ts >= s.lo
+        WHERE f.ts IS NOT NULL
+    ),
+    agg AS (
+        SELECT exp_id, window_start, src_ip, dst_ip, CAST(dst_port AS INTEGER) AS dst_port,
+               count(*) AS conn_count,
+               sum(coalesce(orig_bytes, 0)) AS orig_bytes, sum(coalesce(resp_bytes, 0)) AS resp_bytes,
+               sum(coalesce(orig_pkts, 0)) AS orig_pkts, sum(coalesce(resp_pkts, 0)) AS resp_pkts,
+               sum(coalesce(duration, 0)) AS duration_sum,
+               CAST(count_if(conn_state IN ({failed})) AS BIGINT) AS failed_count,
+               CAST(count_if(proto = 'tcp') AS BIGINT) AS tcp_count,
+               CAST(count_if(proto = 'udp') AS BIGINT) AS udp_count,
+               CAST(count_if(label_rank > 0) AS BIGINT) AS attack_flows,
+               max(coalesce(duration, 0)) AS duration_max, max(label_rank) AS label_rank,
+               min(ts) AS first_ts, max(ts) AS last_ts
+        FROM labelled GROUP BY ALL
+    ),
+    by_src AS (
+        SELECT exp_id, window_start, src_ip,
+               CAST({distinct.format("dst_port")} AS BIGINT) AS distinct_dst_ports,
+               CAST({distinct.format("dst_ip")} AS BIGINT) AS distinct_dst_hosts
+        FROM labelled GROUP BY ALL
+    ),
+    by_dst AS (
+        SELECT exp_id, window_start, dst_ip, CAST({distinct.format("src_ip")} AS BIGINT) AS distinct_src_hosts
+        FROM labelled GROUP BY ALL
+    )
+    SELECT {exp_col}a.window_start, a.src_ip, a.dst_ip, a.dst_port, a.conn_count,
+           a.orig_bytes, a.resp_bytes, a.orig_pkts, a.resp_pkts, a.duration_sum,
+           a.failed_count, a.tcp_count, a.udp_count, a.attack_flows, a.duration_max,
+           a.first_ts, a.last_ts, coalesce(bs.distinct_dst_ports, 0) AS distinct_dst_ports,
+           coalesce(bs.distinct_dst_hosts, 0) AS distinct_dst_hosts,
+           coalesce(bd.distinct_src_hosts, 0) AS distinct_src_hosts, CAST({window_s} AS INTEGER) AS window_s,
+           a.conn_count / {float(window_s)} AS conn_rate,
+           (a.orig_bytes + a.resp_bytes) / a.conn_count AS bytes_per_conn,
+           (a.orig_pkts + a.resp_pkts) / a.conn_count AS pkts_per_conn,
+           a.duration_sum / a.conn_count AS duration_mean,
+           a.failed_count / a.conn_count AS failed_ratio,
+           r.label
+    FROM agg a JOIN ranks r ON a.exp_id = r.exp_id AND a.label_rank = r.rank
+    LEFT JOIN by_src bs ON a.exp_id = bs.exp_id AND a.window_start = bs.window_start AND a.src_ip = bs.src_ip
+    LEFT JOIN by_dst bd ON a.exp_id = bd.exp_id AND a.window_start = bd.window_start AND a.dst_ip = bd.dst_ip
+    ORDER BY {order}
+    """
+
+
+def _build_duckdb(exp_dirs: Sequence[Path], out_path: Path, window_s: int, tap: str, with_exp_id: bool,
+                  memory_limit: str, temp_dir: Optional[Path], threads: Optional[int], exact: bool = False) -> int:
+    if not _HAS_DUCKDB:
+        raise RuntimeError("duckdb não instalado (pip install duckdb) — use engine='pandas'")
+    selects = [_conn_select(f, exp.name) for exp in exp_dirs for f in find_conn_logs(exp, tap=tap)]
+    if not selects:
+        raise FileNotFoundError(f"nenhum conn.log nos experimentos ({tap}/zeek)")
+    with tempfile.TemporaryDirectory(dir=temp_dir) as spill:
+        con = duckdb.connect()
+        try:
+            con.execute(f"SET memory_limit = {_q(memory_limit)}")
+            con.execute(f"SET temp_directory = {_q(spill)}")
+            con.execute("SET preserve_insertion_order = false")
+            if threads:
+                con.execute(f"SET threads = {int(threads)}")
+            tables = _label_tables(exp_dirs)
+            con.register("segs", tables["segs"])
+            con.register("ranks", tables["ranks"])
+            sql = _windows_sql(selects, window_s, with_exp_id, exact)
+            if out_path.suffix == ".parquet":
+                con.execute(f"COPY ({sql}) TO {_q(out_path)} (FORMAT parquet, COMPRESSION zstd)")
+            else:
+                con.execute(f"COPY ({sql}) TO {_q(out_path)} (FORMAT csv, HEADER true)")
+            return int(con.execute(f"SELECT count(*) FROM {_q(out_path)}").fetchone()[0])
+        finally:
+            con.close()
+
+
+def _build_pandas(exp_dirs: Sequence[Path], out_path: Path, window_s: int, tap: str, with_exp_id: bool,
+                  sketch: Optional[SketchConfig] = None) -> int:
+    frames = []
+    for exp in exp_dirs:
+        df = aggregate_conn_windows(exp, window_s=window_s, tap=tap, sketch=sketch)
+        if with_exp_id:
+            df.insert(0, "exp_id", exp.name)
+        frames.append(df)
+    out = pd.concat(frames, ignore_index=True)
+    for c in ("src_ip", "dst_ip"):
+        out[c] = out[c].astype(str)
+    out = out.sort_values(ORDER if with_exp_id else ORDER[1:], kind="stable").reset_index(drop=True)
+    if out_path.suffix == ".parquet":
+        out.to_parquet(out_path, index=False, compression="zstd")
+    else:
+        out.to_csv(out_path, index=False)
+    return len(out)
+
+
+def build_corpus_windows(exp_dirs: Sequence[Path], out_path: Path, window_s: int = 60, engine: str = "pandas",
+                         tap: str = "sensor", with_exp_id: bool = True, memory_limit: str = DEFAULT_MEMORY_LIMIT,
+                         temp_dir: Optional[Path] = None, threads: Optional[int] = None,
+                         sketch: Optional[SketchConfig] = None) -> Path:
+    """
+    Agrega por janela os conn.log de vários experimentos num único Parquet/CSV (pela extensão).
+    engine="duckdb": fora da memória (memory_limit, spill em temp_dir); "pandas": em memória.
+    sketch: precisão das colunas distinct_* (no DuckDB só conta exact; o HLL dele é fixo).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine inválido: {engine} (use {ENGINES})")
+    exp_dirs = [Path(p) for p in exp_dirs]
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    window_s = max(1, int(window_s))
+    t0 = time.perf_counter()
+    if engine == "duckdb":
+        rows = _build_duckdb(exp_dirs, out_path, window_s, tap, with_exp_id, memory_limit, temp_dir, threads,
+                             exact=bool(sketch and sketch.exact))
+    else:
+        rows = _build_pandas(exp_dirs, out_path, window_s, tap, with_exp_id, sketch)
+    dt = time.perf_counter() - t0
+    stats = {"engine": engine, "experiments": len(exp_dirs), "rows_out": rows, "seconds": round(dt, 3)}
+    logger.info(f"[CorpusWindows] {out_path.name}: {json.dumps(stats)}")
+    return out_path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="features_conn_window de vários experimentos (corpus)")
+    ap.add_argument("exp_dirs", type=Path, nargs="+")
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--window-s", type=int, default=60)
+    ap.add_argument("--engine", choices=ENGINES, default="pandas")
+    ap.add_argument("--tap", default="sensor")
+    ap.add_argument("--memory-limit", default=DEFAULT_MEMORY_LIMIT)
+    ap.add_argument("--temp-dir", type=Path, default=None)
+    ap.add_argument("--exact-distinct", action="store_true", help="contagem exata de distintos (sem sketch)")
+    args = ap.parse_args(argv)
+    build_corpus_windows(args.exp_dirs, args.out, window_s=args.window_s, engine=args.engine, tap=args.tap,
+                         memory_limit=args.memory_limit, temp_dir=args.temp_dir,
+                         sketch=SketchConfig(exact=args.exact_distinct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# lab/datasets/etl.py
+"""
+ETL sem VMs nem UI: pré-ETL (features_conn_window) + ETL final (etl_netsec.run_etl) de um
+experimento, de um manifest (lab.data.manifest.build_manifest) ou de um diretório de capturas
+inteiro (backfill) — o mesmo pipeline do Runner._run_etl, chamado direto.
+
+    python -m lab.datasets.etl data/EXP1 --out data/etl
+    python -m lab.datasets.etl lab/data/captures/manifest.json --out lab/data/processed
+    python -m lab.datasets.etl lab/data/captures --out lab/data/processed --since 2024-05-01 \\
+        --workers 32 --chunk-rows 2000000 --engine arrow
+
+Saídas no mesmo layout do Runner/guia: <out>/<exp_id>/ para um experimento e
+<out>/<run_ts do manifest ou "all">/<exp_id>/ para manifest/capturas. O progresso (um evento por
+shard concluído) vai para o stderr; o resumo em JSON (runs, linhas, tempos, falhas) vai para o
+stdout e, com --summary, para um arquivo. Código de saída 1 se algum run falhar.
+
+--engine:
+  pandas  parser C do pandas nas fatias; pré-ETL em memória
+  arrow   pyarrow.csv (multithread) nas fatias; pré-ETL em memória
+  duckdb  pyarrow.csv nas fatias; pré-ETL fora da memória no DuckDB (ver corpus_windows)
+--chunk-rows: cada conn.log é fatiado em shards de ~N linhas, distribuídos entre os --workers
+(.gz não é divisível: um shard por arquivo). --since: só runs com run_ts >= data (ISO ou
+AAAAMMDDTHHMMSSZ).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.parquet_dataset import run_ts_of
+from lab.datasets.pre_etl import generate_conn_features
+from lab.datasets.profiling import DUMP_MODES, EtlProfiler, count_rows
+
+logger = setup_logger(Path('.logs'), name="[ETL]")
+
+ENGINES = ("pandas", "arrow", "duckdb")
+# engine da CLI -> (parser das fatias, motor do pré-ETL)
+_ENGINE_MAP = {"pandas": ("pandas", "pandas"), "arrow": ("arrow", "pandas"), "duckdb": ("arrow", "duckdb")}
+_RUN_TS_FMT = "%Y%m%dT%H%M%SZ"
+
+
+@dataclass
+class EtlJob:
+    name: str
+    exp_dir: Path
+    out_dir: Path
+    run_ts: str
+
+
+def parse_since(value: Optional[str]) -> Optional[str]:
+    """Data/hora (ISO 8601, AAAA-MM-DD, epoch ou AAAAMMDDTHHMMSSZ) -> run_ts compacto em UTC."""
+    if not value:
+        return None
+    v = str(value).strip()
+    try:
+        dt = datetime.strptime(v, _RUN_TS_FMT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        try:
+            dt = datetime.fromtimestamp(float(v), tz=timezone.utc)
+        except ValueError:
+            dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime(_RUN_TS_FMT)
+
+
+def _is_experiment(path: Path) -> bool:
+    return (path / "metadata.json").exists() or any(path.glob("*/zeek"))
+
+
+def resolve_jobs(target: Path, out_dir: Path, since: Optional[str] = None) -> List[EtlJob]:
+    """
+    Runs a processar: experimento (diretório com metadata.json ou <tap>/zeek), manifest (.json)
+    ou diretório de capturas (catálogo atualizado e manifest de todos os runs).
+    """
+    target, out_dir = Path(target), Path(out_dir)
+    if target.is_dir() and _is_experiment(target):
+        runs, base = [{"exp_id": target.name, "path": str(target)}], out_dir
+    else:
+        if target.is_dir():
+            from lab.data.manifest import CaptureCatalog, build_manifest
+            with CaptureCatalog(target) as cat:
+                cat.refresh()
+            manifest = build_manifest(None, cap_dir=target)
+        else:
+            manifest = json.loads(target.read_text(encoding="utf-8"))
+        runs = (manifest or {}).get("runs") or []
+        if not runs:
+            raise FileNotFoundError(f"nenhum run em {target}")
+        base = out_dir / str(manifest.get("run_ts") or "all")
+    jobs = []
+    for r in runs:
+        exp_dir = Path(r["path"])
+        name = str(r.get("exp_id") or r.get("run_dir") or exp_dir.name)
+        jobs.append(EtlJob(name, exp_dir, base / name, run_ts_of(exp_dir)))
+    if since:
+        skipped = [j.name for j in jobs if j.run_ts < since]
+        jobs = [j for j in jobs if j.run_ts >= since]
+        if skipped:
+            logger.info(f"[ETL] --since {since}: {len(skipped)} run(s) anteriores ignorado(s)")
+    return jobs
+
+
+class _Progress:
+    """Progresso no stderr: linha reescrita no terminal; fora dele, no máximo uma linha a cada `every` s."""
+
+    def __init__(self, total_runs: int, quiet: bool = False, every: float = 5.0):
+        self.total_runs = total_runs
+        self.quiet = quiet
+        self.every = every
+        self.tty = sys.stderr.isatty()
+        self.last = 0.0
+
+    def shard(self, k: int, name: str, done: int, total: int, rows: int, t0: float) -> None:
+        now = time.perf_counter()
+        if self.quiet or (not self.tty and done < total and now - self.last < self.every):
+            return
+        self.last = now
+        dt = now - t0
+        line = (f"[{k}/{self.total_runs}] {name}: shard {done}/{total} — {rows} linha(s), {dt:.1f}s"
+                f"{f', {rows / dt:,.0f} linhas/s' if dt > 0 else ''}")
+        sys.stderr.write(f"\r{line}\033[K" if self.tty else line + "\n")
+        sys.stderr.flush()
+
+    def run(self, k: int, job: EtlJob, entry: Dict[str, Any]) -> None:
+        if self.quiet:
+            return
+        status = "ok" if entry["status"] == "ok" else f"FALHOU: {entry.get('error')}"
+        line = f"[{k}/{self.total_runs}] {job.name}: {status} ({entry.get('rows') or 0} fluxos, {entry['seconds']}s)"
+        sys.stderr.write(("\r" + line + "\033[K\n") if self.tty else line + "\n")
+        sys.stderr.flush()
+
+
+def _run_job(job: EtlJob, k: int, progress: _Progress, workers: Optional[int], chunk_rows: Optional[int],
+             engine: str, pre_etl: bool, window_s: int, full: bool, csv: bool, arrow: bool,
+             profile: Optional[str]) -> Dict[str, Any]:
+    parser, window_engine = _ENGINE_MAP[engine]
+    t0 = time.perf_counter()
+    entry: Dict[str, Any] = {"name": job.name, "exp_dir": str(job.exp_dir), "out": str(job.out_dir),
+                             "run_ts": job.run_ts, "status": "ok"}
+    profiler = EtlProfiler(job.name, dump=profile)
+    try:
+        if pre_etl:
+            try:
+                with profiler.stage("pre_etl") as st:
+                    path = generate_conn_features(job.exp_dir, window_s=window_s, engine=window_engine,
+                                                  chunk_rows=chunk_rows or 1_000_000)
+                    st.rows_out = count_rows(path)
+            except Exception as e:
+                # Como no Runner: sem pré-ETL o ETL final ainda sai do Zeek
+                logger.warning(f"[ETL] {job.name}: pré-ETL falhou ({e}) — seguindo para o ETL final")
+                entry["pre_etl_error"] = str(e)
+        rows = [0]
+
+        def on_shard(done: int, total: int, result: Dict[str, Any]) -> None:
+            rows[0] += int(result.get("rows", 0))
+            progress.shard(k, job.name, done, total, rows[0], t0)
+
+        run_etl(job.exp_dir, job.out_dir, workers=workers, full=full, csv=csv, arrow=arrow, profiler=profiler,
+                chunk_rows=chunk_rows, parser=parser, progress=on_shard)
+        info = json.loads((job.out_dir / "meta" / "etl_run.json").read_text(encoding="utf-8"))
+        entry.update({k2: info.get(k2) for k2 in ("rows", "workers", "shards", "incremental", "rows_per_s")})
+    except Exception as e:
+        logger.error(f"[ETL] falha no run {job.name}: {e}")
+        entry.update(status="failed", error=str(e))
+    entry["seconds"] = round(time.perf_counter() - t0, 3)
+    return entry
+
+
+def run_cli(target: Path, out_dir: Path, workers: Optional[int] = None, chunk_rows: Optional[int] = None,
+            engine: str = "pandas", since: Optional[str] = None, pre_etl: bool = True, window_s: int = 60,
+            full: bool = False, csv: bool = False, arrow: bool = False, profile: Optional[str] = None,
+            quiet: bool = False) -> Dict[str, Any]:
+    """Roda o ETL de todos os runs de `target` e retorna o resumo (o mesmo JSON da CLI)."""
+    if engine not in ENGINES:
+        raise ValueError(f"engine inválido: {engine} (use {ENGINES})")
+    since = parse_since(since)
+    jobs = resolve_jobs(target, out_dir, since)
+    progress = _Progress(len(jobs), quiet=quiet)
+    t0 = time.perf_counter()
+    runs = []
+    for k, job in enumerate(jobs, 1):
+        entry = _run_job(job, k, progress, workers, chunk_rows, engine, pre_etl, window_s, full, csv, arrow, profile)
+        progress.run(k, job, entry)
+        runs.append(entry)
+    dt = time.perf_counter() - t0
+    rows = sum(int(r.get("rows") or 0) for r in runs)
+    return {"target": str(target), "out": str(out_dir), "engine": engine, "workers": workers,
+            "chunk_rows": chunk_rows, "since": since, "runs": runs, "rows": rows,
+            "failed": [r["name"] for r in runs if r["status"] != "ok"], "seconds": round(dt, 3),
+            "rows_per_s": round(rows / dt, 1) if dt > 0 else None}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="ETL de experimento/manifest/capturas sem VMs (pré-ETL + ETL final)")
+    ap.add_argument("target", type=Path, help="diretório do experimento, manifest.json ou diretório de capturas")
+    ap.add_argument("--out", type=Path, default=Path("data") / "etl")
+    ap.add_argument("--workers", type=int, default=None, help="processos (padrão: $ETL_WORKERS ou nº de CPUs)")
+    ap.add_argument("--chunk-rows", type=int, default=None, help="linhas por shard (padrão: fatias de 64 MB)")
+    ap.add_argument("--engine", choices=ENGINES, default="pandas")
+    ap.add_argument("--since", default=None, help="só runs com run_ts >= data (ISO, epoch ou AAAAMMDDTHHMMSSZ)")
+    ap.add_argument("--window-s", type=int, default=60, help="janela do pré-ETL")
+    ap.add_argument("--no-pre-etl", action="store_true", help="pula features_conn_window (só o ETL final)")
+    ap.add_argument("--full", action="store_true", help="ignora o estado incremental e reprocessa tudo")
+    ap.add_argument("--csv", action="store_true")
+    ap.add_argument("--arrow", action="store_true")
+    ap.add_argument("--profile", choices=DUMP_MODES, default=None, help="dumps por etapa em meta/profile/")
+    ap.add_argument("--summary", type=Path, default=None, help="também grava o resumo JSON neste arquivo")
+    ap.add_argument("--quiet", action="store_true", help="sem progresso nem logs INFO no stderr")
+    args = ap.parse_args(argv)
+    if args.quiet:
+        logging.disable(logging.INFO)
+    summary = run_cli(args.target, args.out, workers=args.workers, chunk_rows=args.chunk_rows, engine=args.engine,
+                      since=args.since, pre_etl=not args.no_pre_etl, window_s=args.window_s, full=args.full,
+                      csv=args.csv, arrow=args.arrow, profile=args.profile, quiet=args.quiet)
+    text = json.dumps(summary, indent=2)
+    if args.summary is not None:
+        args.summary.parent.mkdir(parents=True, exist_ok=True)
+        args.summary.write_text(text, encoding="utf-8")
+    print(text)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
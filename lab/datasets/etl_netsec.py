@@ -0,0 +1,547 @@
+# lab/datasets/etl_netsec.py
+"""
+ETL final de um experimento: conn.log do Zeek (+ segmentos pcap) -> dataset por fluxo, rotulado.
+
+O trabalho é dividido em shards independentes — um por arquivo (rotações do Zeek, workers
+AF_PACKET, segmentos do tcpdump -G/-C) e, para conn.log grandes sem rotação, fatias de bytes.
+Cada shard roda num ProcessPoolExecutor e grava suas partições num staging (e o CSV parcial em
+<out>/_parts/); no fim as partições afetadas são publicadas de uma vez (saída determinística,
+independe do nº de workers).
+
+Incremental: meta/etl_state.json guarda hash de cada entrada e a versão do código; rodar de novo
+só processa arquivos novos/alterados (ver etl_state).
+
+Verdade do host (auth_events): cada fluxo que casa com uma sessão do sshd no auth.log do victim,
+por (src_ip, src_port, tempo), leva o resultado da autenticação (auth_outcome/auth_failures/auth_user).
+
+Saída em <out>/:
+  dataset/                  Parquet particionado exp_id=/run_ts=/label= (zstd, _metadata; ver parquet_dataset)
+  csv/full.csv              CSV monolítico, só com csv=True (ou sem pyarrow)
+  arrow/full.arrow          Arrow IPC sem compressão para memory_map (treino/visualizador), só com arrow=True
+  meta/label_counts.json    contagem por rótulo
+  meta/pcap_segments.json   intervalo/pacotes de cada segmento pcap
+  meta/auth_summary.json    sessões do sshd, credenciais do Hydra e fluxos casados
+  meta/sampling.json        fluxos por rótulo antes/depois da amostragem (só com sample=...)
+  meta/etl_run.json         shards, workers e tempos
+  meta/etl_profile.json     tempo/CPU/RSS/linhas/bytes por etapa (+ histórico; ver profiling)
+  meta/etl_state.json       entradas já processadas (ETL incremental)
+  pcap_flows/<tap>.parquet  fluxos reconstruídos dos pcaps (opcional, pcap_flows=True)
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.arrow_ipc import ARROW_FILE, arrow_is_current, publish_arrow
+from lab.datasets.auth_events import join_auth_to_flows, load_host_truth
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.etl_state import EtlState, code_version, context_digest, input_key
+from lab.datasets.sampling import SamplingSpec, finalize, merge_counts, reservoir, trim
+from lab.datasets.profiling import EtlProfiler, profile_call
+from lab.datasets.parquet_dataset import (DEFAULT_ROW_GROUP_ROWS, partition_dir, run_ts_of, swap_partitions,
+                                          write_metadata_summary, write_partitioned)
+from lab.datasets.zeek_reader import (NAT_NS, estimate_row_bytes, find_zeek_logs, ip_to_str, iter_zeek_range,
+                                     split_zeek_file)
+
+logger = setup_logger(Path('.logs'), name="[ETL]")
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# Colunas do conn.log materializadas pelo ETL
+CONN_FIELDS = [
+    "ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "proto", "service",
+    "duration", "orig_bytes", "resp_bytes", "conn_state", "missed_bytes", "history",
+    "orig_pkts", "orig_ip_bytes", "resp_pkts", "resp_ip_bytes",
+]
+RENAME = {"id.orig_h": "src_ip", "id.orig_p": "src_port", "id.resp_h": "dst_ip", "id.resp_p": "dst_port"}
+
+# Fatia de bytes por shard quando um conn.log não foi rotacionado
+DEFAULT_SHARD_MB = 64
+# Linhas por bloco dentro de um shard (o .gz inteiro é um shard só)
+DEFAULT_BATCH_ROWS = 500_000
+
+
+# -----------------------
+# Shards (executados nos workers; precisam ser funções de módulo para o pickle)
+# -----------------------
+def _conn_features(df: pd.DataFrame) -> pd.DataFrame:
+    ts_ns = np.asarray(df["ts"], dtype=np.int64)
+    df = df[ts_ns != NAT_NS].rename(columns=RENAME)
+    out = pd.DataFrame({"ts": np.asarray(df["ts"], dtype=np.int64) / 1e9})
+    out["uid"] = df["uid"].to_numpy()
+    out["src_ip"] = ip_to_str(df["src_ip"])
+    out["src_port"] = np.asarray(df["src_port"], dtype=np.int32)
+    out["dst_ip"] = ip_to_str(df["dst_ip"])
+    out["dst_port"] = np.asarray(df["dst_port"], dtype=np.int32)
+    for c in ("proto", "service", "conn_state", "history"):
+        out[c] = df[c].astype(object).fillna("").to_numpy()
+    num = {c: pd.to_numeric(df[c], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+           for c in ("duration", "orig_bytes", "resp_bytes", "missed_bytes", "orig_pkts", "resp_pkts",
+                     "orig_ip_bytes", "resp_ip_bytes")}
+    for c, v in num.items():
+        out[c] = v
+    total_bytes = num["orig_bytes"] + num["resp_bytes"]
+    total_pkts = num["orig_pkts"] + num["resp_pkts"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["total_bytes"] = total_bytes
+        out["total_pkts"] = total_pkts
+        out["bytes_per_pkt"] = np.where(total_pkts > 0, (num["orig_ip_bytes"] + num["resp_ip_bytes"]) / total_pkts, 0.0)
+        out["orig_resp_bytes_ratio"] = np.where(num["resp_bytes"] > 0, num["orig_bytes"] / num["resp_bytes"], 0.0)
+        out["pkts_per_s"] = np.where(num["duration"] > 0, total_pkts / num["duration"], 0.0)
+    return out
+
+
+def _write_csv_part(df: pd.DataFrame, part: Path, append: bool = False) -> None:
+    """CSV do shard sem cabeçalho (formatar CSV é caro, então roda no worker; o merge só concatena)."""
+    if _HAS_PYARROW:
+        with open(part, "ab" if append else "wb") as fh:
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), fh,
+                            write_options=pacsv.WriteOptions(include_header=False, quoting_style="needed"))
+    else:
+        df.to_csv(part, mode="a" if append else "w", index=False, header=False)
+
+
+def _process_conn_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    labeler: IntervalLabeler = shard["labeler"]
+    rows = rows_in = 0
+    columns: List[str] = []
+    label_counts: Dict[str, int] = {}
+    auth_counts: Dict[str, int] = {}
+    kept: List[pd.DataFrame] = []
+    sample_counts: List[pd.DataFrame] = []
+    written: List[str] = []
+    # Blocos de até batch_rows linhas: um .gz inteiro (shard único) não precisa caber na memória
+    batches = iter_zeek_range(Path(shard["path"]), shard["start"], shard["end"], columns=CONN_FIELDS,
+                              batch_rows=shard.get("batch_rows") or DEFAULT_BATCH_ROWS,
+                              parser=shard.get("parser") or "pandas")
+    for b, df in enumerate(batches):
+        feats = _conn_features(df)
+        feats["sensor_host"] = shard["tap"]
+        feats["exp_id"] = shard["exp_id"]
+        feats["run_ts"] = shard["run_ts"]
+        # Rotula com os endereços ainda numéricos (uint32): comparar texto custaria mais que o join
+        ok = np.asarray(df["ts"], dtype=np.int64) != NAT_NS
+        codes = labeler.codes_for(feats["ts"].to_numpy(), np.asarray(df["id.orig_h"])[ok],
+                                  np.asarray(df["id.resp_h"])[ok])
+        feats["label"] = labeler.labels[codes]
+        auth = join_auth_to_flows(feats, shard.get("auth_sessions"))
+        for c in auth.columns:
+            feats[c] = auth[c].to_numpy()
+        rows_in += len(df)
+        rows += len(feats)
+        columns = list(feats.columns)
+        for k, v in labeler.counts(codes).items():
+            label_counts[k] = label_counts.get(k, 0) + v
+        for k, v in auth["auth_outcome"].value_counts().items():
+            if k:
+                auth_counts[str(k)] = auth_counts.get(str(k), 0) + int(v)
+        if shard.get("sample") is not None:
+            # Amostragem: só o reservatório do shard sai daqui; o corte final é no processo principal
+            part, counts = reservoir(feats, shard["sample"])
+            kept = [trim(kept + [part], shard["sample"])]
+            sample_counts.append(counts)
+            continue
+        if shard.get("dataset"):
+            base = shard["basename"] if not b else f"{shard['basename']}-b{b:03d}"
+            written += write_partitioned(feats, Path(shard["dataset"]), base,
+                                         row_group_rows=shard.get("row_group_rows") or DEFAULT_ROW_GROUP_ROWS)
+        if shard.get("csv"):
+            _write_csv_part(feats, Path(shard["csv"]), append=b > 0)
+    extra: Dict[str, Any] = {}
+    if shard.get("sample") is not None:
+        kept[0].to_pickle(shard["sample_out"])
+        extra["sample_counts"] = merge_counts(sample_counts)
+        written.append(shard["sample_out"])
+    elif shard.get("csv"):
+        written.append(shard["csv"])
+    return {**extra, "shard": shard["id"], "rows": rows, "seconds": round(time.perf_counter() - t0, 3),
+            "rows_in": rows_in, "bytes_in": int(shard["end"] - shard["start"] if shard["end"] >= 0 else os.path.getsize(shard["path"])),
+            "bytes_out": sum(os.path.getsize(f) for f in written),
+            "columns": columns, "label_counts": label_counts, "auth_counts": auth_counts}
+
+
+def _process_pcap_segment(shard: Dict[str, Any]) -> Dict[str, Any]:
+    from lab.datasets.pcap_flows import pcap_time_range
+    t0 = time.perf_counter()
+    rng = pcap_time_range(Path(shard["path"])) or {}
+    return {"shard": shard["id"], "rows": 0, "seconds": round(time.perf_counter() - t0, 3),
+            "segment": {"sensor": shard["tap"], "file": Path(shard["path"]).name,
+                        "bytes": Path(shard["path"]).stat().st_size, **rng}}
+
+
+def _process_pcap_flows(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """Fluxos reconstruídos dos pcaps do tap (todos os segmentos, para não cortar fluxos na rotação)."""
+    from lab.datasets.pcap_flows import extract_flows
+    stats = extract_flows([Path(p) for p in shard["paths"]], Path(shard["out"]))
+    return {"shard": shard["id"], "rows": stats.flows, "seconds": stats.seconds, "pcap_flows": stats.as_dict()}
+
+
+_SHARD_FUNCS = {"conn": _process_conn_shard, "pcap": _process_pcap_segment, "pcap_flows": _process_pcap_flows}
+
+
+def _run_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    return profile_call(_SHARD_FUNCS[shard["kind"]], shard, shard.get("profile"), shard.get("profile_out"))
+
+
+# -----------------------
+# Planejamento / merge
+# -----------------------
+def _taps(exp_dir: Path) -> List[str]:
+    """Taps do experimento (metadata.json 'sensors'), com fallback para o layout de um sensor só."""
+    try:
+        meta = json.loads((exp_dir / "metadata.json").read_text(encoding="utf-8"))
+        ids = [str(s.get("id")) for s in (meta.get("sensors") or []) if s.get("id")]
+        if ids:
+            return ids
+    except Exception:
+        pass
+    return ["sensor"]
+
+
+def _inputs(exp_dir: Path) -> List[Tuple[str, str, str, Path]]:
+    """Arquivos de entrada do experimento: [(kind, tap, caminho relativo, caminho)], em ordem estável."""
+    out: List[Tuple[str, str, str, Path]] = []
+    for tap in _taps(exp_dir):
+        for f in find_zeek_logs(exp_dir / tap / "zeek", "conn"):
+            out.append(("conn", tap, f.relative_to(exp_dir).as_posix(), f))
+        pcap_dir = exp_dir / tap / "pcap"
+        for f in (sorted(pcap_dir.glob("*.pcap*")) if pcap_dir.exists() else []):
+            out.append(("pcap", tap, f.relative_to(exp_dir).as_posix(), f))
+    return out
+
+
+def _ref_ts(labeler: IntervalLabeler) -> Optional[float]:
+    """Início do experimento (primeiro estágio do timeline): referência do ano no syslog clássico."""
+    return min((w.t0 for w in labeler.windows), default=None)
+
+
+def plan_shards(exp_dir: Path, parts_dir: Optional[Path], dataset_dir: Optional[Path],
+                shard_mb: int = DEFAULT_SHARD_MB, pcap_flows_dir: Optional[Path] = None,
+                row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+                only: Optional[set] = None, labeler: Optional[IntervalLabeler] = None,
+                auth_sessions: Optional[pd.DataFrame] = None, chunk_rows: Optional[int] = None,
+                parser: str = "pandas") -> List[Dict[str, Any]]:
+    """
+    parts_dir: onde ficam os CSVs parciais (None => sem CSV); dataset_dir: raiz Parquet (None => sem).
+    chunk_rows: fatias de ~chunk_rows linhas (pelos bytes/linha do começo de cada arquivo) em vez
+    de shard_mb; parser: parser das fatias (zeek_reader.PARSERS).
+    only: caminhos relativos a (re)processar (None => todos). Os arquivos de saída de um shard
+    levam a chave da entrada (part-<chave>-<k>), para o ETL incremental achar e trocar só esses.
+    auth_sessions: sessões do sshd (auth_events.auth_sessions); None => lidas do experimento.
+    """
+    exp_dir = Path(exp_dir)
+    if labeler is None:
+        labeler = IntervalLabeler(load_attack_windows(exp_dir), *load_targets(exp_dir))
+    if auth_sessions is None:
+        auth_sessions = load_host_truth(exp_dir, ref_ts=_ref_ts(labeler)).sessions
+    common = {"exp_id": exp_dir.name, "run_ts": run_ts_of(exp_dir), "labeler": labeler, "row_group_rows": row_group_rows,
+              "auth_sessions": auth_sessions, "dataset": str(dataset_dir) if dataset_dir else None, "parser": parser,
+              "batch_rows": int(chunk_rows) if chunk_rows else DEFAULT_BATCH_ROWS}
+    shards: List[Dict[str, Any]] = []
+    pcaps_by_tap: Dict[str, List[Tuple[str, Path]]] = {}
+    for kind, tap, rel, f in _inputs(exp_dir):
+        if kind == "pcap":
+            pcaps_by_tap.setdefault(tap, []).append((rel, f))
+        if only is not None and rel not in only:
+            continue
+        key = input_key(rel)
+        if kind == "conn":
+            shard_bytes = int(shard_mb) * 1024 * 1024
+            row_bytes = estimate_row_bytes(f) if chunk_rows else 0.0
+            if row_bytes > 0:
+                shard_bytes = max(1 << 16, int(int(chunk_rows) * row_bytes))
+            for k, (start, end) in enumerate(split_zeek_file(f, shard_bytes)):
+                base = f"part-{key}-{k:03d}"
+                shards.append({"id": len(shards), "kind": "conn", "tap": tap, "rel": rel, "path": str(f),
+                               "start": start, "end": end, "basename": base,
+                               "csv": str(parts_dir / f"{base}.csv") if parts_dir else None, **common})
+        else:
+            shards.append({"id": len(shards), "kind": "pcap", "tap": tap, "rel": rel, "path": str(f)})
+    if pcap_flows_dir is not None:
+        for tap, pcaps in pcaps_by_tap.items():
+            out = pcap_flows_dir / f"{tap}.parquet"
+            # Fluxos atravessam segmentos: qualquer pcap novo/alterado refaz o tap inteiro
+            if only is None or not out.exists() or any(rel in only for rel, _ in pcaps):
+                shards.append({"id": len(shards), "kind": "pcap_flows", "tap": tap,
+                               "paths": [str(f) for _, f in pcaps], "out": str(out)})
+    # Shards longos primeiro: o pool não termina com um único worker ocupado no fim
+    return sorted(shards, key=lambda sh: sh["kind"] != "pcap_flows")
+
+
+def _resolve_workers(workers: Optional[int]) -> int:
+    if workers is None:
+        try:
+            workers = int(os.environ.get("ETL_WORKERS", "0"))
+        except ValueError:
+            workers = 0
+    return max(1, int(workers) if workers and int(workers) > 0 else (os.cpu_count() or 1))
+
+
+def _execute(shards: List[Dict[str, Any]], workers: int,
+             progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Roda os shards (pool de processos se workers > 1); em falha do pool, cai para serial.
+    progress(feitos, total, resultado) é chamado a cada shard concluído, na ordem dos shards.
+    """
+    def track(results):
+        out = []
+        for r in results:
+            out.append(r)
+            if progress is not None:
+                progress(len(out), len(shards), r)
+        return out
+
+    if workers > 1 and len(shards) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+                return track(pool.map(_run_shard, shards))
+        except Exception as e:
+            logger.warning(f"[ETL] pool de processos falhou ({e}) — seguindo em modo serial")
+    return track(_run_shard(s) for s in shards)
+
+
+def _merge_csv(parts: List[Path], columns: List[str], out_dir: Path) -> Path:
+    """Concatena os CSVs parciais na ordem das entradas (cópia de bytes; troca atômica no fim)."""
+    csv_path = out_dir / "csv" / "full.csv"
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = csv_path.with_suffix(".csv.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write((",".join(columns) + "\n").encode("utf-8"))
+        for part in parts:
+            with open(part, "rb") as src:
+                shutil.copyfileobj(src, fh, length=4 << 20)
+    os.replace(tmp, csv_path)
+    return csv_path
+
+
+def run_etl(exp_dir: Path, out_dir: Path, workers: Optional[int] = None,
+            shard_mb: int = DEFAULT_SHARD_MB, pcap_flows: bool = False, csv: bool = False,
+            row_group_rows: int = DEFAULT_ROW_GROUP_ROWS, full: bool = False,
+            victim_ip: Optional[str] = None, sample: Optional[SamplingSpec] = None,
+            arrow: bool = False, profiler: Optional[EtlProfiler] = None, chunk_rows: Optional[int] = None,
+            parser: str = "pandas", progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> Path:
+    """
+    ETL paralelo e incremental de um experimento coletado (exp_dir = data/<exp_id>).
+    workers: nº de processos (None => $ETL_WORKERS ou nº de CPUs; 1 => serial, sem pool).
+    pcap_flows: também reconstrói fluxos dos pcaps em <out>/pcap_flows/<tap>.parquet.
+    csv: também grava csv/full.csv (sempre gravado quando não há pyarrow).
+    full: ignora meta/etl_state.json e reprocessa tudo.
+    victim_ip: sobrepõe targets.victim_ip do metadata.json na checagem de IP dos rótulos.
+    sample: amostragem estratificada por (label, janela) com coluna sample_weight (ver sampling);
+            com ela, qualquer mudança de entrada reprocessa o experimento inteiro.
+    arrow: também publica o dataset em arrow/full.arrow (ver arrow_ipc); sem ele o arquivo é removido.
+    profiler: perfil por etapa (ver profiling) gravado em meta/etl_profile.json; o Runner passa o
+              seu para incluir o pré-ETL. Dumps de cProfile/pyinstrument com $ETL_PROFILE.
+    chunk_rows: fatias de ~chunk_rows linhas por shard (sobrepõe shard_mb); .gz continua um shard só,
+                lido em blocos de chunk_rows linhas (DEFAULT_BATCH_ROWS sem a opção).
+    parser: "pandas" ou "arrow" (pyarrow.csv) na leitura das fatias — mesma saída.
+    progress: callback (feitos, total, resultado do shard) — progresso de backfills longos (CLI).
+
+    Só arquivos novos/alterados (hash do conteúdo) são processados; mudança no código do ETL,
+    no timeline/attacker_ip ou nas opções reprocessa tudo. Tudo é gravado em _staging/ e as
+    partições afetadas só são trocadas (swap_partitions) depois que todos os shards terminaram:
+    uma falha no meio, mesmo num reprocessamento completo, deixa o dataset anterior intacto.
+    Retorna out_dir.
+    """
+    exp_dir, out_dir = Path(exp_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    meta_dir = out_dir / "meta"
+    if not _HAS_PYARROW and not csv:
+        logger.warning("[ETL] pyarrow ausente — gravando só csv/full.csv")
+        csv = True
+    parts_dir = out_dir / "_parts" if csv else None
+    dataset_dir = out_dir / "dataset" if _HAS_PYARROW else None
+    staging_dir = out_dir / "_staging" / "dataset"
+    flows_dir = out_dir / "pcap_flows" if pcap_flows else None
+
+    t0 = time.perf_counter()
+    prof = profiler or EtlProfiler(exp_dir.name)
+    st_plan = prof.begin("plan")
+    workers = _resolve_workers(workers)
+    inputs = _inputs(exp_dir)
+    if not any(kind == "conn" for kind, *_ in inputs):
+        raise FileNotFoundError(f"nenhum conn.log em {exp_dir}/<tap>/zeek")
+    run_ts = run_ts_of(exp_dir)
+    version = code_version()
+    attacker_ip, meta_victim = load_targets(exp_dir)
+    labeler = IntervalLabeler(load_attack_windows(exp_dir), attacker_ip,
+                              meta_victim if victim_ip is None else victim_ip)
+    truth = load_host_truth(exp_dir, ref_ts=_ref_ts(labeler))
+    context = context_digest({"exp_id": exp_dir.name, "run_ts": run_ts, "attacker_ip": labeler.attacker_ip,
+                              "victim_ip": labeler.victim_ip, "windows": labeler.windows, "csv": bool(csv),
+                              "host_truth": truth.digest, "sample": sample.as_dict() if sample else None,
+                              "dataset": dataset_dir is not None, "row_group_rows": row_group_rows})
+    state = EtlState.load(meta_dir)
+    current, changed, removed = state.diff((rel, f) for _, _, rel, f in inputs)
+    # Dataset compactado ou amostrado: arquivos misturam entradas, então qualquer mudança refaz tudo
+    rebuild = (full or not state.matches(version, context)
+               or ((state.compacted or sample is not None) and bool(changed or removed)))
+    if rebuild:
+        changed, removed = list(current), []
+        state = EtlState(version=version, context=context)
+        if parts_dir is not None:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    # Reprocessamento completo: todos os arquivos do run saem, mas só na publicação (swap_partitions)
+    stale = [""] if rebuild else [f"part-{input_key(rel)}-" for rel in changed + removed]
+    run_scope = partition_dir(Path(), exp_dir.name, run_ts)
+    if parts_dir is not None:
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        for f in parts_dir.glob("part-*.csv"):
+            if f.name.startswith(tuple(stale)):
+                f.unlink()
+    if flows_dir is not None:
+        flows_dir.mkdir(parents=True, exist_ok=True)
+
+    shutil.rmtree(staging_dir.parent, ignore_errors=True)
+    shards = plan_shards(exp_dir, parts_dir, staging_dir if dataset_dir is not None else None,
+                         shard_mb=shard_mb, pcap_flows_dir=flows_dir, row_group_rows=row_group_rows,
+                         only=set(changed), labeler=labeler, auth_sessions=truth.sessions,
+                         chunk_rows=chunk_rows, parser=parser)
+    sample_dir = staging_dir.parent / "sample"
+    if sample is not None:
+        sample_dir.mkdir(parents=True, exist_ok=True)
+        for sh in shards:
+            if sh["kind"] == "conn":
+                sh.update(sample=sample, sample_out=str(sample_dir / f"{sh['basename']}.pkl"), csv=None)
+    if prof.dump:
+        shutil.rmtree(meta_dir / "profile", ignore_errors=True)
+    for sh in shards:
+        out = prof.dump_path(meta_dir, f"shard-{sh['id']}")
+        if out is not None:
+            sh.update(profile=prof.dump, profile_out=str(out))
+    n_conn = sum(1 for sh in shards if sh["kind"] == "conn")
+    n_pcap = sum(1 for sh in shards if sh["kind"] == "pcap")
+    logger.info(f"[ETL] {exp_dir.name}: {len(changed)} entrada(s) nova(s)/alterada(s), {len(removed)} removida(s), "
+                f"{len(current) - len(changed)} sem mudança{' (reprocessamento completo)' if rebuild else ''} — "
+                f"{n_conn} shard(s) conn, {n_pcap} segmento(s) pcap, pcap_flows={bool(pcap_flows)}, workers={workers}")
+
+    prof.end(st_plan)
+    t_map = time.perf_counter()
+    # Shards rodam nos workers: bytes/linhas vêm do que cada shard relata
+    with prof.stage("map") as st:
+        results = _execute(shards, workers, progress) if shards else []
+        st.rows_in = sum(int(r.get("rows_in", r.get("rows", 0))) for r in results)
+        st.rows_out = sum(int(r.get("rows", 0)) for r in results)
+        st.bytes_read = sum(int(r.get("bytes_in", 0)) for r in results)
+        st.bytes_written = sum(int(r.get("bytes_out", 0)) for r in results)
+    t_merge = time.perf_counter()
+
+    sample_report = None
+    if sample is not None and any("sample_counts" in r for r in results):
+        st = prof.begin("sample")
+        sampled, sample_report = finalize(pd.concat([pd.read_pickle(p) for p in sorted(sample_dir.glob("*.pkl"))],
+                                                    ignore_index=True),
+                                          merge_counts([r["sample_counts"] for r in results if "sample_counts" in r]),
+                                          sample)
+        if dataset_dir is not None:
+            write_partitioned(sampled, staging_dir, "sample", row_group_rows=row_group_rows)
+        if parts_dir is not None:
+            _write_csv_part(sampled, parts_dir / "sample.csv")
+            _merge_csv([parts_dir / "sample.csv"], list(sampled.columns), out_dir)
+        logger.info(f"[ETL] amostragem: {sample_report['rows_in']} -> {sample_report['rows_out']} fluxo(s)")
+        st.rows_in, st.rows_out = sample_report["rows_in"], sample_report["rows_out"]
+        prof.end(st)
+
+    # Publica: partições afetadas trocadas de uma vez, depois o _metadata e o CSV
+    if dataset_dir is not None and (changed or removed or not (dataset_dir / "_metadata").exists()):
+        with prof.stage("publish"):
+            swapped = swap_partitions(dataset_dir, staging_dir, stale, scope=run_scope)
+            write_metadata_summary(dataset_dir)
+        logger.info(f"[ETL] {swapped} partição(ões) reescrita(s) em {dataset_dir}")
+    shutil.rmtree(staging_dir.parent, ignore_errors=True)
+
+    per_input: Dict[str, Dict[str, Any]] = {}
+    for sh, r in zip(shards, results):
+        if sh["kind"] == "conn":
+            acc = per_input.setdefault(sh["rel"], {"kind": "conn", "rows": 0, "label_counts": {}, "auth_counts": {},
+                                                   "columns": r["columns"], "csv_parts": []})
+            acc["rows"] += r["rows"]
+            for key in ("label_counts", "auth_counts"):
+                for k, v in r[key].items():
+                    acc[key][k] = acc[key].get(k, 0) + int(v)
+            if sh.get("csv"):
+                acc["csv_parts"].append(Path(sh["csv"]).name)
+        elif sh["kind"] == "pcap":
+            per_input[sh["rel"]] = {"kind": "pcap", "segment": r["segment"]}
+    for rel in removed:
+        state.inputs.pop(rel, None)
+    for rel in changed:
+        state.inputs[rel] = {**current[rel], "result": per_input.get(rel) or {}}
+    for rel, fp in current.items():
+        state.inputs.setdefault(rel, {}).update(fp)
+
+    ordered = [state.result(rel) or {} for _, _, rel, _ in inputs]
+    conn_results = [r for r in ordered if r.get("kind") == "conn"]
+    if parts_dir is not None and sample is None and (changed or removed or not (out_dir / "csv" / "full.csv").exists()):
+        columns = next((r["columns"] for r in conn_results if r.get("columns")), [])
+        with prof.stage("csv"):
+            _merge_csv([parts_dir / p for r in conn_results for p in r.get("csv_parts", [])], columns, out_dir)
+    arrow_path = out_dir / ARROW_FILE
+    if arrow and dataset_dir is not None:
+        if changed or removed or not arrow_is_current(dataset_dir, arrow_path):
+            with prof.stage("arrow"):
+                publish_arrow(dataset_dir, arrow_path)
+    elif arrow_path.exists():
+        shutil.rmtree(arrow_path.parent, ignore_errors=True)
+    rows = sum(int(r.get("rows", 0)) for r in conn_results)
+    label_counts: Dict[str, int] = {}
+    auth_counts: Dict[str, int] = {}
+    for r in conn_results:
+        for k, v in (r.get("label_counts") or {}).items():
+            label_counts[k] = label_counts.get(k, 0) + int(v)
+        for k, v in (r.get("auth_counts") or {}).items():
+            auth_counts[k] = auth_counts.get(k, 0) + int(v)
+
+    meta_dir.mkdir(parents=True, exist_ok=True)
+    (meta_dir / "label_counts.json").write_text(json.dumps(label_counts, indent=2), encoding="utf-8")
+    (meta_dir / "auth_summary.json").write_text(json.dumps({**truth.summary(), "flows": auth_counts}, indent=2),
+                                                encoding="utf-8")
+    if sample_report is not None:
+        (meta_dir / "sampling.json").write_text(json.dumps(sample_report, indent=2), encoding="utf-8")
+    elif sample is None:
+        (meta_dir / "sampling.json").unlink(missing_ok=True)
+    (meta_dir / "pcap_segments.json").write_text(
+        json.dumps([r["segment"] for r in ordered if r.get("kind") == "pcap"], indent=2), encoding="utf-8")
+    state.version, state.context = version, context
+    state.save(meta_dir)
+    dt = time.perf_counter() - t0
+    run_info = {"exp_id": exp_dir.name, "run_ts": run_ts, "rows": rows, "workers": workers,
+                "sampled_rows": sample_report["rows_out"] if sample_report else None,
+                "shards": len(shards), "dataset": str(dataset_dir) if dataset_dir else None,
+                "incremental": {"rebuild": rebuild, "changed": len(changed), "removed": len(removed),
+                                "unchanged": len(current) - len(changed)},
+                "bytes": {"dataset": _du(dataset_dir), "csv": _du(out_dir / "csv") if csv else None,
+                          "arrow": _du(arrow_path) if arrow else None},
+                "seconds": {"plan": round(t_map - t0, 3), "map": round(t_merge - t_map, 3),
+                            "merge": round(time.perf_counter() - t_merge, 3), "total": round(dt, 3)},
+                "rows_per_s": round(rows / dt, 1) if dt > 0 else None,
+                "pcap_flows": {sh["tap"]: r["pcap_flows"] for sh, r in zip(shards, results) if "pcap_flows" in r},
+                "shard_stats": [{k: r[k] for k in ("shard", "rows", "seconds")} for r in results]}
+    (meta_dir / "etl_run.json").write_text(json.dumps(run_info, indent=2), encoding="utf-8")
+    prof.write(meta_dir, extra={"exp_id": exp_dir.name, "run_ts": run_ts, "rows": rows, "workers": workers,
+                                "rebuild": rebuild, "changed": len(changed)})
+    logger.info(f"[ETL] {exp_dir.name}: {rows} fluxos em {dt:.2f}s (workers={workers}) labels={label_counts}")
+    return out_dir
+
+
+def _du(path: Optional[Path]) -> Optional[int]:
+    if path is None or not Path(path).exists():
+        return None
+    if Path(path).is_file():
+        return Path(path).stat().st_size
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
@@ -0,0 +1,131 @@
+# lab/datasets/etl_state.py
+"""
+Estado do ETL incremental (<out>/meta/etl_state.json): o que já foi processado e com qual código.
+
+  {"version": "...", "context": "...", "inputs": {"<caminho relativo>": {size, mtime_ns, hash, ...}}}
+
+- version: ETL_VERSION + digest do código dos módulos do ETL (mudou o código => reprocessa tudo);
+- context: digest de tudo que afeta todas as linhas (rótulos do timeline, attacker_ip, run_ts, opções);
+- inputs: uma entrada por arquivo de entrada (conn.log/rotação, pcap), com o hash do conteúdo e o
+  resultado do último processamento (contagens, arquivos gerados).
+
+O hash só é recalculado quando tamanho ou mtime mudam — rodar de novo sem mudanças custa um stat por arquivo.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.logger_setup import setup_logger
+
+logger = setup_logger(Path('.logs'), name="[ETLState]")
+
+# Suba quando o formato de saída mudar de um jeito que o digest do código não capture
+ETL_VERSION = "2"
+STATE_FILE = "etl_state.json"
+# Módulos cujo código entra na versão do estado
+_CODE_MODULES = ("etl_netsec.py", "zeek_reader.py", "parquet_dataset.py", "pcap_flows.py", "labeling.py",
+                 "auth_events.py", "sampling.py", "arrow_ipc.py", "etl_state.py")
+_HASH_BLOCK = 4 << 20
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def code_version() -> str:
+    h = hashlib.blake2b(ETL_VERSION.encode(), digest_size=8)
+    here = Path(__file__).resolve().parent
+    for name in _CODE_MODULES:
+        try:
+            h.update((here / name).read_bytes())
+        except OSError:
+            h.update(name.encode())
+    return f"{ETL_VERSION}-{h.hexdigest()}"
+
+
+def context_digest(obj: Any) -> str:
+    return _digest(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"))
+
+
+def input_key(rel_path: str) -> str:
+    """Identificador curto e estável de um arquivo de entrada (prefixo dos arquivos de saída dele)."""
+    return _digest(rel_path.encode("utf-8"))[:10]
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        while True:
+            block = fh.read(_HASH_BLOCK)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass
+class EtlState:
+    version: str = ""
+    context: str = ""
+    inputs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Dataset compactado (compact.py): arquivos misturam entradas, então qualquer mudança reprocessa tudo
+    compacted: bool = False
+
+    @classmethod
+    def load(cls, meta_dir: Path) -> "EtlState":
+        path = Path(meta_dir) / STATE_FILE
+        if not path.exists():
+            return cls()
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            return cls(version=str(raw.get("version") or ""), context=str(raw.get("context") or ""),
+                       inputs=dict(raw.get("inputs") or {}), compacted=bool(raw.get("compacted", False)))
+        except Exception as e:
+            logger.warning(f"[ETLState] {path} ilegível ({e}) — reprocessando tudo")
+            return cls()
+
+    def save(self, meta_dir: Path) -> Path:
+        """Grava via arquivo temporário + os.replace (nunca deixa um estado pela metade)."""
+        meta_dir = Path(meta_dir)
+        meta_dir.mkdir(parents=True, exist_ok=True)
+        path = meta_dir / STATE_FILE
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    def fingerprint(self, path: Path, rel: str) -> Dict[str, Any]:
+        """size/mtime/hash atuais de `path`; reaproveita o hash salvo se size e mtime não mudaram."""
+        st = path.stat()
+        prev = self.inputs.get(rel) or {}
+        if prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns and prev.get("hash"):
+            digest = prev["hash"]
+        else:
+            digest = file_hash(path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+
+    def diff(self, files: Iterable[Tuple[str, Path]]) -> Tuple[Dict[str, Dict[str, Any]], List[str], List[str]]:
+        """
+        Compara os arquivos atuais [(rel, path)] com o estado.
+        Retorna (fingerprints atuais, rels novos/alterados, rels que sumiram).
+        """
+        current: Dict[str, Dict[str, Any]] = {}
+        changed: List[str] = []
+        for rel, path in files:
+            fp = self.fingerprint(path, rel)
+            current[rel] = fp
+            if (self.inputs.get(rel) or {}).get("hash") != fp["hash"]:
+                changed.append(rel)
+        removed = [rel for rel in self.inputs if rel not in current]
+        return current, changed, removed
+
+    def matches(self, version: str, context: str) -> bool:
+        return self.version == version and self.context == context
+
+    def result(self, rel: str) -> Optional[Dict[str, Any]]:
+        return (self.inputs.get(rel) or {}).get("result")
@@ -0,0 +1,568 @@
+# lab/datasets/features.py
+"""
+Registro declarativo das features por janela (features_conn_window) e cálculo com cache.
+
+Cada feature é um FeatureDef: nome, entradas (colunas do conn.log ou, nas derivadas, outras
+features), agregação na janela, janela própria (opcional) e versão. Quatro tipos:
+
+  sum/max/min  valor por fluxo (fn(FlowBatch)) agregado por (janela, src, dst, dport) — associativo,
+               então cada conn.log/rotação é agregado em separado e os parciais se combinam;
+  distinct     nº de valores distintos de fn(FlowBatch) por (janela, *by), p.ex. portas por origem
+               (varredura): estado de HyperLogLog (sketches.py), combinável do mesmo jeito, com
+               memória limitada por grupo; o valor estimado se repete em cada linha do grupo;
+  derived      calculada no fim sobre o agregado (fn(agg, FeatureContext)), barata, sem cache.
+
+Cache (<exp>/.feature_cache/): um Parquet por (arquivo de entrada, janela), com as chaves e uma
+coluna "<nome>@<tag>" por feature; tag = digest(nome, versão, entradas, agregação[, rótulos]).
+Cada distinct tem o seu Parquet de estado (<...>-w<janela>-<nome>@<tag>.parquet; o tag inclui
+a precisão do sketch).
+O nome do arquivo leva o hash do conteúdo da entrada, então:
+
+  - entrada alterada            => só ela é relida (todas as features dela);
+  - feature nova/versão nova    => cada entrada é relida só com as colunas dessa feature;
+  - timeline/attacker_ip mudou  => só as features com labels=True são refeitas.
+
+Várias resoluções (compute_multi_window_features): os arquivos são agregados uma vez na janela
+base (mdc dos tamanhos/hops) e as janelas maiores e as sobrepostas (hopping, "300/60") saem da
+combinação desses parciais — mesmo resultado de agregar cada janela direto do conn.log.
+
+Para criar uma feature: register(FeatureDef(...)) e, ao mudar a lógica, suba `version`.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.etl_state import EtlState, context_digest, input_key
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.pre_etl import CONN_COLUMNS, FAILED_STATES, KEY_COLUMNS, find_conn_logs
+from lab.datasets.sketches import SketchConfig, estimate, merge_states, sketch_state
+from lab.datasets.zeek_reader import NAT_NS, ip_to_str, iter_zeek_log
+
+logger = setup_logger(Path('.logs'), name="[Features]")
+
+try:
+    import pyarrow  # noqa: F401  (cache em Parquet)
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+AGGS = ("sum", "max", "min", "distinct", "derived")
+# Agregações que viram uma coluna por chave da janela (as demais: distinct => estado do sketch)
+_COLUMN_AGGS = ("sum", "max", "min")
+# Colunas do conn.log que toda agregação lê (chave da janela)
+_KEY_INPUTS = ("ts", "id.orig_h", "id.resp_h", "id.resp_p")
+
+
+class FlowBatch:
+    """Bloco de fluxos de um conn.log (ts já válido) visto pelas features base."""
+
+    def __init__(self, df: pd.DataFrame, ts_ns: np.ndarray, labeler: IntervalLabeler):
+        self.df = df
+        self.ts = ts_ns / 1e9
+        self._labeler = labeler
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def num(self, col: str) -> np.ndarray:
+        return pd.to_numeric(self.df[col], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+    def text(self, col: str) -> np.ndarray:
+        return self.df[col].astype(str).to_numpy()
+
+    def ip(self, col: str) -> np.ndarray:
+        """Endereço como texto (mesma forma para uint32/bytes16/str; converte só os valores únicos)."""
+        codes, uniques = pd.factorize(np.asarray(self.df[col]))
+        return ip_to_str(uniques)[codes]
+
+    @cached_property
+    def rank(self) -> np.ndarray:
+        """Rank do rótulo de cada fluxo (0 = benigno; ver IntervalLabeler.ranked)."""
+        lab = self._labeler
+        return lab.rank_of_code[lab.codes_for(self.ts, self.df["id.orig_h"], self.df["id.resp_h"])]
+
+
+@dataclass(frozen=True)
+class FeatureContext:
+    window_s: int
+    labeler: IntervalLabeler
+    # Passo entre inícios de janela (== window_s nas tumbling)
+    hop_s: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class FeatureDef:
+    name: str
+    inputs: Tuple[str, ...]
+    agg: str
+    fn: Callable[..., Any]
+    version: int = 1
+    # Janela própria em segundos (None => a do cálculo); o valor vai para a janela de saída que começa nela
+    window_s: Optional[int] = None
+    dtype: str = "float64"
+    # Depende do timeline/attacker_ip (entra no tag do cache)
+    labels: bool = False
+    # False => só serve de entrada para outras features (não sai no resultado)
+    output: bool = True
+    description: str = ""
+    # distinct: grupo da contagem (subconjunto de src_ip/dst_ip/dst_port), por janela
+    by: Tuple[str, ...] = ()
+
+    def tag(self, labels_digest: str = "", sketch: str = "") -> str:
+        key = {"name": self.name, "version": self.version, "inputs": list(self.inputs),
+               "agg": self.agg, "labels": labels_digest if self.labels else ""}
+        if self.agg == "distinct":
+            key.update(by=list(self.by), sketch=sketch)
+        return context_digest(key)[:10]
+
+
+REGISTRY: Dict[str, FeatureDef] = {}
+
+
+def register(feature: FeatureDef) -> FeatureDef:
+    if feature.agg not in AGGS:
+        raise ValueError(f"agregação inválida em {feature.name}: {feature.agg} (use {AGGS})")
+    if feature.name in REGISTRY or feature.name in KEY_COLUMNS:
+        raise ValueError(f"feature já registrada: {feature.name}")
+    if feature.agg == "distinct" and (not feature.by or not set(feature.by) <= set(KEY_COLUMNS[1:])):
+        raise ValueError(f"{feature.name}: distinct precisa de by ⊆ {KEY_COLUMNS[1:]}")
+    missing = [c for c in feature.inputs if feature.agg == "derived" and c not in REGISTRY]
+    if missing:
+        raise ValueError(f"{feature.name}: entradas derivadas não registradas: {missing}")
+    REGISTRY[feature.name] = feature
+    return feature
+
+
+def resolve(names: Optional[Iterable[str]] = None) -> List[FeatureDef]:
+    """Features pedidas + dependências (conn_count sempre), na ordem de registro."""
+    wanted = set(REGISTRY) if names is None else set(names) | {"conn_count"}
+    unknown = wanted - set(REGISTRY)
+    if unknown:
+        raise KeyError(f"features desconhecidas: {sorted(unknown)}")
+    stack = list(wanted)
+    while stack:
+        f = REGISTRY[stack.pop()]
+        for dep in f.inputs if f.agg == "derived" else ():
+            if dep not in wanted:
+                wanted.add(dep)
+                stack.append(dep)
+    return [f for name, f in REGISTRY.items() if name in wanted]
+
+
+# -----------------------
+# Features padrão (as colunas históricas do pré-ETL)
+# -----------------------
+def _per_conn(*terms: str) -> Callable[[pd.DataFrame, FeatureContext], np.ndarray]:
+    def fn(agg: pd.DataFrame, ctx: FeatureContext) -> np.ndarray:
+        return sum(agg[t].to_numpy(dtype=np.float64) for t in terms) / agg["conn_count"].to_numpy(dtype=np.float64)
+    return fn
+
+
+register(FeatureDef("conn_count", (), "sum", lambda b: np.ones(len(b), dtype=np.int64), dtype="int64"))
+for _col in ("orig_bytes", "resp_bytes", "orig_pkts", "resp_pkts"):
+    register(FeatureDef(_col, (_col,), "sum", lambda b, c=_col: b.num(c)))
+register(FeatureDef("duration_sum", ("duration",), "sum", lambda b: b.num("duration")))
+register(FeatureDef("failed_count", ("conn_state",), "sum", dtype="int64",
+                    fn=lambda b: np.isin(b.text("conn_state"), FAILED_STATES).astype(np.int64)))
+register(FeatureDef("tcp_count", ("proto",), "sum", lambda b: (b.text("proto") == "tcp").astype(np.int64), dtype="int64"))
+register(FeatureDef("udp_count", ("proto",), "sum", lambda b: (b.text("proto") == "udp").astype(np.int64), dtype="int64"))
+register(FeatureDef("attack_flows", (), "sum", lambda b: (b.rank > 0).astype(np.int64), dtype="int64", labels=True))
+register(FeatureDef("duration_max", ("duration",), "max", lambda b: b.num("duration")))
+# Maior prioridade de rótulo entre os fluxos da janela (vira `label`)
+register(FeatureDef("label_rank", (), "max", lambda b: b.rank.astype(np.int64), dtype="int64", labels=True,
+                    output=False))
+register(FeatureDef("first_ts", (), "min", lambda b: b.ts))
+register(FeatureDef("last_ts", (), "max", lambda b: b.ts))
+# Varredura/flood: distintos por origem (ou destino) na janela, por HyperLogLog (ver sketches)
+register(FeatureDef("distinct_dst_ports", ("id.resp_p",), "distinct", lambda b: np.asarray(b.df["id.resp_p"]),
+                    dtype="int64", by=("src_ip",)))
+register(FeatureDef("distinct_dst_hosts", ("id.resp_h",), "distinct", lambda b: b.ip("id.resp_h"),
+                    dtype="int64", by=("src_ip",)))
+register(FeatureDef("distinct_src_hosts", ("id.orig_h",), "distinct", lambda b: b.ip("id.orig_h"),
+                    dtype="int64", by=("dst_ip",)))
+register(FeatureDef("window_s", ("conn_count",), "derived", dtype="int32",
+                    fn=lambda agg, ctx: np.full(len(agg), ctx.window_s, dtype=np.int32)))
+register(FeatureDef("conn_rate", ("conn_count",), "derived",
+                    lambda agg, ctx: agg["conn_count"].to_numpy(dtype=np.float64) / float(ctx.window_s)))
+register(FeatureDef("bytes_per_conn", ("orig_bytes", "resp_bytes", "conn_count"), "derived",
+                    _per_conn("orig_bytes", "resp_bytes")))
+register(FeatureDef("pkts_per_conn", ("orig_pkts", "resp_pkts", "conn_count"), "derived",
+                    _per_conn("orig_pkts", "resp_pkts")))
+register(FeatureDef("duration_mean", ("duration_sum", "conn_count"), "derived", _per_conn("duration_sum")))
+register(FeatureDef("failed_ratio", ("failed_count", "conn_count"), "derived", _per_conn("failed_count")))
+register(FeatureDef("label", ("label_rank",), "derived", dtype="str",
+                    fn=lambda agg, ctx: ctx.labeler.ranked[agg["label_rank"].to_numpy(dtype=np.int64)]))
+
+
+# -----------------------
+# Agregação por arquivo
+# -----------------------
+class _KeyEncoder:
+    """Dicionário incremental valor -> inteiro, estável entre blocos (sem loop Python por linha)."""
+
+    def __init__(self):
+        self.values = pd.Index([], dtype=object)
+
+    def encode(self, values) -> np.ndarray:
+        s = pd.Series(values).astype(object)
+        codes = self.values.get_indexer(s)
+        missing = codes < 0
+        if missing.any():
+            self.values = self.values.append(pd.Index(pd.unique(s[missing]), dtype=object))
+            codes = self.values.get_indexer(s)
+        return codes.astype(np.int32)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return ip_to_str(self.values.to_numpy()[codes])
+
+
+def _combine(parts: pd.DataFrame, feats: Sequence[FeatureDef]) -> pd.DataFrame:
+    """Combina agregados parciais (soma/máx/mín são associativos => ordem dos blocos não importa)."""
+    return parts.groupby(KEY_COLUMNS, sort=False, observed=True).agg({f.name: f.agg for f in feats}).reset_index()
+
+
+def _empty(feats: Sequence[FeatureDef]) -> pd.DataFrame:
+    cols = {"window_start": np.int64, "src_ip": object, "dst_ip": object, "dst_port": np.int32}
+    cols.update({f.name: f.dtype for f in feats})
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in cols.items()})
+
+
+def _state_keys(f: FeatureDef) -> List[str]:
+    return ["window_start"] + list(f.by)
+
+
+def _aggregate_file(path: Path, feats: Sequence[FeatureDef], window_s: int, labeler: IntervalLabeler,
+                    chunk_rows: int, sketch_feats: Sequence[FeatureDef] = (),
+                    sketch: Optional[SketchConfig] = None) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Agregado de um conn.log só com as features dadas (lê só as colunas que elas usam) e o estado
+    do sketch de cada feature distinct ({nome: DataFrame}).
+    """
+    sketch = sketch or SketchConfig()
+    need = set(_KEY_INPUTS) | {c for f in list(feats) + list(sketch_feats) for c in f.inputs}
+    columns = [c for c in CONN_COLUMNS if c in need]
+    enc = _KeyEncoder()
+    win_ns = np.int64(window_s) * 1_000_000_000
+    partials: List[pd.DataFrame] = []
+    states: Dict[str, List[pd.DataFrame]] = {f.name: [] for f in sketch_feats}
+    for chunk in iter_zeek_log([path], columns=columns, batch_rows=chunk_rows):
+        if chunk.empty:
+            continue
+        ts_ns = np.asarray(chunk["ts"], dtype=np.int64)
+        ok = ts_ns != NAT_NS
+        if not ok.all():
+            chunk, ts_ns = chunk[ok], ts_ns[ok]
+        batch = FlowBatch(chunk, ts_ns, labeler)
+        frame = {
+            "window_start": (ts_ns // win_ns) * window_s,
+            "src_ip": enc.encode(chunk["id.orig_h"]),
+            "dst_ip": enc.encode(chunk["id.resp_h"]),
+            "dst_port": np.asarray(chunk["id.resp_p"], dtype=np.int32),
+        }
+        for f in sketch_feats:
+            keys = pd.DataFrame({c: frame[c] for c in _state_keys(f)})
+            states[f.name].append(sketch_state(keys, f.fn(batch), sketch))
+            if len(states[f.name]) >= 8:
+                states[f.name] = [merge_states(states[f.name], _state_keys(f), sketch)]
+        if feats:
+            for f in feats:
+                frame[f.name] = f.fn(batch)
+            partials.append(_combine(pd.DataFrame(frame), feats))
+        # Mantém a lista curta: agregados parciais são pequenos, combinar cedo limita memória
+        if len(partials) >= 8:
+            partials = [_combine(pd.concat(partials, ignore_index=True), feats)]
+    out: Dict[str, pd.DataFrame] = {}
+    for f in sketch_feats:
+        keys = _state_keys(f)
+        st = merge_states(states[f.name], keys, sketch) if states[f.name] else pd.DataFrame(
+            {c: pd.Series(dtype=np.int64) for c in keys + sketch.columns})
+        for c in ("src_ip", "dst_ip"):
+            if c in st.columns:
+                st[c] = enc.decode(st[c].to_numpy()) if len(st) else st[c].astype(object)
+        out[f.name] = st
+    if not partials:
+        return _empty(feats), out
+    agg = _combine(pd.concat(partials, ignore_index=True), feats)
+    agg["src_ip"] = enc.decode(agg["src_ip"].to_numpy())
+    agg["dst_ip"] = enc.decode(agg["dst_ip"].to_numpy())
+    return agg, out
+
+
+class _FileCache:
+    """
+    Parquet de agregados de um arquivo de entrada numa janela: <chave>-<hash>-w<janela>.parquet;
+    estado de sketch de uma feature distinct: <chave>-<hash>-w<janela>-<nome>@<tag>.parquet.
+    """
+
+    def __init__(self, cache_dir: Path, rel: str, file_hash: str, window_s: int, feature: Optional[str] = None,
+                 tag: str = ""):
+        self.prefix = f"{input_key(rel)}-"
+        self.suffix = f"-w{window_s}.parquet" if feature is None else f"-w{window_s}-{feature}@{tag}.parquet"
+        # Limpeza: outros hashes da entrada e, no sketch, outros tags da mesma feature
+        self.stale = f"{self.prefix}*{self.suffix}" if feature is None else f"{self.prefix}*-w{window_s}-{feature}@*.parquet"
+        self.path = cache_dir / f"{self.prefix}{file_hash[:16]}{self.suffix}"
+
+    def load(self) -> Optional[pd.DataFrame]:
+        if not self.path.exists():
+            return None
+        try:
+            return pd.read_parquet(self.path)
+        except Exception as e:
+            logger.warning(f"[Features] cache ilegível {self.path.name} ({e}) — recalculando")
+            return None
+
+    def save(self, df: pd.DataFrame) -> None:
+        tmp = self.path.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False, compression="zstd")
+        os.replace(tmp, self.path)
+        # Versões antigas da mesma entrada (hash anterior) saem
+        for old in self.path.parent.glob(self.stale):
+            if old != self.path:
+                old.unlink(missing_ok=True)
+
+
+def _file_features(path: Path, rel: str, file_hash: Optional[str], feats: Sequence[FeatureDef], window_s: int,
+                   labeler: IntervalLabeler, labels_digest: str, chunk_rows: int, cache_dir: Optional[Path],
+                   stats: Dict[str, int], sketch_feats: Sequence[FeatureDef] = (),
+                   sketch: Optional[SketchConfig] = None) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Agregado do arquivo (e estados dos sketches) com as features pedidas, reaproveitando o cache."""
+    sketch = sketch or SketchConfig()
+    tags = {f.name: f"{f.name}@{f.tag(labels_digest)}" for f in feats}
+    use_cache = cache_dir is not None and bool(file_hash)
+    cache = _FileCache(cache_dir, rel, file_hash, window_s) if use_cache else None
+    cached = cache.load() if cache is not None else None
+    todo = [f for f in feats if cached is None or tags[f.name] not in cached.columns]
+    sk_cache = {f.name: _FileCache(cache_dir, rel, file_hash, window_s, f.name, f.tag(labels_digest, sketch.tag))
+                for f in sketch_feats} if use_cache else {}
+    states = {name: c.load() for name, c in sk_cache.items()}
+    sk_todo = [f for f in sketch_feats if states.get(f.name) is None]
+    stats["cached"] += len(feats) - len(todo) + len(sketch_feats) - len(sk_todo)
+    if todo or sk_todo:
+        stats["computed"] += len(todo) + len(sk_todo)
+        fresh, fresh_states = _aggregate_file(path, todo, window_s, labeler, chunk_rows, sk_todo, sketch)
+        for f in sk_todo:
+            states[f.name] = fresh_states[f.name]
+            if f.name in sk_cache:
+                sk_cache[f.name].save(fresh_states[f.name])
+        if todo:
+            fresh = fresh.rename(columns=tags)
+            if cached is None:
+                cached = fresh
+            else:
+                # Tag antigo de uma feature recalculada (versão/rótulos mudaram) sai do cache
+                stale = [c for c in cached.columns
+                         if c not in KEY_COLUMNS and c.split("@")[0] in {f.name for f in todo}]
+                cached = cached.drop(columns=stale).merge(fresh, on=KEY_COLUMNS, how="outer")
+            if cache is not None:
+                cache.save(cached)
+    out = cached[KEY_COLUMNS + [tags[f.name] for f in feats]].rename(columns={v: k for k, v in tags.items()})
+    return out, states
+
+
+@dataclass(frozen=True)
+class WindowSpec:
+    """Janela de saída: size_s segundos, começando a cada hop_s (None => tumbling, hop = size)."""
+    size_s: int
+    hop_s: Optional[int] = None
+
+    def __post_init__(self):
+        if int(self.size_s) < 1 or not 1 <= self.hop <= int(self.size_s):
+            raise ValueError(f"janela inválida: size={self.size_s} hop={self.hop_s} (use 1 <= hop <= size)")
+
+    @property
+    def hop(self) -> int:
+        return int(self.hop_s or self.size_s)
+
+    @property
+    def tumbling(self) -> bool:
+        return self.hop == int(self.size_s)
+
+    @property
+    def name(self) -> str:
+        return f"w{self.size_s}" if self.tumbling else f"w{self.size_s}h{self.hop}"
+
+    @classmethod
+    def parse(cls, value: Any) -> "WindowSpec":
+        """60 | "300/60" (tamanho/hop) | {"size": 300, "hop": 60} | WindowSpec."""
+        if isinstance(value, WindowSpec):
+            return value
+        if isinstance(value, dict):
+            return cls(int(value["size"]), int(value["hop"]) if value.get("hop") else None)
+        size, _, hop = str(value).replace(":", "/").partition("/")
+        return cls(int(size), int(hop) if hop else None)
+
+
+def _rollup(frame: pd.DataFrame, combine: Callable[[pd.DataFrame], pd.DataFrame], size: int) -> pd.DataFrame:
+    """Janelas tumbling de `size` s a partir de janelas menores (size múltiplo da janela de `frame`)."""
+    return combine(frame.assign(window_start=(frame["window_start"].to_numpy() // size) * size))
+
+
+def _slide(frame: pd.DataFrame, combine: Callable[[pd.DataFrame], pd.DataFrame], size: int, hop: int) -> pd.DataFrame:
+    """
+    Janelas de `size` s a cada `hop` s a partir de janelas tumbling de mdc(size, hop) s: cada janela
+    de entrada entra nas janelas de saída (início múltiplo de hop) que a contêm inteira.
+    `combine` junta as linhas da mesma chave (agregados: _combine; sketches: merge_states).
+    """
+    ws = frame["window_start"].to_numpy()
+    base = (ws // hop) * hop
+    parts: List[pd.DataFrame] = []
+    acc: Optional[pd.DataFrame] = None
+    for j in range(-(-size // hop)):
+        start = base - j * hop
+        keep = start + size > ws
+        if keep.any():
+            parts.append(frame[keep].assign(window_start=start[keep]))
+        if len(parts) >= 8:
+            acc = combine(pd.concat(([acc] if acc is not None else []) + parts, ignore_index=True))
+            parts = []
+    if parts:
+        acc = combine(pd.concat(([acc] if acc is not None else []) + parts, ignore_index=True))
+    return acc if acc is not None else frame.iloc[:0]
+
+
+def compute_multi_window_features(exp_dir: Path, windows: Sequence[Any] = (60,),
+                                  features: Optional[Iterable[str]] = None, tap: str = "sensor",
+                                  chunk_rows: int = 1_000_000, cache_dir: Optional[Path] = None,
+                                  sketch: Optional[SketchConfig] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Agregados em várias resoluções numa passada só: {WindowSpec.name: DataFrame}, na ordem pedida.
+
+    Os conn.log são agregados (e cacheados) uma vez, na janela base = mdc de todos os tamanhos,
+    hops e janelas próprias das features. Tumbling maiores saem da menor resolução já calculada
+    que as divide (60 -> 300 -> 3600); hopping (tamanho/hop) somam as janelas tumbling de
+mdc(tamanho, hop) s contidas em cada janela.
+    Só sum/max/min e os estados dos sketches (distinct) são combináveis assim; as derivadas são
+    recalculadas em cada resolução. sketch: precisão das features distinct (padrão HLL com 1%).
+    """
+    exp_dir = Path(exp_dir)
+    specs = [WindowSpec.parse(w) for w in windows]
+    if not specs:
+        raise ValueError("nenhuma janela pedida")
+    files = find_conn_logs(exp_dir, tap=tap)
+    if not files:
+        raise FileNotFoundError(f"conn.log não encontrado em {exp_dir / tap / 'zeek'}")
+    if cache_dir is not None and not _HAS_PYARROW:
+        logger.warning("[Features] pyarrow ausente — cache de features desligado")
+        cache_dir = None
+    t0 = time.perf_counter()
+    sketch = sketch or SketchConfig()
+    feats = resolve(features)
+    base_feats = [f for f in feats if f.agg in _COLUMN_AGGS]
+    sketch_feats = [f for f in feats if f.agg == "distinct"]
+    labeler = IntervalLabeler(load_attack_windows(exp_dir), *load_targets(exp_dir))
+    labels_digest = context_digest({"windows": labeler.windows, "attacker": labeler.attacker_ip,
+                                    "victim": labeler.victim_ip})
+    state = None
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        state = EtlState.load(cache_dir)
+
+    grain = 0
+    for n in [w for sp in specs for w in (sp.size_s, sp.hop)] + [int(f.window_s) for f in base_feats + sketch_feats if f.window_s]:
+        grain = math.gcd(grain, int(n))
+    stats = {"computed": 0, "cached": 0}
+    parts = []
+    file_states: Dict[str, List[pd.DataFrame]] = {f.name: [] for f in sketch_feats}
+    current: Dict[str, Dict[str, Any]] = {}
+    for f in files:
+        rel = f.relative_to(exp_dir).as_posix()
+        if state is not None:
+            current[rel] = state.fingerprint(f, rel)
+        digest = current[rel]["hash"] if rel in current else None
+        agg, states = _file_features(f, rel, digest, base_feats, grain, labeler, labels_digest, chunk_rows,
+                                     cache_dir, stats, sketch_feats, sketch)
+        parts.append(agg)
+        for name, st in states.items():
+            file_states[name].append(st)
+    if state is not None:
+        state.inputs = current
+        state.save(cache_dir)
+
+    # Resoluções tumbling já calculadas; cada nova sai da maior que a divide
+    combine = {None: lambda frame: _combine(frame, base_feats)}
+    levels: Dict[Optional[str], Dict[int, pd.DataFrame]] = {
+        None: {grain: combine[None](pd.concat(parts, ignore_index=True))}}
+    for f in sketch_feats:
+        combine[f.name] = lambda frame, keys=_state_keys(f): merge_states([frame], keys, sketch)
+        levels[f.name] = {grain: merge_states(file_states[f.name], _state_keys(f), sketch)}
+
+    def tumbling(size: int, name: Optional[str] = None) -> pd.DataFrame:
+        done = levels[name]
+        if size not in done:
+            src = max(k for k in done if size % k == 0)
+            done[size] = _rollup(done[src], combine[name], size)
+        return done[size]
+
+    def window(size: int, hop: int, name: Optional[str] = None) -> pd.DataFrame:
+        # Hop que não divide o tamanho (120/45): a janela de hop s passaria do fim; usa mdc(size, hop)
+        return tumbling(size, name) if hop == size else _slide(tumbling(math.gcd(size, hop), name),
+                                                               combine[name], size, hop)
+
+    results: Dict[str, pd.DataFrame] = {}
+    for sp in specs:
+        size = int(sp.size_s)
+        agg = window(size, sp.hop)
+        agg = agg.drop(columns=[f.name for f in base_feats if f.window_s and int(f.window_s) != size])
+        for w in sorted({int(f.window_s) for f in base_feats if f.window_s and int(f.window_s) != size}):
+            # Feature com janela própria: valor da janela de w s que contém o início da janela de saída
+            own = [f.name for f in base_feats if f.window_s and int(f.window_s) == w]
+            other = tumbling(w)[["window_start", "src_ip", "dst_ip", "dst_port"] + own]
+            other = other.rename(columns={"window_start": "_ws"})
+            agg["_ws"] = (agg["window_start"] // w) * w
+            agg = agg.merge(other, on=["_ws", "src_ip", "dst_ip", "dst_port"], how="left").drop(columns="_ws")
+        for f in sketch_feats:
+            # Distintos do grupo (origem ou destino) na janela, repetidos em cada linha do grupo
+            keys = _state_keys(f)
+            if f.window_s and int(f.window_s) != size:
+                w = int(f.window_s)
+                est = estimate(tumbling(w, f.name), keys, sketch).rename(columns={"window_start": "_ws"})
+                agg["_ws"] = (agg["window_start"] // w) * w
+                agg = agg.merge(est.rename(columns={"estimate": f.name}), on=["_ws"] + keys[1:],
+                                how="left").drop(columns="_ws")
+            else:
+                est = estimate(window(size, sp.hop, f.name), keys, sketch)
+                agg = agg.merge(est.rename(columns={"estimate": f.name}), on=keys, how="left")
+        agg = agg.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+        ctx = FeatureContext(window_s=size, labeler=labeler, hop_s=sp.hop)
+        for f in feats:
+            if f.agg == "derived":
+                agg[f.name] = f.fn(agg, ctx)
+            if f.dtype != "str":
+                agg[f.name] = agg[f.name].fillna(0).astype(f.dtype)
+        agg["src_ip"] = pd.Categorical(agg["src_ip"].astype(str))
+        agg["dst_ip"] = pd.Categorical(agg["dst_ip"].astype(str))
+        out = agg[KEY_COLUMNS + [f.name for f in feats if f.output]]
+        out.attrs.update(window=sp.name, files=len(files), grain_s=grain)
+        results[sp.name] = out
+    seconds = round(time.perf_counter() - t0, 3)
+    rows_in = int(levels[None][grain]["conn_count"].sum()) if "conn_count" in levels[None][grain] else 0
+    for out in results.values():
+        out.attrs.update(rows_in=rows_in, features_computed=stats["computed"], features_cached=stats["cached"],
+                         seconds=seconds)
+    logger.info(f"[Features] {exp_dir.name}: {len(feats)} feature(s) em {len(specs)} resolução(ões) "
+                f"({', '.join(results)}; base {grain}s); {stats['computed']} (entrada, feature) calculada(s), "
+                f"{stats['cached']} do cache")
+    return results
+
+
+def compute_window_features(exp_dir: Path, window_s: int = 60, features: Optional[Iterable[str]] = None,
+                            tap: str = "sensor", chunk_rows: int = 1_000_000,
+                            cache_dir: Optional[Path] = None, sketch: Optional[SketchConfig] = None) -> pd.DataFrame:
+    """
+    Agregado por janela/(src, dst, dport) com as features pedidas (None => todas) e suas dependências.
+    cache_dir: cache por (entrada, feature, versão) — None desliga (ver docstring do módulo).
+    """
+    spec = WindowSpec(max(1, int(window_s)))
+    return compute_multi_window_features(exp_dir, [spec], features=features, tap=tap, chunk_rows=chunk_rows,
+                                         cache_dir=cache_dir, sketch=sketch)[spec.name]
@@ -0,0 +1,160 @@
+# lab/datasets/labeling.py
+"""
+Rótulos de fluxo a partir do timeline.json do experimento.
+
+Os pares <stage>_start/<stage>_end viram intervalos fechados [t0, t1]. As bordas de todos os
+intervalos cortam o eixo do tempo em segmentos elementares; cada segmento recebe de antemão o
+rótulo vencedor (regras de prioridade abaixo). Rotular N fluxos é então um único searchsorted
+sobre as bordas — O(N log S), sem laço por estágio.
+
+Prioridade quando estágios se sobrepõem:
+  1. tokens de ação (HydraBruteAction, NmapScanAction, ...) vencem o label do template;
+  2. depois, o intervalo mais curto (mais específico);
+  3. depois, o que começou mais tarde.
+
+Só fluxos entre attacker e victim (metadata.json targets; sem victim_ip, qualquer fluxo do
+attacker) recebem rótulo de ataque; o resto é "benign".
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.zeek_reader import ip_like
+
+logger = setup_logger(Path('.logs'), name="[Labels]")
+
+BENIGN = "benign"
+ACTION_SUFFIX = "Action"
+
+
+@dataclass(frozen=True)
+class AttackWindow:
+    label: str
+    t0: float
+    t1: float
+
+    @property
+    def priority(self) -> Tuple[int, float, float]:
+        """Maior vence: ação > template, depois mais curto, depois mais recente."""
+        return (int(self.label.endswith(ACTION_SUFFIX)), -(self.t1 - self.t0), self.t0)
+
+
+def _parse_ts(v) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(v).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        try:
+            return float(v)
+        except Exception:
+            return None
+
+
+def load_attack_windows(exp_dir: Path) -> List[AttackWindow]:
+    """Pares <stage>_start/<stage>_end do timeline.json (estágios sem _end são ignorados, com aviso)."""
+    tl = Path(exp_dir) / "timeline.json"
+    if not tl.exists():
+        return []
+    try:
+        stages = json.loads(tl.read_text(encoding="utf-8")).get("stages") or []
+    except Exception as e:
+        logger.warning(f"[Labels] timeline.json ilegível: {e}")
+        return []
+    opened: Dict[str, float] = {}
+    windows: List[AttackWindow] = []
+    for st in stages:
+        name, ts = str(st.get("stage") or ""), _parse_ts(st.get("ts"))
+        if ts is None:
+            continue
+        if name.endswith("_start"):
+            opened[name[:-6]] = ts
+        elif name.endswith("_end") and name[:-4] in opened:
+            t0 = opened.pop(name[:-4])
+            windows.append(AttackWindow(name[:-4], min(t0, ts), max(t0, ts)))
+    if opened:
+        logger.warning(f"[Labels] estágios sem _end ignorados: {sorted(opened)}")
+    return sorted(set(windows), key=lambda w: (w.t0, w.t1, w.label))
+
+
+def load_targets(exp_dir: Path) -> Tuple[str, str]:
+    """(attacker_ip, victim_ip) do metadata.json; vazio quando ausente."""
+    try:
+        meta = json.loads((Path(exp_dir) / "metadata.json").read_text(encoding="utf-8"))
+        tg = meta.get("targets") or {}
+        return str(tg.get("attacker_ip") or ""), str(tg.get("victim_ip") or "")
+    except Exception:
+        return "", ""
+
+
+class IntervalLabeler:
+    """Índice de intervalos pré-resolvido: bordas ordenadas + rótulo vencedor por segmento."""
+
+    def __init__(self, windows: Sequence[AttackWindow], attacker_ip: str = "", victim_ip: str = ""):
+        self.windows = list(windows)
+        self.attacker_ip = attacker_ip or ""
+        self.victim_ip = victim_ip or ""
+        self.labels = np.array([BENIGN] + sorted({w.label for w in self.windows}), dtype=object)
+        code_of = {lbl: i for i, lbl in enumerate(self.labels)}
+        # t1 inclusivo: a borda de fim é o próximo float depois de t1
+        ends = np.nextafter(np.array([w.t1 for w in self.windows], dtype=np.float64), np.inf)
+        starts = np.array([w.t0 for w in self.windows], dtype=np.float64)
+        self.bounds = np.unique(np.concatenate([starts, ends])) if self.windows else np.empty(0)
+        self.codes = np.zeros(max(len(self.bounds) - 1, 0), dtype=np.int16)
+        # Rank por rótulo (0 = benign): agregados por janela guardam max(rank), que é associativo
+        best = {}
+        for w in self.windows:
+            best[w.label] = max(best.get(w.label, w.priority), w.priority)
+        self.ranked = np.array([BENIGN] + sorted(best, key=lambda lbl: (best[lbl], lbl)), dtype=object)
+        rank_of = {lbl: i for i, lbl in enumerate(self.ranked)}
+        self.rank_of_code = np.array([rank_of[lbl] for lbl in self.labels], dtype=np.int16)
+        taken = np.zeros(len(self.codes), dtype=bool)
+        # Pinta os segmentos do mais prioritário para o menos; quem chegou primeiro fica
+        for w, t0, t1 in sorted(zip(self.windows, starts, ends), key=lambda x: x[0].priority, reverse=True):
+            i0, i1 = np.searchsorted(self.bounds, [t0, t1])
+            free = ~taken[i0:i1]
+            self.codes[i0:i1][free] = code_of[w.label]
+            taken[i0:i1] = True
+
+    def codes_for(self, ts_s: np.ndarray, src=None, dst=None) -> np.ndarray:
+        """Código do rótulo (índice em self.labels) de cada fluxo; 0 = benign."""
+        ts_s = np.asarray(ts_s, dtype=np.float64)
+        out = np.zeros(len(ts_s), dtype=np.int16)
+        if not len(self.codes) or not self.attacker_ip or not len(ts_s):
+            return out
+        # Filtra por IP antes: só fluxos do attacker (minoria) passam pelo searchsorted
+        idx = None
+        if src is not None and dst is not None:
+            src, dst = np.asarray(src), np.asarray(dst)
+            a = ip_like(self.attacker_ip, src)
+            involved = (src == a) | (dst == a)
+            if self.victim_ip:
+                v = ip_like(self.victim_ip, src)
+                involved &= (src == v) | (dst == v)
+            idx = np.flatnonzero(involved)
+            ts_s = ts_s[idx]
+        seg = np.searchsorted(self.bounds, ts_s, side="right") - 1
+        inside = (seg >= 0) & (seg < len(self.codes))
+        codes = np.where(inside, self.codes[np.clip(seg, 0, len(self.codes) - 1)], 0).astype(np.int16)
+        if idx is None:
+            return codes
+        out[idx] = codes
+        return out
+
+    def segments(self) -> List[Tuple[float, float, int]]:
+        """Segmentos rotulados [(início, fim exclusivo, rank)] — para joins fora do numpy (ASOF no DuckDB)."""
+        return [(float(self.bounds[i]), float(self.bounds[i + 1]), int(self.rank_of_code[c]))
+                for i, c in enumerate(self.codes) if c]
+
+    def label(self, ts_s: np.ndarray, src=None, dst=None) -> np.ndarray:
+        return self.labels[self.codes_for(ts_s, src, dst)]
+
+    def counts(self, codes: np.ndarray) -> Dict[str, int]:
+        """Contagem por rótulo direto dos códigos (subproduto para meta/label_counts.json)."""
+        n = np.bincount(np.asarray(codes, dtype=np.int64), minlength=len(self.labels))
+        return {str(lbl): int(c) for lbl, c in zip(self.labels, n) if c}
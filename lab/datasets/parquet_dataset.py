@@ -0,0 +1,215 @@
+# lab/datasets/parquet_dataset.py
+"""
+Dataset Parquet particionado (Hive) do ETL final:
+
+  <root>/exp_id=<exp>/run_ts=<AAAAmmddTHHMMSSZ>/label=<rótulo>/part-<shard>-<i>.parquet
+  <root>/_common_metadata    esquema
+  <root>/_metadata           esquema + row groups de todos os arquivos (estatísticas por coluna)
+
+zstd, row groups de tamanho fixo e estatísticas min/max por coluna: leitores com pyarrow
+(read_dataset, pd.read_parquet) só abrem as partições e colunas pedidas.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+
+logger = setup_logger(Path('.logs'), name="[Dataset]")
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+PARTITION_COLS = ["exp_id", "run_ts", "label"]
+DEFAULT_ROW_GROUP_ROWS = 256_000
+COMPRESSION = "zstd"
+
+
+def run_ts_of(exp_dir: Path) -> str:
+    """Carimbo do run (metadata.json generated_at; senão mtime do diretório), formato compacto UTC."""
+    exp_dir = Path(exp_dir)
+    dt = None
+    try:
+        meta = json.loads((exp_dir / "metadata.json").read_text(encoding="utf-8"))
+        dt = datetime.fromisoformat(str(meta.get("generated_at")).replace("Z", "+00:00"))
+    except Exception:
+        pass
+    if dt is None:
+        try:
+            dt = datetime.fromtimestamp(exp_dir.stat().st_mtime, tz=timezone.utc)
+        except Exception:
+            dt = datetime.now(timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def partition_dir(root: Path, exp_id: str, run_ts: str) -> Path:
+    return Path(root) / f"exp_id={exp_id}" / f"run_ts={run_ts}"
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor="hive")
+
+
+def write_partitioned(df: pd.DataFrame, root: Path, basename: str,
+                      row_group_rows: int = DEFAULT_ROW_GROUP_ROWS) -> List[str]:
+    """
+    Grava `df` (com as colunas de PARTITION_COLS) sob `root`; retorna os arquivos criados.
+    `basename` precisa ser único por chamada (ex.: part-<shard>) — vários workers escrevem
+    no mesmo root sem coordenação.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for c in PARTITION_COLS:
+        table = table.set_column(table.schema.get_field_index(c), c, table[c].cast(pa.string()))
+    written: List[str] = []
+    ds.write_dataset(
+        table, str(root), format="parquet", partitioning=_partitioning(),
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION, write_statistics=True),
+        max_rows_per_group=row_group_rows, min_rows_per_group=min(row_group_rows, 64_000),
+        max_rows_per_file=row_group_rows * 16,
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return written
+
+
+def drop_run(root: Path, exp_id: str, run_ts: str) -> None:
+    """Remove as partições de um run (reprocessamento substitui, não duplica)."""
+    shutil.rmtree(partition_dir(root, exp_id, run_ts), ignore_errors=True)
+
+
+def leaf_dirs(root: Path) -> List[Path]:
+    """Partições-folha (label=...) com arquivos, relativas a root; ignora diretórios ocultos/_ de staging."""
+    leaves = set()
+    for f in Path(root).rglob("*.parquet"):
+        rel = f.parent.relative_to(root)
+        if not any(p.startswith((".", "_")) for p in rel.parts):
+            leaves.add(rel)
+    return sorted(leaves)
+
+
+def swap_partitions(root: Path, staging: Path, stale_prefixes: Sequence[str],
+                    scope: Optional[Path] = None) -> int:
+    """
+    Publica em `root` os arquivos gravados em `staging` (mesmo layout de partições), descartando de
+    `root` os arquivos cujo nome começa com um dos `stale_prefixes` (entradas reprocessadas/removidas;
+    "" descarta todos). `scope` (relativo a root, p.ex. exp_id=<exp>/run_ts=<ts>) limita o descarte
+    às folhas abaixo dele: nomes de arquivo se repetem entre experimentos.
+
+    Cada partição-folha afetada é montada num diretório oculto (.swap-<label=...>: hardlinks dos
+    arquivos que continuam + os novos) e trocada com dois os.replace (a antiga vai para .old-,
+    a nova entra no lugar). Um leitor nunca vê uma mistura de arquivos antigos e novos, mas, entre
+    os dois renames, pode não encontrar a partição; não há troca atômica de diretórios portátil.
+    Leitores concorrentes ao ETL devem repetir a leitura nesse caso. Retorna o nº de partições
+    reescritas.
+    """
+    root, staging = Path(root), Path(staging)
+    stale = tuple(stale_prefixes)
+    scope_parts = Path(scope).parts if scope is not None else ()
+    affected = set(leaf_dirs(staging)) if staging.exists() else set()
+    if stale:
+        for rel in leaf_dirs(root):
+            if rel.parts[:len(scope_parts)] != scope_parts:
+                continue
+            if any(f.name.startswith(stale) for f in (root / rel).glob("*.parquet")):
+                affected.add(rel)
+    for rel in sorted(affected):
+        final = root / rel
+        final.parent.mkdir(parents=True, exist_ok=True)
+        tmp = final.parent / f".swap-{final.name}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        in_scope = rel.parts[:len(scope_parts)] == scope_parts
+        if final.exists():
+            for f in final.iterdir():
+                if f.is_file() and not (stale and in_scope and f.name.startswith(stale)):
+                    try:
+                        os.link(f, tmp / f.name)
+                    except OSError:
+                        shutil.copy2(f, tmp / f.name)
+        if (staging / rel).exists():
+            for f in (staging / rel).iterdir():
+                os.replace(f, tmp / f.name)
+        old = final.parent / f".old-{final.name}"
+        shutil.rmtree(old, ignore_errors=True)
+        if not any(tmp.iterdir()):
+            tmp.rmdir()
+            if final.exists():
+                os.replace(final, old)
+            # Partição que ficou vazia: remove também os pais vazios (run_ts=/exp_id=)
+            parent = final.parent
+            while parent != root and not any(p for p in parent.iterdir() if not p.name.startswith(".old-")):
+                shutil.rmtree(parent)
+                parent = parent.parent
+        else:
+            if final.exists():
+                os.replace(final, old)
+            os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+    shutil.rmtree(staging, ignore_errors=True)
+    return len(affected)
+
+
+def write_metadata_summary(root: Path) -> Optional[Path]:
+    """
+    Reconstrói _common_metadata e _metadata a partir dos rodapés dos arquivos (barato: só
+    lê footers). Arquivos com esquema divergente ficam fora do _metadata, com aviso.
+    """
+    root = Path(root)
+    files = [root / rel / f.name for rel in leaf_dirs(root) for f in sorted((root / rel).glob("*.parquet"))]
+    if not files:
+        for name in ("_metadata", "_common_metadata"):
+            (root / name).unlink(missing_ok=True)
+        return None
+    combined = None
+    schema = None
+    for f in files:
+        md = pq.read_metadata(f)
+        md.set_file_path(f.relative_to(root).as_posix())
+        if combined is None:
+            combined, schema = md, pq.read_schema(f)
+            continue
+        try:
+            combined.append_row_groups(md)
+        except Exception as e:
+            logger.warning(f"[Dataset] {f.name} fora do _metadata (esquema divergente): {e}")
+    pq.write_metadata(schema, root / "_common_metadata.tmp")
+    combined.write_metadata_file(str(root / "_metadata.tmp"))
+    os.replace(root / "_common_metadata.tmp", root / "_common_metadata")
+    os.replace(root / "_metadata.tmp", root / "_metadata")
+    return root / "_metadata"
+
+
+def open_dataset(root: Path) -> "ds.Dataset":
+    """pyarrow Dataset do diretório particionado (colunas de partição como string; ignora _ e .)."""
+    return ds.dataset(str(root), format="parquet", partitioning=_partitioning(),
+                      exclude_invalid_files=True, ignore_prefixes=["_", "."])
+
+
+def read_dataset(root: Path, columns: Optional[Sequence[str]] = None, filters=None) -> pd.DataFrame:
+    """
+    Lê o dataset (ou um .parquet/.csv avulso) só com as colunas/partições pedidas.
+    filters no formato do pyarrow, ex.: [("label", "in", ["benign", "HydraBruteAction"])].
+    """
+    root = Path(root)
+    if root.suffix == ".csv":
+        return pd.read_csv(root, usecols=list(columns) if columns else None)
+    if not _HAS_PYARROW:
+        raise RuntimeError("pyarrow é necessário para ler o dataset particionado")
+    if root.is_file():
+        return pd.read_parquet(root, columns=list(columns) if columns else None, filters=filters)
+    dataset = open_dataset(root)
+    expr = pq.filters_to_expression(filters) if filters else None
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expr).to_pandas()
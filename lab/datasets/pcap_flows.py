@@ -0,0 +1,477 @@
+# lab/datasets/pcap_flows.py
+"""
+Extrator de fluxos direto dos pcaps (sem Zeek/CICFlowMeter): reconstrói features no host a
+partir dos exp_*.pcap coletados, útil para refazer o dataset offline quando a definição de
+uma feature muda.
+
+Pipeline por lote de pacotes:
+  1. mmap do arquivo + laço enxuto só sobre os cabeçalhos de registro (offset/caplen/ts);
+  2. cabeçalhos Ethernet(VLAN)/SLL/IPv4/TCP/UDP extraídos vetorialmente (numpy gather nos
+     offsets, estilo dpkt mas sem objeto por pacote);
+  3. tabela de fluxos bidirecionais por 5-tupla canônica, com idle/active timeout; fluxos
+     ainda abertos no fim do lote seguem para o próximo (inclusive entre segmentos -G/-C).
+Emite DataFrames de fluxos (features no estilo CICFlowMeter) lote a lote.
+
+Limitações: só IPv4 (o lab é host-only IPv4); fragmentos não-iniciais contam no fluxo sem portas;
+pcapng não suportado (tcpdump -w grava pcap clássico).
+
+    python -m lab.datasets.pcap_flows data/<exp_id> --out flows.parquet
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.zeek_reader import ip_to_str
+
+logger = setup_logger(Path('.logs'), name="[PcapFlows]")
+
+try:
+    import pyarrow  # noqa: F401  (opcional: saída parquet)
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# magic -> (endianness, escala da fração do timestamp)
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_SLL, LINKTYPE_SLL2 = 1, 101, 228, 113, 276
+TCP_FLAGS = {"fin": 0x01, "syn": 0x02, "rst": 0x04, "psh": 0x08, "ack": 0x10, "urg": 0x20}
+
+# Campos por pacote que circulam entre lotes (ordem = ordem das colunas internas)
+PACKET_FIELDS = ("ts", "src", "dst", "sport", "dport", "proto", "ip_len", "payload", "flags", "win")
+
+DEFAULT_IDLE_S = 60.0
+DEFAULT_ACTIVE_S = 120.0
+
+
+@dataclass
+class FlowStats:
+    files: int = 0
+    packets: int = 0
+    ipv4: int = 0
+    skipped: int = 0
+    flows: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        d = dict(self.__dict__)
+        d["packets_per_s"] = round(self.packets / self.seconds, 1) if self.seconds > 0 else None
+        return d
+
+
+# -----------------------
+# Leitura (mmap + cabeçalhos)
+# -----------------------
+@contextmanager
+def _open_pcap(path: Path) -> Iterator[Optional[Tuple[mmap.mmap, str, float, int]]]:
+    """mmap de um pcap clássico: (mm, endianness, escala da fração, linktype); None se vazio."""
+    with open(path, "rb") as fh:
+        if Path(path).stat().st_size < 24:
+            yield None
+            return
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic = mm[:4]
+            if magic == PCAPNG_MAGIC:
+                raise ValueError("pcapng não suportado (use pcap clássico: tcpdump -w)")
+            if magic not in PCAP_MAGIC:
+                raise ValueError(f"magic desconhecido {magic.hex()}")
+            endian, scale = PCAP_MAGIC[magic]
+            yield mm, endian, scale, struct.unpack_from(endian + "I", mm, 20)[0] & 0x0FFFFFFF
+        finally:
+            mm.close()
+
+
+def _record_batches(mm: mmap.mmap, endian: str, batch_packets: int
+                    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """(offset dos dados, caplen, segundos, fração) dos registros em lotes: o laço Python só lê os cabeçalhos."""
+    unpack = struct.Struct(endian + "IIII").unpack_from
+    size, off = len(mm), 24
+    while off + 16 <= size:
+        offs, caps, secs, fracs = array("q"), array("q"), array("q"), array("q")
+        n = 0
+        while off + 16 <= size and n < batch_packets:
+            sec, frac, incl, _ = unpack(mm, off)
+            off += 16
+            if off + incl > size:  # último registro truncado (captura interrompida)
+                off = size
+                break
+            offs.append(off)
+            caps.append(incl)
+            secs.append(sec)
+            fracs.append(frac)
+            off += incl
+            n += 1
+        if n:
+            yield (np.frombuffer(offs, dtype=np.int64), np.frombuffer(caps, dtype=np.int64),
+                   np.frombuffer(secs, dtype=np.int64), np.frombuffer(fracs, dtype=np.int64))
+
+
+def pcap_time_range(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Primeiro/último timestamp e nº de pacotes de um pcap (só os cabeçalhos de registro, sem
+    payload). None para arquivo vazio, pcapng ou ilegível. Usado pela linha do tempo do sensor,
+    pelo catálogo de capturas e pelos segmentos do ETL.
+    """
+    try:
+        with _open_pcap(path) as opened:
+            if opened is None:
+                return None
+            mm, endian, scale, _ = opened
+            first = last = None
+            n = 0
+            for _, _, secs, fracs in _record_batches(mm, endian, 1_000_000):
+                if first is None:
+                    first = int(secs[0]) + int(fracs[0]) * scale
+                last = int(secs[-1]) + int(fracs[-1]) * scale
+                n += len(secs)
+        return {"first_ts": first, "last_ts": last, "packets": n}
+    except Exception as e:
+        logger.warning(f"[PcapFlows] pcap {path}: {e}")
+        return None
+
+
+def _iter_packets(path: Path, batch_packets: int) -> Iterator[Tuple[Dict[str, np.ndarray], int, int]]:
+    """
+    Gera (campos IPv4, nº de registros, nº ignorados) por lote. O laço Python só percorre os
+    cabeçalhos de registro; os campos saem do mmap por gather (cópias — nada referencia o mmap fora daqui).
+    """
+    with _open_pcap(path) as opened:
+        if opened is None:
+            return
+        mm, endian, scale, linktype = opened
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        for offs, caps, secs, fracs in _record_batches(mm, endian, batch_packets):
+            pk, skipped = _parse_headers(buf, linktype, offs, caps, secs + fracs * scale)
+            yield pk, len(offs), skipped
+        del buf
+
+
+def _parse_headers(buf: np.ndarray, linktype: int, offs: np.ndarray, caps: np.ndarray,
+                   ts: np.ndarray, positions: bool = False) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Extrai IPv4/TCP/UDP vetorialmente. Retorna (campos dos pacotes IPv4, nº de ignorados).
+    positions=True acrescenta "pos": índice de cada pacote IPv4 no lote de entrada.
+    """
+    last = len(buf) - 1
+    end = offs + caps
+
+    def u8(i):
+        return buf[np.minimum(i, last)].astype(np.int64)
+
+    def be16(i):
+        return (u8(i) << 8) | u8(i + 1)
+
+    def be32(i):
+        return (be16(i) << 16) | be16(i + 2)
+
+    if linktype == LINKTYPE_ETHERNET:
+        et = be16(offs + 12)
+        vlan = (et == 0x8100) | (et == 0x88A8)
+        et = np.where(vlan, be16(offs + 16), et)
+        l3 = np.where(vlan, offs + 18, offs + 14)
+    elif linktype == LINKTYPE_SLL:
+        et, l3 = be16(offs + 14), offs + 16
+    elif linktype == LINKTYPE_SLL2:
+        et, l3 = be16(offs), offs + 20
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        et, l3 = np.where((u8(offs) >> 4) == 4, 0x0800, 0), offs
+    else:
+        raise ValueError(f"linktype {linktype} não suportado")
+
+    ok = (et == 0x0800) & (l3 + 20 <= end) & ((u8(l3) >> 4) == 4)
+    l3, end, ts = l3[ok], end[ok], ts[ok]
+    ihl = (u8(l3) & 0x0F) * 4
+    ip_len = be16(l3 + 2)
+    proto = u8(l3 + 9)
+    first_frag = (be16(l3 + 6) & 0x1FFF) == 0
+    l4 = l3 + ihl
+    tcp = first_frag & (proto == 6) & (l4 + 14 <= end)
+    udp = first_frag & (proto == 17) & (l4 + 4 <= end)
+    ports = tcp | udp
+    l4_hdr = np.where(tcp, (u8(l4 + 12) >> 4) * 4, np.where(udp, 8, 0))
+    pk = {
+        "ts": ts,
+        "src": be32(l3 + 12),
+        "dst": be32(l3 + 16),
+        "sport": np.where(ports, be16(l4), 0),
+        "dport": np.where(ports, be16(l4 + 2), 0),
+        "proto": proto,
+        "ip_len": ip_len,
+        "payload": np.maximum(ip_len - ihl - l4_hdr, 0),
+        "flags": np.where(tcp, u8(l4 + 13), 0),
+        "win": np.where(tcp & (l4 + 16 <= end), be16(l4 + 14), -1),
+    }
+    if positions:
+        pk["pos"] = np.flatnonzero(ok)
+    return pk, int(len(ok) - ok.sum())
+
+
+# -----------------------
+# Features por fluxo
+# -----------------------
+def _flow_features(p: Dict[str, np.ndarray], starts: np.ndarray, flow_id: np.ndarray) -> pd.DataFrame:
+    """Agrega pacotes (ordenados por fluxo, tempo) em features; `starts` = 1º pacote de cada fluxo."""
+    n_flows = len(starts)
+    ends = np.r_[starts[1:], len(p["ts"])]
+    ts, ln, pl = p["ts"], p["ip_len"].astype(np.float64), p["payload"].astype(np.float64)
+    # Direção "forward" = sentido do primeiro pacote do fluxo (convenção do CICFlowMeter)
+    first = starts[flow_id]
+    fwd = (p["src"] == p["src"][first]) & (p["sport"] == p["sport"][first])
+    bwd = ~fwd
+
+    def per_flow_sum(x):
+        return np.bincount(flow_id, weights=x, minlength=n_flows)
+
+    n_pk = (ends - starts).astype(np.float64)
+    n_fwd = per_flow_sum(fwd.astype(np.float64))
+    n_bwd = n_pk - n_fwd
+    t0, t1 = ts[starts], ts[ends - 1]
+    dur = t1 - t0
+
+    out = {
+        "ts": t0, "ts_end": t1, "duration": dur,
+        "src_ip": ip_to_str(p["src"][starts]), "src_port": p["sport"][starts].astype(np.int32),
+        "dst_ip": ip_to_str(p["dst"][starts]), "dst_port": p["dport"][starts].astype(np.int32),
+        "proto": p["proto"][starts].astype(np.int16),
+        "fwd_pkts": n_fwd.astype(np.int64), "bwd_pkts": n_bwd.astype(np.int64),
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for tag, mask, cnt in (("fwd", fwd, n_fwd), ("bwd", bwd, n_bwd)):
+            s = per_flow_sum(np.where(mask, ln, 0.0))
+            sq = per_flow_sum(np.where(mask, ln * ln, 0.0))
+            mean = np.where(cnt > 0, s / cnt, 0.0)
+            out[f"{tag}_bytes"] = s
+            out[f"{tag}_payload_bytes"] = per_flow_sum(np.where(mask, pl, 0.0))
+            mn = np.minimum.reduceat(np.where(mask, ln, np.inf), starts)
+            mx = np.maximum.reduceat(np.where(mask, ln, -np.inf), starts)
+            out[f"{tag}_pkt_len_min"] = np.where(cnt > 0, mn, 0.0)
+            out[f"{tag}_pkt_len_max"] = np.where(cnt > 0, mx, 0.0)
+            out[f"{tag}_pkt_len_mean"] = mean
+            out[f"{tag}_pkt_len_std"] = np.sqrt(np.maximum(np.where(cnt > 0, sq / cnt, 0.0) - mean * mean, 0.0))
+            # IAT entre pacotes consecutivos do mesmo sentido
+            idx = np.flatnonzero(mask)
+            if len(idx) > 1:
+                same = flow_id[idx[1:]] == flow_id[idx[:-1]]
+                iat = np.diff(ts[idx])[same]
+                owner = flow_id[idx[1:]][same]
+                tot = np.bincount(owner, weights=iat, minlength=n_flows)
+            else:
+                tot = np.zeros(n_flows)
+            out[f"{tag}_iat_total"] = tot
+            out[f"{tag}_iat_mean"] = np.where(cnt > 1, tot / (cnt - 1), 0.0)
+
+        iat = np.diff(ts, prepend=ts[0])
+        iat[starts] = 0.0
+        n_iat = n_pk - 1
+        s = per_flow_sum(iat)
+        mean = np.where(n_iat > 0, s / n_iat, 0.0)
+        out["flow_iat_mean"] = mean
+        out["flow_iat_std"] = np.sqrt(np.maximum(np.where(n_iat > 0, per_flow_sum(iat * iat) / n_iat, 0.0)
+                                                 - mean * mean, 0.0))
+        iat_mn = iat.copy()
+        iat_mn[starts] = np.inf
+        iat_mx = iat.copy()
+        iat_mx[starts] = -np.inf
+        out["flow_iat_min"] = np.where(n_iat > 0, np.minimum.reduceat(iat_mn, starts), 0.0)
+        out["flow_iat_max"] = np.where(n_iat > 0, np.maximum.reduceat(iat_mx, starts), 0.0)
+
+        for name, bit in TCP_FLAGS.items():
+            out[f"{name}_cnt"] = per_flow_sum(((p["flags"] & bit) > 0).astype(np.float64)).astype(np.int64)
+
+        out["init_win_fwd"] = p["win"][starts].astype(np.int32)
+        init_bwd = np.full(n_flows, -1, dtype=np.int32)
+        bidx = np.flatnonzero(bwd)
+        if len(bidx):
+            fl, first_b = np.unique(flow_id[bidx], return_index=True)
+            init_bwd[fl] = p["win"][bidx[first_b]]
+        out["init_win_bwd"] = init_bwd
+
+        total_bytes = out["fwd_bytes"] + out["bwd_bytes"]
+        out["flow_bytes_s"] = np.where(dur > 0, total_bytes / dur, 0.0)
+        out["flow_pkts_s"] = np.where(dur > 0, n_pk / dur, 0.0)
+        out["down_up_ratio"] = np.where(n_fwd > 0, n_bwd / n_fwd, 0.0)
+    return pd.DataFrame(out)
+
+
+# -----------------------
+# Tabela de fluxos
+# -----------------------
+class PcapFlowExtractor:
+    """
+    Tabela de fluxos bidirecionais alimentada lote a lote.
+    Um fluxo termina por idle (gap > idle_timeout), active (duração > active_timeout, como o
+    flow timeout do CICFlowMeter) ou eof; fluxos ainda abertos no fim do lote são mantidos.
+    """
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_S, active_timeout: float = DEFAULT_ACTIVE_S):
+        self.idle_timeout = float(idle_timeout)
+        self.active_timeout = float(active_timeout)
+        self.carry: Optional[Dict[str, np.ndarray]] = None
+
+    def push(self, pk: Dict[str, np.ndarray], final: bool = False) -> pd.DataFrame:
+        if self.carry is not None:
+            pk = {k: np.concatenate([self.carry[k], pk[k]]) for k in PACKET_FIELDS}
+            self.carry = None
+        n = len(pk["ts"])
+        if n == 0:
+            return pd.DataFrame()
+
+        # 5-tupla canônica (menor endpoint primeiro) -> dois inteiros de 64 bits
+        src, dst, sp, dp = pk["src"], pk["dst"], pk["sport"], pk["dport"]
+        a_first = (src < dst) | ((src == dst) & (sp <= dp))
+        k1 = (np.where(a_first, src, dst).astype(np.uint64) << np.uint64(32)) | np.where(a_first, dst, src).astype(np.uint64)
+        k2 = (np.where(a_first, sp, dp) << 24) | (np.where(a_first, dp, sp) << 8) | pk["proto"]
+        order = np.lexsort((pk["ts"], k2, k1))
+        p = {k: v[order] for k, v in pk.items()}
+        k1, k2, ts = k1[order], k2[order], p["ts"]
+
+        new_key = np.r_[True, (k1[1:] != k1[:-1]) | (k2[1:] != k2[:-1])]
+        idle_brk = np.r_[False, np.diff(ts) > self.idle_timeout] & ~new_key
+        brk = new_key | idle_brk
+        active_brk = self._split_active(ts, brk)
+        brk |= active_brk
+
+        starts = np.flatnonzero(brk)
+        flow_id = np.cumsum(brk) - 1
+        ends = np.r_[starts[1:], n]
+        last_of_key = (ends == n) | new_key[np.minimum(ends, n - 1)]
+        t_max = float(ts.max())
+        still_open = last_of_key & (t_max - ts[ends - 1] <= self.idle_timeout) & (not final)
+
+        reason = np.full(len(starts), "idle", dtype=object)
+        nxt = np.minimum(ends, n - 1)
+        reason[(ends < n) & active_brk[nxt]] = "active"
+        reason[last_of_key & ~still_open & (t_max - ts[ends - 1] <= self.idle_timeout)] = "eof"
+
+        if still_open.any():
+            keep = still_open[flow_id]
+            self.carry = {k: v[keep] for k, v in p.items()}
+            if still_open.all():
+                return pd.DataFrame()
+        flows = _flow_features(p, starts, flow_id)
+        flows["end_reason"] = reason
+        return flows[~still_open].reset_index(drop=True)
+
+    def _split_active(self, ts: np.ndarray, brk: np.ndarray) -> np.ndarray:
+        """Quebra segmentos mais longos que active_timeout (raros: só fluxos contínuos, ex. flood)."""
+        out = np.zeros(len(ts), dtype=bool)
+        seg = np.flatnonzero(brk)
+        seg_end = np.r_[seg[1:], len(ts)]
+        long = ts[seg_end - 1] - ts[seg] > self.active_timeout
+        for s, e in zip(seg[long], seg_end[long]):
+            i = s
+            while True:
+                j = s + int(np.searchsorted(ts[s:e], ts[i] + self.active_timeout, side="right"))
+                if j >= e:
+                    break
+                out[j] = True
+                i = j
+        return out
+
+
+# -----------------------
+# API
+# -----------------------
+def find_pcaps(exp_dir: Path, tap: str = "sensor") -> List[Path]:
+    """Segmentos do tcpdump (-G/-C) de um tap, em ordem de nome (= ordem temporal)."""
+    return sorted((Path(exp_dir) / tap / "pcap").glob("*.pcap*"))
+
+
+def iter_pcap_flows(paths: Iterable[Path], batch_packets: int = 1_000_000, idle_timeout: float = DEFAULT_IDLE_S,
+                    active_timeout: float = DEFAULT_ACTIVE_S, stats: Optional[FlowStats] = None) -> Iterator[pd.DataFrame]:
+    """
+    Fluxos dos pcaps em lotes (os arquivos são tratados como uma captura contínua, então um
+    fluxo que atravessa a rotação -G/-C não é cortado). Memória ~ batch_packets + fluxos abertos.
+    """
+    stats = stats if stats is not None else FlowStats()
+    ext = PcapFlowExtractor(idle_timeout=idle_timeout, active_timeout=active_timeout)
+    t0 = time.perf_counter()
+    for path in paths:
+        stats.files += 1
+        try:
+            for pk, n, skipped in _iter_packets(Path(path), batch_packets):
+                stats.packets += n
+                stats.ipv4 += len(pk["ts"])
+                stats.skipped += skipped
+                flows = ext.push(pk)
+                if len(flows):
+                    stats.flows += len(flows)
+                    yield flows
+        except Exception as e:
+            stats.errors.append(f"{Path(path).name}: {e}")
+            logger.warning(f"[PcapFlows] falha lendo {path}: {e}")
+    flows = ext.push({k: np.empty(0, dtype=np.float64 if k == "ts" else np.int64) for k in PACKET_FIELDS},
+                     final=True)
+    if len(flows):
+        stats.flows += len(flows)
+        yield flows
+    stats.seconds = round(time.perf_counter() - t0, 3)
+
+
+def extract_flows(paths: Iterable[Path], out_path: Path, **kw) -> FlowStats:
+    """Grava todos os fluxos em parquet (ou csv sem pyarrow), lote a lote."""
+    out_path = Path(out_path)
+    if out_path.suffix == ".parquet" and not _HAS_PYARROW:
+        out_path = out_path.with_suffix(".csv")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    stats = FlowStats()
+    batches = iter_pcap_flows(paths, stats=stats, **kw)
+    if out_path.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for df in batches:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(out_path, "w", encoding="utf-8", newline="") as fh:
+            for i, df in enumerate(batches):
+                df.to_csv(fh, index=False, header=(i == 0))
+    logger.info(f"[PcapFlows] {out_path.name}: {json.dumps(stats.as_dict())}")
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fluxos bidirecionais (estilo CICFlowMeter) a partir de pcaps")
+    ap.add_argument("inputs", nargs="+", type=Path, help="diretório do experimento (data/<exp_id>) ou arquivos .pcap")
+    ap.add_argument("--tap", default="sensor")
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_S)
+    ap.add_argument("--active-timeout", type=float, default=DEFAULT_ACTIVE_S)
+    ap.add_argument("--batch-packets", type=int, default=1_000_000)
+    args = ap.parse_args(argv)
+    paths: List[Path] = []
+    for p in args.inputs:
+        paths.extend(find_pcaps(p, args.tap) if p.is_dir() else [p])
+    out = args.out or ((args.inputs[0] if args.inputs[0].is_dir() else args.inputs[0].parent) / "flows_pcap.parquet")
+    stats = extract_flows(paths, out, batch_packets=args.batch_packets,
+                          idle_timeout=args.idle_timeout, active_timeout=args.active_timeout)
+    print(json.dumps(stats.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+# lab/datasets/pcap_index.py
+"""
+Índice dos pcaps de um tap para acesso aleatório por janela de tempo ou por fluxo, sem
+reler os segmentos rotacionados (rotulagem/depuração de uma janela de ataque ou de um fluxo).
+
+  <exp>/<tap>/pcap_index/{ts,file,off,key}.npy   uma linha por pacote, ordenada por tempo:
+                      ts (ns) | segmento (uint16) | offset do registro | hash da 5-tupla
+  <exp>/<tap>/pcap_index/flow_{key,row}.npy       (hash, linha) ordenado por hash e tempo
+  <exp>/<tap>/pcap_index/index.json               segmentos indexados (tamanho/mtime), formato e contagens
+
+Uma coluna por arquivo .npy, aberta com np.load(mmap_mode="r"): a coluna ordenada (tempo ou
+hash) é contígua, então a busca binária toca só algumas páginas, e das outras colunas só as
+linhas pedidas são lidas; os pcaps também são mapeados
+(mmap) e só os registros selecionados são lidos. O hash é da 5-tupla canônica (menor endpoint
+primeiro, como no PcapFlowExtractor), então os dois sentidos de um fluxo caem na mesma chave;
+pacotes não IPv4 têm hash 0. 42 bytes por pacote (26 + 16).
+
+A construção é incremental: segmentos com o mesmo tamanho/mtime reaproveitam as linhas do
+índice anterior; só os novos ou alterados (o segmento ainda aberto do tcpdump) são relidos.
+
+    python -m lab.datasets.pcap_index data/<exp_id> build
+    python -m lab.datasets.pcap_index data/<exp_id> query --window HydraSSH --out hydra.pcap
+    python -m lab.datasets.pcap_index data/<exp_id> query --flow 192.168.56.10:41016-192.168.56.20:22/tcp
+    python -m lab.datasets.pcap_index data/<exp_id> query --since 2024-05-01T10:00:00Z --until 2024-05-01T10:00:05Z
+"""
+from __future__ import annotations
+
+import argparse
+import ipaddress
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.pcap_flows import _open_pcap, _parse_headers, _record_batches, find_pcaps
+from lab.datasets.zeek_reader import ip_to_str
+
+logger = setup_logger(Path('.logs'), name="[PcapIndex]")
+
+INDEX_DIR = "pcap_index"
+INDEX_VERSION = 1
+PACKET_DTYPE = np.dtype([("ts", "<i8"), ("file", "<u2"), ("off", "<u8"), ("key", "<u8")])
+PACKET_COLUMNS = PACKET_DTYPE.names
+_PROTOS = {"tcp": 6, "udp": 17, "icmp": 1}
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """Finalizador do splitmix64 (uint64 -> uint64 bem espalhado)."""
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def flow_hash(src, dst, sport, dport, proto) -> np.ndarray:
+    """Hash uint64 da 5-tupla, igual nos dois sentidos (IPs uint32, portas e protocolo inteiros)."""
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    sp, dp = np.asarray(sport, dtype=np.int64), np.asarray(dport, dtype=np.int64)
+    a_first = (src < dst) | ((src == dst) & (sp <= dp))
+    k1 = (np.where(a_first, src, dst).astype(np.uint64) << np.uint64(32)) | np.where(a_first, dst, src).astype(np.uint64)
+    k2 = ((np.where(a_first, sp, dp) << 24) | (np.where(a_first, dp, sp) << 8) | np.asarray(proto, dtype=np.int64))
+    with np.errstate(over="ignore"):
+        return _mix(k1 ^ _mix(k2.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)))
+
+
+@dataclass(frozen=True)
+class FlowKey:
+    src: str
+    dst: str
+    sport: int = 0
+    dport: int = 0
+    proto: int = 6
+
+    @classmethod
+    def parse(cls, text: str) -> "FlowKey":
+        """'ip[:porta]-ip[:porta][/tcp|udp|n]' (a ordem dos endpoints não importa)."""
+        body, _, proto = str(text).strip().partition("/")
+        a, _, b = body.partition("-")
+
+        def endpoint(v: str) -> Tuple[str, int]:
+            ip, _, port = v.strip().rpartition(":") if ":" in v else (v.strip(), "", "0")
+            return str(ipaddress.IPv4Address(ip)), int(port or 0)
+
+        (src, sport), (dst, dport) = endpoint(a), endpoint(b)
+        p = proto.strip().lower() or "tcp"
+        return cls(src, dst, sport, dport, _PROTOS[p] if p in _PROTOS else int(p))
+
+    @property
+    def hash(self) -> int:
+        return int(flow_hash(int(ipaddress.IPv4Address(self.src)), int(ipaddress.IPv4Address(self.dst)),
+                             self.sport, self.dport, self.proto))
+
+
+def _to_ns(t) -> int:
+    """
+    Epoch (s), datetime ou ISO 8601 -> epoch em ns. Float não tem ns em 1.7e9 s (passo de ~240 ns):
+    é arredondado ao µs (resolução do Zeek/pcap clássico); texto numérico é exato.
+    """
+    if isinstance(t, datetime):
+        dt = t
+    elif isinstance(t, (int, np.integer)):
+        return int(t) * 1_000_000_000
+    elif isinstance(t, (float, np.floating)):
+        return int(round(float(t) * 1e6)) * 1000
+    else:
+        try:
+            return int(Decimal(str(t).strip()).scaleb(9).to_integral_value())
+        except InvalidOperation:
+            dt = datetime.fromisoformat(str(t).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(round(dt.timestamp() * 1e6)) * 1000
+
+
+def _fingerprint(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _index_file(path: Path, file_id: int, batch_packets: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Linhas do índice de um segmento (ordem do arquivo) e o seu formato."""
+    parts: List[np.ndarray] = []
+    info: Dict[str, Any] = {}
+    with _open_pcap(path) as opened:
+        if opened is None:
+            return np.empty(0, dtype=PACKET_DTYPE), info
+        mm, endian, scale, linktype = opened
+        info = {"endian": endian, "scale": scale, "linktype": linktype, "header": mm[:24].hex()}
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        ns_per_frac = int(round(scale * 1e9))
+        for offs, caps, secs, fracs in _record_batches(mm, endian, batch_packets):
+            rows = np.zeros(len(offs), dtype=PACKET_DTYPE)
+            rows["ts"] = secs * 1_000_000_000 + fracs * ns_per_frac
+            rows["file"] = file_id
+            rows["off"] = offs - 16
+            try:
+                pk, _ = _parse_headers(buf, linktype, offs, caps, secs + fracs * scale, positions=True)
+                rows["key"][pk["pos"]] = flow_hash(pk["src"], pk["dst"], pk["sport"], pk["dport"], pk["proto"])
+            except ValueError as e:
+                # Linktype desconhecido: o segmento entra no índice por tempo, sem fluxos
+                info["error"] = str(e)
+            parts.append(rows)
+        del buf
+    return (np.concatenate(parts) if parts else np.empty(0, dtype=PACKET_DTYPE)), info
+
+
+def _save(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, np.ascontiguousarray(arr), allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _load_columns(index_dir: Path, names: Iterable[str]) -> Dict[str, np.ndarray]:
+    return {c: np.load(Path(index_dir) / f"{c}.npy", mmap_mode="r") for c in names}
+
+
+def index_dir_of(exp_dir: Path, tap: str = "sensor") -> Path:
+    return Path(exp_dir) / tap / INDEX_DIR
+
+
+def build_pcap_index(paths: Iterable[Path], index_dir: Path, batch_packets: int = 1_000_000,
+                     full: bool = False) -> Dict[str, Any]:
+    """
+    (Re)constrói o índice dos segmentos `paths` em index_dir; segmentos inalterados desde o último
+    build são reaproveitados (full=True relê tudo). Retorna o resumo gravado em index.json.
+    """
+    t0 = time.perf_counter()
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    paths = [Path(p) for p in paths]
+    base = index_dir.parent
+    names = [os.path.relpath(p, base) for p in paths]
+    if len(paths) > np.iinfo(np.uint16).max:
+        raise ValueError(f"segmentos demais para um índice: {len(paths)}")
+
+    old_meta: Dict[str, Any] = {}
+    old_rows = None
+    if not full and (index_dir / "index.json").exists():
+        try:
+            old_meta = json.loads((index_dir / "index.json").read_text(encoding="utf-8"))
+            if old_meta.get("version") == INDEX_VERSION:
+                old_rows = _load_columns(index_dir, PACKET_COLUMNS)
+        except Exception as e:
+            logger.warning(f"[PcapIndex] índice anterior ilegível ({e}) — reconstruindo")
+            old_meta, old_rows = {}, None
+    old_files = {f["name"]: (i, f) for i, f in enumerate(old_meta.get("files") or [])} if old_rows is not None else {}
+    if old_rows is not None and [f["name"] for f in old_meta["files"]] == names and all(
+            all(f.get(k) == v for k, v in _fingerprint(p).items()) for f, p in zip(old_meta["files"], paths)):
+        logger.info(f"[PcapIndex] {index_dir}: nenhum segmento mudou")
+        return {**old_meta, "reused_files": len(paths), "seconds": round(time.perf_counter() - t0, 3)}
+
+    parts: List[np.ndarray] = []
+    files: List[Dict[str, Any]] = []
+    reused = 0
+    for file_id, (path, name) in enumerate(zip(paths, names)):
+        fp = _fingerprint(path)
+        prev = old_files.get(name)
+        if prev is not None and all(prev[1].get(k) == v for k, v in fp.items()):
+            sel = np.flatnonzero(np.asarray(old_rows["file"]) == prev[0])
+            rows = np.zeros(len(sel), dtype=PACKET_DTYPE)
+            for c in PACKET_COLUMNS:
+                rows[c] = old_rows[c][sel]
+            rows["file"] = file_id
+            files.append({**prev[1], "name": name})
+            reused += 1
+        else:
+            try:
+                rows, info = _index_file(path, file_id, batch_packets)
+            except Exception as e:
+                logger.warning(f"[PcapIndex] falha lendo {path}: {e}")
+                rows, info = np.empty(0, dtype=PACKET_DTYPE), {"error": str(e)}
+            files.append({"name": name, **fp, **info, "packets": len(rows)})
+        parts.append(rows)
+    del old_rows
+
+    packets = np.concatenate(parts) if parts else np.empty(0, dtype=PACKET_DTYPE)
+    # Segmentos são contíguos no tempo, mas a ordem do arquivo não é garantida (buffers do kernel)
+    packets = packets[np.lexsort((packets["off"], packets["file"], packets["ts"]))]
+    order = np.argsort(packets["key"], kind="stable")
+    flow_key = packets["key"][order]
+    for c in PACKET_COLUMNS:
+        _save(index_dir / f"{c}.npy", packets[c])
+    _save(index_dir / "flow_key.npy", flow_key)
+    _save(index_dir / "flow_row.npy", order.astype(np.int64))
+    dt = time.perf_counter() - t0
+    meta = {"version": INDEX_VERSION, "built_at": datetime.now(timezone.utc).isoformat(), "files": files,
+            "packets": int(len(packets)),
+            "flows": int(np.count_nonzero(np.diff(flow_key)) + 1) if len(flow_key) else 0,
+            "t_min_ns": int(packets["ts"][0]) if len(packets) else None,
+            "t_max_ns": int(packets["ts"][-1]) if len(packets) else None,
+            "reused_files": reused, "seconds": round(dt, 3),
+            "bytes": int(packets.nbytes + flow_key.nbytes + order.nbytes)}
+    (index_dir / "index.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    logger.info(f"[PcapIndex] {index_dir}: {meta['packets']} pacote(s) de {len(files)} segmento(s) "
+                f"({reused} reaproveitado(s)) em {dt:.2f}s")
+    return meta
+
+
+def build_exp_index(exp_dir: Path, tap: str = "sensor", **kw) -> Dict[str, Any]:
+    """Índice dos segmentos do tap de um experimento em <exp>/<tap>/pcap_index."""
+    pcaps = find_pcaps(exp_dir, tap)
+    if not pcaps:
+        raise FileNotFoundError(f"nenhum pcap em {Path(exp_dir) / tap / 'pcap'}")
+    return build_pcap_index(pcaps, index_dir_of(exp_dir, tap), **kw)
+
+
+class PcapIndex:
+    """
+    Consulta a um índice construído (build_pcap_index). As linhas devolvidas por time_range/flow
+    são posições nas colunas (ts/file/off/key), já em ordem de tempo; records/frame/write_pcap leem os pacotes.
+    """
+
+    def __init__(self, index_dir: Path):
+        self.dir = Path(index_dir)
+        self.meta = json.loads((self.dir / "index.json").read_text(encoding="utf-8"))
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"versão de índice {self.meta.get('version')} != {INDEX_VERSION}: reconstrua")
+        cols = _load_columns(self.dir, PACKET_COLUMNS + ("flow_key", "flow_row"))
+        self.ts, self.file, self.off, self.key = (cols[c] for c in PACKET_COLUMNS)
+        self.flow_key, self.flow_row = cols["flow_key"], cols["flow_row"]
+        self.files = [self.dir.parent / f["name"] for f in self.meta["files"]]
+        self._maps: Dict[int, Any] = {}
+
+    @classmethod
+    def for_experiment(cls, exp_dir: Path, tap: str = "sensor") -> "PcapIndex":
+        return cls(index_dir_of(exp_dir, tap))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __enter__(self) -> "PcapIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for cm, _ in self._maps.values():
+            cm.__exit__(None, None, None)
+        self._maps = {}
+
+    def stale(self) -> List[str]:
+        """Segmentos que mudaram (ou sumiram) desde o build — reconstrua antes de confiar neles."""
+        out = []
+        for path, f in zip(self.files, self.meta["files"]):
+            try:
+                fp = _fingerprint(path)
+            except FileNotFoundError:
+                out.append(f["name"])
+                continue
+            if any(f.get(k) != v for k, v in fp.items()):
+                out.append(f["name"])
+        return out
+
+    # -- seleção (busca binária nas colunas ordenadas) --
+    def time_range(self, t0=None, t1=None) -> np.ndarray:
+        """Linhas com t0 <= ts <= t1 (epoch s, datetime ou ISO; None = aberto)."""
+        ts = self.ts
+        lo = 0 if t0 is None else int(np.searchsorted(ts, _to_ns(t0), side="left"))
+        hi = len(ts) if t1 is None else int(np.searchsorted(ts, _to_ns(t1), side="right"))
+        return np.arange(lo, max(lo, hi), dtype=np.int64)
+
+    def flow(self, key, t0=None, t1=None) -> np.ndarray:
+        """Linhas de um fluxo (FlowKey, texto 'ip:porta-ip:porta/proto' ou hash), opcionalmente numa janela."""
+        if isinstance(key, str):
+            key = FlowKey.parse(key)
+        h = np.uint64(key.hash if isinstance(key, FlowKey) else int(key))
+        lo = int(np.searchsorted(self.flow_key, h, side="left"))
+        hi = int(np.searchsorted(self.flow_key, h, side="right"))
+        rows = np.sort(np.asarray(self.flow_row[lo:hi]))
+        if (t0 is not None or t1 is not None) and len(rows):
+            ts = self.ts[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if t0 is not None:
+                keep &= ts >= _to_ns(t0)
+            if t1 is not None:
+                keep &= ts <= _to_ns(t1)
+            rows = rows[keep]
+        return rows
+
+    # -- leitura dos pacotes (mmap dos segmentos) --
+    def _map(self, file_id: int):
+        if file_id not in self._maps:
+            cm = _open_pcap(self.files[file_id])
+            opened = cm.__enter__()
+            if opened is None:
+                cm.__exit__(None, None, None)
+                raise ValueError(f"segmento vazio: {self.files[file_id]}")
+            self._maps[file_id] = (cm, opened)
+        return self._maps[file_id][1]
+
+    def _groups(self, rows: np.ndarray) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """(arquivo, posições em `rows`, offsets) agrupados por segmento."""
+        rows = np.asarray(rows, dtype=np.int64)
+        files, offs = self.file[rows], self.off[rows].astype(np.int64)
+        for file_id in np.unique(files):
+            pos = np.flatnonzero(files == file_id)
+            yield int(file_id), pos, offs[pos]
+
+    def records(self, rows: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        """(ts em ns, bytes capturados) de cada linha, na ordem de `rows`."""
+        rows = np.asarray(rows, dtype=np.int64)
+        ts = self.ts[rows]
+        for i, (file_id, off) in enumerate(zip(self.file[rows], self.off[rows])):
+            mm, endian, _, _ = self._map(int(file_id))
+            incl = int.from_bytes(mm[int(off) + 8:int(off) + 12], "little" if endian == "<" else "big")
+            yield int(ts[i]), mm[int(off) + 16:int(off) + 16 + incl]
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """Cabeçalhos IPv4/TCP/UDP das linhas (ordem de tempo), com o segmento e o offset de cada pacote."""
+        rows = np.asarray(rows, dtype=np.int64)
+        parts = []
+        for file_id, pos, off in self._groups(rows):
+            mm, endian, scale, linktype = self._map(file_id)
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            hdr = buf[(off[:, None] + np.arange(8, 12)).ravel()].reshape(-1, 4).astype(np.int64)
+            caps = (hdr[:, 0] | hdr[:, 1] << 8 | hdr[:, 2] << 16 | hdr[:, 3] << 24) if endian == "<" else \
+                (hdr[:, 3] | hdr[:, 2] << 8 | hdr[:, 1] << 16 | hdr[:, 0] << 24)
+            ts = self.ts[rows[pos]]
+            pk, _ = _parse_headers(buf, linktype, off + 16, caps, ts / 1e9, positions=True)
+            del buf
+            sub = pd.DataFrame({k: pk[k] for k in ("src", "dst", "sport", "dport", "proto", "ip_len", "payload",
+                                                  "flags")})
+            sub.insert(0, "ts_ns", ts[pk["pos"]])
+            sub["src"], sub["dst"] = ip_to_str(sub["src"].to_numpy()), ip_to_str(sub["dst"].to_numpy())
+            sub["file"] = self.meta["files"][file_id]["name"]
+            sub["offset"] = off[pk["pos"]]
+            sub["_row"] = pos[pk["pos"]]
+            parts.append(sub)
+        if not parts:
+            return pd.DataFrame(columns=["ts_ns", "src", "dst", "sport", "dport", "proto", "ip_len", "payload",
+                                         "flags", "file", "offset"])
+        return pd.concat(parts, ignore_index=True).sort_values("_row", kind="stable").drop(
+            columns="_row").reset_index(drop=True)
+
+    def write_pcap(self, rows: np.ndarray, out_path: Path) -> Path:
+        """Grava as linhas num pcap novo (cabeçalho global do primeiro segmento; mesmo linktype)."""
+        out_path = Path(out_path)
+        rows = np.asarray(rows, dtype=np.int64)
+        file_ids = np.unique(self.file[rows]) if len(rows) else np.array([0])
+        headers = {self.meta["files"][int(i)].get("header") for i in file_ids} - {None}
+        if len({h[40:48] for h in headers}) > 1:
+            raise ValueError("segmentos com linktypes diferentes não cabem num pcap só")
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, "wb") as fh:
+            if headers:
+                fh.write(bytes.fromhex(sorted(headers)[0]))
+            for file_id, off in zip(self.file[rows], self.off[rows]):
+                mm, endian, _, _ = self._map(int(file_id))
+                incl = int.from_bytes(mm[int(off) + 8:int(off) + 12], "little" if endian == "<" else "big")
+                fh.write(mm[int(off):int(off) + 16 + incl])
+        return out_path
+
+
+def _window_bounds(exp_dir: Path, label: str) -> Tuple[float, float]:
+    from lab.datasets.labeling import load_attack_windows
+    windows = [w for w in load_attack_windows(exp_dir) if w.label == label]
+    if not windows:
+        raise ValueError(f"janela {label!r} não está no timeline.json")
+    return min(w.t0 for w in windows), max(w.t1 for w in windows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Índice dos pcaps (tempo/fluxo) e consultas por janela ou fluxo")
+    ap.add_argument("exp_dir", type=Path)
+    ap.add_argument("command", choices=["build", "query"])
+    ap.add_argument("--tap", default="sensor")
+    ap.add_argument("--full", action="store_true", help="build: relê todos os segmentos")
+    ap.add_argument("--since", default=None, help="query: início (epoch ou ISO)")
+    ap.add_argument("--until", default=None, help="query: fim (epoch ou ISO)")
+    ap.add_argument("--window", default=None, help="query: janela do timeline.json (ex.: HydraSSH)")
+    ap.add_argument("--flow", default=None, help="query: 'ip[:porta]-ip[:porta][/tcp|udp]'")
+    ap.add_argument("--out", type=Path, default=None, help="query: grava os pacotes neste pcap")
+    ap.add_argument("--show", type=int, default=10, help="query: pacotes listados no resumo")
+    args = ap.parse_args(argv)
+    if args.command == "build":
+        print(json.dumps(build_exp_index(args.exp_dir, args.tap, full=args.full), indent=2))
+        return
+    t0, t1 = args.since, args.until
+    if args.window:
+        t0, t1 = _window_bounds(args.exp_dir, args.window)
+    t = time.perf_counter()
+    with PcapIndex.for_experiment(args.exp_dir, args.tap) as idx:
+        stale = idx.stale()
+        if stale:
+            logger.warning(f"[PcapIndex] segmentos alterados desde o build: {stale} (rode build)")
+        rows = idx.flow(args.flow, t0, t1) if args.flow else idx.time_range(t0, t1)
+        dt = time.perf_counter() - t
+        report: Dict[str, Any] = {"packets": int(len(rows)), "query_ms": round(dt * 1e3, 3), "stale": stale}
+        if args.out is not None and len(rows):
+            report["out"] = str(idx.write_pcap(rows, args.out))
+        if args.show and len(rows):
+            report["first"] = idx.frame(rows[:args.show]).astype({"ts_ns": "int64"}).to_dict("records")
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# lab/datasets/pre_etl.py
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.sketches import SketchConfig
+from lab.datasets.zeek_reader import find_zeek_logs
+
+logger = setup_logger(Path('.logs'), name="[PreETL]")
+
+try:
+    import pyarrow  # noqa: F401  (opcional: saída parquet)
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# Colunas do conn.log usadas pelo pré-ETL (o resto nem é materializado)
+CONN_COLUMNS = [
+    "ts", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "proto",
+    "duration", "orig_bytes", "resp_bytes", "conn_state", "orig_pkts", "resp_pkts",
+]
+
+# Estados de conexão que indicam tentativa rejeitada/sem resposta (scan, flood)
+FAILED_STATES = ("S0", "REJ", "RSTO", "RSTR", "RSTOS0", "RSTRH", "SH", "SHR", "OTH")
+
+KEY_COLUMNS = ["window_start", "src_ip", "dst_ip", "dst_port"]
+ENGINES = ("pandas", "duckdb")
+# Cache das features por entrada/versão (ver features.py), dentro do experimento
+FEATURE_CACHE_DIR = ".feature_cache"
+
+
+def find_conn_logs(exp_dir: Path, tap: str = "sensor") -> List[Path]:
+    """conn.log do tap (inclui rotações .log.gz e workers AF_PACKET em zeek/w<i>/)."""
+    return find_zeek_logs(Path(exp_dir) / tap / "zeek", "conn")
+
+
+def aggregate_conn_windows(exp_dir: Path, window_s: int = 60, chunk_rows: int = 1_000_000,
+                           tap: str = "sensor", features: Optional[Iterable[str]] = None,
+                           cache: bool = True, sketch: Optional[SketchConfig] = None) -> pd.DataFrame:
+    """
+    Agregado por janela/(src, dst, dport) de um experimento, em memória (motor pandas).
+    As colunas vêm do registro de features (features.REGISTRY; `features` filtra); com cache=True
+    só as features novas/alteradas e as entradas novas/alteradas são recalculadas.
+    """
+    from lab.datasets.features import compute_window_features
+    exp_dir = Path(exp_dir)
+    return compute_window_features(exp_dir, window_s=window_s, features=features, tap=tap, chunk_rows=chunk_rows,
+                                   cache_dir=exp_dir / FEATURE_CACHE_DIR if cache else None, sketch=sketch)
+
+
+def _write_windows(out: pd.DataFrame, out_path: Path) -> None:
+    if out_path.suffix == ".parquet":
+        out.to_parquet(out_path, index=False, compression="zstd")
+    else:
+        out.to_csv(out_path, index=False)
+
+
+def generate_conn_features(exp_dir: Path, window_s: int = 60, chunk_rows: int = 1_000_000,
+                           tap: str = "sensor", out_path: Optional[Path] = None, engine: str = "pandas",
+                           windows: Optional[Sequence[Any]] = None, sketch: Optional[SketchConfig] = None) -> Path:
+    """
+    Agrega o conn.log do Zeek por janela fixa e (src, dst, dport) em blocos, com o rótulo da janela.
+    Só recalcula o que mudou (cache em <exp>/.feature_cache; ver features.py). Grava features_conn_window.parquet (ou .csv sem pyarrow) em exp_dir e retorna o caminho.
+    engine="duckdb" faz a agregação fora da memória (ver corpus_windows).
+    windows: resoluções extras (60, "300/60" = 300 s a cada 60 s, ...), calculadas na mesma passada
+    (features.compute_multi_window_features) em features_conn_window_<w300h60>.parquet ao lado.
+    sketch: precisão das contagens de distintos (sketches.SketchConfig; padrão HLL com erro de 1%).
+    """
+    exp_dir = Path(exp_dir)
+    if engine not in ENGINES:
+        raise ValueError(f"engine inválido: {engine} (use {ENGINES})")
+    if out_path is None:
+        out_path = exp_dir / ("features_conn_window.parquet" if _HAS_PYARROW else "features_conn_window.csv")
+    out_path = Path(out_path)
+    from lab.datasets.features import WindowSpec, compute_multi_window_features
+    main = WindowSpec(max(1, int(window_s)))
+    extra = list({sp.name: sp for sp in map(WindowSpec.parse, windows or ()) if sp.name != main.name}.values())
+    for old in exp_dir.glob(f"{out_path.stem}_w*{out_path.suffix}"):
+        if old.stem[len(out_path.stem) + 1:] not in {sp.name for sp in extra}:
+            old.unlink(missing_ok=True)
+    if engine == "duckdb":
+        from lab.datasets.corpus_windows import build_corpus_windows
+        path = build_corpus_windows([exp_dir], out_path, window_s=window_s, engine="duckdb", tap=tap,
+                                    with_exp_id=False, sketch=sketch)
+        if extra:
+            # Resoluções extras saem do cache por entrada (motor pandas), não do SQL
+            logger.info(f"[PreETL] janelas extras {[sp.name for sp in extra]} pelo motor pandas")
+            for name, df in compute_multi_window_features(exp_dir, extra, tap=tap, chunk_rows=chunk_rows,
+                                                          cache_dir=exp_dir / FEATURE_CACHE_DIR,
+                                                          sketch=sketch).items():
+                _write_windows(df, out_path.with_name(f"{out_path.stem}_{name}{out_path.suffix}"))
+        return path
+
+    t0 = time.perf_counter()
+    results = compute_multi_window_features(exp_dir, [main] + extra, tap=tap, chunk_rows=chunk_rows,
+                                            cache_dir=exp_dir / FEATURE_CACHE_DIR, sketch=sketch)
+    out = results.pop(main.name)
+    _write_windows(out, out_path)
+    for name, df in results.items():
+        _write_windows(df, out_path.with_name(f"{out_path.stem}_{name}{out_path.suffix}"))
+
+    dt = time.perf_counter() - t0
+    rows_in = out.attrs.get("rows_in", 0)
+    stats = {"rows_in": rows_in, "rows_out": len(out), "files": out.attrs.get("files"),
+             "window_s": max(1, int(window_s)), "extra_windows": list(results), "seconds": round(dt, 3),
+             "rows_per_s": round(rows_in / dt, 1) if dt > 0 else None}
+    logger.info(f"[PreETL] {out_path.name}: {json.dumps(stats)}")
+    return out_path
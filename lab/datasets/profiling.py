@@ -0,0 +1,277 @@
+# lab/datasets/profiling.py
+"""
+Perfil por etapa do ETL (pré-ETL, planejamento, shards, amostragem, publicação, CSV/Arrow):
+
+  meta/etl_profile.json           última execução: uma entrada por etapa
+  meta/etl_profile_history.jsonl  uma linha por execução (tempos por etapa) — regressões entre runs
+  meta/profile/<nn>-<etapa>.prof  dump do cProfile (ou .html do pyinstrument), só com dump=...
+
+Por etapa: tempo de parede, CPU do processo e dos filhos já encerrados (workers do pool), pico de
+RSS, linhas e bytes de entrada/saída. O pico de RSS é zerado no início de cada etapa
+(/proc/self/clear_refs) quando o kernel permite; senão é o pico acumulado do processo. Fora de
+POSIX (Windows) o pico vem do psutil, se instalado, e fica null no relatório sem ele. Bytes
+vêm de /proc/self/io (rchar/wchar) se a etapa não informar os seus — I/O dos workers não aparece
+ali, então as etapas paralelas somam os bytes relatados pelos shards.
+
+    prof = EtlProfiler("EXP1", dump="cprofile")       # ou ETL_PROFILE=cprofile|pyinstrument
+    with prof.stage("map") as st:
+        ...
+        st.rows_out = n
+    prof.write(out / "meta")
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.logger_setup import setup_logger
+
+logger = setup_logger(Path('.logs'), name="[Profile]")
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+    _HAS_PYINSTRUMENT = True
+except Exception:
+    _HAS_PYINSTRUMENT = False
+
+# resource e /proc só existem em POSIX/Linux; no Windows o pico vem do psutil (se instalado)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+    _HAS_PSUTIL = True
+except Exception:
+    _HAS_PSUTIL = False
+
+_HAS_PROC = Path("/proc/self").is_dir()
+
+PROFILE_FILE = "etl_profile.json"
+HISTORY_FILE = "etl_profile_history.jsonl"
+DUMP_MODES = ("cprofile", "pyinstrument")
+_HISTORY_MAX = 500
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de RSS do processo em MB; None quando a plataforma não informa."""
+    if _HAS_PROC:
+        try:
+            for line in Path("/proc/self/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        except Exception:
+            pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if _HAS_PSUTIL:
+        try:
+            mem = psutil.Process().memory_info()
+            return getattr(mem, "peak_wset", mem.rss) / (1 << 20)
+        except Exception:
+            pass
+    return None
+
+
+def _children_peak_rss_mb() -> Optional[float]:
+    """Maior pico de RSS entre os filhos já encerrados (só POSIX)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def _reset_peak_rss() -> bool:
+    if not _HAS_PROC:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except Exception:
+        return False
+
+
+def _io_bytes() -> Optional[Tuple[int, int]]:
+    if not _HAS_PROC:
+        return None
+    try:
+        fields = dict(line.split(": ") for line in Path("/proc/self/io").read_text().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except Exception:
+        return None
+
+
+def count_rows(path: Path) -> Optional[int]:
+    """Linhas de um .parquet (só o rodapé) ou .csv (sem o cabeçalho); None se não der para contar."""
+    try:
+        path = Path(path)
+        if path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+        with open(path, "rb") as fh:
+            return max(0, sum(chunk.count(b"\n") for chunk in iter(lambda: fh.read(4 << 20), b"")) - 1)
+    except Exception:
+        return None
+
+
+def resolve_dump(dump: Optional[str]) -> Optional[str]:
+    """Modo de dump pedido (ou $ETL_PROFILE); pyinstrument ausente cai para cProfile."""
+    mode = (dump if dump is not None else os.environ.get("ETL_PROFILE", "")).strip().lower() or None
+    if mode is None or mode in ("0", "off", "false"):
+        return None
+    if mode not in DUMP_MODES:
+        logger.warning(f"[Profile] dump desconhecido '{mode}' — usando cprofile")
+        return "cprofile"
+    if mode == "pyinstrument" and not _HAS_PYINSTRUMENT:
+        logger.warning("[Profile] pyinstrument ausente — usando cprofile")
+        return "cprofile"
+    return mode
+
+
+class _Dump:
+    """cProfile ou pyinstrument ativo durante uma etapa (ou chamada de shard)."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        if mode == "pyinstrument":
+            self.prof = _Pyinstrument()
+            self.prof.start()
+        else:
+            self.prof = cProfile.Profile()
+            self.prof.enable()
+
+    def stop(self) -> "_Dump":
+        if self.mode == "pyinstrument":
+            self.prof.stop()
+        else:
+            self.prof.disable()
+        return self
+
+    def save(self, base: Path) -> Path:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if self.mode == "pyinstrument":
+            path = base.with_suffix(".html")
+            path.write_text(self.prof.output_html(), encoding="utf-8")
+        else:
+            path = base.with_suffix(".prof")
+            self.prof.dump_stats(str(path))
+        return path
+
+
+def profile_call(fn: Callable[[Any], Any], arg: Any, mode: Optional[str], out: Optional[Path]) -> Any:
+    """Roda fn(arg) sob o profiler `mode` e grava o dump em `out` (usado nos workers do pool)."""
+    if not mode or out is None:
+        return fn(arg)
+    dump = _Dump(mode)
+    try:
+        return fn(arg)
+    finally:
+        dump.stop().save(Path(out))
+
+
+@dataclass
+class StageStats:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # CPU/RSS de processos filhos encerrados durante a etapa (pool de workers)
+    children_cpu_s: float = 0.0
+    # None: a plataforma não informa RSS (Windows sem psutil)
+    peak_rss_mb: Optional[float] = None
+    children_peak_rss_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    dump: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+class EtlProfiler:
+    """Coleta StageStats das etapas de uma execução; write() grava o JSON, o histórico e os dumps."""
+
+    def __init__(self, name: str, dump: Optional[str] = None):
+        self.name = name
+        self.dump = resolve_dump(dump)
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.stages: List[StageStats] = []
+        self._dumps: List[Tuple[StageStats, _Dump]] = []
+        self._open: Dict[int, Tuple[Any, Any, float, Optional[_Dump]]] = {}
+        self.rss_reset = _reset_peak_rss()
+
+    def begin(self, name: str, rows_in: Optional[int] = None) -> StageStats:
+        """Abre uma etapa (para trechos longos sem bloco `with`); feche com end()."""
+        st = StageStats(name, rows_in=rows_in)
+        _reset_peak_rss()
+        self._open[id(st)] = (_io_bytes(), os.times(), time.perf_counter(),
+                              _Dump(self.dump) if self.dump else None)
+        return st
+
+    def end(self, st: StageStats) -> StageStats:
+        io0, c0, t0, dump = self._open.pop(id(st))
+        if dump is not None:
+            self._dumps.append((st, dump.stop()))
+        st.wall_s = time.perf_counter() - t0
+        c1 = os.times()
+        st.cpu_s = (c1.user - c0.user) + (c1.system - c0.system)
+        st.children_cpu_s = (c1.children_user - c0.children_user) + (c1.children_system - c0.children_system)
+        io1 = _io_bytes()
+        if io0 and io1:
+            st.bytes_read = io1[0] - io0[0] if st.bytes_read is None else st.bytes_read
+            st.bytes_written = io1[1] - io0[1] if st.bytes_written is None else st.bytes_written
+        st.peak_rss_mb = peak_rss_mb()
+        st.children_peak_rss_mb = _children_peak_rss_mb()
+        self.stages.append(st)
+        return st
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[StageStats]:
+        st = self.begin(name, rows_in=rows_in)
+        try:
+            yield st
+        finally:
+            self.end(st)
+
+    def dump_path(self, meta_dir: Path, name: str) -> Optional[Path]:
+        """Base do dump de um shard/etapa sob meta/profile (None sem dump)."""
+        return Path(meta_dir) / "profile" / name if self.dump else None
+
+    def summary(self) -> Dict[str, Any]:
+        rss = [v for s in self.stages for v in (s.peak_rss_mb, s.children_peak_rss_mb) if v is not None]
+        return {"name": self.name, "started_at": self.started_at, "dump": self.dump,
+                "rss_per_stage": self.rss_reset,
+                "wall_s": round(sum(s.wall_s for s in self.stages), 3),
+                "cpu_s": round(sum(s.cpu_s + s.children_cpu_s for s in self.stages), 3),
+                "peak_rss_mb": round(max(rss), 1) if rss else None}
+
+    def write(self, meta_dir: Path, extra: Optional[Dict[str, Any]] = None) -> Path:
+        meta_dir = Path(meta_dir)
+        meta_dir.mkdir(parents=True, exist_ok=True)
+        for i, (st, dump) in enumerate(self._dumps):
+            try:
+                # Nome de etapa vira nome de arquivo (etl:<exp> => etl_<exp>; ':' não vale no Windows)
+                base = meta_dir / "profile" / f"{i:02d}-{re.sub(r'[^A-Za-z0-9_.-]', '_', st.name)}"
+                st.dump = dump.save(base).relative_to(meta_dir).as_posix()
+            except Exception as e:
+                logger.warning(f"[Profile] dump da etapa {st.name} falhou: {e}")
+        self._dumps = []
+        report = {**self.summary(), **(extra or {}), "stages": [s.as_dict() for s in self.stages]}
+        path = meta_dir / PROFILE_FILE
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        hist = meta_dir / HISTORY_FILE
+        line = json.dumps({**self.summary(), **(extra or {}),
+                           "stages": {s.name: round(s.wall_s, 3) for s in self.stages}})
+        lines = hist.read_text(encoding="utf-8").splitlines() if hist.exists() else []
+        hist.write_text("\n".join((lines + [line])[-_HISTORY_MAX:]) + "\n", encoding="utf-8")
+        return path
@@ -0,0 +1,112 @@
+# lab/datasets/sampling.py
+"""
+Amostragem estratificada do ETL final para capturas de flood (exp_heavy_syn, exp_dos): milhões de
+fluxos de ataque contra poucos benignos.
+
+Estrato = (label, janela de window_s segundos). Cada fluxo recebe uma chave pseudoaleatória
+determinística u = hash(uid) em [0, 1); o reservatório de um estrato são os k fluxos de menor u
+(bottom-k). Bottom-k é combinável: cada shard guarda até `per_window` fluxos por estrato e a
+contagem total; juntar shards e cortar de novo dá exatamente o reservatório de uma passada
+só, independente do nº de workers.
+
+No fim (finalize) cada rótulo acima de target_ratio × (rótulo mais raro) é cortado para essa
+cota, distribuída entre as janelas proporcionalmente ao nº de fluxos de cada uma (pelo menos um
+fluxo por janela, para nenhuma janela sumir do dataset). A coluna
+sample_weight = fluxos do estrato / fluxos mantidos (Horvitz-Thompson): somas e métricas
+ponderadas estimam a captura inteira.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+WEIGHT_COLUMN = "sample_weight"
+KEY_COLUMN = "_sample_u"
+_STRATUM = ["label", "_window"]
+
+
+@dataclass(frozen=True)
+class SamplingSpec:
+    # Cota de cada rótulo = target_ratio (>= 1) × nº de fluxos do rótulo mais raro (0 => só o teto por janela)
+    target_ratio: float = 1.0
+    window_s: int = 60
+    # Teto de fluxos por (label, janela) guardado no streaming
+    per_window: int = 5000
+    seed: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def sample_keys(df: pd.DataFrame, seed: int = 0) -> np.ndarray:
+    """u em [0, 1) por fluxo, estável entre execuções e máquinas (hash do uid do Zeek)."""
+    key = f"{int(seed):016d}"[-16:]
+    h = pd.util.hash_array(df["uid"].astype(object).to_numpy(), hash_key=key)
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def reservoir(df: pd.DataFrame, spec: SamplingSpec) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Bottom-k por (label, janela) de um bloco. Retorna (fluxos mantidos com a chave u,
+    contagens [label, _window, n]) — a entrada de merge/finalize.
+    """
+    work = df.assign(**{KEY_COLUMN: sample_keys(df, spec.seed),
+                        "_window": np.floor_divide(df["ts"].to_numpy(dtype=np.float64), spec.window_s).astype(np.int64)})
+    counts = work.groupby(_STRATUM, sort=False, observed=True).size().rename("n").reset_index()
+    work = work.sort_values(_STRATUM + [KEY_COLUMN], kind="stable")
+    kept = work[work.groupby(_STRATUM, sort=False, observed=True).cumcount().to_numpy() < spec.per_window]
+    return kept.drop(columns="_window"), counts
+
+
+def merge_counts(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    if not parts:
+        return pd.DataFrame({"label": pd.Series(dtype=object), "_window": pd.Series(dtype=np.int64),
+                             "n": pd.Series(dtype=np.int64)})
+    return pd.concat(parts, ignore_index=True).groupby(_STRATUM, sort=True, observed=True)["n"].sum().reset_index()
+
+
+def _bottom_k(kept: pd.DataFrame, spec: SamplingSpec) -> pd.DataFrame:
+    kept = kept.assign(_window=np.floor_divide(kept["ts"].to_numpy(dtype=np.float64), spec.window_s).astype(np.int64))
+    kept = kept.sort_values(_STRATUM + [KEY_COLUMN], kind="stable")
+    rank = kept.groupby(_STRATUM, sort=False, observed=True).cumcount().to_numpy()
+    return kept[rank < spec.per_window]
+
+
+def trim(parts: List[pd.DataFrame], spec: SamplingSpec) -> pd.DataFrame:
+    """Junta reservatórios (de blocos de um shard) e corta de novo: memória ~ per_window por estrato."""
+    return _bottom_k(pd.concat(parts, ignore_index=True), spec).drop(columns="_window")
+
+
+def finalize(kept: pd.DataFrame, counts: pd.DataFrame, spec: SamplingSpec) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Junta os reservatórios dos shards, aplica a cota por rótulo e grava sample_weight."""
+    kept = _bottom_k(kept, spec)
+
+    per_label = counts.groupby("label", observed=True)["n"].sum()
+    quota: Dict[str, int] = {}
+    if spec.target_ratio and len(per_label):
+        # Razão < 1 cortaria o próprio rótulo mais raro
+        cap = max(1, math.ceil(max(1.0, spec.target_ratio) * int(per_label.min())))
+        quota = {str(lbl): cap for lbl, n in per_label.items() if n > cap}
+    alloc = counts.copy()
+    stored = kept.groupby(_STRATUM, sort=False, observed=True).size().rename("stored").reset_index()
+    alloc = alloc.merge(stored, on=_STRATUM, how="left").fillna({"stored": 0})
+    alloc["k"] = alloc["stored"].astype(np.int64)
+    for lbl, cap in quota.items():
+        m = (alloc["label"] == lbl).to_numpy()
+        share = np.maximum(1, np.floor(cap * alloc.loc[m, "n"].to_numpy() / per_label[lbl])).astype(np.int64)
+        alloc.loc[m, "k"] = np.minimum(alloc.loc[m, "k"].to_numpy(), share)
+    alloc["weight"] = np.where(alloc["k"] > 0, alloc["n"] / alloc["k"].clip(lower=1), 0.0)
+
+    kept = kept.merge(alloc[_STRATUM + ["k", "weight"]], on=_STRATUM, how="left")
+    rank = kept.groupby(_STRATUM, sort=False, observed=True).cumcount().to_numpy()
+    out = kept[rank < kept["k"].to_numpy()].rename(columns={"weight": WEIGHT_COLUMN})
+    out = out.drop(columns=["_window", "k", KEY_COLUMN]).sort_values("ts", kind="stable").reset_index(drop=True)
+    report = {"spec": spec.as_dict(), "rows_in": int(counts["n"].sum()), "rows_out": len(out),
+              "by_label": {str(lbl): {"flows": int(n), "kept": int((out["label"] == lbl).sum())}
+                           for lbl, n in per_label.items()},
+              "quota": quota}
+    return out, report
@@ -0,0 +1,106 @@
+# lab/datasets/sketches.py
+"""
+Contagem de distintos por grupo com memória limitada (HyperLogLog) para as features de varredura
+(portas/hosts distintos por origem na janela) — `nmap -p 1-65535` ou flood com origem forjada
+não explodem a memória do pré-ETL.
+
+O estado é um DataFrame esparso: uma linha por (grupo, registrador) com o maior rho visto.
+Cada grupo ocupa no máximo m = 2^p linhas, qualquer que seja o nº de valores; com poucos
+valores ocupa só uma linha por valor (e a estimativa cai na contagem linear, quase exata).
+Estados se combinam por máximo (merge_states): entre blocos, arquivos/shards e janelas (tumbling
+maiores e hopping saem da união dos estados das janelas menores).
+
+SketchConfig(error=0.01) escolhe p pelo erro relativo padrão 1.04/sqrt(m); exact=True guarda o
+hash de 64 bits de cada valor distinto (validação: memória proporcional aos distintos).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Chave fixa: o mesmo valor cai no mesmo registrador em qualquer processo/máquina
+_HASH_KEY = "lab-sketch-00001"
+
+
+@dataclass(frozen=True)
+class SketchConfig:
+    # Erro relativo padrão do HyperLogLog (1.04/sqrt(2^p)); p fica em [4, 16]
+    error: float = 0.01
+    exact: bool = False
+
+    @property
+    def p(self) -> int:
+        return min(16, max(4, math.ceil(math.log2((1.04 / max(float(self.error), 1e-6)) ** 2))))
+
+    @property
+    def m(self) -> int:
+        return 1 << self.p
+
+    @property
+    def tag(self) -> str:
+        return "exact" if self.exact else f"hll{self.p}"
+
+    @property
+    def columns(self) -> List[str]:
+        """Colunas do estado além das chaves do grupo."""
+        return ["h"] if self.exact else ["reg", "rho"]
+
+
+def hash_values(values) -> np.ndarray:
+    """Hash uint64 estável (números e texto)."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        return pd.util.hash_array(arr, hash_key=_HASH_KEY, categorize=False)
+    # Texto: categorize=True hasheia cada valor único uma vez só
+    return pd.util.hash_array(arr.astype(object), hash_key=_HASH_KEY)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Nº de bits de cada uint64 (0 => 0), exato: metades de 32 bits cabem no float64."""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1]).astype(np.int64)
+
+
+def sketch_state(keys: pd.DataFrame, values, cfg: SketchConfig) -> pd.DataFrame:
+    """Estado (já reduzido) dos `values` de cada grupo `keys` (mesmo nº de linhas)."""
+    h = hash_values(values)
+    names = list(keys.columns)
+    if cfg.exact:
+        return keys.assign(h=h).drop_duplicates(ignore_index=True)
+    p = cfg.p
+    rest = h & np.uint64((1 << (64 - p)) - 1)
+    state = keys.assign(reg=(h >> np.uint64(64 - p)).astype(np.uint16),
+                        rho=((64 - p) - _bit_length(rest) + 1).astype(np.uint8))
+    return state.groupby(names + ["reg"], sort=False, observed=True)["rho"].max().reset_index()
+
+
+def merge_states(states: Sequence[pd.DataFrame], keys: Sequence[str], cfg: SketchConfig) -> pd.DataFrame:
+    """União de estados dos mesmos grupos (associativa e idempotente)."""
+    frame = pd.concat([s for s in states if s is not None], ignore_index=True)
+    if cfg.exact:
+        return frame.drop_duplicates(ignore_index=True)
+    return frame.groupby(list(keys) + ["reg"], sort=False, observed=True)["rho"].max().reset_index()
+
+
+def estimate(state: pd.DataFrame, keys: Sequence[str], cfg: SketchConfig) -> pd.DataFrame:
+    """Nº estimado de distintos por grupo: keys + ["estimate"] (int64)."""
+    keys = list(keys)
+    g = state.groupby(keys, sort=False, observed=True)
+    if cfg.exact:
+        return g.size().rename("estimate").astype(np.int64).reset_index()
+    m = float(cfg.m)
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(cfg.m, 0.7213 / (1 + 1.079 / m))
+    agg = state.assign(_z=np.exp2(-state["rho"].to_numpy(dtype=np.float64))).groupby(
+        keys, sort=False, observed=True).agg(present=("reg", "size"), z=("_z", "sum")).reset_index()
+    zeros = m - agg["present"].to_numpy(dtype=np.float64)
+    raw = alpha * m * m / (zeros + agg["z"].to_numpy())
+    # Faixa baixa: contagem linear pelos registradores vazios (bem mais precisa)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.where(zeros > 0, zeros, 1.0))
+    est = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+    return agg[keys].assign(estimate=np.rint(est).astype(np.int64))
@@ -0,0 +1,791 @@
+# lab/datasets/synth.py
+"""
+Experimento sintético no layout do Runner, sem VMs: tráfego benigno + os padrões de ataque dos
+experimentos do lab, para medir o ETL de 10K a 100M linhas.
+
+  <exp>/metadata.json, timeline.json      alvos e janelas (rótulo do template + token de ação)
+  <exp>/<tap>/zeek/conn.log, ssh.log, http.log  (+ rotações <log>.<stamp>.log[.gz])
+  <exp>/<tap>/pcap/exp_<stamp>.pcap       só cabeçalhos (snaplen 54), rotação por tempo (--pcap)
+  <exp>/victim/auth.log                   sshd: Failed/Accepted/Connection closed das sessões SSH
+  <exp>/attacker/lists/hydra_<victim>.out credencial encontrada por execução do Hydra
+
+Padrões (ATTACKS), um depois do outro no intervalo, com benigno o tempo todo:
+  scan        nmap -sS: attacker -> victim em portas aleatórias (REJ/S0; RSTO nas abertas)
+  brute_ssh   hydra ssh: sessões curtas na 22, 1-3 senhas por conexão, uma aceita no fim
+  brute_http  hydra http-post-form: POST /login na 8081, 302 no acerto
+  dos         slowhttptest: conexões longas e quase sem bytes na 8080 (S1/SF/RSTO)
+  syn_flood   hping3 -S: um SYN por porta de origem na 8080 (S0)
+
+A geração é vetorizada por fatias de tempo (~block_rows linhas cada): a saída já sai ordenada,
+a memória fica presa à fatia e o texto TSV sai do pyarrow.csv (pandas sem pyarrow). Os uid
+ligam conn.log a ssh.log/http.log, e os eventos do auth.log caem dentro dos fluxos SSH (o join
+do auth_events funciona como num run real). Mesma semente => mesmos arquivos.
+
+    python -m lab.datasets.synth data/SYN_1M --rows 1000000 --pcap
+    python -m lab.datasets.synth data/SYN_SCAN --rows 100000 --attacks scan brute_ssh --zeek-rotate-s 600
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import math
+import os
+import shutil
+import struct
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+from lab.datasets.zeek_reader import ip_to_str
+
+logger = setup_logger(Path('.logs'), name="[Synth]")
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# nome: (rótulo do template no timeline, token de ação do Runner, peso nas linhas de ataque)
+ATTACKS: Dict[str, Tuple[str, Optional[str], float]] = {
+    "scan": ("NmapTCP", "NmapScanAction", 1.0),
+    "brute_ssh": ("HydraSSH", "HydraBruteAction", 1.0),
+    "brute_http": ("HydraHTTP", "HydraBruteAction", 1.0),
+    "dos": ("SlowHTTPDoS", None, 1.0),
+    "syn_flood": ("Hping3SYN", None, 3.0),
+}
+_KINDS = ("benign",) + tuple(ATTACKS)
+_K = {name: i for i, name in enumerate(_KINDS)}
+
+CONN_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "proto", "service",
+               "duration", "orig_bytes", "resp_bytes", "conn_state", "missed_bytes", "history",
+               "orig_pkts", "orig_ip_bytes", "resp_pkts", "resp_ip_bytes", "tunnel_parents"]
+CONN_TYPES = ["time", "string", "addr", "port", "addr", "port", "enum", "string",
+              "interval", "count", "count", "string", "count", "string",
+              "count", "count", "count", "count", "set[string]"]
+SSH_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "version", "auth_success",
+              "auth_attempts", "direction", "client", "server"]
+SSH_TYPES = ["time", "string", "addr", "port", "addr", "port", "count", "bool", "count", "enum", "string", "string"]
+HTTP_FIELDS = ["ts", "uid", "id.orig_h", "id.orig_p", "id.resp_h", "id.resp_p", "trans_depth", "method", "host",
+               "uri", "version", "user_agent", "request_body_len", "response_body_len", "status_code", "status_msg"]
+HTTP_TYPES = ["time", "string", "addr", "port", "addr", "port", "count", "string", "string",
+              "string", "string", "string", "count", "count", "count", "string"]
+
+# conn_state -> histórico típico (TCP); UDP usa "Dd"/"D"
+_STATES = np.array(["SF", "S0", "REJ", "RSTO", "SH", "S1"], dtype=object)
+_HISTORY = np.array(["ShADadFf", "S", "Sr", "ShADadR", "Sh", "ShADad"], dtype=object)
+SF, S0, REJ, RSTO, SH, S1 = range(6)
+_TCP, _UDP = 6, 17
+
+# Serviços benignos: (porta, proto, service, peso, destino: "victim" | "lan" | "wan" | "dns")
+_BENIGN = (
+    (443, _TCP, "ssl", 0.35, "wan"),
+    (80, _TCP, "http", 0.18, "lan"),
+    (53, _UDP, "dns", 0.20, "dns"),
+    (8080, _TCP, "http", 0.10, "victim"),
+    (8081, _TCP, "http", 0.08, "victim"),
+    (22, _TCP, "ssh", 0.04, "victim"),
+    (3306, _TCP, "-", 0.05, "lan"),
+)
+_WAN = ("93.184.216.34", "151.101.1.69", "140.82.112.3", "172.217.29.46", "104.16.132.229")
+_SCAN_OPEN = (22, 80, 8080, 8081)
+_BENIGN_URIS = np.array(["/", "/index.html", "/static/app.js", "/static/style.css", "/api/status", "/favicon.ico"],
+                        dtype=object)
+_UID_ALPHABET = np.frombuffer(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+_SSH_SERVER = "SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.6"
+PCAP_SNAPLEN = 54
+
+
+def _u32(ip: str) -> int:
+    a, b, c, d = (int(x) for x in ip.split("."))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def _iso(t: float) -> str:
+    return datetime.fromtimestamp(t, tz=timezone.utc).isoformat()
+
+
+def _stamp(t: float) -> str:
+    return datetime.fromtimestamp(t, tz=timezone.utc).strftime("%Y-%m-%d-%H-%M-%S")
+
+
+@dataclass
+class SynthSpec:
+    # Linhas do conn.log (somando as rotações); o resto (ssh/http/auth/pcap) sai proporcional
+    rows: int = 100_000
+    attacks: Tuple[str, ...] = tuple(ATTACKS)
+    # Fração das linhas que vem dos ataques (dividida pelos pesos de ATTACKS)
+    attack_share: float = 0.3
+    t0: float = 1_700_000_000.0
+    span_s: float = 3600.0
+    benign_hosts: int = 40
+    attacker_ip: str = "192.168.56.10"
+    victim_ip: str = "192.168.56.20"
+    user: str = "tcc"
+    password: str = "123456"
+    tap: str = "sensor"
+    # 0 => um arquivo por log; senão rotação a cada N s, como zeek_rotate_seconds
+    zeek_rotate_s: float = 0.0
+    gzip_rotated: bool = False
+    pcap: bool = False
+    pcap_packets_per_flow: int = 6
+    pcap_rotate_s: float = 300.0
+    seed: int = 42
+    block_rows: int = 500_000
+    scan_ports: List[int] = field(default_factory=lambda: [22, 80, 8081])
+
+    def __post_init__(self):
+        self.attacks = tuple(self.attacks)
+        unknown = [a for a in self.attacks if a not in ATTACKS]
+        if unknown:
+            raise ValueError(f"ataque(s) desconhecido(s): {unknown} (use {tuple(ATTACKS)})")
+        if self.rows < 1 or self.span_s <= 0:
+            raise ValueError("rows e span_s precisam ser positivos")
+
+
+@dataclass(frozen=True)
+class SynthWindow:
+    attack: str
+    t0: float
+    t1: float
+
+    @property
+    def label(self) -> str:
+        return ATTACKS[self.attack][0]
+
+    @property
+    def t_success(self) -> float:
+        """Instante em que o brute force acerta a senha (perto do fim da janela)."""
+        return self.t0 + 0.95 * (self.t1 - self.t0)
+
+
+def attack_windows(spec: SynthSpec) -> List[SynthWindow]:
+    """Ataques em sequência depois de 10% de benigno puro; cada um ocupa o meio do seu trecho."""
+    if not spec.attacks:
+        return []
+    slot = 0.9 * spec.span_s / len(spec.attacks)
+    start = spec.t0 + 0.1 * spec.span_s
+    return [SynthWindow(a, start + i * slot + 0.1 * slot, start + i * slot + 0.8 * slot)
+            for i, a in enumerate(spec.attacks)]
+
+
+def timeline_stages(windows: List[SynthWindow]) -> List[Dict[str, str]]:
+    """Estágios no formato do Runner: <rótulo>_start/_end e, se houver, o token de ação."""
+    stages = []
+    for w in windows:
+        token = ATTACKS[w.attack][1]
+        for name in (w.label, token) if token else (w.label,):
+            stages.append({"stage": f"{name}_start", "ts": _iso(w.t0)})
+            stages.append({"stage": f"{name}_end", "ts": _iso(w.t1)})
+    return stages
+
+
+def _split(total: int, weights: np.ndarray) -> np.ndarray:
+    """Divide `total` inteiro proporcionalmente aos pesos (soma exata)."""
+    w = np.asarray(weights, dtype=np.float64)
+    if total <= 0 or w.sum() <= 0:
+        return np.zeros(len(w), dtype=np.int64)
+    cum = np.rint(total * np.cumsum(w) / w.sum()).astype(np.int64)
+    return np.diff(np.concatenate([[0], cum]))
+
+
+def make_uids(start: int, n: int, seed: int) -> np.ndarray:
+    """uid estilo Zeek ('C' + 17 base62), únicos por índice global e estáveis por semente."""
+    x = np.arange(start, start + n, dtype=np.uint64) + np.uint64((seed * 0x632BE59BD9B4E019) % (1 << 64))
+    out = np.empty((n, 18), dtype=np.uint8)
+    out[:, 0] = ord("C")
+    with np.errstate(over="ignore"):
+        for part, (lo, hi) in enumerate(((1, 10), (10, 18))):
+            # Duas palavras de 64 bits (splitmix64) dão os 17 dígitos
+            x = x + np.uint64(0x9E3779B97F4A7C15)
+            z = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z ^= z >> np.uint64(31)
+            for i in range(lo, hi):
+                out[:, i] = _UID_ALPHABET[(z % np.uint64(62)).astype(np.int64)]
+                z //= np.uint64(62)
+    return out.view("S18").ravel()
+
+
+class _Hosts:
+    def __init__(self, spec: SynthSpec):
+        lan = _u32("192.168.56.0")
+        self.attacker = _u32(spec.attacker_ip)
+        self.victim = _u32(spec.victim_ip)
+        self.dns = lan | 1
+        self.clients = np.array([lan | (100 + i % 150) for i in range(max(1, spec.benign_hosts))], dtype=np.uint32)
+        self.lan = np.array([self.victim] + [lan | h for h in (30, 31, 32, 33)], dtype=np.uint32)
+        self.wan = np.array([_u32(ip) for ip in _WAN], dtype=np.uint32)
+
+
+def _flows(n: int, ts: np.ndarray, kind: str) -> Dict[str, np.ndarray]:
+    return {"ts": ts, "kind": np.full(n, _K[kind], dtype=np.int8), "proto": np.full(n, _TCP, dtype=np.int8),
+            "attempts": np.zeros(n, dtype=np.int64), "success": np.zeros(n, dtype=bool)}
+
+
+def _benign(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "benign")
+    svc = rng.choice(len(_BENIGN), n, p=np.array([s[3] for s in _BENIGN]) / sum(s[3] for s in _BENIGN))
+    port = np.array([s[0] for s in _BENIGN])[svc]
+    proto = np.array([s[1] for s in _BENIGN], dtype=np.int8)[svc]
+    dest = np.array([s[4] for s in _BENIGN], dtype=object)[svc]
+    dst = np.where(dest == "victim", hosts.victim, hosts.dns).astype(np.uint32)
+    lan, wan = dest == "lan", dest == "wan"
+    dst[lan] = hosts.lan[rng.integers(0, len(hosts.lan), int(lan.sum()))]
+    dst[wan] = hosts.wan[rng.integers(0, len(hosts.wan), int(wan.sum()))]
+    udp = proto == _UDP
+    state = rng.choice([SF, S0, REJ, RSTO, SH], n, p=[0.9, 0.03, 0.02, 0.03, 0.02])
+    state[udp] = np.where(rng.random(int(udp.sum())) < 0.95, SF, S0)
+    dead = (state == S0) | (state == REJ)
+    dur = np.where(udp, rng.uniform(0.001, 0.05, n), np.minimum(rng.lognormal(-1.0, 1.5, n), 600.0))
+    ob = np.where(udp, rng.integers(30, 64, n), np.minimum(rng.lognormal(6.0, 1.2, n), 5e6).astype(np.int64))
+    rb = np.where(udp, rng.integers(50, 320, n), np.minimum(rng.lognormal(8.0, 2.0, n), 5e7).astype(np.int64))
+    f.update(src=hosts.clients[rng.integers(0, len(hosts.clients), n)], sport=rng.integers(32768, 61000, n),
+             dst=dst, dport=port, proto=proto, service=np.array([s[2] for s in _BENIGN], dtype=object)[svc],
+             state=state, duration=np.where(dead, 0.0, dur), orig_bytes=np.where(dead, 0, ob),
+             resp_bytes=np.where(dead, 0, rb))
+    f["service"][dead] = "-"
+    f["orig_pkts"] = np.where(udp, 1, 2 + f["orig_bytes"] // 1000)
+    f["resp_pkts"] = np.where(dead, (state == REJ).astype(np.int64), np.where(udp, 1, 2 + f["resp_bytes"] // 1400))
+    f["orig_pkts"] = np.where(dead, np.where(state == S0, rng.integers(1, 4, n), 1), f["orig_pkts"])
+    f["attempts"] = np.where(f["service"] == "ssh", 1, 0)
+    f["success"] = f["service"] == "ssh"
+    return f
+
+
+def _scan(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "scan")
+    dport = rng.integers(1, 65536, n)
+    # As portas abertas aparecem algumas vezes (retransmissão/versão), como num -sS com -sV leve
+    hot = rng.random(n) < 0.02
+    dport[hot] = rng.choice(np.array(_SCAN_OPEN), int(hot.sum()))
+    is_open = np.isin(dport, _SCAN_OPEN)
+    state = np.where(is_open, RSTO, np.where(rng.random(n) < 0.1, S0, REJ))
+    f.update(src=np.full(n, hosts.attacker, dtype=np.uint32),
+             sport=rng.choice(np.array([rng.integers(40000, 65000) for _ in range(2)]), n),
+             dst=np.full(n, hosts.victim, dtype=np.uint32), dport=dport, service=np.full(n, "-", dtype=object),
+             state=state, duration=np.where(state == S0, 0.0, rng.uniform(5e-5, 1e-3, n)),
+             orig_bytes=np.zeros(n, dtype=np.int64), resp_bytes=np.zeros(n, dtype=np.int64),
+             orig_pkts=np.where(state == RSTO, 2, 1), resp_pkts=np.where(state == S0, 0, 1))
+    return f
+
+
+def _brute_ssh(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "brute_ssh")
+    state = np.where(rng.random(n) < 0.85, SF, RSTO)
+    f.update(src=np.full(n, hosts.attacker, dtype=np.uint32), sport=rng.integers(40000, 61000, n),
+             dst=np.full(n, hosts.victim, dtype=np.uint32), dport=np.full(n, 22),
+             service=np.full(n, "ssh", dtype=object), state=state, duration=rng.uniform(1.0, 4.0, n),
+             orig_bytes=rng.integers(1500, 2600, n), resp_bytes=rng.integers(2500, 3600, n),
+             orig_pkts=rng.integers(15, 31, n), resp_pkts=rng.integers(12, 26, n),
+             attempts=rng.integers(1, 4, n))
+    return f
+
+
+def _brute_http(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "brute_http")
+    f.update(src=np.full(n, hosts.attacker, dtype=np.uint32), sport=rng.integers(40000, 61000, n),
+             dst=np.full(n, hosts.victim, dtype=np.uint32), dport=np.full(n, 8081),
+             service=np.full(n, "http", dtype=object), state=np.full(n, SF), duration=rng.uniform(0.02, 0.3, n),
+             orig_bytes=rng.integers(300, 520, n), resp_bytes=rng.integers(600, 1300, n),
+             orig_pkts=rng.integers(5, 9, n), resp_pkts=rng.integers(4, 8, n), attempts=np.ones(n, dtype=np.int64))
+    return f
+
+
+def _dos(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "dos")
+    state = rng.choice([S1, SF, RSTO], n, p=[0.4, 0.3, 0.3])
+    ob = rng.integers(200, 3000, n)
+    f.update(src=np.full(n, hosts.attacker, dtype=np.uint32), sport=rng.integers(32768, 61000, n),
+             dst=np.full(n, hosts.victim, dtype=np.uint32), dport=np.full(n, 8080),
+             service=np.full(n, "http", dtype=object), state=state, duration=rng.uniform(5.0, 180.0, n),
+             orig_bytes=ob, resp_bytes=np.where(state == SF, rng.integers(0, 400, n), 0),
+             orig_pkts=4 + ob // 60, resp_pkts=rng.integers(1, 4, n))
+    return f
+
+
+def _syn_flood(n, ts, hosts: _Hosts, spec, rng) -> Dict[str, np.ndarray]:
+    f = _flows(n, ts, "syn_flood")
+    # hping3 incrementa a porta de origem a cada pacote
+    base = int(rng.integers(1024, 60000))
+    f.update(src=np.full(n, hosts.attacker, dtype=np.uint32),
+             sport=1024 + (base + np.arange(n)) % (65536 - 1024), dst=np.full(n, hosts.victim, dtype=np.uint32),
+             dport=np.full(n, 8080), service=np.full(n, "-", dtype=object), state=np.full(n, S0),
+             duration=np.zeros(n), orig_bytes=np.zeros(n, dtype=np.int64), resp_bytes=np.zeros(n, dtype=np.int64),
+             orig_pkts=np.ones(n, dtype=np.int64), resp_pkts=np.zeros(n, dtype=np.int64))
+    return f
+
+
+_GENERATORS = {"benign": _benign, "scan": _scan, "brute_ssh": _brute_ssh, "brute_http": _brute_http,
+               "dos": _dos, "syn_flood": _syn_flood}
+
+
+def _ip_text(values: np.ndarray) -> np.ndarray:
+    """uint32 -> texto; poucos hosts distintos, então converte só os únicos."""
+    uniq, inv = np.unique(values, return_inverse=True)
+    return ip_to_str(uniq)[inv]
+
+
+def _fixed6(values: np.ndarray):
+    """Segundos com 6 casas ('%.6f', como o Zeek grava time/interval)."""
+    micros = np.rint(np.asarray(values, dtype=np.float64) * 1e6).astype(np.int64)
+    if not _HAS_PYARROW:
+        return pd.Series(micros / 1e6).map("{:.6f}".format).to_numpy(dtype=object)
+    sec = pc.cast(pa.array(micros // 1_000_000), pa.string())
+    frac = pc.utf8_lpad(pc.cast(pa.array(micros % 1_000_000), pa.string()), 6, "0")
+    return pc.binary_join_element_wise(sec, frac, ".")
+
+
+def _tsv(columns: Dict[str, Any]) -> bytes:
+    """Linhas TSV (sem cabeçalho) de colunas já no formato do Zeek."""
+    if _HAS_PYARROW:
+        table = pa.table({k: (pa.array(v).cast(pa.string()) if isinstance(v, np.ndarray) and v.dtype.kind == "S"
+                              else v) for k, v in columns.items()})
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(table, sink, pa_csv.WriteOptions(include_header=False, delimiter="\t",
+                                                          quoting_style="none"))
+        return sink.getvalue().to_pybytes()
+    frame = pd.DataFrame({k: (v.astype(str) if isinstance(v, np.ndarray) and v.dtype.kind == "S" else v)
+                          for k, v in columns.items()})
+    return frame.to_csv(sep="\t", header=False, index=False, lineterminator="\n").encode("utf-8")
+
+
+class _ZeekLog:
+    """Um log do Zeek em TSV com rotação por tempo: <name>.<stamp>.log[.gz]; o corrente fica <name>.log."""
+
+    def __init__(self, zeek_dir: Path, name: str, fields: List[str], types: List[str], t0: float,
+                 rotate_s: float = 0.0, gzip_rotated: bool = False):
+        self.dir, self.name, self.fields, self.types = Path(zeek_dir), name, fields, types
+        self.rotate_s, self.gzip_rotated = float(rotate_s or 0), gzip_rotated
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / f"{name}.log"
+        self.rows = 0
+        self.files: List[Path] = []
+        self._open(t0)
+
+    def _open(self, t: float) -> None:
+        self.opened = t
+        self.fh = open(self.path, "wb")
+        self.fh.write((f"#separator \\x09\n#set_separator\t,\n#empty_field\t(empty)\n#unset_field\t-\n"
+                       f"#path\t{self.name}\n#open\t{_stamp(t)}\n#fields\t" + "\t".join(self.fields) +
+                       "\n#types\t" + "\t".join(self.types) + "\n").encode())
+
+    def _close(self, t: float) -> None:
+        self.fh.write(f"#close\t{_stamp(t)}\n".encode())
+        self.fh.close()
+
+    def tick(self, t: float) -> None:
+        """Rotaciona se `t` já passou do intervalo do arquivo corrente (granularidade da fatia)."""
+        if self.rotate_s <= 0 or t < self.opened + self.rotate_s:
+            return
+        end = self.opened + self.rotate_s * math.floor((t - self.opened) / self.rotate_s)
+        self._close(end)
+        rotated = self.dir / f"{self.name}.{_stamp(self.opened)}.log"
+        os.replace(self.path, rotated)
+        if self.gzip_rotated:
+            with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb", compresslevel=1) as dst:
+                shutil.copyfileobj(src, dst, length=4 << 20)
+            rotated.unlink()
+            rotated = Path(f"{rotated}.gz")
+        self.files.append(rotated)
+        self._open(end)
+
+    def write(self, columns: Dict[str, Any], n: int) -> None:
+        if n:
+            self.fh.write(_tsv(columns))
+            self.rows += n
+
+    def close(self, t: float) -> List[Path]:
+        self._close(t)
+        self.files.append(self.path)
+        return self.files
+
+
+class _Carry:
+    """Eventos gerados fora de ordem entre fatias (pacotes/auth dentro da duração do fluxo):
+    guarda o que passa do fim da fatia e devolve, ordenado, só o que já pode ser escrito."""
+
+    def __init__(self):
+        self.parts: List[Dict[str, np.ndarray]] = []
+
+    def push(self, cols: Dict[str, np.ndarray]) -> None:
+        if len(cols["ts"]):
+            self.parts.append(cols)
+
+    def pop(self, until: float = math.inf) -> Dict[str, np.ndarray]:
+        if not self.parts:
+            return {}
+        cols = {k: np.concatenate([p[k] for p in self.parts]) for k in self.parts[0]}
+        order = np.argsort(cols["ts"], kind="stable")
+        cols = {k: v[order] for k, v in cols.items()}
+        cut = int(np.searchsorted(cols["ts"], until, side="left"))
+        rest = {k: v[cut:] for k, v in cols.items()}
+        self.parts = [rest] if cut < len(order) else []
+        return {k: v[:cut] for k, v in cols.items()}
+
+
+def pcap_records(ts: np.ndarray, src: np.ndarray, dst: np.ndarray, sport: np.ndarray, dport: np.ndarray,
+                 proto: np.ndarray, flags: np.ndarray, ip_len: np.ndarray) -> np.ndarray:
+    """Registros pcap (cabeçalho de 16 B + Ethernet/IPv4/TCP|UDP em 54 B), montados vetorialmente."""
+    n = len(ts)
+    rec = 16 + PCAP_SNAPLEN
+    r = np.zeros((n, rec), dtype=np.uint8)
+    ts = np.asarray(ts, dtype=np.float64)
+    sec = np.floor(ts).astype(np.uint32)
+    usec = np.minimum((ts - sec) * 1e6, 999_999).astype(np.uint32)
+    ip_len = np.asarray(ip_len, dtype=np.int64)
+    r[:, 0:4] = sec.astype("<u4").view(np.uint8).reshape(n, 4)
+    r[:, 4:8] = usec.astype("<u4").view(np.uint8).reshape(n, 4)
+    r[:, 8:12] = np.full(n, PCAP_SNAPLEN, dtype="<u4").view(np.uint8).reshape(n, 4)
+    r[:, 12:16] = (ip_len + 14).astype("<u4").view(np.uint8).reshape(n, 4)
+    e = 16
+    r[:, e + 12], r[:, e + 13] = 0x08, 0x00
+    ip = e + 14
+    r[:, ip] = 0x45
+    r[:, ip + 2:ip + 4] = ip_len.astype(">u2").view(np.uint8).reshape(n, 2)
+    r[:, ip + 8], r[:, ip + 9] = 64, np.asarray(proto, dtype=np.uint8)
+    r[:, ip + 12:ip + 16] = np.asarray(src, dtype=np.uint32).astype(">u4").view(np.uint8).reshape(n, 4)
+    r[:, ip + 16:ip + 20] = np.asarray(dst, dtype=np.uint32).astype(">u4").view(np.uint8).reshape(n, 4)
+    l4 = ip + 20
+    r[:, l4:l4 + 2] = np.asarray(sport).astype(">u2").view(np.uint8).reshape(n, 2)
+    r[:, l4 + 2:l4 + 4] = np.asarray(dport).astype(">u2").view(np.uint8).reshape(n, 2)
+    udp = np.asarray(proto) == _UDP
+    tcp = ~udp
+    r[tcp, l4 + 12] = 0x50
+    r[tcp, l4 + 13] = np.asarray(flags, dtype=np.uint8)[tcp]
+    r[tcp, l4 + 14:l4 + 16] = np.full(int(tcp.sum()), 64240, dtype=">u2").view(np.uint8).reshape(-1, 2)
+    if udp.any():
+        r[udp, l4 + 4:l4 + 6] = (ip_len[udp] - 20).astype(">u2").view(np.uint8).reshape(-1, 2)
+    return r
+
+
+def pcap_header(snaplen: int = PCAP_SNAPLEN) -> bytes:
+    return struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, snaplen, 1)
+
+
+def _flow_packets(f: Dict[str, np.ndarray], per_flow: int) -> Dict[str, np.ndarray]:
+    """Até `per_flow` pacotes por fluxo, espalhados na duração: handshake, dados e FIN/RST pelo conn_state."""
+    total = f["orig_pkts"] + f["resp_pkts"]
+    k = np.clip(total, 1, max(1, per_flow)).astype(np.int64)
+    idx = np.repeat(np.arange(len(k)), k)
+    j = np.arange(len(idx)) - np.repeat(np.cumsum(k) - k, k)
+    kk, state, proto = k[idx], f["state"][idx], f["proto"][idx]
+    last = (j == kk - 1) & (j >= 3)
+    # Sentido: 0 = orig->resp; o 2º pacote é a resposta, no meio alterna
+    rev = np.where(j == 1, state != S0, (j >= 3) & (j % 2 == 0) & ~last)
+    flags = np.where(j == 0, 0x02, 0x18).astype(np.uint8)
+    flags[(j == 1) & (state == REJ)] = 0x14
+    flags[(j == 1) & (state != REJ)] = 0x12
+    flags[(j == 2)] = np.where(state[j == 2] == RSTO, 0x04, 0x10)
+    flags[state == S0] = 0x02
+    flags[last & (state == SF)] = 0x11
+    flags[last & (state == RSTO)] = 0x04
+    rev[state == S0] = False
+    data = flags == 0x18
+    per_pkt = np.where(rev, f["resp_bytes"][idx] // np.maximum(f["resp_pkts"][idx], 1),
+                       f["orig_bytes"][idx] // np.maximum(f["orig_pkts"][idx], 1))
+    udp = proto == _UDP
+    ip_len = np.where(udp, 28 + np.maximum(per_pkt, 12), 40 + np.where(data, np.minimum(per_pkt, 1460), 0))
+    t = f["ts"][idx] + f["duration"][idx] * j / np.maximum(kk - 1, 1)
+    src, dst = f["src"][idx], f["dst"][idx]
+    sport, dport = f["sport"][idx], f["dport"][idx]
+    return {"ts": t, "src": np.where(rev, dst, src), "dst": np.where(rev, src, dst),
+            "sport": np.where(rev, dport, sport), "dport": np.where(rev, sport, dport),
+            "proto": proto, "flags": flags, "ip_len": ip_len}
+
+
+class _PcapWriter:
+    """exp_<AAAAmmdd_HHMMSS>.pcap rotacionado a cada rotate_s (tcpdump -G), como o sensor."""
+
+    def __init__(self, pcap_dir: Path, t0: float, rotate_s: float):
+        self.dir, self.t0, self.rotate_s = Path(pcap_dir), t0, float(rotate_s or 0)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.fh = None
+        self.seg = -1
+        self.packets = 0
+        self.files: List[Path] = []
+
+    def _segment(self, seg: int) -> None:
+        if self.fh is not None:
+            self.fh.close()
+        start = self.t0 + seg * self.rotate_s
+        path = self.dir / f"exp_{datetime.fromtimestamp(start, tz=timezone.utc):%Y%m%d_%H%M%S}.pcap"
+        self.fh = open(path, "wb")
+        self.fh.write(pcap_header())
+        self.files.append(path)
+        self.seg = seg
+
+    def write(self, p: Dict[str, np.ndarray]) -> None:
+        if not p or not len(p["ts"]):
+            return
+        seg = (np.floor((p["ts"] - self.t0) / self.rotate_s).astype(np.int64) if self.rotate_s > 0
+               else np.zeros(len(p["ts"]), dtype=np.int64))
+        bounds = np.flatnonzero(np.diff(seg)) + 1
+        for a, b in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(seg)]])):
+            if seg[a] != self.seg:
+                self._segment(int(seg[a]))
+            part = {k: v[a:b] for k, v in p.items()}
+            self.fh.write(pcap_records(**part).tobytes())
+        self.packets += len(seg)
+
+    def close(self) -> List[Path]:
+        if self.fh is not None:
+            self.fh.close()
+        return self.files
+
+
+def _ssh_columns(f: Dict[str, np.ndarray], m: np.ndarray, uid, orig_h, resp_h) -> Dict[str, Any]:
+    brute = f["kind"][m] == _K["brute_ssh"]
+    return {"ts": _fixed6(f["ts"][m]), "uid": uid[m], "id.orig_h": orig_h[m], "id.orig_p": f["sport"][m],
+            "id.resp_h": resp_h[m], "id.resp_p": f["dport"][m], "version": np.full(int(m.sum()), 2),
+            "auth_success": np.where(f["success"][m], "T", "F").astype(object),
+            "auth_attempts": f["attempts"][m], "direction": np.full(int(m.sum()), "INBOUND", dtype=object),
+            "client": np.where(brute, "SSH-2.0-libssh_0.10.4", "SSH-2.0-OpenSSH_9.6").astype(object),
+            "server": np.full(int(m.sum()), _SSH_SERVER, dtype=object)}
+
+
+def _http_columns(f: Dict[str, np.ndarray], m: np.ndarray, uid, orig_h, resp_h, rng) -> Dict[str, Any]:
+    n = int(m.sum())
+    kind, success = f["kind"][m], f["success"][m]
+    brute, dos = kind == _K["brute_http"], kind == _K["dos"]
+    status = np.where(brute, np.where(success, "302", "200"),
+                      np.where(dos, "-", rng.choice(np.array(["200", "200", "200", "304", "404"]), n))).astype(object)
+    msg = pd.Series(status).map({"200": "OK", "302": "Found", "304": "Not Modified", "404": "Not Found"})
+    resp = f["resp_bytes"][m]
+    return {"ts": _fixed6(f["ts"][m]), "uid": uid[m], "id.orig_h": orig_h[m], "id.orig_p": f["sport"][m],
+            "id.resp_h": resp_h[m], "id.resp_p": f["dport"][m], "trans_depth": np.ones(n, dtype=np.int64),
+            "method": np.where(brute, "POST", "GET").astype(object), "host": resp_h[m],
+            "uri": np.where(brute, "/login", np.where(dos, "/", _BENIGN_URIS[rng.integers(0, len(_BENIGN_URIS), n)])),
+            "version": np.full(n, "1.1", dtype=object),
+            "user_agent": np.where(brute, "Mozilla/4.0 (Hydra)",
+                                   np.where(dos, "Mozilla/5.0 (X11; Linux x86_64) slowhttptest",
+                                            "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Firefox/128.0")).astype(object),
+            "request_body_len": np.where(brute, rng.integers(30, 60, n), 0),
+            "response_body_len": np.where(dos, 0, np.maximum(resp - 250, 0)),
+            "status_code": status, "status_msg": msg.fillna("-").to_numpy(dtype=object)}
+
+
+def _auth_events(f: Dict[str, np.ndarray], pid0: int, user: str, rng) -> Dict[str, np.ndarray]:
+    """Eventos do sshd das sessões SSH no victim: tentativas dentro da duração do fluxo."""
+    m = (f["service"] == "ssh") & (f["dport"] == 22)
+    n = int(m.sum())
+    if not n:
+        return {"ts": np.zeros(0)}
+    brute = f["kind"][m] == _K["brute_ssh"]
+    success = f["success"][m]
+    fails = np.where(brute, f["attempts"][m] - success.astype(np.int64), 0)
+    k = fails + 1 + success.astype(np.int64)            # falhas + (aceito) + fim da sessão
+    idx = np.repeat(np.arange(n), k)
+    j = np.arange(len(idx)) - np.repeat(np.cumsum(k) - k, k)
+    kk = k[idx]
+    dur = np.maximum(f["duration"][m][idx], 0.5)
+    ip = pd.Series(_ip_text(f["src"][m])[idx])
+    port = pd.Series(f["sport"][m][idx]).astype(str)
+    who = pd.Series(np.where(brute[idx], user, "vagrant"), dtype=object)
+    end = j == kk - 1
+    accepted = ~end & (j == kk - 2) & success[idx]
+    tail = " from " + ip + " port " + port + " ssh2"
+    msg = np.where(end, np.where(success[idx], "Disconnected from user " + who + " " + ip + " port " + port,
+                                 "Connection closed by authenticating user " + who + " " + ip + " port " + port
+                                 + " [preauth]"),
+                   np.where(accepted, np.where(brute[idx], "Accepted password for ", "Accepted publickey for ") + who
+                            + tail, "Failed password for " + who + tail))
+    pid = (pid0 + np.arange(n)) % 60000 + 1000
+    return {"ts": f["ts"][m][idx] + dur * (j + 1) / (kk + 1), "pid": pid[idx], "msg": msg.astype(object)}
+
+
+def _auth_lines(ev: Dict[str, np.ndarray], host: str = "victim") -> bytes:
+    if not ev or not len(ev["ts"]):
+        return b""
+    # Carimbo ISO do rsyslog; formata só os segundos distintos
+    sec = np.floor(ev["ts"]).astype(np.int64)
+    uniq, inv = np.unique(sec, return_inverse=True)
+    stamps = np.array([datetime.fromtimestamp(int(s), tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") for s in uniq],
+                      dtype=object)[inv]
+    micros = pd.Series(((ev["ts"] - sec) * 1e6).astype(np.int64)).astype(str).str.zfill(6)
+    lines = (pd.Series(stamps) + "." + micros + f"+00:00 {host} sshd[" + pd.Series(ev["pid"]).astype(str) + "]: "
+             + pd.Series(ev["msg"]))
+    return (lines.str.cat(sep="\n") + "\n").encode("utf-8")
+
+
+def _hydra_out(spec: SynthSpec, windows: List[SynthWindow]) -> str:
+    lines = []
+    for w in windows:
+        if w.attack == "brute_ssh":
+            tag, cmd = "[22][ssh]", f"hydra -l {spec.user} -P lists/passwords.txt -o lists/hydra_{spec.victim_ip}.out ssh://{spec.victim_ip}"
+        elif w.attack == "brute_http":
+            tag, cmd = ("[8081][http-post-form]",
+                        f"hydra -l {spec.user} -P lists/passwords.txt -s 8081 {spec.victim_ip} "
+                        "http-post-form /login:user=^USER^&pass=^PASS^:F=invalid")
+        else:
+            continue
+        started = datetime.fromtimestamp(w.t0, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        lines.append(f"# Hydra v9.5 run at {started} on {spec.victim_ip} {tag.split('][')[1][:-1]} ({cmd})")
+        lines.append(f"{tag} host: {spec.victim_ip}   login: {spec.user}   password: {spec.password}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def row_counts(spec: SynthSpec) -> Dict[str, int]:
+    """Linhas do conn.log por padrão (benign + ataques), somando exatamente spec.rows."""
+    weights = np.array([ATTACKS[a][2] for a in spec.attacks])
+    attack_rows = int(round(spec.rows * min(max(spec.attack_share, 0.0), 1.0))) if spec.attacks else 0
+    counts = {"benign": spec.rows - attack_rows}
+    counts.update({a: int(n) for a, n in zip(spec.attacks, _split(attack_rows, weights))})
+    return counts
+
+
+def generate_experiment(out_dir: Path, spec: Optional[SynthSpec] = None) -> Dict[str, Any]:
+    """Gera o experimento sintético em out_dir (substitui os arquivos gerados) e retorna o resumo."""
+    spec = spec or SynthSpec()
+    out_dir = Path(out_dir)
+    t_start = time.perf_counter()
+    rng = np.random.default_rng(spec.seed)
+    hosts = _Hosts(spec)
+    windows = attack_windows(spec)
+    counts = row_counts(spec)
+    t_end = spec.t0 + spec.span_s
+    intervals = {"benign": (spec.t0, t_end), **{w.attack: (w.t0, w.t1) for w in windows}}
+
+    zeek_dir = out_dir / spec.tap / "zeek"
+    pcap_dir = out_dir / spec.tap / "pcap"
+    for d in (zeek_dir, pcap_dir):
+        shutil.rmtree(d, ignore_errors=True)
+    (out_dir / "victim").mkdir(parents=True, exist_ok=True)
+    logs = {name: _ZeekLog(zeek_dir, name, fields, types, spec.t0, spec.zeek_rotate_s, spec.gzip_rotated)
+            for name, fields, types in (("conn", CONN_FIELDS, CONN_TYPES), ("ssh", SSH_FIELDS, SSH_TYPES),
+                                        ("http", HTTP_FIELDS, HTTP_TYPES))}
+    pcap = _PcapWriter(pcap_dir, spec.t0, spec.pcap_rotate_s) if spec.pcap else None
+    packets, auth = _Carry(), _Carry()
+    auth_path = out_dir / "victim" / "auth.log"
+    auth_lines = 0
+
+    n_slices = max(1, math.ceil(spec.rows / max(1, spec.block_rows)))
+    edges = spec.t0 + spec.span_s * np.arange(n_slices + 1) / n_slices
+    per_slice = {}
+    for kind, n in counts.items():
+        a, b = intervals[kind]
+        overlap = np.clip(np.minimum(edges[1:], b) - np.maximum(edges[:-1], a), 0, None)
+        per_slice[kind] = _split(n, overlap)
+    success_at = {w.attack: w.t_success for w in windows if w.attack in ("brute_ssh", "brute_http")}
+    done = 0
+    with open(auth_path, "wb") as auth_fh:
+        for s in range(n_slices):
+            lo, hi = edges[s], edges[s + 1]
+            parts = []
+            for kind, ns in per_slice.items():
+                n = int(ns[s])
+                if not n:
+                    continue
+                a, b = max(lo, intervals[kind][0]), min(hi, intervals[kind][1])
+                ts = a + rng.random(n) * (b - a)
+                parts.append(_GENERATORS[kind](n, ts, hosts, spec, rng))
+            for log in logs.values():
+                log.tick(lo)
+            if not parts:
+                continue
+            f = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+            order = np.argsort(f["ts"], kind="stable")
+            f = {k: v[order] for k, v in f.items()}
+            n = len(order)
+            for attack, t_ok in success_at.items():
+                # Uma sessão aceita por execução do Hydra: a primeira depois de t_success
+                if lo <= t_ok < hi:
+                    cand = np.flatnonzero((f["kind"] == _K[attack]) & (f["ts"] >= t_ok))
+                    if len(cand):
+                        f["success"][cand[0]] = True
+                        f["attempts"][cand[0]] = max(1, int(f["attempts"][cand[0]]))
+            uid = make_uids(done, n, spec.seed)
+            orig_h, resp_h = _ip_text(f["src"]), _ip_text(f["dst"])
+            udp = f["proto"] == _UDP
+            history = _HISTORY[f["state"]]
+            history[udp] = np.where(f["state"][udp] == S0, "D", "Dd")
+            logs["conn"].write({
+                "ts": _fixed6(f["ts"]), "uid": uid, "id.orig_h": orig_h, "id.orig_p": f["sport"],
+                "id.resp_h": resp_h, "id.resp_p": f["dport"], "proto": np.where(udp, "udp", "tcp").astype(object),
+                "service": f["service"], "duration": _fixed6(f["duration"]), "orig_bytes": f["orig_bytes"],
+                "resp_bytes": f["resp_bytes"], "conn_state": _STATES[f["state"]], "missed_bytes": np.zeros(n, dtype=np.int64),
+                "history": history, "orig_pkts": f["orig_pkts"],
+                "orig_ip_bytes": f["orig_bytes"] + np.where(udp, 28, 40) * f["orig_pkts"],
+                "resp_pkts": f["resp_pkts"], "resp_ip_bytes": f["resp_bytes"] + np.where(udp, 28, 40) * f["resp_pkts"],
+                "tunnel_parents": np.full(n, "-", dtype=object)}, n)
+            ssh = f["service"] == "ssh"
+            logs["ssh"].write(_ssh_columns(f, ssh, uid, orig_h, resp_h), int(ssh.sum()))
+            http = f["service"] == "http"
+            logs["http"].write(_http_columns(f, http, uid, orig_h, resp_h, rng), int(http.sum()))
+            auth.push(_auth_events(f, done, spec.user, rng))
+            ev = auth.pop(hi)
+            auth_fh.write(_auth_lines(ev))
+            auth_lines += len(ev.get("ts", ()))
+            if pcap is not None:
+                packets.push(_flow_packets(f, spec.pcap_packets_per_flow))
+                pcap.write(packets.pop(hi))
+            done += n
+        ev = auth.pop()
+        auth_fh.write(_auth_lines(ev))
+        auth_lines += len(ev.get("ts", ()))
+    if pcap is not None:
+        pcap.write(packets.pop())
+        pcap.close()
+    files = {name: [p.relative_to(out_dir).as_posix() for p in log.close(t_end)] for name, log in logs.items()}
+
+    hydra = _hydra_out(spec, windows)
+    hydra_path = out_dir / "attacker" / "lists" / f"hydra_{spec.victim_ip}.out"
+    if hydra:
+        hydra_path.parent.mkdir(parents=True, exist_ok=True)
+        hydra_path.write_text(hydra, encoding="utf-8")
+    else:
+        hydra_path.unlink(missing_ok=True)
+    stages = timeline_stages(windows)
+    meta = {"targets": {"attacker_ip": spec.attacker_ip, "victim_ip": spec.victim_ip, "scan_ports": spec.scan_ports},
+            "timeline": {"stages": stages}, "generated_at": _iso(t_end),
+            "sensors": [{"id": spec.tap, "host": spec.tap, "iface": ""}], "synthetic": asdict(spec)}
+    (out_dir / "metadata.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    (out_dir / "timeline.json").write_text(json.dumps({"stages": stages}, indent=2), encoding="utf-8")
+
+    dt = time.perf_counter() - t_start
+    size = sum(p.stat().st_size for p in out_dir.rglob("*") if p.is_file())
+    summary = {"exp_dir": str(out_dir), "rows": {name: log.rows for name, log in logs.items()},
+               "flows_by_pattern": counts, "auth_lines": auth_lines, "packets": pcap.packets if pcap else 0,
+               "files": {**files, "pcap": [p.relative_to(out_dir).as_posix() for p in pcap.files] if pcap else []},
+               "windows": [{"attack": w.attack, "label": w.label, "t0": _iso(w.t0), "t1": _iso(w.t1)} for w in windows],
+               "bytes": size, "seconds": round(dt, 3), "rows_per_s": round(spec.rows / dt, 1) if dt > 0 else None}
+    logger.info(f"[Synth] {out_dir.name}: {spec.rows} fluxo(s), {auth_lines} linha(s) de auth.log, "
+                f"{summary['packets']} pacote(s) em {dt:.1f}s")
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Experimento sintético (Zeek/pcap/auth.log/timeline) para benchmarks do ETL")
+    ap.add_argument("out_dir", type=Path)
+    ap.add_argument("--rows", type=int, default=100_000, help="linhas do conn.log")
+    ap.add_argument("--attacks", nargs="*", choices=list(ATTACKS), default=list(ATTACKS))
+    ap.add_argument("--attack-share", type=float, default=0.3)
+    ap.add_argument("--span-s", type=float, default=3600.0)
+    ap.add_argument("--t0", type=float, default=1_700_000_000.0, help="início (epoch)")
+    ap.add_argument("--benign-hosts", type=int, default=40)
+    ap.add_argument("--zeek-rotate-s", type=float, default=0.0, help="rotação dos logs do Zeek (0 = sem)")
+    ap.add_argument("--gzip", action="store_true", help="rotações em .log.gz")
+    ap.add_argument("--pcap", action="store_true", help="também grava pcaps (só cabeçalhos)")
+    ap.add_argument("--packets-per-flow", type=int, default=6)
+    ap.add_argument("--pcap-rotate-s", type=float, default=300.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--block-rows", type=int, default=500_000)
+    args = ap.parse_args(argv)
+    spec = SynthSpec(rows=args.rows, attacks=tuple(args.attacks), attack_share=args.attack_share, t0=args.t0,
+                     span_s=args.span_s, benign_hosts=args.benign_hosts, zeek_rotate_s=args.zeek_rotate_s,
+                     gzip_rotated=args.gzip, pcap=args.pcap, pcap_packets_per_flow=args.packets_per_flow,
+                     pcap_rotate_s=args.pcap_rotate_s, seed=args.seed, block_rows=args.block_rows)
+    print(json.dumps(generate_experiment(args.out_dir, spec), indent=2))
+
+
+if __name__ == "__main__":
+    main()
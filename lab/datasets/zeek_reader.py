@@ -0,0 +1,594 @@
+# lab/datasets/zeek_reader.py
+"""
+Leitor streaming de logs do Zeek (TSV com #fields/#types ou JSON-lines, .log ou .log.gz).
+
+Entrega blocos (DataFrames) de tamanho fixo com tipos compactos:
+  time     -> int64 ns desde epoch (unset = NaT/INT64_MIN; `.view("datetime64[ns]")` funciona)
+  interval -> float64 (segundos)
+  addr     -> uint32 (só IPv4) ou 16 bytes (IPv6 / IPv4-mapped), conforme `addr_mode`
+              ("auto" decide por arquivo: uint32 até o primeiro IPv6, 16 bytes daí em diante;
+              read_zeek_log/read_zeek_range promovem os blocos uint32 anteriores para 16 bytes,
+              então a coluna concatenada tem uma representação só; ip_to_str() volta ao texto)
+  port     -> uint16 (unset = 0)
+  count/int-> Int64 (nullable)
+  double   -> float64
+  bool     -> boolean
+  enum     -> category
+  demais   -> str (string, set[...], vector[...])
+A memória fica limitada a `batch_rows` linhas brutas por vez, independente do tamanho do log.
+
+iter_zeek_range (fatias do ETL) aceita parser="arrow": o pyarrow.csv lê a fatia com várias
+threads e devolve os mesmos tipos do parser C do pandas (cai para ele se o pyarrow faltar/falhar);
+arquivos inteiros (.gz) passam pelo leitor incremental (pyarrow.csv.open_csv), bloco a bloco.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import ipaddress
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger_setup import setup_logger
+
+logger = setup_logger(Path('.logs'), name="[ZeekReader]")
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+NAT_NS = np.iinfo(np.int64).min
+UNSET = "-"
+EMPTY = "(empty)"
+ADDR_MODES = ("auto", "uint32", "bytes16", "string")
+PARSERS = ("pandas", "arrow")
+# Tipos Zeek que o parser C já entrega numéricos (unset -> NaN)
+NATIVE_DTYPES = {"time": "float64", "interval": "float64", "double": "float64",
+                 "port": "float64", "count": "float64", "int": "float64"}
+
+# Tipos de campos comuns, usados quando o log é JSON (sem cabeçalho #types)
+KNOWN_TYPES: Dict[str, str] = {
+    "ts": "time", "uid": "string", "id.orig_h": "addr", "id.orig_p": "port", "id.resp_h": "addr",
+    "id.resp_p": "port", "proto": "enum", "service": "string", "duration": "interval",
+    "orig_bytes": "count", "resp_bytes": "count", "conn_state": "string", "local_orig": "bool",
+    "local_resp": "bool", "missed_bytes": "count", "history": "string", "orig_pkts": "count",
+    "orig_ip_bytes": "count", "resp_pkts": "count", "resp_ip_bytes": "count",
+    "auth_success": "bool", "auth_attempts": "count", "direction": "enum", "client": "string",
+    "server": "string", "method": "string", "host": "string", "uri": "string", "status_code": "count",
+    "request_body_len": "count", "response_body_len": "count", "user_agent": "string",
+    "percent_lost": "double", "pkts_proc": "count", "pkts_dropped": "count",
+}
+
+
+@dataclass
+class ZeekHeader:
+    path: Path
+    fmt: str                                  # "tsv" | "json"
+    fields: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    separator: str = "\t"
+    header_lines: int = 0
+
+    def type_of(self, name: str) -> str:
+        try:
+            return self.types[self.fields.index(name)]
+        except (ValueError, IndexError):
+            return KNOWN_TYPES.get(name, "string")
+
+
+def open_text(path: Path):
+    """Abre .log ou .log.gz como texto (rotações comprimidas são transparentes)."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+_META_LINE = re.compile(rb"(?m)^#[^\n]*\n?")
+
+
+class _DataLines(io.RawIOBase):
+    """
+    Stream binário que entrega só linhas de dados: remove cabeçalho, #close e cabeçalhos
+    repetidos (logs concatenados) antes do parser C. Trabalha em blocos alinhados em linha;
+    a regex só roda nos blocos que de fato têm '#' no início de alguma linha.
+    """
+
+    def __init__(self, fh, block_bytes: int = 1 << 20):
+        super().__init__()
+        self.fh = fh
+        self.block_bytes = block_bytes
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not len(self.pending):
+            blk = self.fh.read(self.block_bytes)
+            if not blk:
+                return 0
+            if not blk.endswith(b"\n"):
+                blk += self.fh.readline()
+            if blk.startswith(b"#") or b"\n#" in blk:
+                blk = _META_LINE.sub(b"", blk)
+            self.pending = memoryview(blk)
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+
+def _open_data(path: Path):
+    raw = gzip.open(path, "rb") if Path(path).suffix == ".gz" else open(path, "rb")
+    return io.BufferedReader(_DataLines(raw), buffer_size=1 << 20), raw
+
+
+def read_zeek_header(path: Path) -> ZeekHeader:
+    path = Path(path)
+    hdr = ZeekHeader(path=path, fmt="tsv")
+    with open_text(path) as fh:
+        for line in fh:
+            if not line.startswith("#"):
+                if line.lstrip().startswith("{"):
+                    hdr.fmt = "json"
+                break
+            hdr.header_lines += 1
+            line = line.rstrip("\n")
+            if line.startswith("#separator"):
+                sep = line.split(" ", 1)[-1].strip()
+                hdr.separator = sep.encode("utf-8").decode("unicode_escape") if sep.startswith("\\x") else sep
+            elif line.startswith("#fields"):
+                hdr.fields = line.split("\t")[1:]
+            elif line.startswith("#types"):
+                hdr.types = line.split("\t")[1:]
+    return hdr
+
+
+def find_zeek_logs(zeek_dir: Path, name: str) -> List[Path]:
+    """
+    Todas as partes de um log: <name>.log, rotações (<name>.<stamp>.log[.gz]) e
+    subdiretórios de workers AF_PACKET (zeek/w<i>/). Ordenadas por caminho.
+    """
+    zeek_dir = Path(zeek_dir)
+    if not zeek_dir.exists():
+        return []
+    out = set()
+    for pat in (f"{name}.log", f"{name}.log.gz", f"{name}.*.log", f"{name}.*.log.gz"):
+        out.update(zeek_dir.rglob(pat))
+    return sorted(out)
+
+
+# -----------------------
+# Conversões vetorizadas
+# -----------------------
+def _unique_map(s: pd.Series, fn, dtype) -> np.ndarray:
+    """Aplica `fn` só nos valores distintos (IPs/portas repetem muito) e expande via códigos."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    mapped = np.array([fn(u) for u in uniques], dtype=dtype) if len(uniques) else np.empty(0, dtype=dtype)
+    out = np.empty(len(s), dtype=dtype)
+    ok = codes >= 0
+    out[ok] = mapped[codes[ok]]
+    if not ok.all():
+        out[~ok] = fn(None)
+    return out
+
+
+def _ip_packed(v) -> bytes:
+    if v is None or v in (UNSET, EMPTY, ""):
+        return b"\x00" * 16
+    try:
+        ip = ipaddress.ip_address(v)
+    except ValueError:
+        return b"\x00" * 16
+    if ip.version == 4:
+        return ipaddress.IPv6Address("::ffff:" + str(ip)).packed
+    return ip.packed
+
+
+def _ip_u32(v) -> int:
+    if v is None or v in (UNSET, EMPTY, ""):
+        return 0
+    try:
+        ip = ipaddress.ip_address(v)
+    except ValueError:
+        return 0
+    return int(ip) if ip.version == 4 else 0
+
+
+def convert_addr(s: pd.Series, mode: str = "auto"):
+    if mode == "string":
+        return s.replace({UNSET: None}).astype("string")
+    if mode == "uint32":
+        return _unique_map(s, _ip_u32, np.uint32)
+    if mode == "auto":
+        sample = pd.unique(s.dropna())
+        if not any(":" in str(x) for x in sample):
+            return _unique_map(s, _ip_u32, np.uint32)
+    return pd.Series(_unique_map(s, _ip_packed, object), index=s.index)
+
+
+def _u32_packed(v) -> bytes:
+    v = int(v)
+    return b"\x00" * 10 + b"\xff\xff" + v.to_bytes(4, "big") if v else b"\x00" * 16
+
+
+def _sticky_addr_mode(chunk: pd.DataFrame, hdr: ZeekHeader, addr_mode: str) -> str:
+    """Em "auto", depois do primeiro bloco com IPv6 o resto do arquivo sai em 16 bytes."""
+    if addr_mode != "auto":
+        return addr_mode
+    if any(hdr.type_of(c) == "addr" and chunk[c].dtype == object for c in chunk.columns):
+        return "bytes16"
+    return addr_mode
+
+
+def unify_addr(parts: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """
+    Blocos do modo "auto" podem misturar uint32 e 16 bytes na mesma coluna (arquivos/blocos
+    diferentes): promove os uint32 para 16 bytes antes de concatenar.
+    """
+    wide = {c for p in parts for c in p.columns
+            if p[c].dtype == object and len(p[c]) and isinstance(p[c].iloc[0], (bytes, bytearray))}
+    if not wide:
+        return parts
+    out = []
+    for p in parts:
+        narrow = [c for c in wide if c in p.columns and p[c].dtype.kind in "ui"]
+        if narrow:
+            p = p.assign(**{c: _unique_map(p[c], _u32_packed, object) for c in narrow})
+        out.append(p)
+    return out
+
+
+def ip_like(ip: str, values):
+    """`ip` (texto) na mesma representação de `values` (uint32 / bytes16 / str) — para comparar sem converter a coluna."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "ui":
+        return arr.dtype.type(_ip_u32(ip))
+    if len(arr) and isinstance(arr[0], (bytes, bytearray)):
+        return _ip_packed(ip)
+    return ip
+
+
+def ip_to_str(values) -> np.ndarray:
+    """Inverso de convert_addr: uint32 / bytes16 / str -> texto (vetorizado para uint32)."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "ui":
+        a = arr.astype(np.uint32)
+        parts = [((a >> sh) & 0xFF).astype(str) for sh in (24, 16, 8, 0)]
+        return np.char.add(np.char.add(np.char.add(np.char.add(parts[0], "."), parts[1]), "."),
+                           np.char.add(np.char.add(parts[2], "."), parts[3])).astype(object)
+
+    def one(v):
+        if isinstance(v, (bytes, bytearray)) and len(v) == 16:
+            ip = ipaddress.IPv6Address(bytes(v))
+            return str(ip.ipv4_mapped) if ip.ipv4_mapped else str(ip)
+        if isinstance(v, (int, np.integer)):
+            return str(ipaddress.IPv4Address(int(v)))
+        return "" if v is None else str(v)
+    return np.array([one(v) for v in arr], dtype=object)
+
+
+def _to_float(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_float_dtype(s):
+        return s.to_numpy(dtype=np.float64)
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def convert_time_ns(s: pd.Series) -> np.ndarray:
+    f = _to_float(s)
+    # arredonda em µs (resolução do Zeek) antes de escalar: evita erro de float em 1e18
+    out = np.full(len(f), NAT_NS, dtype=np.int64)
+    ok = ~np.isnan(f)
+    out[ok] = np.round(f[ok] * 1e6).astype(np.int64) * 1000
+    return out
+
+
+def _convert_json_time(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(s):
+        return convert_time_ns(s)
+    # JSON do Zeek: epoch numérico (padrão) ou ISO8601 (LogAscii::json_timestamps)
+    return pd.to_datetime(s, errors="coerce", utc=True).astype("int64").to_numpy()
+
+
+def convert_column(s: pd.Series, ztype: str, addr_mode: str = "auto"):
+    t = (ztype or "string").lower()
+    if t == "time":
+        return convert_time_ns(s)
+    if t == "interval" or t == "double":
+        return _to_float(s)
+    if t == "addr":
+        return convert_addr(s, addr_mode)
+    if t == "port":
+        return np.nan_to_num(_to_float(s), nan=0.0).astype(np.uint16)
+    if t in ("count", "int"):
+        return pd.array(_to_float(s), dtype="Float64").astype("Int64")
+    if t == "bool":
+        return s.map({"T": True, "F": False, True: True, False: False}).astype("boolean")
+    if t == "enum":
+        return s.replace({UNSET: None}).astype("category")
+    return s.replace({UNSET: None, EMPTY: ""})
+
+
+# -----------------------
+# Leitura em blocos
+# -----------------------
+def iter_zeek_batches(path: Path, columns: Optional[Sequence[str]] = None, batch_rows: int = 500_000,
+                      addr_mode: str = "auto", typed: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Gera DataFrames de até `batch_rows` linhas de um único arquivo de log.
+    `columns` limita o que é materializado (campos ausentes viram colunas nulas).
+    """
+    if addr_mode not in ADDR_MODES:
+        raise ValueError(f"addr_mode inválido: {addr_mode} (use {ADDR_MODES})")
+    hdr = read_zeek_header(path)
+    comp = "gzip" if Path(path).suffix == ".gz" else None
+
+    if hdr.fmt == "json":
+        for chunk in pd.read_json(path, lines=True, chunksize=batch_rows, compression=comp, dtype=False):
+            if columns is not None:
+                chunk = chunk.reindex(columns=list(columns))
+            if typed:
+                for c in chunk.columns:
+                    zt = hdr.type_of(c)
+                    chunk[c] = _convert_json_time(chunk[c]) if zt == "time" else convert_column(
+                        chunk[c].astype(object).where(chunk[c].notna(), UNSET), zt, addr_mode)
+                addr_mode = _sticky_addr_mode(chunk, hdr, addr_mode)
+            yield chunk
+        return
+
+    if not hdr.fields:
+        logger.warning(f"[ZeekReader] {path}: cabeçalho #fields ausente — ignorado.")
+        return
+    kw, want, missing = _tsv_read_args(hdr, columns, typed)
+    stream, raw = _open_data(path)
+    try:
+        try:
+            reader = pd.read_csv(stream, chunksize=batch_rows, **kw)
+        except pd.errors.EmptyDataError:
+            return  # só cabeçalho (log aberto e fechado sem eventos)
+        for chunk in reader:
+            chunk = _finish_tsv_chunk(chunk, hdr, columns, want, missing, typed, addr_mode)
+            if chunk is not None:
+                if typed:
+                    addr_mode = _sticky_addr_mode(chunk, hdr, addr_mode)
+                yield chunk
+    finally:
+        raw.close()
+
+
+def _tsv_read_args(hdr: ZeekHeader, columns: Optional[Sequence[str]], typed: bool):
+    want = [c for c in (columns or hdr.fields) if c in hdr.fields]
+    missing = [c for c in (columns or []) if c not in hdr.fields]
+    # Campos numéricos são convertidos pelo próprio parser C (bem mais rápido que to_numeric em str);
+    # "-" (unset) vira NaN só nessas colunas, o resto continua texto cru.
+    dtypes = {c: NATIVE_DTYPES.get(hdr.type_of(c), str) if typed else str for c in want}
+    kw = dict(sep=hdr.separator, header=None, names=hdr.fields, usecols=want or None, dtype=dtypes,
+              keep_default_na=False, na_values={c: [UNSET] for c, d in dtypes.items() if d is not str},
+              quoting=3, engine="c", encoding="utf-8", encoding_errors="replace")  # quoting=3 -> QUOTE_NONE
+    return kw, want, missing
+
+
+def _finish_tsv_chunk(chunk: pd.DataFrame, hdr: ZeekHeader, columns, want, missing, typed: bool,
+                      addr_mode: str) -> Optional[pd.DataFrame]:
+    if chunk.empty:
+        return None
+    if typed:
+        chunk = pd.DataFrame({c: convert_column(chunk[c], hdr.type_of(c), addr_mode) for c in want},
+                             index=chunk.index)
+    for c in missing:
+        chunk[c] = None
+    chunk = chunk[list(columns) if columns is not None else want]
+    return chunk.reset_index(drop=True)
+
+
+# -----------------------
+# Fatias por byte (paralelismo dentro de um arquivo grande)
+# -----------------------
+def split_zeek_file(path: Path, shard_bytes: int) -> List[tuple]:
+    """
+    Divide um log TSV não comprimido em intervalos [início, fim) de ~shard_bytes.
+    Os limites não precisam cair em fim de linha: read_zeek_range alinha cada fatia.
+    .gz / JSON não são divisíveis -> um único intervalo (0, -1).
+    """
+    path = Path(path)
+    if path.suffix == ".gz" or shard_bytes <= 0:
+        return [(0, -1)]
+    hdr = read_zeek_header(path)
+    if hdr.fmt != "tsv":
+        return [(0, -1)]
+    size = path.stat().st_size
+    if size <= shard_bytes:
+        return [(0, -1)]
+    cuts = list(range(0, size, shard_bytes)) + [size]
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def estimate_row_bytes(path: Path, sample_bytes: int = 1 << 20) -> float:
+    """Bytes por linha de dados (amostra do começo do arquivo, já descomprimida) — para fatiar por nº de linhas."""
+    stream, raw = _open_data(Path(path))
+    try:
+        data = stream.read(sample_bytes)
+        data += stream.readline()
+    finally:
+        raw.close()
+    return len(data) / max(1, data.count(b"\n")) if data else 0.0
+
+
+def _arrow_options(hdr: ZeekHeader, columns, typed: bool):
+    """Opções do pyarrow.csv com os mesmos tipos de _tsv_read_args."""
+    want = [c for c in (columns or hdr.fields) if c in hdr.fields]
+    missing = [c for c in (columns or []) if c not in hdr.fields]
+    native = {c for c in want if typed and hdr.type_of(c) in NATIVE_DTYPES}
+    opts = dict(
+        read_options=pacsv.ReadOptions(column_names=hdr.fields, block_size=8 << 20),
+        parse_options=pacsv.ParseOptions(delimiter=hdr.separator, quote_char=False),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=want, null_values=[UNSET], strings_can_be_null=False,
+            column_types={c: pa.float64() if c in native else pa.string() for c in want}))
+    return opts, want, missing, native
+
+
+def _arrow_frame(table, hdr: ZeekHeader, columns, want, missing, native, typed: bool,
+                 addr_mode: str) -> Optional[pd.DataFrame]:
+    chunk = table.to_pandas()
+    for c in want:
+        if c not in native:
+            chunk[c] = chunk[c].astype(str)
+    return _finish_tsv_chunk(chunk, hdr, columns, want, missing, typed, addr_mode)
+
+
+def _parse_arrow(data: bytes, hdr: ZeekHeader, columns, typed: bool, addr_mode: str) -> Optional[pd.DataFrame]:
+    """Linhas de dados TSV -> DataFrame pelo pyarrow.csv (fatia inteira em memória)."""
+    opts, want, missing, native = _arrow_options(hdr, columns, typed)
+    table = pacsv.read_csv(pa.BufferReader(data), **opts)
+    return _arrow_frame(table, hdr, columns, want, missing, native, typed, addr_mode)
+
+
+def _stream_arrow(path: Path, hdr: ZeekHeader, columns, batch_rows: int, typed: bool,
+                  addr_mode: str) -> Iterator[pd.DataFrame]:
+    """Arquivo inteiro (inclusive .gz) pelo leitor incremental do pyarrow.csv: blocos de ~batch_rows linhas."""
+    opts, want, missing, native = _arrow_options(hdr, columns, typed)
+    stream, raw = _open_data(path)
+    try:
+        if not stream.peek(1):
+            return  # só cabeçalho
+        pending, n = [], 0
+        for rb in pacsv.open_csv(stream, **opts):
+            pending.append(rb)
+            n += rb.num_rows
+            if n < batch_rows:
+                continue
+            out = _arrow_frame(pa.Table.from_batches(pending), hdr, columns, want, missing, native, typed, addr_mode)
+            pending, n = [], 0
+            if out is not None:
+                if typed:
+                    addr_mode = _sticky_addr_mode(out, hdr, addr_mode)
+                yield out
+        if pending:
+            out = _arrow_frame(pa.Table.from_batches(pending), hdr, columns, want, missing, native, typed, addr_mode)
+            if out is not None:
+                yield out
+    finally:
+        raw.close()
+
+
+def iter_zeek_range(path: Path, start: int, end: int, columns: Optional[Sequence[str]] = None,
+                    batch_rows: int = 500_000, addr_mode: str = "auto", typed: bool = True,
+                    parser: str = "pandas") -> Iterator[pd.DataFrame]:
+    """
+    Linhas que COMEÇAM em [start, end): a fatia sai num bloco só (memória ~ tamanho da fatia);
+    end=-1 => arquivo inteiro, lido em streaming em blocos de até `batch_rows` linhas como
+    iter_zeek_batches (.gz não é divisível e pode ser grande). Fatias vizinhas nunca duplicam
+    nem perdem linha. Sempre gera ao menos um bloco (vazio, com as colunas pedidas, se não houver linhas).
+    parser: "pandas" (parser C) ou "arrow" (pyarrow.csv, multithread).
+    """
+    path = Path(path)
+    if parser not in PARSERS:
+        raise ValueError(f"parser inválido: {parser} (use {PARSERS})")
+    hdr = read_zeek_header(path)
+    empty = pd.DataFrame(columns=list(columns or hdr.fields))
+    n = 0
+    for chunk in _range_chunks(path, hdr, start, end, columns, batch_rows, addr_mode, typed, parser):
+        n += 1
+        yield chunk
+    if not n:
+        yield empty
+
+
+def _range_chunks(path: Path, hdr: ZeekHeader, start: int, end: int, columns, batch_rows: int,
+                  addr_mode: str, typed: bool, parser: str) -> Iterator[pd.DataFrame]:
+    if parser == "arrow" and _HAS_PYARROW and hdr.fmt == "tsv" and hdr.fields:
+        n = 0
+        try:
+            if end < 0:
+                for out in _stream_arrow(path, hdr, columns, batch_rows, typed, addr_mode):
+                    n += 1
+                    yield out
+                return
+            data = io.BufferedReader(_DataLines(io.BytesIO(_read_range(path, start, end)))).read()
+            out = _parse_arrow(data, hdr, columns, typed, addr_mode) if data.strip() else None
+            if out is not None:
+                yield out
+            return
+        except Exception as e:
+            if n:
+                raise  # blocos já entregues: recomeçar no pandas duplicaria linhas
+            logger.warning(f"[ZeekReader] parser arrow falhou em {path.name} ({e}) — usando pandas")
+    if end < 0:
+        yield from iter_zeek_batches(path, columns=columns, batch_rows=batch_rows, addr_mode=addr_mode, typed=typed)
+        return
+    if not hdr.fields:
+        return
+    # Cabeçalho (start=0) e #close (última fatia) saem no mesmo filtro do streaming
+    data = io.BufferedReader(_DataLines(io.BytesIO(_read_range(path, start, end))))
+    kw, want, missing = _tsv_read_args(hdr, columns, typed)
+    try:
+        chunk = pd.read_csv(data, **kw)
+    except pd.errors.EmptyDataError:
+        return
+    # Fatia já limitada pelo plano de shards: sai num bloco só
+    out = _finish_tsv_chunk(chunk, hdr, columns, want, missing, typed, addr_mode)
+    if out is not None:
+        yield out
+
+
+def read_zeek_range(path: Path, start: int, end: int, columns: Optional[Sequence[str]] = None,
+                    addr_mode: str = "auto", typed: bool = True, parser: str = "pandas") -> pd.DataFrame:
+    """iter_zeek_range concatenado num DataFrame só (memória ~ tamanho da fatia ou do arquivo)."""
+    parts = list(iter_zeek_range(path, start, end, columns=columns, addr_mode=addr_mode, typed=typed, parser=parser))
+    return parts[0] if len(parts) == 1 else pd.concat(unify_addr(parts), ignore_index=True)
+
+
+def _read_range(path: Path, start: int, end: int) -> bytes:
+    """Bytes das linhas que começam em [start, end) (alinhados em fim de linha)."""
+    with open(path, "rb") as fh:
+        if start > 0:
+            fh.seek(start - 1)
+            fh.readline()  # termina a linha em curso (pertence à fatia anterior)
+        pos = fh.tell()
+        buf = fh.read(max(0, end - pos)) if pos < end else b""
+        if buf and not buf.endswith(b"\n"):
+            buf += fh.readline()
+    return buf
+
+
+def iter_zeek_log(paths: Iterable[Path], columns: Optional[Sequence[str]] = None, batch_rows: int = 500_000,
+                  addr_mode: str = "auto", typed: bool = True) -> Iterator[pd.DataFrame]:
+    """Encadeia várias partes/rotações de um mesmo log."""
+    for p in paths:
+        try:
+            yield from iter_zeek_batches(p, columns=columns, batch_rows=batch_rows, addr_mode=addr_mode, typed=typed)
+        except Exception as e:
+            logger.warning(f"[ZeekReader] falha lendo {p}: {e}")
+
+
+def read_zeek_log(paths: Iterable[Path] | Path, columns: Optional[Sequence[str]] = None,
+                  addr_mode: str = "auto") -> pd.DataFrame:
+    """Conveniência para logs pequenos (ssh.log, notice.log): concatena todos os blocos."""
+    if isinstance(paths, (str, Path)):
+        paths = [Path(paths)]
+    parts = list(iter_zeek_log(paths, columns=columns, addr_mode=addr_mode))
+    if not parts:
+        return pd.DataFrame(columns=list(columns or []))
+    return pd.concat(unify_addr(parts), ignore_index=True)
+
+
+def zeek_schema(path: Path) -> Dict[str, str]:
+    hdr = read_zeek_header(path)
+    return dict(zip(hdr.fields, hdr.types)) if hdr.fields else {}
+
+
+if __name__ == "__main__":
+    import sys
+    for arg in sys.argv[1:]:
+        print(json.dumps({"path": arg, "schema": zeek_schema(Path(arg))}, indent=2))
@@ -5,7 +5,7 @@ import io
 import json
 import shlex
 import tarfile
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Optional
@@ -15,18 +15,29 @@ import sys
 from app.core.logger_setup import setup_logger
 from app.core.ssh_manager import SSHManager
 from lab.agents.attack import AttackExecutor
-from lab.agents.sensor import SensorAgent
+from lab.agents.sensor import SensorGroup, build_capture_health, build_sensor_timeline, resolve_sensor_taps
+from lab.agents.telemetry import TelemetryAgent, summarize_run_telemetry
 
 from app.core.yaml_loader import ExperimentSpec, resolve_profile_command, _flatten, _safe_format
 
 logger = setup_logger(Path('.logs'), name="[Runner]")
 
+
+def _flag(value) -> bool:
+    """Booleano de gvars vindo do YAML/CLI: "false"/"0"/"no"/"off" (e vazio) desligam."""
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+
 @dataclass
 class ExperimentRunner:
     def __init__(self, ssh_manager: SSHManager, lab_dir: Path):
         self.ssh = ssh_manager
         self.lab_dir = Path(lab_dir)
         self.timeline: list[dict] = []
+        self.telemetry_summary: dict = {}
+        self.capture_health: dict = {}
 
     # -----------------------
     # Utilidades internas
@@ -153,7 +164,81 @@ class ExperimentRunner:
         except Exception as e:
             logger.error(f"[Runner] falha no pull {host}:{remote_dir} -> {local_dst}: {e}")
 
-    def _write_metadata_and_timeline(self, out_base: Path, ips: dict, stages: list[dict]):
+    def _collect_from_vms(self, out_base: Path, ips: dict, tag: str = "", sensors: Optional[SensorGroup] = None):
+        """Puxa artefatos dos taps (cada um em out_base/<tap_id>/), attacker e victim (inclui telemetria)."""
+        taps = sensors.taps if sensors is not None else resolve_sensor_taps(None)
+        for tap in taps:
+            self._pull_tree_b64(tap.host, "$HOME/tcc", ["zeek", "pcap", "run"], out_base / tap.id)
+        try:
+            vic_ip = ips.get("victim", "")
+            self._pull_tree_b64("attacker", "$HOME/tcc",
+                                [f"lists/hydra_{vic_ip}.out", "lists/users.txt",
+                                 "lists/small_wordlist.txt", "run/telemetry.tsv"], out_base / "attacker")
+        except Exception as e:
+            logger.warning(f"[Runner] hydra logs{tag}: {e}")
+        try:
+            self._pull_tree_b64("victim", "/var/log", ["auth.log", "auth.log.1"], out_base / "victim")
+        except Exception as e:
+            logger.warning(f"[Runner] auth.log{tag}: {e}")
+        try:
+            self._pull_tree_b64("victim", "$HOME/tcc", ["run/telemetry.tsv"], out_base / "victim")
+        except Exception as e:
+            logger.warning(f"[Runner] telemetria victim{tag}: {e}")
+
+        try:
+            self.telemetry_summary = summarize_run_telemetry(out_base)
+        except Exception as e:
+            logger.warning(f"[Runner] resumo de telemetria{tag}: {e}")
+
+    def _write_capture_health(self, out_base: Path, sensors: SensorGroup, spec: ExperimentSpec) -> dict:
+        """
+        Gera capture_health.json (tcpdump/kernel/Zeek) e avalia o limite de perda do experimento.
+        Com vários taps, o topo do arquivo é o tap primário e `sensors` traz cada um; o status
+        geral é o pior entre eles. Também grava capture_timeline.json (quem viu o quê e quando).
+        """
+        try:
+            max_loss = float((spec.gvars or {}).get("capture_loss_max_pct", 1.0))
+        except Exception:
+            max_loss = 1.0
+        try:
+            by_tap = {
+                tap.id: build_capture_health(sensors.agents[tap.id].capture_stats, out_base / tap.id / "zeek",
+                                             max_loss_pct=max_loss)
+                for tap in sensors.taps
+            }
+            health = dict(by_tap[sensors.taps[0].id])
+            if len(by_tap) > 1:
+                health["sensors"] = by_tap
+                if any(h.get("status") == "degraded" for h in by_tap.values()):
+                    health["status"] = "degraded"
+                    health["loss_pct_max"] = max((h.get("loss_pct_max") or 0.0) for h in by_tap.values())
+            (out_base / "capture_health.json").write_text(json.dumps(health, indent=2), encoding="utf-8")
+            if health.get("status") == "degraded":
+                logger.warning(f"[Runner] captura degradada: perda {health.get('loss_pct_max')}% > {max_loss}%")
+            else:
+                logger.info(f"[Runner] saúde da captura: {health.get('status')} (perda máx={health.get('loss_pct_max')})")
+            self.capture_health = health
+        except Exception as e:
+            logger.warning(f"[Runner] capture_health: {e}")
+            return {}
+
+        try:
+            timeline = build_sensor_timeline(out_base, sensors.taps)
+            (out_base / "capture_timeline.json").write_text(json.dumps(timeline, indent=2), encoding="utf-8")
+            logger.info(f"[Runner] capture_timeline: {len(timeline['segments'])} segmentos de {len(sensors.taps)} tap(s)")
+        except Exception as e:
+            logger.warning(f"[Runner] capture_timeline: {e}")
+        return self.capture_health
+
+    def _check_capture_health(self, spec: ExperimentSpec):
+        fail = _flag((spec.gvars or {}).get("capture_loss_fail", False))
+        if fail and (self.capture_health or {}).get("status") == "degraded":
+            raise RuntimeError(
+                f"Perda de captura acima do limite ({self.capture_health.get('loss_pct_max')}% > "
+                f"{self.capture_health.get('threshold_pct')}%) — run descartado."
+            )
+
+    def _write_metadata_and_timeline(self, out_base: Path, ips: dict, stages: list[dict], extra: Optional[dict] = None):
         try:
             meta = {
                 "targets": {
@@ -164,11 +249,20 @@ class ExperimentRunner:
                 "timeline": {"stages": stages},
                 "generated_at": datetime.now(timezone.utc).isoformat()
             }
+            meta.update(extra or {})
             (out_base / "metadata.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
             (out_base / "timeline.json").write_text(json.dumps({"stages": stages}, indent=2), encoding="utf-8")
             logger.info(f"[Runner] metadata/timeline escritos em {out_base}")
         except Exception as e:
             logger.warning(f"[Runner] metadata/timeline: {e}")
+            return
+        # Catálogo das capturas (<out_dir>/catalog.sqlite): indexa o run assim que ele é fechado.
+        # Best-effort: sem pandas/pyarrow o catálogo fica para depois, o run segue
+        try:
+            from lab.data.manifest import index_run
+            index_run(out_base)
+        except Exception as e:
+            logger.warning(f"[Runner] catálogo de capturas: {e}")
 
     # -----------------------
     # ETL acoplado ao Runner
@@ -176,7 +270,7 @@ class ExperimentRunner:
     def _run_etl(self, exp_dir: Path, etl_out_root: Path) -> Optional[Path]:
         """
         Executa pré-ETL e ETL final.
-        - pré-ETL gera features_conn_window.csv dentro de exp_dir
+        - pré-ETL gera features_conn_window.parquet (ou .csv sem pyarrow) dentro de exp_dir
         - ETL final escreve datasets prontos em etl_out_root/<exp_id>/
         """
         try:
@@ -197,9 +291,20 @@ class ExperimentRunner:
                 sys.path.append(str(self.lab_dir))
                 from lab.datasets.etl_netsec import run_etl
 
+            from lab.datasets.profiling import EtlProfiler, count_rows
+            from lab.datasets.sketches import SketchConfig
+            profiler = EtlProfiler(exp_dir.name, dump=getattr(self, "etl_profile", None))
+
             # 1) Pré-ETL
             try:
-                out_csv = generate_conn_features(exp_dir, window_s=int(getattr(self, "pre_etl_window_s", 60)))
+                with profiler.stage("pre_etl") as st:
+                    out_csv = generate_conn_features(exp_dir, window_s=int(getattr(self, "pre_etl_window_s", 60)),
+                                                     engine=getattr(self, "window_engine", "pandas"),
+                                                     windows=getattr(self, "pre_etl_windows", None),
+                                                     sketch=SketchConfig(
+                                                         error=getattr(self, "pre_etl_sketch_error", 0.01),
+                                                         exact=getattr(self, "pre_etl_sketch_exact", False)))
+                    st.rows_out = count_rows(out_csv)
                 logger.info(f"[ETL] Pré-ETL ok: {out_csv}")
             except Exception as e:
                 logger.warning(f"[ETL] Pré-ETL falhou (seguindo para ETL direto do Zeek): {e}")
@@ -209,7 +314,16 @@ class ExperimentRunner:
             etl_out_dir = Path(etl_out_root) / exp_id
             etl_out_dir.mkdir(parents=True, exist_ok=True)
 
-            path_done = run_etl(exp_dir, etl_out_dir)
+            sample = None
+            if float(getattr(self, "etl_sample_ratio", 0) or 0) > 0:
+                from lab.datasets.sampling import SamplingSpec
+                sample = SamplingSpec(target_ratio=float(self.etl_sample_ratio),
+                                      window_s=int(getattr(self, "pre_etl_window_s", 60)),
+                                      per_window=int(getattr(self, "etl_sample_per_window", 5000)))
+            path_done = run_etl(exp_dir, etl_out_dir, workers=getattr(self, "etl_workers", None),
+                                pcap_flows=bool(getattr(self, "pcap_flows", False)),
+                                csv=bool(getattr(self, "etl_csv", False)), sample=sample,
+                                arrow=bool(getattr(self, "etl_arrow", False)), profiler=profiler)
             logger.info(f"[ETL] Finalizado em: {path_done}")
             return Path(path_done)
 
@@ -231,9 +345,35 @@ class ExperimentRunner:
             logger.info(f"[Runner] pre_etl_window_s={self.pre_etl_window_s}")
         except Exception:
             self.pre_etl_window_s = 60
+        self.pre_etl_windows = list((spec.gvars or {}).get("pre_etl_windows") or [])
+        try:
+            self.pre_etl_sketch_error = float((spec.gvars or {}).get("pre_etl_sketch_error") or 0.01)
+        except Exception:
+            self.pre_etl_sketch_error = 0.01
+        self.pre_etl_sketch_exact = _flag((spec.gvars or {}).get("pre_etl_sketch_exact", False))
+        try:
+            self.etl_workers = int((spec.gvars or {}).get("etl_workers") or 0) or None
+        except Exception:
+            self.etl_workers = None
+        self.pcap_flows = _flag((spec.gvars or {}).get("pcap_flows", False))
+        self.etl_csv = _flag((spec.gvars or {}).get("etl_csv", False))
+        self.etl_arrow = _flag((spec.gvars or {}).get("etl_arrow", False))
+        self.etl_profile = (spec.gvars or {}).get("etl_profile") or None
+        self.window_engine = str((spec.gvars or {}).get("window_engine") or "pandas")
+        try:
+            self.etl_sample_ratio = float((spec.gvars or {}).get("etl_sample_ratio") or 0)
+            self.etl_sample_per_window = int((spec.gvars or {}).get("etl_sample_per_window") or 5000)
+        except Exception:
+            self.etl_sample_ratio, self.etl_sample_per_window = 0.0, 5000
 
-        sensor = SensorAgent(self.ssh, "sensor")
+        sensor = SensorGroup(self.ssh, resolve_sensor_taps(getattr(spec, "capture", None)))
         attacker = AttackExecutor(self.ssh)
+        try:
+            telemetry_interval_s = float((spec.gvars or {}).get("telemetry_interval_s", 1.0))
+        except Exception:
+            telemetry_interval_s = 1.0
+        telemetry_enabled = _flag((spec.gvars or {}).get("telemetry", True))
+        telemetry = TelemetryAgent(self.ssh, interval_s=telemetry_interval_s)
         ips: Dict[str, str] = {}
 
         logger.info(f"[Runner] início exp_id={exp_id} out={out_base} pre_etl={run_pre_etl}")
@@ -274,12 +414,17 @@ class ExperimentRunner:
                         logger.info("[Runner] iniciando sensor (tcpdump+zeek)…")
                         sensor.sanitize_and_start(
                             victim_ip=ips.get("victim", ""),
-                            attacker_ip=ips.get("attacker", "")
+                            attacker_ip=ips.get("attacker", ""),
+                            sensor_ip=ips.get("sensor", ""),
+                            capture=getattr(spec, "capture", None)
                         )
+                        if telemetry_enabled:
+                            telemetry.start(victim_ip=ips.get("victim", ""))
                         continue
 
                     if "stop_sensor" in action:
                         sensor.stop()
+                        telemetry.stop()
                         continue
 
                     # --- ataque ---
@@ -313,6 +458,8 @@ class ExperimentRunner:
                         if token:
                             self.timeline.append({"stage": f"{token}_start", "ts": t_start})
                             self.timeline.append({"stage": f"{token}_end", "ts": t_end})
+                        # Drops do tcpdump na telemetria: um SIGUSR1 por etapa, não por amostra
+                        telemetry.mark_stage_end()
 
                         # Verificação rápida do resultado Hydra
                         try:
@@ -346,22 +493,18 @@ class ExperimentRunner:
                         )
                         logger.info(f"[Runner] manifest: {manifest}")
 
-                        # Copia artefatos das VMs
-                        self._pull_tree_b64("sensor", "$HOME/tcc", ["zeek", "pcap", "run"], out_base / "sensor")
-                        try:
-                            vic_ip = ips.get("victim", "")
-                            self._pull_tree_b64("attacker", "$HOME/tcc",
-                                                [f"lists/hydra_{vic_ip}.out", "lists/users.txt",
-                                                 "lists/small_wordlist.txt"], out_base / "attacker")
-                        except Exception as e:
-                            logger.warning(f"[Runner] hydra logs: {e}")
-                        try:
-                            self._pull_tree_b64("victim", "/var/log", ["auth.log", "auth.log.1"], out_base / "victim")
-                        except Exception as e:
-                            logger.warning(f"[Runner] auth.log: {e}")
+                        # Copia artefatos das VMs (telemetria já parada para fechar o TSV)
+                        telemetry.stop()
+                        self._collect_from_vms(out_base, ips, sensors=sensor)
 
-                        # metadata/timeline
-                        self._write_metadata_and_timeline(out_base, ips, self.timeline)
+                        # metadata/timeline (+ saúde da captura)
+                        self._write_capture_health(out_base, sensor, spec)
+                        self._write_metadata_and_timeline(out_base, ips, self.timeline,
+                                                          {"telemetry": self.telemetry_summary,
+                                                           "capture_health": self.capture_health,
+                                                           "capture_profile": sensor.capture_profile,
+                                                           "sensors": [asdict(t) for t in sensor.taps]})
+                        self._check_capture_health(spec)
 
                         # ETL acoplado (gera datasets prontos em data/etl/<exp_id>/)
                         if run_pre_etl:
@@ -421,11 +564,15 @@ class ExperimentRunner:
             err = e
             logger.exception("[Runner] erro durante execução")
         finally:
-            # Sempre tenta parar sensor
+            # Sempre tenta parar sensor e telemetria
             try:
                 sensor.stop()
             except Exception:
                 pass
+            try:
+                telemetry.stop()
+            except Exception:
+                pass
 
             # Marker final
             try:
@@ -436,7 +583,7 @@ class ExperimentRunner:
 
             # FAILSAFE: se o usuário esqueceu 'collect_artifacts', tenta coletar e rodar ETL
             try:
-                sensor_zeek = out_base / "sensor" / "zeek"
+                sensor_zeek = out_base / sensor.taps[0].id / "zeek"
                 if run_pre_etl and not sensor_zeek.exists():
                     logger.warning("[Runner] sensor/zeek ausente — acionando coleta de artefatos automaticamente (failsafe).")
                     try:
@@ -446,20 +593,13 @@ class ExperimentRunner:
                         logger.warning(f"[Runner] snapshot (failsafe): {e}")
 
                     # puxa de cada VM (mesma lógica do collect_artifacts)
-                    self._pull_tree_b64("sensor", "$HOME/tcc", ["zeek", "pcap", "run"], out_base / "sensor")
-                    try:
-                        vic_ip = ips.get("victim", "")
-                        self._pull_tree_b64("attacker", "$HOME/tcc",
-                                            [f"lists/hydra_{vic_ip}.out", "lists/users.txt",
-                                             "lists/small_wordlist.txt"], out_base / "attacker")
-                    except Exception as e:
-                        logger.warning(f"[Runner] hydra logs (failsafe): {e}")
-                    try:
-                        self._pull_tree_b64("victim", "/var/log", ["auth.log", "auth.log.1"], out_base / "victim")
-                    except Exception as e:
-                        logger.warning(f"[Runner] auth.log (failsafe): {e}")
-
-                    self._write_metadata_and_timeline(out_base, ips, self.timeline)
+                    self._collect_from_vms(out_base, ips, tag=" (failsafe)", sensors=sensor)
+                    self._write_capture_health(out_base, sensor, spec)
+                    self._write_metadata_and_timeline(out_base, ips, self.timeline,
+                                                      {"telemetry": self.telemetry_summary,
+                                                       "capture_health": self.capture_health,
+                                                       "capture_profile": sensor.capture_profile,
+                                                       "sensors": [asdict(t) for t in sensor.taps]})
             except Exception as e:
                 logger.warning(f"[Runner] failsafe de coleta não executado: {e}")
 
@@ -36,6 +36,9 @@ from PySide6.QtWidgets import (
     QMessageBox, QProgressBar,
 )
 
+from lab.datasets.arrow_ipc import ARROW_SUFFIXES, read_arrow
+
+
 class ParquetLoader(QObject):
     loaded = Signal(object, str)   # DataFrame, path
     error = Signal(str, str)       # mensagem, path
@@ -47,7 +50,10 @@ class ParquetLoader(QObject):
 
     def run(self):
         try:
-            if _HAS_PYARROW:
+            if _HAS_PYARROW and self.path.lower().endswith(ARROW_SUFFIXES):
+                # Arrow IPC do ETL (etl_arrow): mapeado em memória, sem desserializar
+                df = read_arrow(self.path)
+            elif _HAS_PYARROW:
                 df = pd.read_parquet(self.path, engine="pyarrow")
             else:
                 df = pd.read_parquet(self.path)
@@ -166,6 +172,11 @@ class MainWindow(QMainWindow):
         self.act_open.triggered.connect(self.open_dialog)
         toolbar.addAction(self.act_open)
 
+        self.act_open_dir = QAction("Abrir dataset (pasta)", self)
+        self.act_open_dir.setShortcut("Ctrl+Shift+O")
+        self.act_open_dir.triggered.connect(self.open_dir_dialog)
+        toolbar.addAction(self.act_open_dir)
+
         self.act_export = QAction("Exportar CSV", self)
         self.act_export.setShortcut("Ctrl+E")
         self.act_export.triggered.connect(self.export_csv)
@@ -250,24 +261,34 @@ class MainWindow(QMainWindow):
     def open_dialog(self):
         path, _ = QFileDialog.getOpenFileName(
             self,
-            "Abrir arquivo .parquet",
+            "Abrir arquivo .parquet/.arrow",
             "",
-            "Arquivos Parquet (*.parquet);;Todos os arquivos (*.*)",
+            "Parquet/Arrow (*.parquet *.arrow *.feather *.ipc);;Todos os arquivos (*.*)",
         )
         if path:
             self.load_file(path)
 
+    def open_dir_dialog(self):
+        # Dataset particionado do ETL (exp_id=/run_ts=/label=): o pyarrow lê a pasta inteira
+        path = QFileDialog.getExistingDirectory(self, "Abrir dataset Parquet (pasta)", "")
+        if path:
+            self.load_file(path)
+
+    @staticmethod
+    def _is_loadable(path: str) -> bool:
+        return os.path.isdir(path) or path.lower().endswith((".parquet",) + ARROW_SUFFIXES)
+
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls():
             for url in e.mimeData().urls():
-                if url.isLocalFile() and url.toLocalFile().lower().endswith(".parquet"):
+                if url.isLocalFile() and self._is_loadable(url.toLocalFile()):
                     e.acceptProposedAction()
                     return
         e.ignore()
 
     def dropEvent(self, e):
         for url in e.mimeData().urls():
-            if url.isLocalFile() and url.toLocalFile().lower().endswith(".parquet"):
+            if url.isLocalFile() and self._is_loadable(url.toLocalFile()):
                 self.load_file(url.toLocalFile())
                 break
 
@@ -295,6 +316,7 @@ class MainWindow(QMainWindow):
         self._loading = on
         self.table.setEnabled(not on)
         self.act_open.setEnabled(not on)
+        self.act_open_dir.setEnabled(not on)
         self.act_export.setEnabled(not on)
         self.act_copy.setEnabled(not on)
         self._progress.setVisible(on)
@@ -447,7 +469,7 @@ class MainWindow(QMainWindow):
     def load_from_cli(self, argv):
         if len(argv) >= 2:
             path = argv[1]
-            if os.path.isfile(path) and path.lower().endswith(".parquet"):
+            if os.path.isdir(path) or (os.path.isfile(path) and path.lower().endswith((".parquet",) + ARROW_SUFFIXES)):
                 self.load_file(path)
 
 
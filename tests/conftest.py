@@ -0,0 +1,34 @@
+# tests/conftest.py
+"""
+Fixtures compartilhadas: experimentos do gerador sintético (lab.datasets.synth) em dois tamanhos,
+gerados uma vez por sessão. O "small" tem rotações .gz do Zeek e vários segmentos de pcap; o
+"medium" um arquivo por log, como um run curto do Runner.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from lab.datasets.synth import SynthSpec, generate_experiment
+
+SIZES = {
+    "small": SynthSpec(rows=3_000, span_s=1800.0, zeek_rotate_s=600.0, gzip_rotated=True, pcap=True,
+                       pcap_rotate_s=300.0, seed=7),
+    "medium": SynthSpec(rows=30_000, pcap=True, seed=42),
+}
+
+
+@pytest.fixture(scope="session", params=sorted(SIZES))
+def synth_exp(request, tmp_path_factory) -> Path:
+    """Diretório de um experimento sintético (layout do Runner), um por tamanho."""
+    out = tmp_path_factory.mktemp(f"exp_{request.param}")
+    generate_experiment(out, SIZES[request.param])
+    return out
+
+
+@pytest.fixture(scope="session")
+def small_exp(tmp_path_factory) -> Path:
+    out = tmp_path_factory.mktemp("exp_small_only")
+    generate_experiment(out, SIZES["small"])
+    return out
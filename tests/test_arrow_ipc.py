@@ -0,0 +1,73 @@
+# tests/test_arrow_ipc.py
+"""Publicação e leitura do Arrow IPC (arrow_ipc) contra o dataset Parquet do ETL."""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from lab.datasets import arrow_ipc
+from lab.datasets.arrow_ipc import ARROW_FILE, arrow_is_current, open_arrow, publish_arrow, read_arrow
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.parquet_dataset import read_dataset
+
+
+def _norm(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in ("exp_id", "run_ts", "label"):
+        df[c] = df[c].astype(str)
+    return df.sort_values("uid").reset_index(drop=True)
+
+
+@pytest.fixture
+def etl_out(small_exp, tmp_path):
+    run_etl(small_exp, tmp_path, workers=1, arrow=True)
+    return tmp_path
+
+
+def test_arrow_matches_dataset(etl_out):
+    arrow = etl_out / ARROW_FILE
+    assert arrow_is_current(etl_out / "dataset", arrow)
+    want = _norm(read_dataset(etl_out / "dataset"))
+    got = _norm(read_arrow(arrow))
+    pd.testing.assert_frame_equal(got[want.columns], want, check_dtype=False)
+
+
+def test_arrow_columns_and_filters(etl_out):
+    arrow = etl_out / ARROW_FILE
+    table = open_arrow(arrow, columns=["ts", "label"])
+    assert table.column_names == ["ts", "label"]
+    attacks = read_arrow(arrow, columns=["uid", "label"], filters=[("label", "!=", "benign")])
+    full = read_dataset(etl_out / "dataset", columns=["uid", "label"])
+    assert sorted(attacks["uid"]) == sorted(full.loc[full["label"].astype(str) != "benign", "uid"])
+
+
+def test_arrow_removed_without_option(small_exp, etl_out):
+    run_etl(small_exp, etl_out, workers=1)
+    assert not (etl_out / ARROW_FILE).exists()
+
+
+def test_replace_blocked_defers_publication(small_exp, etl_out, monkeypatch):
+    """Windows: o arquivo mapeado por um leitor não pode ser trocado — versão anterior fica, desatualizada."""
+    arrow = etl_out / ARROW_FILE
+    before = arrow.read_bytes()
+    real_replace = os.replace
+
+    def blocked(src, dst):
+        if os.fspath(dst) == os.fspath(arrow):
+            raise PermissionError(13, "arquivo em uso")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(arrow_ipc, "_REPLACE_TRIES", 2)
+    monkeypatch.setattr(arrow_ipc.os, "replace", blocked)
+    (etl_out / "dataset" / "_metadata").touch()
+    os.utime(arrow, (0, 0))
+    assert publish_arrow(etl_out / "dataset", arrow) is None
+    assert arrow.read_bytes() == before
+    assert not arrow.with_suffix(".arrow.tmp").exists()
+    assert not arrow_is_current(etl_out / "dataset", arrow)
+    monkeypatch.undo()
+    # O próximo ETL (sem mudança de entrada) republica por estar desatualizado
+    run_etl(small_exp, etl_out, workers=1, arrow=True)
+    assert arrow_is_current(etl_out / "dataset", arrow)
@@ -0,0 +1,127 @@
+# tests/test_auth_events.py
+"""auth.log do sshd (ISO e syslog clássico, .gz), sessões e join com os fluxos; saída do Hydra."""
+from __future__ import annotations
+
+import gzip
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets.auth_events import (auth_sessions, join_auth_to_flows, load_host_truth, parse_auth_log,
+                                      parse_hydra_out)
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.parquet_dataset import read_dataset
+from lab.datasets.zeek_reader import find_zeek_logs, read_zeek_log
+
+ISO = [
+    "2024-05-01T10:00:01.100000+00:00 victim sshd[100]: Invalid user admin from 10.0.0.9 port 40001",
+    "2024-05-01T10:00:01.200000+00:00 victim sshd[100]: Failed password for invalid user admin from 10.0.0.9 port 40001 ssh2",
+    "2024-05-01T10:00:02.000000+00:00 victim sshd[100]: Failed password for invalid user admin from 10.0.0.9 port 40001 ssh2",
+    "2024-05-01T10:00:03.000000+00:00 victim sshd[100]: error: maximum authentication attempts exceeded for invalid user admin from 10.0.0.9 port 40001 ssh2 [preauth]",
+    "2024-05-01T10:00:03.500000+00:00 victim CRON[7]: pam_unix(cron:session): session opened for user root",
+    "2024-05-01T10:00:04.000000+00:00 victim sshd[101]: Failed password for vagrant from 10.0.0.9 port 40002 ssh2",
+    "2024-05-01T10:00:05.000000+00:00 victim sshd[101]: Accepted password for vagrant from 10.0.0.9 port 40002 ssh2",
+    "2024-05-01T10:00:09.000000+00:00 victim sshd[101]: Disconnected from user vagrant 10.0.0.9 port 40002",
+]
+CLASSIC = [
+    "May  1 10:00:10 victim sshd[102]: Connection closed by authenticating user root 10.0.0.7 port 50000 [preauth]",
+    "May  1 10:00:11 victim sshd[103]: Accepted publickey for vagrant from 10.0.0.5 port 50001 ssh2: ED25519 SHA256:x",
+    "May  1 10:00:12 victim sshd[103]: Received disconnect from 10.0.0.5 port 50001:11: disconnected by user",
+]
+REF = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _ts(s: str) -> float:
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def auth_files(tmp_path):
+    iso = tmp_path / "auth.log"
+    iso.write_text("\n".join(ISO) + "\n")
+    classic = tmp_path / "auth.log.1.gz"
+    with gzip.open(classic, "wt") as fh:
+        fh.write("\n".join(CLASSIC) + "\n")
+    return [iso, classic]
+
+
+def test_parse_mixed_iso_and_classic_syslog(auth_files):
+    ev = parse_auth_log(auth_files, ref_ts=REF)
+    assert len(ev) == len(ISO) - 1 + len(CLASSIC)   # a linha do CRON fica fora
+    assert ev["ts"].is_monotonic_increasing
+    assert ev["ts"].iloc[0] == pytest.approx(_ts("2024-05-01T10:00:01.1"))
+    assert ev["ts"].iloc[-1] == pytest.approx(_ts("2024-05-01T10:00:12"))
+    by_pid = ev.groupby("pid")["kind"].apply(list).to_dict()
+    assert by_pid[100] == ["invalid_user", "failed", "failed", "max_attempts"]
+    assert by_pid[101] == ["failed", "accepted", "closed"]
+    assert by_pid[102] == ["closed"] and by_pid[103] == ["accepted", "closed"]
+    assert set(ev.loc[ev["pid"] == 100, "user"]) == {"admin"}
+    assert ev.loc[ev["pid"] == 103, "src_port"].tolist() == [50001, 50001]
+
+
+def test_sessions_outcome_and_failures(auth_files):
+    s = auth_sessions(parse_auth_log(auth_files, ref_ts=REF)).set_index("pid")
+    assert s.loc[100, ["outcome", "failures", "user"]].tolist() == ["failure", 2, "admin"]
+    assert s.loc[101, ["outcome", "failures", "user"]].tolist() == ["success", 1, "vagrant"]
+    assert s.loc[102, "outcome"] == "noauth"
+    assert s.loc[103, ["outcome", "user"]].tolist() == ["success", "vagrant"]
+    assert s.loc[101, "first_ts"] == pytest.approx(_ts("2024-05-01T10:00:04"))
+    assert s.loc[101, "last_ts"] == pytest.approx(_ts("2024-05-01T10:00:09"))
+
+
+def test_classic_syslog_year_rollover(tmp_path):
+    path = tmp_path / "auth.log"
+    path.write_text("Dec 31 23:59:58 victim sshd[9]: Failed password for root from 10.0.0.9 port 1 ssh2\n"
+                    "Jan  1 00:00:02 victim sshd[9]: Failed password for root from 10.0.0.9 port 1 ssh2\n")
+    ev = parse_auth_log([path], ref_ts=datetime(2025, 1, 1, 0, 5, tzinfo=timezone.utc).timestamp())
+    assert ev["ts"].tolist() == [_ts("2024-12-31T23:59:58"), _ts("2025-01-01T00:00:02")]
+
+
+def test_join_picks_open_flow_on_same_endpoint(auth_files):
+    sessions = auth_sessions(parse_auth_log(auth_files, ref_ts=REF))
+    t0 = _ts("2024-05-01T10:00:00")
+    flows = pd.DataFrame({
+        "ts": [t0, t0 + 3.5, t0 - 100, t0 + 1, t0 + 10.5],
+        "src_ip": ["10.0.0.9", "10.0.0.9", "10.0.0.9", "10.0.0.8", "10.0.0.5"],
+        "src_port": [40001, 40002, 40002, 40001, 50001],
+        "duration": [4.0, 6.0, 1.0, 4.0, 2.0]})
+    got = join_auth_to_flows(flows, sessions)
+    assert got["auth_outcome"].tolist() == ["failure", "success", "", "", "success"]
+    assert got["auth_failures"].tolist() == [2, 1, 0, 0, 0]
+    assert got["auth_user"].tolist() == ["admin", "vagrant", "", "", "vagrant"]
+    # Relógio do victim adiantado além da tolerância: sem fluxo aberto, sem resultado
+    late = sessions.assign(first_ts=sessions["first_ts"] + 60)
+    assert (join_auth_to_flows(flows, late)["auth_outcome"] == "").all()
+
+
+def test_hydra_out(tmp_path):
+    path = tmp_path / "hydra_10.0.0.2.out"
+    path.write_text("# Hydra v9.5 run at 2024-05-01 10:00:00 on 10.0.0.2 ssh (hydra -l vagrant ...)\n"
+                    "[22][ssh] host: 10.0.0.2   login: vagrant   password: vagrant\n"
+                    "# Hydra v9.5 run at 2024-05-01 11:00:00 on 10.0.0.2 http-post-form (...)\n"
+                    "[80][http-post-form] host: 10.0.0.2   login: admin   password: p@ss word\n")
+    h = parse_hydra_out([path])
+    assert h["run_started"].tolist() == [_ts("2024-05-01T10:00:00"), _ts("2024-05-01T11:00:00")]
+    assert h[["port", "service", "login", "password"]].values.tolist() == [
+        [22, "ssh", "vagrant", "vagrant"], [80, "http-post-form", "admin", "p@ss word"]]
+
+
+def test_etl_auth_columns_match_ssh_log(small_exp, tmp_path):
+    """No experimento sintético o ssh.log traz a verdade (auth_success/attempts) de cada sessão."""
+    assert not load_host_truth(small_exp).sessions.empty
+    run_etl(small_exp, tmp_path, workers=1)
+    ds = read_dataset(tmp_path / "dataset", columns=["uid", "auth_outcome", "auth_failures"])
+    ssh = read_zeek_log(find_zeek_logs(small_exp / "sensor" / "zeek", "ssh"),
+                        columns=["uid", "id.resp_p", "auth_success", "auth_attempts", "client"])
+    m = ssh.merge(ds, on="uid", how="left", validate="one_to_one")
+    m = m[np.asarray(m["id.resp_p"], dtype=np.int64) == 22]
+    assert len(m) and m["auth_outcome"].notna().all()
+    success = m["auth_success"].astype(bool)   # tipo bool do Zeek (T/F)
+    assert (m.loc[success, "auth_outcome"] == "success").all()
+    brute = m["client"].astype(str).str.contains("libssh")
+    fails = np.asarray(m["auth_attempts"], dtype=np.int64) - success.astype(np.int64)
+    failed = brute & ~success & (fails > 0)
+    assert failed.any() and (m.loc[failed, "auth_outcome"] == "failure").all()
+    np.testing.assert_array_equal(m.loc[brute, "auth_failures"].to_numpy(dtype=np.int64), fails[brute])
@@ -0,0 +1,188 @@
+# tests/test_bench.py
+"""
+Benchmarks (pytest-benchmark) de cada etapa do ETL sobre experimentos sintéticos em três tamanhos.
+
+    python -m pytest tests/test_bench.py --benchmark-only
+    python -m pytest tests/test_bench.py --benchmark-only -k 150k --benchmark-group-by=func
+    python -m pytest tests/test_bench.py --benchmark-compare     # contra a última rodada salva
+    python -m pytest --benchmark-disable                         # uma rodada de cada, só como teste
+
+Rodadas curtas (pedantic): o objetivo é acompanhar regressão e a forma da curva entre tamanhos a
+cada commit; os números de capacidade para volumes grandes continuam em
+python -m lab.datasets.bench suite.
+"""
+from __future__ import annotations
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from lab.datasets.arrow_ipc import ARROW_FILE, publish_arrow, read_arrow
+from lab.datasets.auth_events import label_zeek_log, load_host_truth
+from lab.datasets.compact import compact_dataset
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.features import compute_multi_window_features
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.parquet_dataset import read_dataset, write_metadata_summary
+from lab.datasets.pcap_flows import extract_flows, find_pcaps
+from lab.datasets.pcap_index import PcapIndex, build_exp_index
+from lab.datasets.pre_etl import aggregate_conn_windows, find_conn_logs, generate_conn_features
+from lab.datasets.sketches import SketchConfig, merge_states, sketch_state
+from lab.datasets.synth import SynthSpec, generate_experiment
+from lab.datasets.zeek_reader import read_zeek_log
+
+BENCH_SIZES = {
+    "3k": SynthSpec(rows=3_000, span_s=1800.0, zeek_rotate_s=600.0, gzip_rotated=True, pcap=True,
+                    pcap_rotate_s=300.0, seed=7),
+    "30k": SynthSpec(rows=30_000, pcap=True, seed=42),
+    "150k": SynthSpec(rows=150_000, zeek_rotate_s=600.0, pcap=True, pcap_rotate_s=600.0, seed=3),
+}
+
+
+@pytest.fixture(scope="module", params=list(BENCH_SIZES))
+def bench_exp(request, tmp_path_factory):
+    out = tmp_path_factory.mktemp(f"bench_{request.param}")
+    generate_experiment(out, BENCH_SIZES[request.param])
+    return out
+
+
+@pytest.fixture(scope="module")
+def bench_etl_out(bench_exp, tmp_path_factory):
+    """Saída do ETL final (dataset + full.arrow) de cada tamanho, para as etapas a jusante."""
+    return run_etl(bench_exp, tmp_path_factory.mktemp("bench_etl"), workers=1, arrow=True)
+
+
+def _fresh_dirs(tmp_path, prefix):
+    n = [0]
+
+    def nxt():
+        n[0] += 1
+        return tmp_path / f"{prefix}{n[0]}"
+    return nxt
+
+
+def test_bench_zeek_reader(benchmark, bench_exp):
+    paths = find_conn_logs(bench_exp)
+    df = benchmark.pedantic(read_zeek_log, args=(paths,), rounds=3)
+    assert len(df)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "duckdb"])
+def test_bench_pre_etl(benchmark, bench_exp, tmp_path, engine):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+        nxt = _fresh_dirs(tmp_path, "w")
+
+        def run():
+            return generate_conn_features(bench_exp, engine="duckdb", out_path=nxt().with_suffix(".parquet"))
+        assert benchmark.pedantic(run, rounds=3).exists()
+    else:
+        # Sem o cache de features: cada rodada agrega o conn.log inteiro
+        out = benchmark.pedantic(aggregate_conn_windows, args=(bench_exp,), kwargs={"cache": False}, rounds=3)
+        assert len(out)
+
+
+@pytest.mark.parametrize("parser", ["pandas", "arrow"])
+def test_bench_etl(benchmark, bench_exp, tmp_path, parser):
+    nxt = _fresh_dirs(tmp_path, "out")
+
+    def setup():
+        return (bench_exp, nxt()), {"workers": 1, "parser": parser}
+
+    out = benchmark.pedantic(run_etl, setup=setup, rounds=3)
+    assert (out / "dataset").exists()
+
+
+def test_bench_labeler(benchmark, bench_exp):
+    df = read_zeek_log(find_conn_logs(bench_exp), columns=["ts", "id.orig_h", "id.resp_h"])
+    ts = np.asarray(df["ts"], dtype=np.int64) / 1e9
+    labeler = IntervalLabeler(load_attack_windows(bench_exp), *load_targets(bench_exp))
+    codes = benchmark.pedantic(labeler.codes_for, args=(ts, df["id.orig_h"], df["id.resp_h"]), rounds=5)
+    assert len(codes) == len(df)
+
+
+def test_bench_multi_window(benchmark, bench_exp):
+    out = benchmark.pedantic(compute_multi_window_features, args=(bench_exp, ["60", "300", "300/60"]),
+                             kwargs={"cache_dir": None}, rounds=3)
+    assert set(out) == {"w60", "w300", "w300h60"}
+
+
+@pytest.mark.parametrize("exact", [False, True], ids=["hll", "exact"])
+def test_bench_sketches(benchmark, bench_exp, exact):
+    df = read_zeek_log(find_conn_logs(bench_exp), columns=["ts", "id.orig_h", "id.resp_p"])
+    keys = pd.DataFrame({"window_start": np.asarray(df["ts"], dtype=np.int64) // (60 * 10**9),
+                         "src_ip": df["id.orig_h"].astype(str)})
+    cfg = SketchConfig(exact=exact)
+    blocks = np.array_split(np.arange(len(df)), 4)
+
+    def run():
+        states = [sketch_state(keys.iloc[b], np.asarray(df["id.resp_p"])[b], cfg) for b in blocks]
+        return merge_states(states, ["window_start", "src_ip"], cfg)
+
+    assert len(benchmark.pedantic(run, rounds=3))
+
+
+def test_bench_auth_join(benchmark, bench_exp):
+    truth = load_host_truth(bench_exp)
+    ssh = benchmark.pedantic(label_zeek_log, args=(bench_exp, truth), rounds=3)
+    assert (ssh["auth_outcome"] != "").any()
+
+
+def test_bench_arrow_publish(benchmark, bench_etl_out, tmp_path):
+    nxt = _fresh_dirs(tmp_path, "arrow")
+    path = benchmark.pedantic(lambda: publish_arrow(bench_etl_out / "dataset", nxt() / ARROW_FILE), rounds=3)
+    assert path is not None and path.exists()
+
+
+@pytest.mark.parametrize("source", ["parquet", "arrow"])
+def test_bench_read(benchmark, bench_etl_out, source):
+    if source == "arrow":
+        df = benchmark.pedantic(read_arrow, args=(bench_etl_out / ARROW_FILE,), rounds=5)
+    else:
+        df = benchmark.pedantic(read_dataset, args=(bench_etl_out / "dataset",), rounds=5)
+    assert len(df)
+
+
+def test_bench_compaction(benchmark, bench_etl_out, tmp_path):
+    """Dataset com o run duplicado em outro run_ts: compacta e deduplica a cada rodada."""
+    nxt = _fresh_dirs(tmp_path, "ds")
+
+    def setup():
+        root = nxt()
+        shutil.copytree(bench_etl_out / "dataset", root)
+        run = next(root.glob("exp_id=*/run_ts=*"))
+        shutil.copytree(run, run.parent / "run_ts=19700101T000000Z")
+        write_metadata_summary(root)
+        return (root,), {}
+
+    report = benchmark.pedantic(compact_dataset, setup=setup, rounds=3)
+    assert report["experiments"] and "skipped" not in report["experiments"][0]
+
+
+def test_bench_pcap_flows(benchmark, bench_exp, tmp_path):
+    paths = find_pcaps(bench_exp)
+    nxt = _fresh_dirs(tmp_path, "flows")
+    stats = benchmark.pedantic(lambda: extract_flows(paths, nxt().with_suffix(".parquet")), rounds=3)
+    assert stats.flows > 0
+
+
+def test_bench_pcap_index_build(benchmark, bench_exp):
+    info = benchmark.pedantic(build_exp_index, args=(bench_exp,), kwargs={"full": True}, rounds=3)
+    assert info
+
+
+def test_bench_pcap_index(benchmark, bench_exp):
+    build_exp_index(bench_exp, full=True)
+    with PcapIndex.for_experiment(bench_exp) as idx:
+        ts = np.asarray(idx.ts)
+        rng = np.random.default_rng(0)
+        bounds = np.sort(rng.choice(ts, (200, 2)), axis=1) / 1e9
+
+        def queries():
+            return sum(len(idx.time_range(a, b)) for a, b in bounds)
+
+        assert benchmark.pedantic(queries, rounds=5) > 0
@@ -0,0 +1,70 @@
+# tests/test_compact.py
+"""Compactação/deduplicação (compact.compact_dataset) num dataset com vários experimentos."""
+from __future__ import annotations
+
+import shutil
+
+import pandas as pd
+import pytest
+
+from lab.datasets.compact import compact_dataset, flow_hash
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.parquet_dataset import leaf_dirs, read_dataset, write_metadata_summary
+from lab.datasets.synth import SynthSpec, generate_experiment
+
+
+@pytest.fixture
+def shared_root(tmp_path):
+    """Dois experimentos num só dataset; EXP_A com o run copiado para outro run_ts (duplicatas)."""
+    root = tmp_path / "dataset"
+    for name, seed in (("EXP_A", 1), ("EXP_B", 2)):
+        exp = tmp_path / "raw" / name
+        generate_experiment(exp, SynthSpec(rows=1_500, seed=seed))
+        run_etl(exp, tmp_path / "etl" / name, workers=1)
+        shutil.copytree(tmp_path / "etl" / name / "dataset" / f"exp_id={name}", root / f"exp_id={name}")
+    run = next((root / "exp_id=EXP_A").glob("run_ts=*"))
+    shutil.copytree(run, run.parent / "run_ts=19700101T000000Z")
+    write_metadata_summary(root)
+    return root
+
+
+def _frame(root, exp_id):
+    df = read_dataset(root, filters=[("exp_id", "=", exp_id)])
+    return df.drop(columns=["run_ts"]).sort_values("uid").reset_index(drop=True)
+
+
+def test_compact_dedups_one_experiment_only(shared_root):
+    a_before = read_dataset(shared_root, filters=[("exp_id", "=", "EXP_A")])
+    b_files = sorted(f.relative_to(shared_root) for f in (shared_root / "exp_id=EXP_B").rglob("*.parquet"))
+    b_before = _frame(shared_root, "EXP_B")
+    # Os nomes dos arquivos se repetem entre experimentos (mesmo conn.log relativo)
+    a_names = {f.name for f in (shared_root / "exp_id=EXP_A").rglob("*.parquet")}
+    assert a_names & {f.name for f in b_files}
+
+    report = compact_dataset(shared_root)
+    by_exp = {e["exp_id"]: e for e in report["experiments"]}
+    assert by_exp["EXP_A"]["duplicates"] == len(a_before) // 2
+    assert by_exp["EXP_B"].get("skipped")
+
+    a_after = read_dataset(shared_root, filters=[("exp_id", "=", "EXP_A")])
+    assert len(a_after) == len(a_before) // 2
+    assert not pd.Series(flow_hash(a_after)).duplicated().any()
+    # Fica o run_ts mais novo
+    assert "19700101T000000Z" not in set(a_after["run_ts"].astype(str))
+    assert sorted(f.relative_to(shared_root) for f in (shared_root / "exp_id=EXP_B").rglob("*.parquet")) == b_files
+    pd.testing.assert_frame_equal(_frame(shared_root, "EXP_B"), b_before)
+
+
+def test_compact_is_idempotent(shared_root):
+    compact_dataset(shared_root)
+    leaves = leaf_dirs(shared_root)
+    again = compact_dataset(shared_root)
+    assert all(e.get("skipped") for e in again["experiments"])
+    assert leaf_dirs(shared_root) == leaves
+
+
+def test_dry_run_changes_nothing(shared_root):
+    files = sorted(shared_root.rglob("*.parquet"))
+    report = compact_dataset(shared_root, dry_run=True)
+    assert report["duplicates"] > 0
+    assert sorted(shared_root.rglob("*.parquet")) == files
@@ -0,0 +1,89 @@
+# tests/test_etl.py
+"""ETL final (etl_netsec.run_etl): a saída não depende de shards, parser nem blocos; rótulos por fluxo."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets import etl_netsec
+from lab.datasets.etl_netsec import run_etl
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.parquet_dataset import read_dataset
+from lab.datasets.pre_etl import find_conn_logs
+from lab.datasets.sampling import SamplingSpec
+from lab.datasets.zeek_reader import read_zeek_log
+
+VARIANTS = {
+    "default": {},
+    "chunked": {"chunk_rows": 700, "csv": True},
+    "arrow": {"chunk_rows": 700, "parser": "arrow"},
+}
+
+
+def _dataset(out) -> pd.DataFrame:
+    df = read_dataset(out / "dataset")
+    return df.sort_values("uid").reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def etl_outputs(synth_exp, tmp_path_factory):
+    out = {}
+    for name, kw in VARIANTS.items():
+        dst = tmp_path_factory.mktemp(f"etl_{name}")
+        run_etl(synth_exp, dst, workers=1, **kw)
+        out[name] = dst
+    return out
+
+
+def test_output_independent_of_sharding(synth_exp, etl_outputs):
+    base = _dataset(etl_outputs["default"])
+    n_conn = len(read_zeek_log(find_conn_logs(synth_exp), columns=["uid"]))
+    assert len(base) == n_conn
+    cols = ["uid", "ts", "src_ip", "dst_ip", "dst_port", "label", "auth_outcome", "total_bytes"]
+    for name in VARIANTS:
+        other = _dataset(etl_outputs[name])
+        pd.testing.assert_frame_equal(other[cols].astype(str), base[cols].astype(str), obj=name)
+    csv = pd.read_csv(etl_outputs["chunked"] / "csv" / "full.csv")
+    assert len(csv) == n_conn and set(csv["uid"]) == set(base["uid"])
+
+
+def test_labels_match_labeler(synth_exp, etl_outputs):
+    df = _dataset(etl_outputs["default"])
+    labeler = IntervalLabeler(load_attack_windows(synth_exp), *load_targets(synth_exp))
+    want = labeler.label(df["ts"].to_numpy(dtype=np.float64), df["src_ip"].astype(str).to_numpy(),
+                         df["dst_ip"].astype(str).to_numpy())
+    assert (df["label"].astype(str).to_numpy() == want.astype(str)).all()
+    assert set(df["label"].astype(str)) - {"benign"}
+
+
+def test_incremental_rerun_is_noop(synth_exp, etl_outputs):
+    out = etl_outputs["default"]
+    before = _dataset(out)
+    run_etl(synth_exp, out, workers=1)
+    pd.testing.assert_frame_equal(_dataset(out), before)
+
+
+def test_sampling_weights_sum_to_population(synth_exp, tmp_path):
+    run_etl(synth_exp, tmp_path, workers=1, sample=SamplingSpec(per_window=20))
+    df = read_dataset(tmp_path / "dataset")
+    full = len(read_zeek_log(find_conn_logs(synth_exp), columns=["uid"]))
+    assert len(df) < full
+    # Horvitz-Thompson: a soma dos pesos estima (aqui, reproduz) o nº de fluxos de cada rótulo
+    assert df["sample_weight"].sum() == pytest.approx(full, rel=1e-9)
+
+
+def test_failed_rebuild_keeps_published_dataset(small_exp, tmp_path, monkeypatch):
+    run_etl(small_exp, tmp_path, workers=1)
+    before = _dataset(tmp_path)
+
+    def crash(*a, **kw):
+        raise RuntimeError("worker caiu")
+
+    monkeypatch.setattr(etl_netsec, "_execute", crash)
+    with pytest.raises(RuntimeError):
+        run_etl(small_exp, tmp_path, workers=1, full=True)
+    pd.testing.assert_frame_equal(_dataset(tmp_path), before)
+    monkeypatch.undo()
+    run_etl(small_exp, tmp_path, workers=1, full=True)
+    pd.testing.assert_frame_equal(_dataset(tmp_path), before)
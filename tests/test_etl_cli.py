@@ -0,0 +1,102 @@
+# tests/test_etl_cli.py
+"""CLI do ETL (lab.datasets.etl): as três engines geram o mesmo dataset e o mesmo pré-ETL; resumo e --since."""
+from __future__ import annotations
+
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets.etl import ENGINES, main, parse_since
+from lab.datasets.parquet_dataset import read_dataset, run_ts_of
+
+
+def _has(mod: str) -> bool:
+    try:
+        __import__(mod)
+    except ImportError:
+        return False
+    return True
+
+
+@pytest.fixture(scope="module")
+def cli_runs(small_exp, tmp_path_factory):
+    """Um `main([...])` por engine, cada um sobre uma cópia do experimento (o pré-ETL grava nele)."""
+    out = {}
+    for engine in ENGINES:
+        if engine == "duckdb" and not _has("duckdb"):
+            continue
+        base = tmp_path_factory.mktemp(f"cli_{engine}")
+        exp = base / "EXP1"
+        shutil.copytree(small_exp, exp)
+        summary = base / "summary.json"
+        code = main([str(exp), "--out", str(base / "etl"), "--engine", engine, "--workers", "1",
+                     "--chunk-rows", "700", "--summary", str(summary), "--quiet"])
+        out[engine] = (code, exp, base / "etl" / "EXP1", json.loads(summary.read_text(encoding="utf-8")))
+    return out
+
+
+def test_summary_and_exit_code(cli_runs):
+    for engine, (code, exp, out, summary) in cli_runs.items():
+        assert code == 0 and summary["engine"] == engine and summary["failed"] == []
+        (run,) = summary["runs"]
+        assert run["status"] == "ok" and run["out"] == str(out) and run["run_ts"] == run_ts_of(exp)
+        assert "pre_etl_error" not in run
+        assert summary["rows"] == run["rows"] == len(read_dataset(out / "dataset", columns=["uid"]))
+
+
+def test_engines_agree(cli_runs):
+    def dataset(out):
+        return read_dataset(out / "dataset").sort_values("uid").reset_index(drop=True)
+
+    def windows(exp):
+        df = pd.read_parquet(exp / "features_conn_window.parquet")
+        for c in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[c]):
+                df[c] = df[c].astype(str)
+        keys = [c for c in ("window_start", "src_ip", "dst_ip", "dst_port") if c in df.columns]
+        return df.sort_values(keys).reset_index(drop=True)
+
+    (_, exp0, out0, _) = cli_runs["pandas"]
+    base, base_w = dataset(out0), windows(exp0)
+    assert len(base) and len(base_w)
+    for engine, (_, exp, out, _) in cli_runs.items():
+        pd.testing.assert_frame_equal(dataset(out).astype(str), base.astype(str), obj=engine)
+        got = windows(exp)
+        assert list(got.columns) == list(base_w.columns), engine
+        # distinct_*: o approx_count_distinct do DuckDB tem precisão fixa e erra muito em contagens
+        # pequenas (ver corpus_windows); nele só se exige a mesma presença. O resto bate, a menos da
+        # ordem das somas em float.
+        est = [c for c in got.columns if c.startswith("distinct_")] if engine == "duckdb" else []
+        pd.testing.assert_frame_equal(got.drop(columns=est), base_w.drop(columns=est), check_dtype=False,
+                                      rtol=1e-9, obj=f"pré-ETL {engine}")
+        np.testing.assert_array_equal(got[est].to_numpy() > 0, base_w[est].to_numpy() > 0)
+
+
+def test_failed_run_exits_1(tmp_path, capsys):
+    exp = tmp_path / "EXP_BAD"
+    (exp / "sensor" / "zeek").mkdir(parents=True)
+    assert main([str(exp), "--out", str(tmp_path / "etl"), "--workers", "1", "--no-pre-etl", "--quiet"]) == 1
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["failed"] == ["EXP_BAD"] and summary["runs"][0]["error"]
+
+
+def test_since_filters_runs(small_exp, tmp_path, capsys):
+    ts = run_ts_of(small_exp)
+    for since, n in ((ts, 1), ("2999-01-01", 0)):
+        assert main([str(small_exp), "--out", str(tmp_path / since), "--since", since, "--no-pre-etl",
+                     "--workers", "1", "--quiet"]) == 0
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["since"] == parse_since(since) and len(summary["runs"]) == n
+
+
+def test_parse_since_formats():
+    want = "20240501T000000Z"
+    assert parse_since("2024-05-01") == want
+    assert parse_since("2024-05-01T03:00:00+03:00") == want
+    assert parse_since("2024-05-01T00:00:00Z") == want
+    assert parse_since("1714521600") == want
+    assert parse_since(want) == want
+    assert parse_since(None) is None and parse_since("") is None
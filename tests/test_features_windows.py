@@ -0,0 +1,93 @@
+# tests/test_features_windows.py
+"""
+compute_multi_window_features (uma passada, janelas maiores/hopping combinadas dos parciais)
+contra o agregado recalculado direto do conn.log, janela por janela.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets.features import WindowSpec, compute_multi_window_features
+from lab.datasets.labeling import IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.pre_etl import FAILED_STATES, KEY_COLUMNS, find_conn_logs
+from lab.datasets.sketches import SketchConfig
+from lab.datasets.zeek_reader import NAT_NS, ip_to_str, read_zeek_log
+
+WINDOWS = ["60", "300", "300/60", "120/45"]
+FEATURES = ["conn_count", "orig_bytes", "duration_max", "failed_count", "first_ts", "last_ts", "label",
+            "distinct_dst_ports", "distinct_src_hosts"]
+
+
+def _flows(exp_dir) -> pd.DataFrame:
+    df = read_zeek_log(find_conn_logs(exp_dir), columns=["ts", "id.orig_h", "id.resp_h", "id.resp_p",
+                                                         "orig_bytes", "duration", "conn_state"])
+    ts_ns = np.asarray(df["ts"], dtype=np.int64)
+    df = df[ts_ns != NAT_NS].reset_index(drop=True)
+    ts_ns = np.asarray(df["ts"], dtype=np.int64)
+    labeler = IntervalLabeler(load_attack_windows(exp_dir), *load_targets(exp_dir))
+    return pd.DataFrame({
+        "t_s": ts_ns // 1_000_000_000,
+        "ts": ts_ns / 1e9,
+        "src_ip": ip_to_str(df["id.orig_h"]),
+        "dst_ip": ip_to_str(df["id.resp_h"]),
+        "dst_port": np.asarray(df["id.resp_p"], dtype=np.int32),
+        "orig_bytes": pd.to_numeric(df["orig_bytes"], errors="coerce").fillna(0).to_numpy(dtype=np.float64),
+        "duration": pd.to_numeric(df["duration"], errors="coerce").fillna(0).to_numpy(dtype=np.float64),
+        "failed": np.isin(df["conn_state"].astype(str).to_numpy(), FAILED_STATES).astype(np.int64),
+        "rank": labeler.rank_of_code[labeler.codes_for(ts_ns / 1e9, df["id.orig_h"], df["id.resp_h"])],
+    }), labeler
+
+
+def direct_windows(flows: pd.DataFrame, labeler: IntervalLabeler, size: int, hop: int) -> pd.DataFrame:
+    """Cada fluxo em todas as janelas [k*hop, k*hop + size) que o contêm; agrega direto."""
+    parts = []
+    last = flows["t_s"].to_numpy() // hop
+    for j in range(-(-size // hop)):
+        start = (last - j) * hop
+        keep = (start >= 0) & (start + size > flows["t_s"].to_numpy())
+        parts.append(flows[keep].assign(window_start=start[keep]))
+    exploded = pd.concat(parts, ignore_index=True)
+    agg = exploded.groupby(KEY_COLUMNS, observed=True).agg(
+        conn_count=("ts", "size"), orig_bytes=("orig_bytes", "sum"), duration_max=("duration", "max"),
+        failed_count=("failed", "sum"), first_ts=("ts", "min"), last_ts=("ts", "max"),
+        label_rank=("rank", "max")).reset_index()
+    agg["label"] = labeler.ranked[agg["label_rank"].to_numpy(dtype=np.int64)]
+    for name, by, col in (("distinct_dst_ports", "src_ip", "dst_port"), ("distinct_src_hosts", "dst_ip", "src_ip")):
+        n = exploded.groupby(["window_start", by], observed=True)[col].nunique().rename(name).reset_index()
+        agg = agg.merge(n, on=["window_start", by], how="left")
+    return agg.drop(columns="label_rank")
+
+
+@pytest.fixture(scope="module")
+def multi(synth_exp):
+    return compute_multi_window_features(synth_exp, WINDOWS, features=FEATURES, cache_dir=None,
+                                         sketch=SketchConfig(exact=True))
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+def test_multi_window_matches_direct(synth_exp, multi, window):
+    spec = WindowSpec.parse(window)
+    got = multi[spec.name].copy()
+    got["src_ip"], got["dst_ip"] = got["src_ip"].astype(str), got["dst_ip"].astype(str)
+    flows, labeler = _flows(synth_exp)
+    want = direct_windows(flows, labeler, int(spec.size_s), spec.hop)
+    got = got.sort_values(KEY_COLUMNS).reset_index(drop=True)
+    want = want.sort_values(KEY_COLUMNS).reset_index(drop=True)
+    assert len(got) == len(want)
+    pd.testing.assert_frame_equal(got[KEY_COLUMNS].astype(str), want[KEY_COLUMNS].astype(str))
+    for c in ("conn_count", "failed_count", "distinct_dst_ports", "distinct_src_hosts"):
+        np.testing.assert_array_equal(got[c].to_numpy(dtype=np.int64), want[c].to_numpy(dtype=np.int64), err_msg=c)
+    for c in ("orig_bytes", "duration_max", "first_ts", "last_ts"):
+        np.testing.assert_allclose(got[c].to_numpy(dtype=np.float64), want[c].to_numpy(dtype=np.float64),
+                                   rtol=1e-12, err_msg=c)
+    assert (got["label"].astype(str).to_numpy() == want["label"].astype(str).to_numpy()).all()
+
+
+def test_multi_window_matches_single_resolution(synth_exp, multi):
+    for window in WINDOWS:
+        spec = WindowSpec.parse(window)
+        alone = compute_multi_window_features(synth_exp, [spec], features=FEATURES, cache_dir=None,
+                                              sketch=SketchConfig(exact=True))[spec.name]
+        pd.testing.assert_frame_equal(multi[spec.name], alone)
@@ -0,0 +1,55 @@
+# tests/test_labeling.py
+"""IntervalLabeler contra um laço força-bruta (janela vencedora por fluxo, uma a uma)."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from lab.datasets.labeling import BENIGN, AttackWindow, IntervalLabeler, load_attack_windows, load_targets
+from lab.datasets.pre_etl import find_conn_logs
+from lab.datasets.zeek_reader import ip_to_str, read_zeek_log
+
+
+def brute_force_labels(windows, attacker_ip, victim_ip, ts, src, dst):
+    out = []
+    for t, s, d in zip(ts, src, dst):
+        if attacker_ip not in (s, d) or (victim_ip and victim_ip not in (s, d)):
+            out.append(BENIGN)
+            continue
+        hits = [w for w in windows if w.t0 <= t <= w.t1]
+        out.append(max(hits, key=lambda w: w.priority).label if hits else BENIGN)
+    return np.array(out, dtype=object)
+
+
+def test_labeler_matches_brute_force_on_experiment(synth_exp):
+    windows = load_attack_windows(synth_exp)
+    attacker_ip, victim_ip = load_targets(synth_exp)
+    assert windows and attacker_ip and victim_ip
+    df = read_zeek_log(find_conn_logs(synth_exp), columns=["ts", "id.orig_h", "id.resp_h"])
+    ts = np.asarray(df["ts"], dtype=np.int64) / 1e9
+    labeler = IntervalLabeler(windows, attacker_ip, victim_ip)
+    got = labeler.label(ts, df["id.orig_h"], df["id.resp_h"])
+    want = brute_force_labels(windows, attacker_ip, victim_ip, ts,
+                              ip_to_str(df["id.orig_h"]), ip_to_str(df["id.resp_h"]))
+    assert (got == want).all()
+    assert (got != BENIGN).any()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_labeler_overlapping_windows(seed):
+    rng = np.random.default_rng(seed)
+    names = ["NmapScanAction", "HydraBruteAction", "hping3_template", "SlowHTTPDoS", "Hping3SYN"]
+    windows = []
+    for _ in range(12):
+        t0 = float(rng.integers(0, 900))
+        # Bordas inteiras repetidas: janelas que começam/terminam no mesmo instante
+        windows.append(AttackWindow(str(rng.choice(names)), t0, t0 + float(rng.integers(0, 200))))
+    attacker, victim, other = "10.0.0.1", "10.0.0.2", "10.0.0.3"
+    n = 5_000
+    ts = np.concatenate([rng.uniform(-10, 1200, n - 200), [w.t0 for w in windows], [w.t1 for w in windows],
+                         rng.integers(0, 1200, 200 - 2 * len(windows)).astype(np.float64)])
+    pool = np.array([attacker, victim, other], dtype=object)
+    src, dst = pool[rng.integers(0, 3, len(ts))], pool[rng.integers(0, 3, len(ts))]
+    labeler = IntervalLabeler(windows, attacker, victim)
+    got = labeler.label(ts, src, dst)
+    assert (got == brute_force_labels(windows, attacker, victim, ts, src, dst)).all()
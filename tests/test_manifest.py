@@ -0,0 +1,73 @@
+# tests/test_manifest.py
+"""Catálogo das capturas (lab.data.manifest): refresh incremental, hashes/intervalos por arquivo e manifest."""
+from __future__ import annotations
+
+import os
+import shutil
+from dataclasses import replace
+
+import pytest
+
+from lab.data.manifest import CaptureCatalog, build_manifest, get_latest_run_ts
+from lab.datasets.etl_state import file_hash
+from lab.datasets.parquet_dataset import run_ts_of
+from lab.datasets.pcap_flows import pcap_time_range
+from lab.datasets.synth import SynthSpec, generate_experiment
+
+SPEC = SynthSpec(rows=800, span_s=1800.0, zeek_rotate_s=600.0, gzip_rotated=True, pcap=True, pcap_rotate_s=300.0,
+                 seed=7)
+
+
+@pytest.fixture
+def captures(tmp_path):
+    """Dois runs em <captures>/, com t0 diferentes (run_ts diferentes)."""
+    for name, t0 in (("EXP_A", 1_700_000_000.0), ("EXP_B", 1_700_100_000.0)):
+        generate_experiment(tmp_path / name, replace(SPEC, t0=t0))
+    return tmp_path
+
+
+def test_refresh_is_incremental(captures):
+    with CaptureCatalog(captures) as cat:
+        assert cat.refresh() == {"runs": 2, "indexed": 2, "removed": 0}
+        assert cat.refresh() == {"runs": 2, "indexed": 0, "removed": 0}
+        meta = captures / "EXP_A" / "metadata.json"
+        st = meta.stat()
+        os.utime(meta, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert cat.refresh() == {"runs": 2, "indexed": 1, "removed": 0}
+        shutil.rmtree(captures / "EXP_B")
+        assert cat.refresh() == {"runs": 1, "indexed": 0, "removed": 1}
+        assert [r["run_dir"] for r in cat.runs()] == ["EXP_A"]
+        assert cat.files("EXP_B") == []
+
+
+def test_files_carry_hash_kind_and_time_range(captures):
+    with CaptureCatalog(captures) as cat:
+        cat.refresh()
+        files = {f["rel_path"]: f for f in cat.files("EXP_A")}
+        run = cat.runs(run_ts_of(captures / "EXP_A"))[0]
+    on_disk = sorted(p.relative_to(captures / "EXP_A").as_posix()
+                     for p in (captures / "EXP_A").rglob("*") if p.is_file())
+    assert sorted(files) == on_disk and run["n_files"] == len(on_disk)
+    pcaps = [f for f in files.values() if f["kind"] == "pcap"]
+    assert len(pcaps) > 1
+    for f in pcaps:
+        rng = pcap_time_range(captures / "EXP_A" / f["rel_path"])
+        assert (f["first_ts"], f["last_ts"]) == pytest.approx((rng["first_ts"], rng["last_ts"]))
+    assert any(k.startswith("zeek:conn") for k in (f["kind"] for f in files.values()))
+    for rel, f in files.items():
+        assert f["hash"] == file_hash(captures / "EXP_A" / rel)
+    assert run["first_ts"] <= min(f["first_ts"] for f in pcaps)
+    assert run["last_ts"] >= max(f["last_ts"] for f in pcaps)
+
+
+def test_latest_run_and_manifest(captures):
+    latest = run_ts_of(captures / "EXP_B")
+    assert latest > run_ts_of(captures / "EXP_A")
+    assert get_latest_run_ts(captures) == latest
+    man = build_manifest(latest, cap_dir=captures)
+    assert man["run_ts"] == latest and [r["exp_id"] for r in man["runs"]] == ["EXP_B"]
+    run = man["runs"][0]
+    assert run["path"] == str((captures / "EXP_B").resolve()) and isinstance(run["sensors"], list)
+    assert {f["rel_path"] for f in run["files"]} >= {"metadata.json"}
+    assert [r["exp_id"] for r in build_manifest(None, cap_dir=captures)["runs"]] == ["EXP_A", "EXP_B"]
+    assert build_manifest("19700101T000000Z", cap_dir=captures) == {}
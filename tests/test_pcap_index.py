@@ -0,0 +1,106 @@
+# tests/test_pcap_index.py
+"""Consultas do PcapIndex (tempo, fluxo, export) contra uma varredura completa dos segmentos."""
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets.labeling import load_attack_windows
+from lab.datasets.pcap_flows import _iter_packets, find_pcaps
+from lab.datasets.pcap_index import FlowKey, PcapIndex, build_exp_index, index_dir_of
+from lab.datasets.zeek_reader import ip_to_str
+
+COLUMNS = ["ts_ns", "src", "dst", "sport", "dport", "proto", "ip_len", "file"]
+
+
+def full_scan(exp_dir) -> pd.DataFrame:
+    parts = []
+    for path in find_pcaps(exp_dir):
+        for pk, _, _ in _iter_packets(path, 100_000):
+            # Pcaps do gerador têm resolução de µs: o ts em float volta exato para ns
+            parts.append(pd.DataFrame({
+                "ts_ns": np.round(pk["ts"] * 1e6).astype(np.int64) * 1000,
+                "src": ip_to_str(pk["src"]), "dst": ip_to_str(pk["dst"]),
+                "sport": pk["sport"], "dport": pk["dport"], "proto": pk["proto"], "ip_len": pk["ip_len"],
+                "file": os.path.relpath(path, exp_dir / "sensor")}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _same(got: pd.DataFrame, want: pd.DataFrame) -> None:
+    got = got[COLUMNS].astype({c: np.int64 for c in ("sport", "dport", "proto", "ip_len")})
+    want = want[COLUMNS].astype({c: np.int64 for c in ("sport", "dport", "proto", "ip_len")})
+    key = COLUMNS
+    pd.testing.assert_frame_equal(got.sort_values(key).reset_index(drop=True),
+                                  want.sort_values(key).reset_index(drop=True), check_dtype=False)
+
+
+@pytest.fixture(scope="module")
+def indexed(synth_exp):
+    build_exp_index(synth_exp, full=True)
+    with PcapIndex.for_experiment(synth_exp) as idx:
+        yield synth_exp, idx, full_scan(synth_exp)
+
+
+def test_index_covers_every_packet(indexed):
+    _, idx, scan = indexed
+    assert len(idx) == len(scan)
+    assert (np.diff(np.asarray(idx.ts)) >= 0).all()
+    _same(idx.frame(np.arange(len(idx))), scan)
+
+
+def test_time_range_matches_scan(indexed):
+    exp, idx, scan = indexed
+    rng = np.random.default_rng(0)
+    ts = scan["ts_ns"].to_numpy()
+    for _ in range(20):
+        a, b = np.sort(rng.choice(ts, 2))
+        got = idx.frame(idx.time_range(a / 1e9, b / 1e9))
+        _same(got, scan[(ts >= a) & (ts <= b)])
+    # Janela de ataque do timeline (bordas inclusivas, como o rótulo)
+    w = load_attack_windows(exp)[0]
+    got = idx.time_range(w.t0, w.t1)
+    assert len(got) == int(((ts >= round(w.t0 * 1e9)) & (ts <= round(w.t1 * 1e9))).sum())
+
+
+def test_flow_matches_scan(indexed):
+    _, idx, scan = indexed
+    rng = np.random.default_rng(1)
+    for i in rng.choice(len(scan), 25, replace=False):
+        r = scan.iloc[i]
+        key = FlowKey.parse(f"{r.src}:{r.sport}-{r.dst}:{r.dport}/{'tcp' if r.proto == 6 else 'udp'}")
+        fwd = (scan.src == r.src) & (scan.sport == r.sport) & (scan.dst == r.dst) & (scan.dport == r.dport)
+        rev = (scan.src == r.dst) & (scan.sport == r.dport) & (scan.dst == r.src) & (scan.dport == r.sport)
+        want = scan[(fwd | rev) & (scan.proto == r.proto)]
+        _same(idx.frame(idx.flow(key)), want)
+        ts = np.sort(want.ts_ns.to_numpy())
+        t0, t1 = int(ts[0]), int(ts[len(ts) // 2])
+        _same(idx.frame(idx.flow(key, t0 / 1e9, t1 / 1e9)), want[(want.ts_ns >= t0) & (want.ts_ns <= t1)])
+
+
+def test_write_pcap_roundtrip(indexed, tmp_path):
+    _, idx, scan = indexed
+    ts = scan["ts_ns"].to_numpy()
+    a, b = np.quantile(ts, [0.4, 0.45]).astype(np.int64)
+    out = idx.write_pcap(idx.time_range(a / 1e9, b / 1e9), tmp_path / "cut.pcap")
+    cut = pd.concat([pd.DataFrame({"ts_ns": np.round(pk["ts"] * 1e6).astype(np.int64) * 1000,
+                                   "ip_len": pk["ip_len"]}) for pk, _, _ in _iter_packets(out, 100_000)])
+    want = scan[(ts >= a) & (ts <= b)]
+    assert sorted(zip(cut.ts_ns, cut.ip_len)) == sorted(zip(want.ts_ns, want.ip_len))
+
+
+def test_incremental_rebuild(small_exp):
+    full = build_exp_index(small_exp, full=True)
+    again = build_exp_index(small_exp)
+    assert again["reused_files"] == len(full["files"]) and again["packets"] == full["packets"]
+    seg = find_pcaps(small_exp)[0]
+    st = seg.stat()
+    os.utime(seg, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    part = build_exp_index(small_exp)
+    assert part["reused_files"] == len(full["files"]) - 1
+    assert part["packets"] == full["packets"] and part["flows"] == full["flows"]
+    with PcapIndex(index_dir_of(small_exp)) as idx:
+        assert not idx.stale()
+        _same(idx.frame(np.arange(len(idx))), full_scan(small_exp))
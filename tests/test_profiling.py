@@ -0,0 +1,86 @@
+# tests/test_profiling.py
+"""Perfil por etapa (lab.datasets.profiling): relatório, histórico, dumps e plataformas sem resource//proc."""
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+
+from lab.datasets import profiling
+from lab.datasets.profiling import HISTORY_FILE, PROFILE_FILE, EtlProfiler, count_rows, resolve_dump
+
+
+def _work(n: int = 200_000) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_stages_report_and_history(tmp_path):
+    prof = EtlProfiler("EXP1")
+    with prof.stage("map", rows_in=10) as st:
+        _work()
+        st.rows_out = 7
+    st = prof.begin("reduce")
+    prof.end(st)
+    meta = tmp_path / "meta"
+    for _ in range(2):
+        path = prof.write(meta, extra={"rows": 7})
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert path == meta / PROFILE_FILE and report["name"] == "EXP1" and report["rows"] == 7
+    assert [s["name"] for s in report["stages"]] == ["map", "reduce"]
+    assert report["stages"][0]["rows_in"] == 10 and report["stages"][0]["rows_out"] == 7
+    assert report["stages"][0]["wall_s"] > 0 and report["stages"][0]["cpu_s"] >= 0
+    assert report["peak_rss_mb"] is None or report["peak_rss_mb"] > 0
+    hist = (meta / HISTORY_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(hist) == 2 and set(json.loads(hist[-1])["stages"]) == {"map", "reduce"}
+
+
+def test_stage_closes_on_error(tmp_path):
+    prof = EtlProfiler("EXP1")
+    with pytest.raises(ValueError):
+        with prof.stage("boom"):
+            raise ValueError("x")
+    assert [s.name for s in prof.stages] == ["boom"] and not prof._open
+
+
+def test_without_resource_proc_or_psutil(tmp_path, monkeypatch):
+    """Windows sem psutil: sem pico de RSS nem bytes de /proc, mas o relatório sai igual."""
+    monkeypatch.setattr(profiling, "resource", None)
+    monkeypatch.setattr(profiling, "_HAS_PROC", False)
+    monkeypatch.setattr(profiling, "_HAS_PSUTIL", False)
+    assert profiling.peak_rss_mb() is None
+    prof = EtlProfiler("EXP1")
+    with prof.stage("map"):
+        _work()
+    report = json.loads(prof.write(tmp_path).read_text(encoding="utf-8"))
+    st = report["stages"][0]
+    assert report["peak_rss_mb"] is None and report["rss_per_stage"] is False
+    assert st["peak_rss_mb"] is None and st["children_peak_rss_mb"] is None
+    assert st["bytes_read"] is None and st["wall_s"] > 0
+
+
+def test_cprofile_dump(tmp_path):
+    prof = EtlProfiler("etl:EXP1", dump="cprofile")
+    with prof.stage("etl:EXP1"):
+        _work()
+    report = json.loads(prof.write(tmp_path).read_text(encoding="utf-8"))
+    dump = report["stages"][0]["dump"]
+    assert dump == "profile/00-etl_EXP1.prof" and (tmp_path / dump).stat().st_size > 0
+
+
+def test_resolve_dump(monkeypatch):
+    monkeypatch.delenv("ETL_PROFILE", raising=False)
+    assert resolve_dump(None) is None and resolve_dump("off") is None
+    assert resolve_dump("CProfile") == "cprofile" and resolve_dump("gprof") == "cprofile"
+    monkeypatch.setenv("ETL_PROFILE", "cprofile")
+    assert resolve_dump(None) == "cprofile" and resolve_dump("") is None
+    monkeypatch.setattr(profiling, "_HAS_PYINSTRUMENT", False)
+    assert resolve_dump("pyinstrument") == "cprofile"
+
+
+def test_count_rows(tmp_path):
+    df = pd.DataFrame({"a": range(5)})
+    df.to_parquet(tmp_path / "x.parquet")
+    df.to_csv(tmp_path / "x.csv", index=False)
+    assert count_rows(tmp_path / "x.parquet") == 5 and count_rows(tmp_path / "x.csv") == 5
+    assert count_rows(tmp_path / "missing.csv") is None
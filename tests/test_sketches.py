@@ -0,0 +1,72 @@
+# tests/test_sketches.py
+"""HyperLogLog (sketches.py) contra contagens exatas de distintos."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lab.datasets.features import compute_window_features
+from lab.datasets.sketches import SketchConfig, estimate, merge_states, sketch_state
+
+
+def _groups(rng, cardinalities):
+    """Valores por grupo com repetição (cada distinto aparece 1-4 vezes), embaralhados."""
+    keys, values = [], []
+    for g, n in enumerate(cardinalities):
+        distinct = rng.choice(1 << 40, size=n, replace=False)
+        v = np.repeat(distinct, rng.integers(1, 5, n))
+        keys.append(np.full(len(v), g, dtype=np.int64))
+        values.append(v)
+    order = rng.permutation(sum(len(v) for v in values))
+    return np.concatenate(keys)[order], np.concatenate(values)[order]
+
+
+@pytest.mark.parametrize("error", [0.01, 0.05])
+def test_hll_within_error_bound(error):
+    rng = np.random.default_rng(1)
+    cards = [1, 2, 10, 100, 1_000, 5_000, 20_000, 100_000]
+    keys, values = _groups(rng, cards)
+    cfg = SketchConfig(error=error)
+    est = estimate(sketch_state(pd.DataFrame({"g": keys}), values, cfg), ["g"], cfg).sort_values("g")
+    got = est["estimate"].to_numpy()
+    # 4 desvios-padrão do HLL (1.04/sqrt(m)); a faixa baixa (contagem linear) é praticamente exata
+    tol = 4 * 1.04 / np.sqrt(cfg.m)
+    for n, e in zip(cards, got):
+        assert abs(e - n) <= max(1, tol * n), (n, e)
+
+
+def test_hll_merge_equals_single_pass():
+    rng = np.random.default_rng(2)
+    keys, values = _groups(rng, [50, 3_000, 40_000])
+    cfg = SketchConfig()
+    frame = pd.DataFrame({"g": keys})
+    whole = sketch_state(frame, values, cfg)
+    parts = [sketch_state(frame.iloc[i::5].reset_index(drop=True), values[i::5], cfg) for i in range(5)]
+    merged = merge_states(parts, ["g"], cfg)
+    key = ["g", "reg"]
+    pd.testing.assert_frame_equal(whole.sort_values(key).reset_index(drop=True),
+                                  merged.sort_values(key).reset_index(drop=True))
+
+
+def test_exact_mode_is_exact():
+    rng = np.random.default_rng(3)
+    cards = [1, 7, 333, 12_345]
+    keys, values = _groups(rng, cards)
+    cfg = SketchConfig(exact=True)
+    est = estimate(sketch_state(pd.DataFrame({"g": keys}), values, cfg), ["g"], cfg).sort_values("g")
+    assert est["estimate"].tolist() == cards
+
+
+def test_window_distincts_hll_vs_exact(synth_exp):
+    feats = ["distinct_dst_ports", "distinct_dst_hosts", "distinct_src_hosts"]
+    hll = compute_window_features(synth_exp, window_s=60, features=feats, cache_dir=None, sketch=SketchConfig())
+    exact = compute_window_features(synth_exp, window_s=60, features=feats, cache_dir=None,
+                                    sketch=SketchConfig(exact=True))
+    assert len(hll) == len(exact)
+    tol = 4 * 1.04 / np.sqrt(SketchConfig().m)
+    for c in feats:
+        a, b = hll[c].to_numpy(dtype=np.float64), exact[c].to_numpy(dtype=np.float64)
+        assert (np.abs(a - b) <= np.maximum(1.0, tol * b)).all(), c
+    # A varredura do atacante aparece: muitas portas distintas numa janela
+    assert exact["distinct_dst_ports"].max() > 10